@@ -0,0 +1,48 @@
+"""Compare the pydantic_xml and compiled backends on a large synthetic ResultList.
+
+The result list is built by replicating the person results of an example file.
+
+Usage: python benchmarks/compiled_backend.py [number of person results per class]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pyiof
+
+EXAMPLE = Path(__file__).parent.parent / "tests" / "testdata" / "resultlist" / "generated.xml"
+
+
+def synthetic_resultlist(size: int) -> pyiof.ResultList:
+    resultlist = pyiof.ResultList.read_xml(str(EXAMPLE))
+    for class_result in resultlist.class_results:
+        results = class_result.person_results
+        if results:
+            class_result.person_results = [results[i % len(results)] for i in range(size)]
+    return resultlist
+
+
+def measure(function, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    resultlist = synthetic_resultlist(size)
+    data = resultlist.to_xml()
+    print(f"ResultList with {size} person results per class, {len(data) / 1e6:.1f} MB")
+
+    for backend in ("pydantic_xml", "compiled"):
+        parse = measure(lambda b=backend: pyiof.ResultList.from_xml(data, backend=b))
+        serialize = measure(lambda b=backend: resultlist.to_xml(backend=b))
+        print(f"{backend:>12}: from_xml {parse:.3f} s, to_xml {serialize:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
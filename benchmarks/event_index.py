@@ -0,0 +1,67 @@
+"""Time queries of an index over a large synthetic EventList.
+
+Usage: python benchmarks/event_index.py [number of events]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+import pyiof
+from pyiof.event_index import EventIndex
+
+
+def synthetic_events(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        date = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randrange(366))
+        races = [
+            pyiof.Race(
+                race_number=number,
+                name=f"Race {number}",
+                start_time=pyiof.DateAndOptionalTime(
+                    date=date + datetime.timedelta(days=number - 1)
+                ),
+                position=pyiof.GeoPosition(lat=rng.uniform(55, 69), lng=rng.uniform(5, 30)),
+                discipline=[rng.choice(["Sprint", "Middle", "Long"])],
+            )
+            for number in range(1, rng.choice([1, 1, 2, 3]) + 1)
+        ]
+        events.append(
+            pyiof.Event(
+                name=f"Event {i}",
+                start_time=pyiof.DateAndOptionalTime(date=date),
+                classification=rng.choice(["National", "Regional", "Local"]),
+                races=races,
+                organisers=[pyiof.Organisation(name=f"Club {i % 400}")],
+            )
+        )
+    return events
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    events = synthetic_events(count)
+    start = time.perf_counter()
+    index = EventIndex(events)
+    print(f"build ({len(index)} races): {time.perf_counter() - start:.3f} s")
+    june = (datetime.date(2024, 6, 1), datetime.date(2024, 6, 7))
+    queries = {
+        "radius 20 km": {"near": (60.0, 18.0), "radius": 20},
+        "one week": {"start": june[0], "end": june[1]},
+        "organiser": {"organiser": "Club 7"},
+        "combined": {"near": (60.0, 18.0), "radius": 100, "start": june[0], "discipline": "Sprint"},
+    }
+    for name, query in queries.items():
+        repeat = 1000
+        start = time.perf_counter()
+        for _ in range(repeat):
+            matches = index.query(**query)
+        elapsed = (time.perf_counter() - start) / repeat * 1e6
+        print(f"{name:>14}: {elapsed:7.1f} us, {len(matches)} races")
+
+
+if __name__ == "__main__":
+    main()
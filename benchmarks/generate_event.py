@@ -0,0 +1,31 @@
+"""Generate the messages of a large event and write them to a temporary directory.
+
+Usage: python benchmarks/generate_event.py [number of runners] [number of workers]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from pyiof.generator import MESSAGES, EventGenerator
+
+
+def main() -> None:
+    runners = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    generator = EventGenerator(
+        seed=1, runners=runners, classes=max(20, runners // 1500), clubs=max(50, runners // 250)
+    )
+    print(f"{runners} runners, {workers} workers")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in MESSAGES:
+            start = time.perf_counter()
+            path = generator.write(directory, names=[name], workers=workers)[name]
+            seconds = time.perf_counter() - start
+            size = path.stat().st_size
+            print(f"{name:>20}: {seconds:6.2f} s, {size / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
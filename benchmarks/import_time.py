@@ -0,0 +1,53 @@
+"""Measure the startup time of pyiof in fresh interpreters.
+
+Each scenario runs in a new Python process, the best of several runs is reported.
+`python -X importtime -c "import pyiof"` shows the breakdown per module.
+
+Usage: python benchmarks/import_time.py [number of runs]
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+EXAMPLE = Path(__file__).parent.parent / "tests" / "testdata" / "controlcardlist"
+
+SCENARIOS = {
+    "import pyiof": "import pyiof",
+    "access ControlCardList": "import pyiof; pyiof.ControlCardList",
+    "read ControlCardList": (
+        "import pyiof, glob; "
+        f"pyiof.ControlCardList.read_xml(sorted(glob.glob({str(EXAMPLE / '*.xml')!r}))[0])"
+    ),
+    "access all models": "import pyiof; [getattr(pyiof, name) for name in pyiof.__all__]",
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(statement: str, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMER.format(statement=statement)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        times.append(float(output))
+    return min(times)
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, statement in SCENARIOS.items():
+        print(f"{name:>24}: {measure(statement, runs) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare JSON export and import with pydantic's generic JSON methods.
+
+Usage: python benchmarks/json_export.py [number of person results per class]
+"""
+
+import sys
+import time
+
+from compiled_backend import synthetic_resultlist
+
+import pyiof
+
+
+def measure(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    # re-read, so the person results are distinct objects like in a real file
+    resultlist = pyiof.ResultList.from_xml(synthetic_resultlist(size).to_xml())
+    data = resultlist.to_json()
+    generic = resultlist.model_dump_json()
+    print(f"ResultList with {size} person results per class")
+    print(f"  JSON size: {len(data) / 1e6:.1f} MB, model_dump_json: {len(generic) / 1e6:.1f} MB")
+    print(f"    to_json: {measure(resultlist.to_json):.3f} s")
+    print(f"  iter_json: {measure(lambda: max(map(len, resultlist.iter_json()))):.3f} s")
+    print(f"  from_json: {measure(lambda: pyiof.ResultList.from_json(data)):.3f} s")
+    print(
+        "model_validate_json: "
+        f"{measure(lambda: pyiof.ResultList.model_validate_json(generic)):.3f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
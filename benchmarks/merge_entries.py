@@ -0,0 +1,54 @@
+"""Merge club entry lists with overlapping entries into one event entry list.
+
+Usage: python benchmarks/merge_entries.py [number of clubs] [number of persons]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+import pyiof
+from pyiof.merge import merge_entry_lists
+
+
+def club_entry_lists(clubs: int, persons: int) -> list:
+    rng = random.Random(0)
+    event = pyiof.Event(name="Benchmark Event")
+    organisations = [
+        pyiof.Organisation(id=pyiof.Id(id=str(i)), name=f"OK {i}") for i in range(clubs)
+    ]
+    entries = [[] for _ in range(clubs)]
+    for i in range(persons):
+        club = i % clubs
+        person = pyiof.Person(
+            ids=[pyiof.Id(id=str(i), type="NAT")],
+            name=pyiof.PersonName(family_name=f"Family {i}", given_name=f"Given {i}"),
+            birth_date=datetime.date(1950 + i % 60, 1 + i % 12, 1 + i % 28),
+        )
+        entry = pyiof.PersonEntry(
+            person=person,
+            organisation=organisations[club],
+            classes=[pyiof.Class_(name=f"H{21 + i % 10}")],
+        )
+        entries[club].append(entry)
+        # every tenth person is also entered by another club, without id
+        if i % 10 == 0:
+            duplicate = person.model_copy(update={"ids": []})
+            entries[rng.randrange(clubs)].append(entry.model_copy(update={"person": duplicate}))
+    return [pyiof.EntryList(event=event, person_entries=club) for club in entries]
+
+
+def main() -> None:
+    clubs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    persons = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    entry_lists = club_entry_lists(clubs, persons)
+
+    start = time.perf_counter()
+    _, report = merge_entry_lists(entry_lists)
+    print(f"merge: {time.perf_counter() - start:.3f} s")
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare reading one runner of a large ResultList by parsing it and by its index.
+
+Usage: python benchmarks/message_index.py [number of runners]
+"""
+
+import sys
+import tempfile
+import time
+
+from pyiof.generator import EventGenerator
+from pyiof.index import MessageIndex
+from pyiof.message_elements import ResultList
+
+
+def main() -> None:
+    runners = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as directory:
+        path = EventGenerator(seed=1, runners=runners).write(directory, ["ResultList"])
+        path = path["ResultList"]
+        print(f"      size: {path.stat().st_size / 1024**2:.1f} MB")
+
+        start = time.perf_counter()
+        ResultList.read_xml(str(path))
+        print(f"     parse: {time.perf_counter() - start:.3f} s")
+        start = time.perf_counter()
+        index = MessageIndex.open(path)
+        print(f"     index: {time.perf_counter() - start:.3f} s")
+        start = time.perf_counter()
+        index = MessageIndex.open(path)
+        print(f"load index: {time.perf_counter() - start:.3f} s")
+        key = next(key for key in index.entry_keys if key[0] == "person")
+        start = time.perf_counter()
+        index.read_entries(key)
+        print(f"    runner: {time.perf_counter() - start:.4f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Compare reading a large ResultList from XML and from the parse cache.
+
+Usage: python benchmarks/parse_cache.py [number of person results per class]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from compiled_backend import synthetic_resultlist
+
+import pyiof
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "results.xml"
+        # re-read, so the person results are distinct objects like in a real file
+        data = synthetic_resultlist(size).to_xml()
+        pyiof.ResultList.from_xml(data).write_xml(str(path))
+        cache_dir = Path(directory) / "cache"
+
+        start = time.perf_counter()
+        pyiof.ResultList.read_xml(str(path))
+        print(f"       xml: {time.perf_counter() - start:.3f} s")
+        start = time.perf_counter()
+        pyiof.ResultList.read_xml(str(path), cache_dir=cache_dir)
+        print(f"cold cache: {time.perf_counter() - start:.3f} s")
+        start = time.perf_counter()
+        pyiof.ResultList.read_xml(str(path), cache_dir=cache_dir)
+        print(f"warm cache: {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Match entries without ids against a large competitor database.
+
+Usage: python benchmarks/person_matching.py [number of competitors] [number of entries]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+import pyiof
+from pyiof.matching import PersonIndex
+
+FAMILY = [
+    "Müller", "Schmidt", "Hansen", "Johansson", "Nilsson", "Novák", "Kowalski", "Smith",
+    "Jones", "Petrov", "Dubois", "Rossi", "Virtanen", "Korhonen", "Berg", "Lund",
+]  # fmt: skip
+GIVEN = [
+    "Anna", "Jörg", "Ole", "Kari", "Maria", "Jan", "Eva", "Lars", "Sara", "Mikko",
+    "Emma", "Peter", "Ida", "Tomas", "Lena", "Paul",
+]  # fmt: skip
+
+
+def competitors(size: int, rng: random.Random) -> list:
+    result = []
+    for i in range(size):
+        person = pyiof.Person(
+            ids=[pyiof.Id(id=str(i), type="NAT")],
+            name=pyiof.PersonName(
+                family_name=f"{rng.choice(FAMILY)}{rng.choice(['', 'son', 'er', 'ova'])}",
+                given_name=f"{rng.choice(GIVEN)} {rng.choice(GIVEN)}",
+            ),
+            birth_date=datetime.date(1940, 1, 1) + datetime.timedelta(days=rng.randrange(25000)),
+            sex=rng.choice("MF"),
+        )
+        result.append(pyiof.Competitor(person=person))
+    return result
+
+
+def entries(database: list, size: int, rng: random.Random) -> list:
+    result = []
+    for competitor in rng.sample(database, size):
+        person = competitor.person
+        # late entries: no id, upper case family name, only the first given name
+        name = pyiof.PersonName(
+            family_name=person.name.family_name.upper(),
+            given_name=person.name.given_name.split()[0],
+        )
+        entry_person = person.model_copy(update={"ids": [], "name": name})
+        result.append(pyiof.PersonEntry(person=entry_person))
+    return result
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(0)
+    database = competitors(size, rng)
+    batch = entries(database, queries, rng)
+
+    start = time.perf_counter()
+    index = PersonIndex(database)
+    print(f"index {size} competitors: {time.perf_counter() - start:.3f} s")
+    start = time.perf_counter()
+    matches = index.match_entries(batch)
+    elapsed = time.perf_counter() - start
+    print(f"match {queries} entries: {elapsed:.3f} s ({elapsed / queries * 1e3:.3f} ms per entry)")
+    correct = sum(
+        m is not None and m.competitor.person.birth_date == e.person.birth_date
+        for e, m in zip(batch, matches, strict=True)
+    )
+    print(f"correct: {correct}/{queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compute a ranking list from a season of result lists.
+
+Usage: python benchmarks/ranking.py [number of races] [number of runners]
+"""
+
+import random
+import sys
+import time
+
+import pyiof
+from pyiof.ranking import Ranking, WRSFormula
+
+CLASSES = 10
+FIELD = 150
+
+
+def season(races: int, runners: int) -> list:
+    rng = random.Random(0)
+    persons = [
+        pyiof.Person(
+            ids=[pyiof.Id(id=str(i), type="IOF")],
+            name=pyiof.PersonName(family_name=f"Family {i}", given_name=f"Given {i}"),
+        )
+        for i in range(runners)
+    ]
+    skill = [rng.gauss(1.0, 0.1) for _ in range(runners)]
+    result_lists = []
+    for race in range(races):
+        class_results = []
+        for class_number in range(CLASSES):
+            field = rng.sample(range(runners), FIELD)
+            person_results = [
+                pyiof.PersonResult(
+                    person=persons[i],
+                    results=[
+                        pyiof.PersonRaceResult(
+                            time=3600 * skill[i] * rng.gauss(1.0, 0.05),
+                            status="OK" if rng.random() > 0.05 else "MissingPunch",
+                        )
+                    ],
+                )
+                for i in field
+            ]
+            class_results.append(
+                pyiof.ClassResult(
+                    class_=pyiof.Class_(name=f"H{class_number}"), person_results=person_results
+                )
+            )
+        result_lists.append(
+            pyiof.ResultList(event=pyiof.Event(name=f"Race {race}"), class_results=class_results)
+        )
+    return result_lists
+
+
+def main() -> None:
+    races = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    runners = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    result_lists = season(races, runners)
+
+    start = time.perf_counter()
+    ranking = Ranking(WRSFormula(), best_of=5)
+    ranking.add_result_lists(result_lists)
+    competitors = ranking.to_competitor_list()
+    elapsed = time.perf_counter() - start
+    print(f"{len(ranking.races)} races, {len(competitors.competitors)} ranked: {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
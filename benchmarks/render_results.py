@@ -0,0 +1,80 @@
+"""Render a large result list as HTML, streamed class by class and from the loaded model.
+
+Usage: python benchmarks/render_results.py [number of classes] [runners per class]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pyiof
+from pyiof.render import render_file, render_html
+
+
+def result_list(classes: int, runners: int) -> pyiof.ResultList:
+    class_results = []
+    for number in range(classes):
+        person_results = [
+            pyiof.PersonResult(
+                person=pyiof.Person(
+                    name=pyiof.PersonName(family_name=f"Family {i}", given_name=f"Given {i}")
+                ),
+                organisation=pyiof.Organisation(name=f"Club {i % 50}"),
+                results=[
+                    pyiof.PersonRaceResult(
+                        time=3000 + 10 * i,
+                        time_behind=10 * i,
+                        position=i + 1,
+                        status="OK",
+                        split_time=[
+                            pyiof.SplitTime(control_card=str(31 + c), time=(c + 1) * 150 + i)
+                            for c in range(15)
+                        ],
+                    )
+                ],
+            )
+            for i in range(runners)
+        ]
+        class_results.append(
+            pyiof.ClassResult(class_=pyiof.Class_(name=f"H{number}"), person_results=person_results)
+        )
+    return pyiof.ResultList(event=pyiof.Event(name="Benchmark"), class_results=class_results)
+
+
+def peak(function) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main() -> None:
+    classes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    runners = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "results.xml"
+        result_list(classes, runners).write_xml(str(path))
+        print(f"{classes} classes, {path.stat().st_size / 1e6:.1f} MB XML")
+
+        def streamed():
+            with open(os.devnull, "w") as out:
+                render_file(str(path), pyiof.ResultList, out)
+
+        def loaded():
+            with open(os.devnull, "w") as out:
+                render_html(pyiof.ResultList.read_xml(str(path)), out)
+
+        # tracing slows both down considerably
+        for name, function in (("streamed", streamed), ("loaded", loaded)):
+            elapsed, megabytes = peak(function)
+            print(f"{name:>9}: {elapsed:.2f} s, peak {megabytes:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Compare summarizing a large ServiceRequestList by parsing it and in one streaming pass.
+
+Usage: python benchmarks/service_requests.py [number of runners]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pyiof.generator import EventGenerator
+from pyiof.message_elements import ServiceRequestList
+from pyiof.services import ServiceSummary, summarize_services
+
+
+def main() -> None:
+    runners = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        generator = EventGenerator(seed=1, runners=runners)
+        path = generator.write(directory, ["ServiceRequestList"])["ServiceRequestList"]
+        print(f"     size: {path.stat().st_size / 1024**2:.1f} MB")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        summary = ServiceSummary()
+        summary.add(ServiceRequestList.read_xml(str(path)))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        print(f"    parse: {elapsed:.3f} s, peak {peak / 1024**2:.1f} MB")
+
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        streamed = summarize_services(path)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"streaming: {elapsed:.3f} s, peak {peak / 1024**2:.1f} MB")
+        assert streamed.services == summary.services
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,262 @@
-import importlib.metadata
-
-from .class_ import Class_
-from .competitor import *
-from .contact import *
-from .event import *
-from .message_elements import (  # noqa: F401
-    ClassList,
-    CompetitorList,
-    ControlCardList,
-    CourseData,
-    EntryList,
-    EventList,
-    OrganisationList,
-    ResultList,
-    ServiceRequestList,
-    StartList,
-)
-from .result import *
-from .start import *
-
-__version__ = importlib.metadata.version(__package__ or __name__)
-del importlib.metadata
+"""Python bindings for the IOF data standard 3.0.
+
+The public models are imported lazily on first attribute access, e.g. `pyiof.ResultList`,
+and their schemas are built on first use, so `import pyiof` stays cheap.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .base import DateAndOptionalTime, GeoPosition, Id, Image, Score
+    from .class_ import Class_
+    from .competitor import (
+        Competitor,
+        ControlCard,
+        PersonEntry,
+        StartTimeAllocationRequest,
+        TeamEntry,
+        TeamEntryPerson,
+    )
+    from .contact import (
+        Address,
+        Contact,
+        Country,
+        EntryReceiver,
+        Organisation,
+        Person,
+        PersonName,
+        Role,
+        Sex,
+    )
+    from .course import ControlAnswer, Route, SimpleCourse, SimpleRaceCourse, StartName
+    from .event import Event, EventClassification, EventForm, EventStatus, Race, RaceDiscipline
+    from .fee import Account, AssignedFee
+    from .message_elements import (
+        ClassList,
+        CompetitorList,
+        ControlCardList,
+        CourseData,
+        EntryList,
+        EventList,
+        OrganisationList,
+        ResultList,
+        ServiceRequestList,
+        StartList,
+    )
+    from .misc import EventURL, InformationItem, Schedule, Service, ServiceRequest
+    from .result import (
+        ClassResult,
+        OverallResult,
+        PersonRaceResult,
+        PersonResult,
+        ResultStatus,
+        SplitTime,
+        TeamMemberRaceResult,
+        TeamMemberResult,
+        TeamPosition,
+        TeamResult,
+        TeamTimeBehind,
+    )
+    from .start import (
+        ClassStart,
+        PersonRaceStart,
+        PersonStart,
+        TeamMemberRaceStart,
+        TeamMemberStart,
+        TeamStart,
+    )
+    from .xml_base import BaseXmlModel
+
+# public name -> submodule it is imported from
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    **dict.fromkeys(["DateAndOptionalTime", "GeoPosition", "Id", "Image", "Score"], "base"),
+    "Class_": "class_",
+    **dict.fromkeys(
+        [
+            "Competitor",
+            "ControlCard",
+            "PersonEntry",
+            "StartTimeAllocationRequest",
+            "TeamEntry",
+            "TeamEntryPerson",
+        ],
+        "competitor",
+    ),
+    **dict.fromkeys(
+        [
+            "Address",
+            "Contact",
+            "Country",
+            "EntryReceiver",
+            "Organisation",
+            "Person",
+            "PersonName",
+            "Role",
+            "Sex",
+        ],
+        "contact",
+    ),
+    **dict.fromkeys(
+        ["ControlAnswer", "Route", "SimpleCourse", "SimpleRaceCourse", "StartName"], "course"
+    ),
+    **dict.fromkeys(
+        ["Event", "EventClassification", "EventForm", "EventStatus", "Race", "RaceDiscipline"],
+        "event",
+    ),
+    **dict.fromkeys(["Account", "AssignedFee"], "fee"),
+    **dict.fromkeys(
+        [
+            "ClassList",
+            "CompetitorList",
+            "ControlCardList",
+            "CourseData",
+            "EntryList",
+            "EventList",
+            "OrganisationList",
+            "ResultList",
+            "ServiceRequestList",
+            "StartList",
+        ],
+        "message_elements",
+    ),
+    **dict.fromkeys(
+        ["EventURL", "InformationItem", "Schedule", "Service", "ServiceRequest"], "misc"
+    ),
+    **dict.fromkeys(
+        [
+            "ClassResult",
+            "OverallResult",
+            "PersonRaceResult",
+            "PersonResult",
+            "ResultStatus",
+            "SplitTime",
+            "TeamMemberRaceResult",
+            "TeamMemberResult",
+            "TeamPosition",
+            "TeamResult",
+            "TeamTimeBehind",
+        ],
+        "result",
+    ),
+    **dict.fromkeys(
+        [
+            "ClassStart",
+            "PersonRaceStart",
+            "PersonStart",
+            "TeamMemberRaceStart",
+            "TeamMemberStart",
+            "TeamStart",
+        ],
+        "start",
+    ),
+    "BaseXmlModel": "xml_base",
+}
+
+# submodules which were available as attributes of the package before lazy loading
+_SUBMODULES = {
+    "base",
+    "class_",
+    "competitor",
+    "compiled",
+    "contact",
+    "course",
+    "event",
+    "fee",
+    "message_elements",
+    "misc",
+    "payload",
+    "result",
+    "start",
+    "xml_base",
+}
+
+__all__ = [
+    "Account",
+    "Address",
+    "AssignedFee",
+    "BaseXmlModel",
+    "ClassList",
+    "ClassResult",
+    "ClassStart",
+    "Class_",
+    "Competitor",
+    "CompetitorList",
+    "Contact",
+    "ControlAnswer",
+    "ControlCard",
+    "ControlCardList",
+    "Country",
+    "CourseData",
+    "DateAndOptionalTime",
+    "EntryList",
+    "EntryReceiver",
+    "Event",
+    "EventClassification",
+    "EventForm",
+    "EventList",
+    "EventStatus",
+    "EventURL",
+    "GeoPosition",
+    "Id",
+    "Image",
+    "InformationItem",
+    "Organisation",
+    "OrganisationList",
+    "OverallResult",
+    "Person",
+    "PersonEntry",
+    "PersonName",
+    "PersonRaceResult",
+    "PersonRaceStart",
+    "PersonResult",
+    "PersonStart",
+    "Race",
+    "RaceDiscipline",
+    "ResultList",
+    "ResultStatus",
+    "Role",
+    "Route",
+    "Schedule",
+    "Score",
+    "Service",
+    "ServiceRequest",
+    "ServiceRequestList",
+    "Sex",
+    "SimpleCourse",
+    "SimpleRaceCourse",
+    "SplitTime",
+    "StartList",
+    "StartName",
+    "StartTimeAllocationRequest",
+    "TeamEntry",
+    "TeamEntryPerson",
+    "TeamMemberRaceResult",
+    "TeamMemberRaceStart",
+    "TeamMemberResult",
+    "TeamMemberStart",
+    "TeamPosition",
+    "TeamResult",
+    "TeamStart",
+    "TeamTimeBehind",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        module = import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        return import_module(f".{name}", __name__)
+    elif name == "__version__":
+        from importlib import metadata  # noqa: PLC0415 (only needed for the version)
+
+        value = metadata.version(__package__ or __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | _SUBMODULES)
@@ -0,0 +1,114 @@
+"""asyncio support for reading and writing messages.
+
+Parsing and serializing large messages is CPU bound and would block the event loop for
+seconds. The functions of this module run the work in an executor instead, by default
+the thread pool of the event loop. A `concurrent.futures.ProcessPoolExecutor` can be used
+for `aread_xml` and `awrite_xml` to avoid contention on the GIL, the models are then
+pickled between the processes.
+
+The async iterators process one item per step, only when the consumer asks for it, which
+gives natural backpressure: a slow consumer (e.g. a websocket) pauses parsing instead of
+queueing parsed classes in memory. When iteration is cancelled or stopped, the
+underlying stream is closed after the step in progress.
+
+    stream = await astream_message("results.xml", pyiof.ResultList)
+    async for class_result in stream.items:
+        ...
+"""
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import functools
+import threading
+from typing import Any, AsyncIterator, Dict, Generic, Iterator, Optional, Type, TypeVar
+
+import pydantic_xml
+
+from .compiled import Backend
+from .json_io import iter_json
+from .streaming import M, Source, StreamedMessage, stream_message
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def run(executor: Optional[concurrent.futures.Executor], function: Any, *args, **kwargs):
+    """Run a function in an executor, None for the default executor of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(function, *args, **kwargs))
+
+
+async def aiterate(
+    iterator: Iterator[T], executor: Optional[concurrent.futures.Executor] = None
+) -> AsyncIterator[T]:
+    """Iterate over a blocking iterator in a thread executor, one item at a time."""
+    lock = threading.Lock()
+
+    def step() -> Any:
+        with lock:
+            return next(iterator, _DONE)
+
+    def close() -> None:
+        with lock:
+            getattr(iterator, "close", lambda: None)()
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            item = await loop.run_in_executor(executor, step)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        # a cancelled step may still be running, close waits for it in the executor, and
+        # the iterator is closed when the async iterator is, or raises its errors
+        await loop.run_in_executor(executor, close)
+
+
+@dataclasses.dataclass
+class AsyncStreamedMessage(Generic[M]):
+    """A message element which is read incrementally, see `astream_message`.
+
+    Attributes:
+        header (BaseXmlModel): The message element without the streamed items.
+        field (str): Name of the streamed field of the message element.
+        items (AsyncIterator): The parsed items of the streamed field.
+    """
+
+    header: M
+    field: str
+    items: AsyncIterator[Any]
+
+
+async def astream_message(
+    source: Source,
+    cls: Type[M],
+    field: Optional[str] = None,
+    context: Optional[Dict[str, Any]] = None,
+    backend: Backend = "compiled",
+    executor: Optional[concurrent.futures.ThreadPoolExecutor] = None,
+) -> AsyncStreamedMessage[M]:
+    """Read a message element incrementally, see `pyiof.streaming.stream_message`.
+
+    Args:
+        executor (ThreadPoolExecutor, optional): executor for parsing, defaults to the
+            thread pool of the event loop. Process pools are not supported, as the state
+            of the parser can't be shared between processes.
+    """
+    stream = await run(executor, stream_message, source, cls, field, context, backend)
+    return AsyncStreamedMessage(
+        header=stream.header, field=stream.field, items=aiterate(stream.items, executor)
+    )
+
+
+def aiter_json(
+    message: pydantic_xml.BaseXmlModel | StreamedMessage,
+    executor: Optional[concurrent.futures.ThreadPoolExecutor] = None,
+) -> AsyncIterator[str]:
+    """Serialize a message element to JSON in chunks, see `pyiof.json_io.iter_json`.
+
+    Chunks are produced on demand, e.g. while writing them to an HTTP response.
+    """
+    return aiterate(iter_json(message), executor)
@@ -1,6 +1,10 @@
+import base64
 import datetime
-from typing import Literal, Optional
+from typing import Literal, Optional, Union
 
+from pydantic import ValidationInfo, field_serializer, model_validator
+
+from .payload import ImagePayload, ImageStorage
 from .xml_base import BaseXmlModel, attr, element
 
 
@@ -22,8 +26,12 @@ class Image(BaseXmlModel):
     Defines an image file, either as a link (use the url attribute)
     or as base64-encoded binary data.
 
+    Large payloads can be kept out of Python strings by reading the message with
+    an `ImageStorage` mode, or by calling `spill`. `data` is then an `ImagePayload`,
+    which is streamed back in base64 chunks by `write_xml`.
+
     Attributes:
-        data: base64 encoded data
+        data (str | ImagePayload): base64 encoded data
         mediatype (str): The type of the image file, e.g. image/jpeg. Refer to
                    https://www.iana.org/assignments/media-types/media-types.xhtml#image
                    for available media types.
@@ -32,13 +40,39 @@ class Image(BaseXmlModel):
         resolution (double, optional): The resolution of the image in dpi.
     """
 
-    data: str
+    data: Union[str, ImagePayload]
     mediatype: str = attr(name="mediaType")
     url: Optional[str] = attr(default=None)
     width: Optional[int] = attr(default=None)
     height: Optional[int] = attr(default=None)
     resolution: Optional[float] = attr(default=None)
 
+    @model_validator(mode="after")
+    def apply_image_storage(self, info: ValidationInfo) -> "Image":
+        storage = info.context.get("image_storage") if info.context else None
+        if (
+            isinstance(storage, ImageStorage)
+            and isinstance(self.data, str)
+            and len(self.data) >= storage.threshold
+        ):
+            self.data = ImagePayload.from_base64(self.data, storage.mode, storage.directory)
+        return self
+
+    @field_serializer("data")
+    def serialize_data(self, data: Union[str, ImagePayload]) -> str:
+        return data.serialize() if isinstance(data, ImagePayload) else data
+
+    def content(self) -> bytes:
+        """The decoded image data."""
+        if isinstance(self.data, ImagePayload):
+            return self.data.read()
+        return base64.b64decode(self.data)
+
+    def spill(self, directory: Optional[str] = None) -> None:
+        """Move the image data to a temporary file."""
+        if isinstance(self.data, str):
+            self.data = ImagePayload.from_base64(self.data, "spill", directory)
+
 
 class DateAndOptionalTime(BaseXmlModel):
     """Defines a point in time which either is known by date and time,
@@ -0,0 +1,117 @@
+"""On-disk cache of parsed messages.
+
+`read_xml(path, cache_dir=...)` stores a pickled snapshot of the validated model, keyed by
+a hash of the file content, the model class, the read options and the versions of pyiof
+and pydantic. On a cache hit the model is restored from the snapshot without parsing or
+validating the XML again.
+
+Entries are evicted least recently used first when the size of the cache directory
+exceeds its limit. The cache can be shared between processes, entries are written
+atomically. Snapshots are pickles, so the cache directory must only be writable by
+trusted users.
+"""
+
+import contextlib
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import pydantic
+
+from .utils import gc_paused
+
+DEFAULT_MAX_SIZE = 1024**3
+
+_SUFFIX = ".pyiof-cache"
+
+
+@functools.cache
+def _versions() -> bytes:
+    return f"pyiof {metadata.version('pyiof')}, pydantic {pydantic.VERSION}".encode()
+
+
+class ParseCache:
+    """Directory of cached model snapshots.
+
+    Attributes:
+        directory (Path): Directory of the cache entries, created on first use.
+        max_size (int): Maximum total size of the cache entries in bytes.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def key(self, cls: type, data: bytes, options: Any = None) -> str:
+        """Cache key of a message read from `data` as `cls` with the given read options."""
+        h = hashlib.sha256(_versions())
+        h.update(f"\0{cls.__module__}.{cls.__qualname__}\0{options!r}\0".encode())
+        h.update(data)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + _SUFFIX)
+
+    def load(self, key: str) -> Optional[Any]:
+        """The cached model of a key, None on a cache miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f, gc_paused():
+                model = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # truncated or incompatible entry
+            with contextlib.suppress(OSError):
+                path.unlink()
+            return None
+        # the modification time orders entries for eviction
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return model
+
+    def store(self, key: str, model: Any) -> None:
+        """Store a model and evict old entries if the cache exceeds its size limit."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=_SUFFIX, dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the size limit is met."""
+        entries = []
+        total = 0
+        for path in self.directory.glob("*" + _SUFFIX):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for path in self.directory.glob("*" + _SUFFIX):
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
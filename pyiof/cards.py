@@ -0,0 +1,408 @@
+"""Registry of control cards across messages.
+
+`CardRegistry` indexes the control cards of rental pools (`ControlCardList`) and the
+cards referenced by competitors, entries, starts and results by punching system and
+card number. Lookups of the owner, rental status, holders and duplicates of a card take
+constant time, and the registry is updated incrementally when a message, a class or a
+single entry is added again or removed:
+
+    registry = CardRegistry(default_system="SI")
+    registry.add(rental_cards)
+    registry.add(entry_list)
+    registry.add(start_list)
+
+    # at the start gate
+    conflicts = registry.assign("2071234", person, race=1)
+    ...
+    registry.mark_returned("8000017")
+    print(registry.missing_returns())
+
+Persons are identified by their first id, or by their normalized name if they have
+none, so namesakes with different ids are different persons. A card used by different persons in
+the same race is a duplicate; cards of entries without race numbers and of competitor
+lists count for every race, start list and result entries without race number are
+race 1.
+"""
+
+import dataclasses
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .competitor import Competitor, ControlCard, PersonEntry, TeamEntry
+from .contact import Person
+from .merge import id_key, normalize_name
+from .message_elements import CompetitorList, ControlCardList, EntryList, ResultList, StartList
+from .result import ClassResult, PersonResult, TeamResult
+from .start import ClassStart, PersonStart, TeamStart
+
+CardKey = Tuple[str, str]
+"""A control card as (punching system, card number)."""
+
+CardLike = Union[ControlCard, CardKey, str]
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class CardUse:
+    """A reference to a control card by a person.
+
+    Attributes:
+        key (CardKey): The card as (punching system, card number).
+        source (Hashable): The source the reference was added from, see
+            `CardRegistry.add`.
+        holder (Hashable): The identity of the person, their first id or their
+            normalized name.
+        person (Person, optional): The person using the card.
+        race (int, optional): The race number, None if the card is used in all races.
+        leg (int, optional): The leg of a team member.
+        record (Any): The model referencing the card, e.g. a `PersonStart`.
+    """
+
+    key: CardKey
+    source: Hashable
+    holder: Hashable
+    person: Optional[Person]
+    race: Optional[int]
+    leg: Optional[int]
+    record: Any
+
+
+# a card reference found in a model: card, person, race, leg and the referencing record
+_Reference = Tuple[ControlCard, Optional[Person], Optional[int], Optional[int], Any]
+
+
+def _competitor(competitor: Competitor) -> Iterator[_Reference]:
+    for card in competitor.controlcards:
+        yield card, competitor.person, None, None, competitor
+
+
+def _person_entry(entry: PersonEntry) -> Iterator[_Reference]:
+    for race in entry.race_number or [None]:
+        for card in entry.controlcards:
+            yield card, entry.person, race, None, entry
+
+
+def _team_entry(entry: TeamEntry) -> Iterator[_Reference]:
+    for race in entry.race or [None]:
+        for member in entry.team_entry_persons:
+            for card in member.control_card:
+                yield card, member.person, race, member.leg, entry
+
+
+def _person_start(start: PersonStart) -> Iterator[_Reference]:
+    for race_start in start.starts:
+        for card in race_start.control_card:
+            yield card, start.person, race_start.race_number or 1, None, start
+
+
+def _team_start(start: TeamStart) -> Iterator[_Reference]:
+    for member in start.team_member_starts:
+        for race_start in member.starts:
+            for card in race_start.control_card:
+                yield card, member.person, race_start.race_number or 1, race_start.leg, start
+
+
+def _person_result(result: PersonResult) -> Iterator[_Reference]:
+    for race_result in result.results:
+        for card in race_result.control_card:
+            yield card, result.person, race_result.race_number or 1, None, result
+
+
+def _team_result(result: TeamResult) -> Iterator[_Reference]:
+    for member in result.team_member_results:
+        for race_result in member.results:
+            for card in race_result.control_card:
+                race = race_result.race_number or 1
+                yield card, member.person, race, race_result.leg, result
+
+
+def _class_start(class_start: ClassStart) -> Iterator[_Reference]:
+    for person_start in class_start.person_starts:
+        yield from _person_start(person_start)
+    for team_start in class_start.team_starts:
+        yield from _team_start(team_start)
+
+
+def _class_result(class_result: ClassResult) -> Iterator[_Reference]:
+    for person_result in class_result.person_results:
+        yield from _person_result(person_result)
+    for team_result in class_result.team_results:
+        yield from _team_result(team_result)
+
+
+def _items(field: str, walk: Callable[[Any], Iterator[_Reference]]) -> Callable:
+    def references(model: Any) -> Iterator[_Reference]:
+        for item in getattr(model, field):
+            yield from walk(item)
+
+    return references
+
+
+_WALKERS: Dict[type, Callable[[Any], Iterator[_Reference]]] = {
+    Competitor: _competitor,
+    PersonEntry: _person_entry,
+    TeamEntry: _team_entry,
+    PersonStart: _person_start,
+    TeamStart: _team_start,
+    PersonResult: _person_result,
+    TeamResult: _team_result,
+    ClassStart: _class_start,
+    ClassResult: _class_result,
+    CompetitorList: _items("competitors", _competitor),
+    StartList: _items("class_starts", _class_start),
+    ResultList: _items("class_results", _class_result),
+}
+
+
+def _entry_list(entry_list: EntryList) -> Iterator[_Reference]:
+    for team_entry in entry_list.team_entries:
+        yield from _team_entry(team_entry)
+    for person_entry in entry_list.person_entries:
+        yield from _person_entry(person_entry)
+
+
+_WALKERS[EntryList] = _entry_list
+
+
+def _holder(person: Optional[Person], record: Any) -> Hashable:
+    if person is None:
+        return ("record", id(record))
+    for identifier in person.ids:
+        if identifier.id:
+            return id_key(identifier)
+    name = person.name
+    return ("name", normalize_name(name.family_name), normalize_name(name.given_name))
+
+
+class CardRegistry:
+    """Index of control cards by punching system and card number.
+
+    Args:
+        default_system: the punching system of cards without one, e.g. "SI"
+    """
+
+    def __init__(self, default_system: str = ""):
+        self.default_system = default_system
+        # rental pools: card -> owners by source
+        self._pools: Dict[CardKey, Dict[Hashable, Optional[str]]] = {}
+        self._uses: Dict[CardKey, List[CardUse]] = {}
+        self._sources: Dict[Hashable, Tuple[List[CardKey], List[CardUse]]] = {}
+        self._duplicates: Set[CardKey] = set()
+        self._returned: Set[CardKey] = set()
+        # rental cards in use which haven't been returned
+        self._outstanding: Set[CardKey] = set()
+
+    def key(self, card: CardLike) -> CardKey:
+        """The key of a card, a card number is of the default punching system."""
+        if isinstance(card, ControlCard):
+            return (card.punching_system or self.default_system, card.id.strip())
+        if isinstance(card, str):
+            return (self.default_system, card.strip())
+        return card
+
+    def __len__(self) -> int:
+        """The number of distinct cards, in pools or used."""
+        return len(self._pools.keys() | self._uses.keys())
+
+    def __contains__(self, card: CardLike) -> bool:
+        key = self.key(card)
+        return key in self._pools or key in self._uses
+
+    # updates
+
+    def add(self, model: Any, source: Optional[Hashable] = None) -> None:
+        """Index the cards of a message, a class or an entry.
+
+        The cards previously added from the same source are replaced, so a message can be
+        added again after it has been reloaded.
+
+        Args:
+            model: a `ControlCardList` as rental pool, or a `CompetitorList`,
+                `EntryList`, `StartList`, `ResultList`, `ClassStart`, `ClassResult` or one
+                of their entries
+            source: the identity of the source, the model class name by default, e.g. a
+                file name or ("StartList", class name) for classes added separately
+        """
+        source = type(model).__name__ if source is None else source
+        self.remove(source)
+        pool: List[CardKey] = []
+        uses: List[CardUse] = []
+        self._sources[source] = (pool, uses)
+        if isinstance(model, ControlCardList):
+            for card in model.control_cards:
+                key = self.key(card)
+                self._pools.setdefault(key, {})[source] = model.owner
+                pool.append(key)
+                self._update(key)
+            return
+        walk = _WALKERS.get(type(model))
+        if walk is None:
+            raise TypeError(f"CardRegistry: can't index {type(model).__name__}")
+        for card, person, race, leg, record in walk(model):
+            key = self.key(card)
+            use = CardUse(key, source, _holder(person, record), person, race, leg, record)
+            self._uses.setdefault(key, []).append(use)
+            uses.append(use)
+            self._update(key)
+
+    def remove(self, source: Hashable) -> None:
+        """Remove the cards added from a source."""
+        if source not in self._sources:
+            return
+        pool, uses = self._sources.pop(source)
+        for key in pool:
+            owners = self._pools[key]
+            del owners[source]
+            if not owners:
+                del self._pools[key]
+            self._update(key)
+        for use in uses:
+            remaining = [u for u in self._uses[use.key] if u is not use]
+            if remaining:
+                self._uses[use.key] = remaining
+            else:
+                del self._uses[use.key]
+            self._update(use.key)
+
+    def assign(
+        self, card: CardLike, person: Person, race: Optional[int] = 1, leg: Optional[int] = None
+    ) -> List[CardUse]:
+        """Register a card handed to a person, e.g. at the start gate.
+
+        The assignment replaces earlier assignments of the card to the person in the race.
+
+        Returns:
+            the uses of the card by other persons in the same race, empty if the card
+            isn't a duplicate
+        """
+        key = self.key(card)
+        holder = _holder(person, person)
+        source = ("assign", key, holder, race)
+        self.remove(source)
+        use = CardUse(key, source, holder, person, race, leg, person)
+        self._sources[source] = ([], [use])
+        self._uses.setdefault(key, []).append(use)
+        self._update(key)
+        return self.conflicts(key, race, holder)
+
+    def unassign(self, card: CardLike, person: Person, race: Optional[int] = 1) -> None:
+        """Remove an assignment of `assign`."""
+        self.remove(("assign", self.key(card), _holder(person, person), race))
+
+    def mark_returned(self, card: CardLike, returned: bool = True) -> None:
+        """Mark a rental card as returned, or as not returned."""
+        key = self.key(card)
+        if returned:
+            self._returned.add(key)
+        else:
+            self._returned.discard(key)
+        self._update(key)
+
+    def _update(self, key: CardKey) -> None:
+        """Update the duplicates and outstanding rental cards after a card changed."""
+        if self._has_conflicts(key):
+            self._duplicates.add(key)
+        else:
+            self._duplicates.discard(key)
+        if key in self._pools and key in self._uses and key not in self._returned:
+            self._outstanding.add(key)
+        else:
+            self._outstanding.discard(key)
+
+    def _has_conflicts(self, key: CardKey) -> bool:
+        uses = self._uses.get(key, ())
+        if len(uses) < 2:
+            return False
+        holders: Dict[Optional[int], Set[Hashable]] = {}
+        for use in uses:
+            holders.setdefault(use.race, set()).add(use.holder)
+        anywhere = holders.get(None, set())
+        return any(len(h | anywhere) > 1 for h in holders.values())
+
+    # queries
+
+    def owner(self, card: CardLike) -> Optional[str]:
+        """The owner of a rental card, of the first control card list it is in."""
+        owners = self._pools.get(self.key(card))
+        return next(iter(owners.values())) if owners else None
+
+    def is_rental(self, card: CardLike) -> bool:
+        """Whether a card is in a rental pool, i.e. in a control card list."""
+        return self.key(card) in self._pools
+
+    def uses(self, card: CardLike) -> List[CardUse]:
+        """The references to a card, in the order they were added."""
+        return list(self._uses.get(self.key(card), ()))
+
+    def holders(self, card: CardLike, race: Optional[int] = None) -> List[Person]:
+        """The distinct persons using a card, in a race or in any race."""
+        persons: Dict[Hashable, Person] = {}
+        for use in self._uses.get(self.key(card), ()):
+            if use.person is not None and (race is None or use.race in (race, None)):
+                persons.setdefault(use.holder, use.person)
+        return list(persons.values())
+
+    def conflicts(
+        self, card: CardLike, race: Optional[int] = None, holder: Optional[Hashable] = None
+    ) -> List[CardUse]:
+        """The uses of a card conflicting with another use in the same race.
+
+        Args:
+            card: the card
+            race: only conflicts in a race
+            holder: only the uses of other persons than a holder, see `CardUse.holder`
+        """
+        key = self.key(card)
+        if key not in self._duplicates and holder is None:
+            return []
+        uses = [
+            u for u in self._uses.get(key, ()) if race is None or u.race is None or u.race == race
+        ]
+        if holder is not None:
+            return [u for u in uses if u.holder != holder]
+        conflicting = []
+        for use in uses:
+            others = {u.holder for u in uses if u.race is None or use.race in (None, u.race)}
+            if len(others | {use.holder}) > 1:
+                conflicting.append(use)
+        return conflicting
+
+    def is_duplicate(self, card: CardLike) -> bool:
+        """Whether a card is used by different persons in the same race."""
+        return self.key(card) in self._duplicates
+
+    def duplicates(self) -> Dict[CardKey, List[CardUse]]:
+        """The cards used by different persons in the same race, with their uses."""
+        return {key: self.conflicts(key) for key in sorted(self._duplicates)}
+
+    def missing_returns(self) -> List[CardKey]:
+        """The rental cards used by somebody which haven't been returned."""
+        return sorted(self._outstanding)
+
+    def unknown(self, sources: Optional[Iterable[Hashable]] = None) -> List[CardKey]:
+        """The cards used but neither in a rental pool nor in a competitor list.
+
+        Args:
+            sources: only the cards of these sources
+        """
+        keys: Iterable[CardKey] = (
+            self._uses.keys()
+            if sources is None
+            else {u.key for s in sources for u in self._sources.get(s, ((), ()))[1]}
+        )
+        return sorted(
+            key
+            for key in keys
+            if key not in self._pools
+            and not any(isinstance(u.record, Competitor) for u in self._uses.get(key, ()))
+        )
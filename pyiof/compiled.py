@@ -0,0 +1,482 @@
+"""Code-generated serialization and parsing backend.
+
+pydantic_xml serializes a model by converting it to a JSON-compatible dict first and then
+walking generic field serializers for every element. This module instead generates a
+specialized function per model class from its field metadata, which builds the lxml
+tree directly. The output is identical to the pydantic_xml backend.
+
+For parsing, a generated function per model class maps an lxml element to the input
+dict of the model, following the same element matching rules as pydantic_xml. The whole
+document is then validated in a single `model_validate` call, which coerces datetimes,
+floats and literals. If validation fails, the document is parsed again with pydantic_xml
+to get its error messages.
+
+Models with features the generators do not handle (custom field serializers, computed
+fields, union types, ...) are handled by pydantic_xml, while their parent and child
+elements still use generated code.
+"""
+
+import datetime
+import decimal
+import functools
+import threading
+import types
+import typing
+from typing import Any, Callable, Dict, Hashable, List, Literal, Optional, Tuple, Type, Union
+
+import pydantic
+import pydantic_xml
+from lxml import etree
+from pydantic_core import to_jsonable_python
+from pydantic_xml.element.native import XmlElement
+from pydantic_xml.fields import extract_field_xml_entity_info
+from pydantic_xml.typedefs import EntityLocation
+from pydantic_xml.utils import QName
+
+Backend = Literal["pydantic_xml", "compiled"]
+
+ModelType = Type[pydantic_xml.BaseXmlModel]
+Serializer = Callable[[Any, etree._Element], None]
+Parser = Callable[[etree._Element, Optional[Dict[str, Any]]], Any]
+
+_PRIMITIVE_TYPES = (
+    str,
+    int,
+    float,
+    bool,
+    decimal.Decimal,
+    datetime.datetime,
+    datetime.date,
+    datetime.time,
+)
+
+
+def _encode_generic(value: Any) -> str:
+    # same as pydantic_xml: the JSON-compatible value, with lowercase booleans
+    encoded = to_jsonable_python(value)
+    if encoded is None:
+        return ""
+    if isinstance(encoded, bool):
+        return "true" if encoded else "false"
+    return str(encoded)
+
+
+_ENCODERS: Dict[type, Callable[[Any], str]] = {
+    str: str,
+    int: str,
+    float: str,
+    bool: lambda value: "true" if value else "false",
+    datetime.date: datetime.date.isoformat,
+}
+
+
+def _encode(value: Any) -> str:
+    return _ENCODERS.get(type(value), _encode_generic)(value)
+
+
+def _encode_float(value: Any) -> str:
+    # float fields serialize integer values as floats, e.g. 1 as "1.0"
+    return str(float(value)) if type(value) is int else _encode(value)
+
+
+class _Field(typing.NamedTuple):
+    name: str
+    location: Optional[EntityLocation]
+    xml_name: str
+    is_list: bool
+    model: Optional[ModelType]
+    # None for values which are parsed from text but can't be encoded by the generator
+    encoder: Optional[str]
+
+
+def _unwrap(annotation: Any) -> Any:
+    """Strip Annotated and Optional from a type, None for unions of several types."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return _unwrap(typing.get_args(annotation)[0])
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _unwrap(args[0]) if len(args) == 1 else None
+    return annotation
+
+
+def _is_model(tp: Any) -> bool:
+    return isinstance(tp, type) and issubclass(tp, pydantic_xml.BaseXmlModel)
+
+
+def _is_primitive(tp: Any) -> bool:
+    if typing.get_origin(tp) is Literal:
+        return all(isinstance(arg, str) for arg in typing.get_args(tp))
+    return tp in _PRIMITIVE_TYPES
+
+
+def _is_text_union(annotation: Any) -> bool:
+    """Whether a union type is read from text, e.g. Union[str, ImagePayload]."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return _is_text_union(typing.get_args(annotation)[0])
+    if origin not in (Union, types.UnionType):
+        return False
+    return not any(
+        _is_model(arg) or typing.get_origin(arg) is not None for arg in typing.get_args(annotation)
+    )
+
+
+def _has_custom_serialization(cls: ModelType) -> bool:
+    decorators = cls.__pydantic_decorators__
+    return bool(
+        decorators.field_serializers
+        or decorators.model_serializers
+        or decorators.computed_fields
+        or cls.__xml_field_serializers__
+        or cls.__xml_skip_empty__ is not None
+        or cls.model_config.get("extra") == "allow"
+    )
+
+
+def _analyze_field(cls: ModelType, name: str, field_info: Any) -> Optional[_Field]:
+    if field_info.exclude or pydantic_xml.fields.NoXml in field_info.metadata:
+        return None
+    entity = extract_field_xml_entity_info(field_info)
+    location = entity.location if entity is not None else None
+    if entity is not None and (entity.ns or entity.nsmap or entity.nillable or entity.wrapped):
+        return None
+
+    tp = _unwrap(field_info.annotation)
+    is_list = typing.get_origin(tp) in (list, List)
+    if is_list:
+        tp = _unwrap(typing.get_args(tp)[0])
+
+    path = entity.path if entity is not None else None
+    model: Optional[ModelType] = None
+    if _is_model(tp) and location is not EntityLocation.ATTRIBUTE:
+        model = tp
+        tag = path or tp.__xml_tag__ or field_info.alias or name
+        location = EntityLocation.ELEMENT
+    elif (_is_primitive(tp) and (not is_list or location is EntityLocation.ELEMENT)) or (
+        tp is None and _is_text_union(field_info.annotation)
+    ):
+        tag = path or field_info.alias or name
+    else:
+        return None
+
+    is_attr = location is EntityLocation.ATTRIBUTE
+    xml_name = QName.from_alias(tag=tag, nsmap=cls.__xml_nsmap__, is_attr=is_attr).uri
+    encoder: Optional[str] = None
+    if model is None and tp is not None:
+        encoder = "_encode_float" if tp is float else "_encode"
+    return _Field(name, location, xml_name, is_list, model, encoder)
+
+
+def _layout(cls: ModelType) -> Optional[List[_Field]]:
+    """Collect the XML layout of a model, None if it is not supported by the generators."""
+    fields = []
+    for name, field_info in cls.model_fields.items():
+        field = _analyze_field(cls, name, field_info)
+        if field is None:
+            return None
+        fields.append(field)
+    return fields
+
+
+def _serializer_layout(cls: ModelType) -> Optional[List[_Field]]:
+    """The layout of a model for serialization, None if it must use pydantic_xml."""
+    if _has_custom_serialization(cls):
+        return None
+    fields = _layout(cls)
+    if fields is None or any(f.model is None and f.encoder is None for f in fields):
+        return None
+    return fields
+
+
+def _parser_layout(cls: ModelType) -> Optional[List[_Field]]:
+    """The layout of a model for parsing, None if it must use pydantic_xml."""
+    if cls.__xml_field_validators__ or cls.model_config.get("extra") == "forbid":
+        return None
+    if any(f.validation_alias is not None for f in cls.model_fields.values()):
+        return None
+    return _layout(cls)
+
+
+class _GeneratedNames:
+    """Names of generated functions by key, safe for concurrent first use.
+
+    Functions are generated and executed while holding a lock. Their names are published
+    when the outermost generation completes, so lookups without the lock only find
+    functions which are in the namespace, with the functions they call.
+    """
+
+    def __init__(self) -> None:
+        self.names: Dict[Hashable, str] = {}
+        self._pending: Dict[Hashable, str] = {}
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, prefix: str, define: Callable[[str], None]) -> str:
+        """The name of the function of a key, `define(name)` adds it to the namespace.
+
+        Generated code may look up other functions while it is generated, including the
+        one being generated for recursive models.
+        """
+        name = self.names.get(key)
+        if name is not None:
+            return name
+        with self._lock:
+            name = self.names.get(key) or self._pending.get(key)
+            if name is not None:
+                return name
+            outermost = not self._pending
+            name = self._pending[key] = f"{prefix}_{len(self.names) + len(self._pending)}"
+            try:
+                define(name)
+            except BaseException:
+                if outermost:
+                    self._pending.clear()
+                raise
+            if outermost:
+                self.names.update(self._pending)
+                self._pending.clear()
+        return name
+
+
+class _SerializerGenerator:
+    """Generates serializer functions for one combination of serialization options."""
+
+    def __init__(self, skip_empty: bool, exclude_none: bool):
+        self.skip_empty = skip_empty
+        self.exclude_none = exclude_none
+        self.namespace: Dict[str, Any] = {
+            "_encode": _encode,
+            "_encode_float": _encode_float,
+            "_SubElement": etree.SubElement,
+            "_fallback": self._fallback,
+        }
+        self.names = _GeneratedNames()
+
+    def _fallback(self, value: pydantic_xml.BaseXmlModel, element: etree._Element) -> None:
+        tree = pydantic_xml.BaseXmlModel.to_xml_tree(
+            value, skip_empty=self.skip_empty, exclude_none=self.exclude_none
+        )
+        element.text = tree.text
+        for key, attr_value in tree.attrib.items():
+            element.set(key, attr_value)
+        element.extend(list(tree))
+
+    def serializer(self, cls: ModelType) -> Serializer:
+        return self.namespace[self.name(cls)]
+
+    def name(self, cls: ModelType) -> str:
+        return self.names.get(
+            cls, f"_serialize_{cls.__name__}", functools.partial(self._define, cls)
+        )
+
+    def _define(self, cls: ModelType, name: str) -> None:
+        fields = _serializer_layout(cls)
+        if fields is None:
+            self.namespace[name] = self._fallback
+            return
+        source = self._generate(name, fields)
+        exec(compile(source, f"<pyiof.compiled {cls.__qualname__}>", "exec"), self.namespace)
+
+    def _generate(self, name: str, fields: List[_Field]) -> str:
+        lines = [f"def {name}(value, element):"]
+        for field in fields:
+            lines.append(f"    v = value.{field.name}")
+            if field.is_list:
+                lines.append("    if v is not None:")
+                lines.append("        for item in v:")
+                if self.skip_empty:
+                    lines.append("            if item is None:")
+                    lines.append("                continue")
+                lines.extend(self._element(field, "item", "            "))
+            elif field.location is EntityLocation.ELEMENT:
+                lines.extend(self._element(field, "v", "    "))
+            else:
+                if field.location is EntityLocation.ATTRIBUTE:
+                    assign = f"element.set({field.xml_name!r}, {{}})"
+                else:
+                    assign = "element.text = {}"
+                if self.skip_empty or self.exclude_none:
+                    lines.append("    if v is not None:")
+                    lines.append("        " + assign.format(f"{field.encoder}(v)"))
+                else:
+                    lines.append("    " + assign.format(f'"" if v is None else {field.encoder}(v)'))
+        lines.append("    return None")
+        return "\n".join(lines) + "\n"
+
+    def _element(self, field: _Field, var: str, indent: str) -> List[str]:
+        lines = []
+        if field.model is not None:
+            lines.append(f"{indent}if {var} is not None:")
+            lines.append(f"{indent}    sub = _SubElement(element, {field.xml_name!r})")
+            lines.append(f"{indent}    {self.name(field.model)}({var}, sub)")
+            if self.skip_empty:
+                lines.append(f"{indent}    if not sub.text and not len(sub) and not sub.attrib:")
+                lines.append(f"{indent}        element.remove(sub)")
+            return lines
+
+        if self.skip_empty or self.exclude_none:
+            lines.append(f"{indent}if {var} is not None:")
+            indent += "    "
+            lines.append(f"{indent}text = {field.encoder}({var})")
+        else:
+            lines.append(f'{indent}text = "" if {var} is None else {field.encoder}({var})')
+        if self.skip_empty:
+            lines.append(f"{indent}if text:")
+            lines.append(f"{indent}    _SubElement(element, {field.xml_name!r}).text = text")
+        else:
+            lines.append(f"{indent}_SubElement(element, {field.xml_name!r}).text = text")
+        return lines
+
+
+_generators: Dict[Tuple[bool, bool], _SerializerGenerator] = {}
+
+
+def get_serializer(cls: ModelType, skip_empty: bool, exclude_none: bool) -> Serializer:
+    """The generated serializer of a model class, which fills an already created element.
+
+    Serializers are generated on first use and cached per class and options.
+    """
+    key = (skip_empty, exclude_none)
+    generator = _generators.get(key)
+    if generator is None:
+        generator = _generators.setdefault(key, _SerializerGenerator(skip_empty, exclude_none))
+    return generator.serializer(cls)
+
+
+def to_xml_tree(
+    model: pydantic_xml.BaseXmlModel,
+    skip_empty: bool = False,
+    exclude_none: bool = False,
+    exclude_unset: bool = False,
+) -> etree._Element:
+    """Serialize a model to an lxml tree using generated code."""
+    if exclude_unset:
+        return pydantic_xml.BaseXmlModel.to_xml_tree(
+            model, skip_empty=skip_empty, exclude_none=exclude_none, exclude_unset=True
+        )
+    cls = type(model)
+    nsmap = cls.__xml_nsmap__
+    tag = QName.from_alias(tag=cls.__xml_tag__ or cls.__name__, ns=cls.__xml_ns__, nsmap=nsmap)
+    root = etree.Element(
+        tag.uri,
+        nsmap={ns or None: uri for ns, uri in nsmap.items()} if nsmap else None,  # type: ignore
+    )
+    get_serializer(cls, skip_empty, exclude_none)(model, root)
+    return root
+
+
+def _parse_fallback(
+    cls: ModelType, element: etree._Element, context: Optional[Dict[str, Any]]
+) -> pydantic_xml.BaseXmlModel:
+    assert cls.__xml_serializer__ is not None
+    return cls.__xml_serializer__.deserialize(
+        XmlElement.from_native(element),
+        context=context,
+        sourcemap={},
+        loc=(),
+        empty_as_string=False,
+    )
+
+
+class _ParserGenerator:
+    """Generates functions mapping an lxml element to the input dict of a model.
+
+    Sub-elements are matched sequentially in field order, like the strict search mode
+    of pydantic_xml: a field only consumes elements at the current position.
+    """
+
+    def __init__(self) -> None:
+        self.namespace: Dict[str, Any] = {"_Comment": etree.Comment}
+        self.names = _GeneratedNames()
+
+    def parser(self, cls: ModelType) -> Parser:
+        return self.namespace[self.name(cls)]
+
+    def name(self, cls: ModelType) -> str:
+        return self.names.get(cls, f"_parse_{cls.__name__}", functools.partial(self._define, cls))
+
+    def _define(self, cls: ModelType, name: str) -> None:
+        fields = _parser_layout(cls)
+        if fields is None:
+            self.namespace[name] = functools.partial(_parse_fallback, cls)
+            return
+        source = self._generate(name, fields)
+        exec(compile(source, f"<pyiof.compiled {cls.__qualname__}>", "exec"), self.namespace)
+
+    def _generate(self, name: str, fields: List[_Field]) -> str:
+        lines = [f"def {name}(element, context):", "    result = {}"]
+        if any(f.location is EntityLocation.ELEMENT for f in fields):
+            lines.append("    children = [c for c in element if c.tag is not _Comment]")
+            lines.append("    n = len(children)")
+            lines.append("    i = 0")
+        for field in fields:
+            key = repr(field.name)
+            tag = repr(field.xml_name)
+            if field.location is EntityLocation.ATTRIBUTE:
+                lines.append(f"    v = element.get({tag})")
+                lines.append("    if v is not None:")
+                lines.append(f"        result[{key}] = v")
+            elif field.location is None:
+                lines.append("    v = element.text")
+                lines.append("    if v:")
+                lines.append(f"        result[{key}] = v")
+            elif field.is_list:
+                lines.append("    items = []")
+                lines.append(f"    while i < n and children[i].tag == {tag}:")
+                if field.model is not None:
+                    lines.append(
+                        f"        items.append({self.name(field.model)}(children[i], context))"
+                    )
+                    lines.append("        i += 1")
+                else:
+                    # like pydantic_xml, an empty element ends a list of values
+                    lines.append("        v = children[i].text")
+                    lines.append("        i += 1")
+                    lines.append("        if not v:")
+                    lines.append("            break")
+                    lines.append("        items.append(v)")
+                lines.append("    if items:")
+                lines.append(f"        result[{key}] = items")
+            else:
+                lines.append(f"    if i < n and children[i].tag == {tag}:")
+                if field.model is not None:
+                    lines.append(
+                        f"        result[{key}] = {self.name(field.model)}(children[i], context)"
+                    )
+                    lines.append("        i += 1")
+                else:
+                    lines.append("        v = children[i].text")
+                    lines.append("        i += 1")
+                    lines.append("        if v:")
+                    lines.append(f"            result[{key}] = v")
+        lines.append("    return result")
+        return "\n".join(lines) + "\n"
+
+
+_parser_generator = _ParserGenerator()
+
+
+def get_parser(cls: ModelType) -> Parser:
+    """The generated parser of a model class, returning the input dict for validation.
+
+    Parsers are generated on first use and cached per class.
+    """
+    return _parser_generator.parser(cls)
+
+
+def from_xml_tree(
+    cls: ModelType, root: etree._Element, context: Optional[Dict[str, Any]] = None
+) -> Optional[pydantic_xml.BaseXmlModel]:
+    """Parse a model from an lxml tree using generated code.
+
+    Returns None if the document can't be handled, e.g. because of a wrong root element or
+    validation errors, so the caller can fall back to pydantic_xml.
+    """
+    assert cls.__xml_serializer__ is not None, f"model {cls.__name__} is partially initialized"
+    if root.tag != cls.__xml_serializer__.element_name or _parser_layout(cls) is None:
+        return None
+    data = get_parser(cls)(root, context)
+    try:
+        return cls.model_validate(data, strict=False, context=context)
+    except pydantic.ValidationError:
+        return None
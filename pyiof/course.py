@@ -1,11 +1,14 @@
 import datetime
-from typing import List, Literal, Optional
+from typing import TYPE_CHECKING, Any, List, Literal, Optional, Tuple
 
-from pydantic import conlist
+from pydantic import PrivateAttr, conlist
 
 from .base import GeoPosition, Id, Image, LanguageString, MapPosition
 from .xml_base import BaseXmlModel, attr, element
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class Leg(BaseXmlModel):
     """Defines extra information for a relay leg.
@@ -200,9 +203,35 @@ class Map(BaseXmlModel):
 class Route(BaseXmlModel):
     """Defines a route, i.e. a number of geographical positions (waypoints) describing a
     competitor's navigation throughout a course.
+
+    The route is kept in the base64 encoded IOF binary route format. It is decoded lazily
+    on first access of `waypoints` and cached until `base64` is replaced.
+    Decoding and encoding require the ``numpy`` extra.
+
+    Attributes:
+        base64 (str): The route in the IOF binary route format, base64 encoded.
     """
 
     base64: str
+    _waypoints: Optional[Tuple[str, Any]] = PrivateAttr(default=None)
+
+    @property
+    def waypoints(self) -> "np.ndarray":
+        """The decoded waypoints as read-only structured array, see `pyiof.route.WAYPOINT_DTYPE`."""
+        if self._waypoints is None or self._waypoints[0] is not self.base64:
+            from .route import decode_route  # noqa: PLC0415 (optional numpy dependency)
+
+            waypoints = decode_route(self.base64)
+            waypoints.flags.writeable = False
+            self._waypoints = (self.base64, waypoints)
+        return self._waypoints[1]
+
+    @classmethod
+    def from_waypoints(cls, waypoints: "np.ndarray") -> "Route":
+        """Create a route from a structured array of waypoints, see `pyiof.route.encode_route`."""
+        from .route import encode_route  # noqa: PLC0415 (optional numpy dependency)
+
+        return cls(base64=encode_route(waypoints))
 
 
 class StartName(BaseXmlModel):
@@ -0,0 +1,271 @@
+"""Memory accounting of model trees.
+
+`memory_report` walks a model, e.g. a loaded `ResultList`, and reports the number of
+instances and their memory per model class and per field, and how much memory is taken
+by duplicated subtrees: distinct objects with equal content, e.g. the same
+`Organisation` repeated for every runner of a club.
+
+    report = memory_report(result_list)
+    print(report)
+    logger.info("model memory", extra=report.to_dict())
+
+Sizes are measured with `sys.getsizeof` and include the instance, its attribute dict,
+lists and values. Objects shared by several parents are counted once, strings and
+numbers shared through interning are counted for every reference, so the sizes are an
+upper bound of the memory which would be freed with the model.
+
+For periodic sampling in production, `sample` walks only a fraction of the items of
+each list and extrapolates the counts and sizes.
+"""
+
+import dataclasses
+import datetime
+import decimal
+import sys
+from typing import Any, Dict, List, Set, Tuple
+
+import pydantic
+
+from .payload import ImagePayload
+
+
+@dataclasses.dataclass
+class ClassStats:
+    """Memory of the instances of a model class.
+
+    Attributes:
+        instances (float): The number of instances.
+        own_bytes (float): The memory of the instances, their attribute dicts and values,
+            without the memory of their submodels.
+        deep_bytes (float): The memory of the instances including their submodels.
+        duplicates (float): The number of instances equal to another instance.
+        duplicate_bytes (float): The deep memory of the duplicates.
+    """
+
+    instances: float = 0
+    own_bytes: float = 0
+    deep_bytes: float = 0
+    duplicates: float = 0
+    duplicate_bytes: float = 0
+
+
+@dataclasses.dataclass
+class FieldStats:
+    """Memory of the values of a field, including submodels.
+
+    Attributes:
+        values (float): The number of set values, items of lists counted separately.
+        bytes (float): The memory of the values.
+    """
+
+    values: float = 0
+    bytes: float = 0
+
+
+@dataclasses.dataclass
+class MemoryReport:
+    """Result of `memory_report`.
+
+    Attributes:
+        total_bytes (float): The memory of the whole model.
+        classes (Dict[str, ClassStats]): Statistics by model class name.
+        fields (Dict[Tuple[str, str], FieldStats]): Statistics by model class name and
+            field name.
+        duplicate_bytes (float): The memory of the duplicated subtrees, not counting
+            the duplicates nested in them again.
+        shared (int): The number of references to objects already counted.
+        sample (float): The fraction of list items walked.
+    """
+
+    total_bytes: float = 0
+    duplicate_bytes: float = 0
+    classes: Dict[str, ClassStats] = dataclasses.field(default_factory=dict)
+    fields: Dict[Tuple[str, str], FieldStats] = dataclasses.field(default_factory=dict)
+    shared: int = 0
+    sample: float = 1.0
+
+    def largest_classes(self, count: int = 10) -> List[Tuple[str, ClassStats]]:
+        """The classes with the most own memory."""
+        return sorted(self.classes.items(), key=lambda c: c[1].own_bytes, reverse=True)[:count]
+
+    def largest_fields(self, count: int = 10) -> List[Tuple[Tuple[str, str], FieldStats]]:
+        """The fields with the most memory."""
+        return sorted(self.fields.items(), key=lambda f: f[1].bytes, reverse=True)[:count]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The report as dict of plain values, e.g. for structured logging."""
+        return {
+            "total_bytes": round(self.total_bytes),
+            "duplicate_bytes": round(self.duplicate_bytes),
+            "shared": self.shared,
+            "sample": self.sample,
+            "classes": {
+                name: {k: round(v) for k, v in dataclasses.asdict(stats).items()}
+                for name, stats in self.classes.items()
+            },
+            "fields": {
+                f"{cls}.{field}": {"values": round(stats.values), "bytes": round(stats.bytes)}
+                for (cls, field), stats in self.fields.items()
+            },
+        }
+
+    def __str__(self) -> str:
+        lines = [
+            f"total {self.total_bytes / 1e6:.1f} MB, duplicated subtrees "
+            f"{self.duplicate_bytes / 1e6:.1f} MB"
+            + (f", sampled {self.sample:.0%}" if self.sample < 1 else ""),
+            f"{'class':<28}{'instances':>12}{'own MB':>10}{'deep MB':>10}{'dup MB':>10}",
+        ]
+        for name, stats in self.largest_classes(len(self.classes)):
+            lines.append(
+                f"{name:<28}{stats.instances:>12.0f}{stats.own_bytes / 1e6:>10.2f}"
+                f"{stats.deep_bytes / 1e6:>10.2f}{stats.duplicate_bytes / 1e6:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+# immutable values compared by value, None and booleans are singletons without own memory
+_SCALARS = (str, int, float, decimal.Decimal, datetime.date, datetime.datetime, datetime.time)
+
+
+def _scalar_size(value: Any) -> int:
+    if isinstance(value, ImagePayload):
+        return sys.getsizeof(value) + sys.getsizeof(value._buffer or b"")
+    return sys.getsizeof(value)
+
+
+def _scalar_key(value: Any) -> Any:
+    """Hashable key of a scalar value for the detection of duplicates."""
+    if isinstance(value, ImagePayload):
+        return id(value)
+    try:
+        hash(value)
+    except TypeError:
+        return id(value)
+    return value
+
+
+class _Walker:
+    """Walks a model tree bottom-up.
+
+    Each value is measured as (size, own size, number of values, content key, duplicate
+    bytes): the own size excludes submodels, the content key is equal for values with
+    equal content, and the duplicate bytes are the deep size of the duplicated subtrees
+    within the value.
+    """
+
+    def __init__(self, sample: float):
+        self.stride = max(1, round(1 / sample))
+        self.report = MemoryReport(sample=1 / self.stride)
+        self.seen: Dict[int, Any] = {}
+        self.keys: Set[Any] = set()
+        self.stats: Dict[type, Tuple[ClassStats, Dict[str, FieldStats]]] = {}
+
+    def add_class(self, cls: type) -> Tuple[ClassStats, Dict[str, FieldStats]]:
+        stats = self.report.classes.setdefault(cls.__name__, ClassStats())
+        self.stats[cls] = (stats, {})
+        return self.stats[cls]
+
+    def add_field(self, cls: type, field: str) -> FieldStats:
+        stats = self.report.fields.setdefault((cls.__name__, field), FieldStats())
+        self.stats[cls][1][field] = stats
+        return stats
+
+    def value(self, value: Any, weight: float) -> Tuple[int, int, int, Any, float]:
+        if isinstance(value, pydantic.BaseModel):
+            size, key, duplicate = self.model(value, weight)
+            return size, 0, 1, key, duplicate
+        if isinstance(value, list):
+            return self.list(value, weight)
+        if value is None or value is True or value is False:
+            return 0, 0, 0, value, 0
+        size = _scalar_size(value)
+        return size, size, 1, _scalar_key(value), 0
+
+    def list(self, values: list, weight: float) -> Tuple[int, int, int, Any, float]:
+        items = values[:: self.stride]
+        scale = len(values) / len(items) if items else 1
+        size = own = duplicate = 0
+        keys = []
+        for item in items:
+            item_size, item_own, _, key, item_duplicate = self.value(item, weight * scale)
+            size += item_size
+            own += item_own
+            duplicate += item_duplicate
+            keys.append(key)
+        # a sampled list can't be compared to other lists
+        key = tuple(keys) if scale == 1 else id(values)
+        container = sys.getsizeof(values)
+        return (
+            container + round(size * scale),
+            container + round(own * scale),
+            len(values),
+            key,
+            duplicate * scale,
+        )
+
+    def model(self, model: pydantic.BaseModel, weight: float) -> Tuple[int, Any, float]:
+        """Deep size, content key and duplicate bytes of a model."""
+        if id(model) in self.seen:
+            self.report.shared += 1
+            return 0, self.seen[id(model)], 0
+        cls = type(model)
+        stats, fields = self.stats.get(cls) or self.add_class(cls)
+        own = (
+            sys.getsizeof(model)
+            + sys.getsizeof(model.__dict__)
+            + sys.getsizeof(model.__pydantic_fields_set__)
+        )
+        size = own
+        duplicate = 0.0
+        keys: List[Any] = [cls]
+        for field, value in model.__dict__.items():
+            if value is None or value is True or value is False:
+                keys.append(value)
+                continue
+            if type(value) in _SCALARS:
+                value_size = value_own = sys.getsizeof(value)
+                count, key, value_duplicate = 1, value, 0
+            else:
+                value_size, value_own, count, key, value_duplicate = self.value(value, weight)
+                duplicate += value_duplicate
+            size += value_size
+            own += value_own
+            keys.append(key)
+            field_stats = fields.get(field) or self.add_field(cls, field)
+            field_stats.values += count * weight
+            field_stats.bytes += value_size * weight
+        key = hash(tuple(keys))
+        self.seen[id(model)] = key
+
+        stats.instances += weight
+        stats.own_bytes += own * weight
+        stats.deep_bytes += size * weight
+        if key in self.keys:
+            stats.duplicates += weight
+            stats.duplicate_bytes += size * weight
+            duplicate = size
+        else:
+            self.keys.add(key)
+        return size, key, duplicate
+
+
+def memory_report(model: pydantic.BaseModel, sample: float = 1.0) -> MemoryReport:
+    """Report the memory of a model tree by model class and field.
+
+    Args:
+        model: the model to walk, e.g. a message element
+        sample: the fraction of list items to walk, e.g. 0.01 to walk every 100th class
+            result, person result and split time, for a faster estimate
+
+    Returns:
+        the report, see `MemoryReport`
+    """
+    if not 0 < sample <= 1:
+        raise ValueError("memory_report: sample must be in (0, 1]")
+    walker = _Walker(sample)
+    size, _, duplicate = walker.model(model, 1.0)
+    report = walker.report
+    report.total_bytes = size
+    report.duplicate_bytes = duplicate
+    return report
@@ -0,0 +1,310 @@
+"""Spatial and temporal queries over the events of an `EventList`.
+
+`EventIndex` indexes the races of events, e.g. the fixtures of a federation, by position,
+dates, classification, discipline and organiser:
+
+    index = EventIndex(event_list.events)
+    nearby = index.query(near=(59.33, 18.07), radius=50, start=datetime.date(2024, 6, 1),
+                         end=datetime.date(2024, 6, 30), discipline="Sprint")
+    for match in nearby:
+        print(match.event.name, match.race.name, f"{match.distance:.1f} km")
+
+Each race is indexed with the fields of its event where it has none, e.g. the dates of
+the event for a race without start time, events without races are indexed with their own
+fields. Positions are indexed in a grid of cells, a radius
+query computes the distances of the races in the cells within the radius only. Date
+ranges are indexed as intervals sorted by start date, so a date query takes a slice of
+the intervals starting up to the longest duration before the queried range. The
+classification, discipline and organiser indices map each value to its races. Requires
+the ``numpy`` extra.
+"""
+
+import dataclasses
+import datetime
+import math
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError("pyiof.event_index requires numpy, install pyiof[numpy]") from e
+
+from .base import DateAndOptionalTime
+from .contact import Organisation
+from .event import Event, EventClassification, Race, RaceDiscipline
+from .merge import normalize_name
+
+EARTH_RADIUS = 6371.0088
+"""The mean earth radius in kilometers."""
+
+
+@dataclasses.dataclass
+class EventMatch:
+    """A race matching a query.
+
+    Attributes:
+        event (Event): The event.
+        race (Race, optional): The race, None for an event without races.
+        distance (float, optional): The distance to the queried position in kilometers.
+    """
+
+    event: Event
+    race: Optional[Race]
+    distance: Optional[float] = None
+
+
+def _day(value: Optional[DateAndOptionalTime]) -> Optional[int]:
+    return value.date.toordinal() if value is not None else None
+
+
+def _query_day(value: Union[datetime.date, datetime.datetime]) -> int:
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def _organiser_keys(organisation: Organisation) -> List[Tuple[str, str]]:
+    keys = [("organiser", normalize_name(organisation.name))]
+    if organisation.short_name:
+        keys.append(("organiser", normalize_name(organisation.short_name)))
+    if organisation.id is not None and organisation.id.id:
+        keys.append(("organiser_id", organisation.id.id))
+    return keys
+
+
+def _values(event: Event, race: Optional[Race]) -> Iterable[Tuple[str, str]]:
+    """The classification, disciplines and organisers of a race."""
+    classification = (race.classification if race else None) or event.classification
+    values = [("classification", classification)] if classification else []
+    values += [("discipline", d) for d in (race.discipline if race else [])]
+    organisers = [*event.organisers, *(race.organisers if race else [])]
+    values += [key for organiser in organisers for key in _organiser_keys(organiser)]
+    return dict.fromkeys(values)
+
+
+def distances(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """The great-circle distances from a position to positions in kilometers."""
+    lat1, lat2 = math.radians(lat), np.radians(lats)
+    dlat, dlng = lat2 - lat1, np.radians(lngs - lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class EventIndex:
+    """Index of the races of events by position, dates, classification, discipline and
+    organiser.
+
+    Args:
+        events: the events, e.g. `EventList.events`
+        cell_size: the size of the grid cells in degrees
+    """
+
+    def __init__(self, events: Iterable[Event], cell_size: float = 0.5):
+        self.cell_size = cell_size
+        self._columns = math.ceil(360 / cell_size)
+        self.races: List[Tuple[Event, Optional[Race]]] = []
+        starts: List[float] = []
+        ends: List[float] = []
+        lats: List[float] = []
+        lngs: List[float] = []
+        values: Dict[Tuple[str, str], List[int]] = {}
+        for event in events:
+            for race in event.races or [None]:
+                row = len(self.races)
+                self.races.append((event, race))
+                if race is not None and race.start_time is not None:
+                    start, end = _day(race.start_time), _day(race.end_time)
+                else:
+                    start, end = _day(event.start_time), _day(event.end_time)
+                starts.append(math.nan if start is None else start)
+                ends.append(math.nan if start is None else max(end or start, start))
+                position = race.position if race else None
+                lats.append(position.lat if position else math.nan)
+                lngs.append(position.lng if position else math.nan)
+                for value in _values(event, race):
+                    values.setdefault(value, []).append(row)
+        self._values = {value: np.array(rows) for value, rows in values.items()}
+
+        self._lats, self._lngs = np.array(lats), np.array(lngs)
+        self._grid = self._build_grid()
+
+        # intervals with dates, sorted by start date
+        starts_array, ends_array = np.array(starts), np.array(ends)
+        dated = np.flatnonzero(~np.isnan(starts_array))
+        order = dated[np.argsort(starts_array[dated], kind="stable")]
+        self._interval_rows = order
+        self._interval_starts = starts_array[order].astype(np.int64)
+        self._interval_ends = ends_array[order].astype(np.int64)
+        durations = self._interval_ends - self._interval_starts
+        self._max_duration = int(durations.max()) if len(durations) else 0
+        # the order of the results without position, races without dates last
+        self._start_keys = np.full(len(self.races), np.iinfo(np.int64).max)
+        self._start_keys[order] = self._interval_starts
+
+    def _cell(self, lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.floor((lat + 90) / self.cell_size).astype(np.int64)
+        columns = np.floor((lng + 180) / self.cell_size).astype(np.int64) % self._columns
+        return rows, columns
+
+    def _build_grid(self) -> Dict[Tuple[int, int], np.ndarray]:
+        positioned = np.flatnonzero(~np.isnan(self._lats))
+        rows, columns = self._cell(self._lats[positioned], self._lngs[positioned])
+        keys = rows * self._columns + columns
+        if not len(keys):
+            return {}
+        order = np.argsort(keys, kind="stable")
+        keys, positioned = keys[order], positioned[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]).tolist()
+        grid = {}
+        for start, end in zip(starts, [*starts[1:], len(keys)], strict=True):
+            grid[divmod(int(keys[start]), self._columns)] = positioned[start:end]
+        return grid
+
+    def __len__(self) -> int:
+        """The number of indexed races."""
+        return len(self.races)
+
+    # queries returning sorted row indices
+
+    def _near(self, lat: float, lng: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """The rows within a radius and their distances."""
+        angle = radius / EARTH_RADIUS
+        dlat = math.degrees(angle)
+        candidates = None
+        # the cells of the bounding box, unless it contains a pole or many cells
+        if lat - dlat > -90 and lat + dlat < 90:
+            ratio = math.sin(angle) / math.cos(math.radians(lat))
+            dlng = math.degrees(math.asin(ratio)) if ratio < 1 else 180.0
+            size = self.cell_size
+            rows = range(
+                math.floor((lat - dlat + 90) / size), math.floor((lat + dlat + 90) / size) + 1
+            )
+            columns = range(
+                math.floor((lng - dlng + 180) / size), math.floor((lng + dlng + 180) / size) + 1
+            )
+            if len(columns) < self._columns and len(rows) * len(columns) <= len(self._grid):
+                cells = [
+                    self._grid.get((row, column % self._columns))
+                    for row in rows
+                    for column in columns
+                ]
+                occupied = [cell for cell in cells if cell is not None]
+                candidates = np.sort(np.concatenate(occupied)) if occupied else np.empty(0, np.intp)
+        if candidates is None:
+            candidates = np.flatnonzero(~np.isnan(self._lats))
+        found = distances(lat, lng, self._lats[candidates], self._lngs[candidates])
+        within = found <= radius
+        return candidates[within], found[within]
+
+    def _between(
+        self,
+        start: Optional[Union[datetime.date, datetime.datetime]],
+        end: Optional[Union[datetime.date, datetime.datetime]],
+    ) -> np.ndarray:
+        """The rows whose dates overlap a date range, both ends inclusive."""
+        first = _query_day(start) if start is not None else None
+        last = _query_day(end) if end is not None else None
+        low = 0
+        if first is not None:
+            low = np.searchsorted(self._interval_starts, first - self._max_duration, "left")
+        high = len(self._interval_starts)
+        if last is not None:
+            high = np.searchsorted(self._interval_starts, last, "right")
+        rows = self._interval_rows[low:high]
+        if first is not None:
+            rows = rows[self._interval_ends[low:high] >= first]
+        return np.sort(rows)
+
+    def _rows(self, keys: Iterable[Tuple[str, str]]) -> np.ndarray:
+        rows = [self._values[key] for key in keys if key in self._values]
+        if len(rows) == 1:
+            return rows[0]
+        return np.unique(np.concatenate(rows)) if rows else np.empty(0, np.intp)
+
+    def _value_selections(
+        self,
+        classification: Optional[Union[str, Iterable[str]]],
+        discipline: Optional[Union[str, Iterable[str]]],
+        organiser: Optional[Union[str, Organisation]],
+    ) -> List[np.ndarray]:
+        """The rows with any of the values of each given field."""
+        selections = []
+        for field, values in (("classification", classification), ("discipline", discipline)):
+            if isinstance(values, str):
+                selections.append(self._rows([(field, values)]))
+            elif values is not None:
+                selections.append(self._rows((field, value) for value in values))
+        if isinstance(organiser, Organisation):
+            selections.append(self._rows(_organiser_keys(organiser)))
+        elif organiser is not None:
+            keys = [("organiser", normalize_name(organiser)), ("organiser_id", organiser)]
+            selections.append(self._rows(keys))
+        return selections
+
+    def query(
+        self,
+        near: Optional[Tuple[float, float]] = None,
+        radius: Optional[float] = None,
+        start: Optional[Union[datetime.date, datetime.datetime]] = None,
+        end: Optional[Union[datetime.date, datetime.datetime]] = None,
+        classification: Optional[Union[EventClassification, Iterable[str]]] = None,
+        discipline: Optional[Union[RaceDiscipline, Iterable[str]]] = None,
+        organiser: Optional[Union[str, Organisation]] = None,
+    ) -> List[EventMatch]:
+        """The races matching all given conditions.
+
+        Args:
+            near: a position as (latitude, longitude), with `radius`
+            radius: the maximal distance from `near` in kilometers
+            start: the first day of the date range
+            end: the last day of the date range, races overlapping the range match
+            classification: a classification, or any of several
+            discipline: a discipline, or any of several
+            organiser: an organiser by name, short name or id, or an `Organisation`
+
+        Returns:
+            the matching races, by distance if a position is given, else by start date
+        """
+        if (near is None) != (radius is None):
+            raise ValueError("EventIndex: near and radius must be given together")
+        selections: List[np.ndarray] = []
+        found: Optional[np.ndarray] = None
+        if near is not None:
+            rows, found = self._near(near[0], near[1], radius)  # type: ignore
+            selections.append(rows)
+        if start is not None or end is not None:
+            selections.append(self._between(start, end))
+        selections += self._value_selections(classification, discipline, organiser)
+        if not selections:
+            return self._matches(np.arange(len(self.races)), None)
+
+        rows = selections[0]
+        for selection in selections[1:]:
+            rows = np.intersect1d(rows, selection, assume_unique=True)
+        if near is not None:
+            distance = found[np.searchsorted(selections[0], rows)]  # type: ignore
+            order = np.argsort(distance, kind="stable")
+            return self._matches(rows[order], distance[order])
+        return self._matches(rows, None)
+
+    def _matches(self, rows: np.ndarray, found: Optional[np.ndarray]) -> List[EventMatch]:
+        if found is None:
+            # by start date, races without dates last
+            order = np.argsort(self._start_keys[rows], kind="stable")
+            return [EventMatch(*self.races[row]) for row in rows[order].tolist()]
+        return [
+            EventMatch(*self.races[row], distance)
+            for row, distance in zip(rows.tolist(), found.tolist(), strict=True)
+        ]
+
+    def within(self, lat: float, lng: float, radius: float) -> List[EventMatch]:
+        """The races within a radius in kilometers of a position, by distance."""
+        return self.query(near=(lat, lng), radius=radius)
+
+    def between(
+        self,
+        start: Optional[Union[datetime.date, datetime.datetime]],
+        end: Optional[Union[datetime.date, datetime.datetime]],
+    ) -> List[EventMatch]:
+        """The races overlapping a date range, by start date."""
+        return self.query(start=start, end=end)
@@ -0,0 +1,1072 @@
+"""Deterministic generation of realistic events for tests and benchmarks.
+
+`EventGenerator` builds a coherent event from a seed: clubs, persons, individual and
+relay classes with fees, a terrain of controls with forked relay courses, entries,
+start lists, results with split times following the courses, and service requests. All
+messages refer to the same persons, cards and courses, and validate against the IOF XSD.
+
+Each class is generated from its own random stream, so the messages can be produced
+class by class and written to disk without keeping the messages in memory, only the
+simulated runners are kept for the next messages (up to `_MAX_SIMULATED_RUNNERS`):
+
+    generator = EventGenerator(seed=1, runners=100_000, classes=60, clubs=400)
+    generator.write("fixtures/")
+    result_list = EventGenerator(seed=1, runners=500).build("ResultList")
+
+Results are simulated per runner from a pace and the leg lengths of the course, with
+occasional mistakes, missing punches, retirements and non-starters. Relay members get
+their positions on the leg and among the runners of the same forked course, and the
+standing of the team after their leg as `OverallResult`.
+"""
+
+import concurrent.futures
+import dataclasses
+import datetime
+import decimal
+import itertools
+import math
+import os
+import random
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .base import DateAndOptionalTime, GeoPosition, Id, LanguageString, MapPosition
+from .class_ import Class_, RaceClass
+from .competitor import Competitor, ControlCard, PersonEntry, TeamEntry, TeamEntryPerson
+from .compiled import Backend
+from .contact import Country, Organisation, Person, PersonName
+from .course import (
+    ClassCourseAssignment,
+    Control,
+    Course,
+    CourseControl,
+    Leg,
+    RaceCourseData,
+    SimpleCourse,
+    SimpleRaceCourse,
+    TeamCourseAssignment,
+    TeamMemberCourseAssignment,
+)
+from .event import Event, Race
+from .fee import Amount, AssignedFee, Fee
+from .message_elements import (
+    BaseMessageElement,
+    ClassList,
+    CompetitorList,
+    ControlCardList,
+    CourseData,
+    EntryList,
+    OrganisationList,
+    ResultList,
+    ServiceRequestList,
+    StartList,
+)
+from .misc import OrganisationServiceRequest, PersonServiceRequest, Service, ServiceRequest
+from .result import (
+    ClassResult,
+    OverallResult,
+    PersonRaceResult,
+    PersonResult,
+    SplitTime,
+    TeamMemberRaceResult,
+    TeamMemberResult,
+    TeamPosition,
+    TeamResult,
+    TeamTimeBehind,
+)
+from .start import (
+    ClassStart,
+    PersonRaceStart,
+    PersonStart,
+    TeamMemberRaceStart,
+    TeamMemberStart,
+    TeamStart,
+)
+from .streaming import StreamedMessage, item_xml, streamed_field, write_xml
+from .xml_base import BaseXmlModel
+
+_GIVEN_NAMES = {
+    "M": (
+        "Anders", "Erik", "Lars", "Matthias", "Thierry", "Olav", "Jonas", "Daniel", "Kasper",
+        "Gustav", "Eddie", "Miika", "Ralph", "Tim", "Florian", "Jan", "Piotr", "Ferenc",
+        "Ivan", "Yannick", "Søren", "Jörg", "Emil", "Vojtěch",
+    ),
+    "F": (
+        "Anna", "Tove", "Simone", "Maja", "Natalia", "Sabine", "Helena", "Karolin", "Cécile",
+        "Eva", "Marika", "Jenny", "Tereza", "Frida", "Andrine", "Julia", "Lisa", "Venla",
+        "Ida", "Ingrid", "Zsófia", "Jana", "Aleksandra", "Hanne",
+    ),
+}  # fmt: skip
+_FAMILY_NAMES = (
+    "Andersson", "Johansson", "Karlsson", "Nilsson", "Eriksson", "Larsen", "Hansen",
+    "Gueorgiou", "Hubmann", "Kyburz", "Müller", "Schmidt", "Novák", "Svoboda", "Kowalski",
+    "Virtanen", "Korhonen", "Lundgren", "Bergström", "Dvořák", "Kovács", "Alexandersson",
+    "Weber", "Berger", "Olsen", "Petrov", "Ivanova", "Smith", "Brown", "Rossi", "Dupont",
+    "Lindqvist", "Jensen", "Øvergård", "Wyder", "Hertner", "Lenz", "Ryabkina", "Roos",
+)  # fmt: skip
+_TOWNS = (
+    "Stockholm", "Göteborg", "Uppsala", "Lund", "Umeå", "Oslo", "Bergen", "Trondheim",
+    "Helsinki", "Tampere", "Turku", "København", "Aarhus", "Bern", "Zürich", "Liestal",
+    "Praha", "Brno", "Wien", "Graz", "München", "Dresden", "Kraków", "Budapest", "Tartu",
+)  # fmt: skip
+_CLUB_KINDS = ("OK", "SK", "IF", "OL", "OLG", "Suunta", "Orienteers")
+
+# age of the classes with their weight in the number of runners, repeated for both sexes
+_AGES = (
+    (21, 3), (20, 2), (18, 2), (16, 2), (14, 1), (12, 1), (10, 1), (35, 2), (40, 2),
+    (45, 2), (50, 2), (55, 1), (60, 1), (65, 1), (70, 1), (75, 1), (80, 1),
+)  # fmt: skip
+
+# pace of the fastest runners of M21 in seconds per km of straight legs
+_ELITE_PACE = 360.0
+_METERS_PER_DEGREE = 111_320.0
+_MAP_SCALE = 10_000
+# the simulated runners kept for the messages of an event, the rest are simulated again
+_MAX_SIMULATED_RUNNERS = 200_000
+
+MESSAGES = (
+    "OrganisationList",
+    "ClassList",
+    "CompetitorList",
+    "ControlCardList",
+    "CourseData",
+    "EntryList",
+    "ServiceRequestList",
+    "StartList",
+    "ResultList",
+)
+
+
+@dataclasses.dataclass
+class _Runner:
+    """A simulated runner of a class or relay leg."""
+
+    person: Person
+    club: int
+    card: str
+    rental: bool
+    bib: str
+    entry_id: str
+    start: datetime.datetime
+    status: str = "OK"
+    time: Optional[float] = None
+    splits: List[Tuple[str, Optional[float]]] = dataclasses.field(default_factory=list)
+
+    @property
+    def finish(self) -> Optional[datetime.datetime]:
+        if self.time is None:
+            return None
+        return self.start + datetime.timedelta(seconds=self.time)
+
+
+@dataclasses.dataclass
+class _Course:
+    name: str
+    family: Optional[str]
+    controls: List[int]
+    legs: List[float]
+
+    @property
+    def length(self) -> float:
+        return round(sum(self.legs), -1)
+
+    def simple(self) -> SimpleCourse:
+        return SimpleCourse(
+            name=self.name,
+            course_family=self.family,
+            length=self.length,
+            climb=round(self.length * 0.025, -1),
+            number_of_controls=len(self.controls),
+        )
+
+
+@dataclasses.dataclass
+class _Team:
+    name: str
+    clubs: List[int]
+    bib: str
+    entry_id: str
+    members: List[_Runner]
+    courses: List[_Course]
+
+
+class EventGenerator:
+    """Seeded generator of a realistic single-race event.
+
+    Args:
+        seed: the seed, the same seed and arguments produce the same event
+        runners: the number of runners in individual classes
+        classes: the number of individual classes
+        clubs: the number of clubs, of very different sizes
+        relay_classes: the number of relay classes
+        teams: the number of teams per relay class
+        legs: the number of legs of the relays, also the number of forked variants
+        controls: the number of controls in the terrain
+        date: the date of the race
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        runners: int = 1000,
+        classes: int = 20,
+        clubs: int = 50,
+        relay_classes: int = 2,
+        teams: int = 20,
+        legs: int = 3,
+        controls: int = 80,
+        date: datetime.date = datetime.date(2024, 6, 15),
+    ):
+        if classes < 1 or clubs < 1 or not 1 <= legs <= 10 or controls < 30:
+            raise ValueError(
+                "EventGenerator: at least 1 class, 1 club, 1 to 10 legs and 30 controls"
+            )
+        self.seed = seed
+        self.runners = runners
+        self.legs = legs
+        self.date = date
+        self.timezone = datetime.timezone(datetime.timedelta(hours=2))
+        self.first_start = datetime.datetime.combine(
+            date, datetime.time(10, 0), tzinfo=self.timezone
+        )
+        rng = self._random("event")
+
+        self.clubs = [self._club(i, rng) for i in range(clubs)]
+        self._club_weights = list(itertools.accumulate(1 / (i + 3) for i in range(clubs)))
+        self.classes = [self._class(i) for i in range(classes)]
+        self.relay_classes = [self._relay_class(i) for i in range(relay_classes)]
+        self._sizes = self._class_sizes(runners, classes)
+        self._offsets = [0, *itertools.accumulate(self._sizes)]
+        self._teams = teams
+
+        # terrain of 3 x 2 km around the arena, positions in meters east and north
+        self._positions = [
+            (rng.uniform(-1500, 1500), rng.uniform(-1000, 1000)) for _ in range(controls)
+        ]
+        self._codes = [str(31 + i) for i in range(controls)]
+        self.courses = [self._individual_course(i) for i in range(classes)]
+        self.relay_courses = [self._relay_courses(i) for i in range(relay_classes)]
+        self.services = self._services()
+        # the simulated runners and teams per class, see `_simulated`
+        self._simulations: Dict[Tuple[str, int], List[Any]] = {}
+        self._simulated_runners = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # worker processes simulate their own classes
+        return {**self.__dict__, "_simulations": {}, "_simulated_runners": 0}
+
+    def _random(self, *key: Any) -> random.Random:
+        return random.Random("/".join(map(str, (self.seed, *key))))
+
+    # event
+
+    def _club(self, index: int, rng: random.Random) -> Organisation:
+        town = _TOWNS[index % len(_TOWNS)]
+        kind = _CLUB_KINDS[rng.randrange(len(_CLUB_KINDS))]
+        number = f" {index // len(_TOWNS) + 1}" if index >= len(_TOWNS) else ""
+        return Organisation(
+            id=Id(id=str(1000 + index)),
+            name=f"{kind} {town}{number}",
+            short_name=f"{kind} {town[:4]}{number}",
+            country=Country(name="", code=("SWE", "NOR", "FIN", "SUI", "CZE")[index % 5]),
+            type="Club",
+        )
+
+    def _fees(self, name: str, amount: int) -> List[Fee]:
+        deadline = self.first_start - datetime.timedelta(days=14)
+        return [
+            Fee(
+                id=Id(id=f"{name}-normal"),
+                name=[LanguageString(text=f"Entry fee {name}", language="en")],
+                amount=Amount(amount=decimal.Decimal(amount), currency="EUR"),
+                valid_to_time=deadline,
+                type="Normal",
+            ),
+            Fee(
+                id=Id(id=f"{name}-late"),
+                name=[LanguageString(text=f"Late entry fee {name}", language="en")],
+                amount=Amount(amount=decimal.Decimal(amount) * 3 / 2, currency="EUR"),
+                valid_from_time=deadline,
+                type="Late",
+            ),
+        ]
+
+    def _class(self, index: int) -> Class_:
+        age, _ = _AGES[(index // 2) % len(_AGES)]
+        sex = "M" if index % 2 == 0 else "F"
+        repetition = index // (2 * len(_AGES))
+        name = f"{'M' if sex == 'M' else 'W'}{age}" + (f" {repetition + 1}" if repetition else "")
+        return Class_(
+            id=Id(id=str(index + 1)),
+            name=name,
+            fee=self._fees(name, 10 if age <= 16 else 22),
+            race_class=[RaceClass(punching_system=["SI"], course=[SimpleCourse(name=name)])],
+            min_age=age if age > 21 else None,
+            max_age=age if age < 21 else None,
+            sex=sex,
+        )
+
+    def _relay_class(self, index: int) -> Class_:
+        sex = "M" if index % 2 == 0 else "F"
+        name = f"{'Men' if sex == 'M' else 'Women'} Relay" + (
+            f" {index // 2 + 1}" if index > 1 else ""
+        )
+        return Class_(
+            id=Id(id=f"R{index + 1}"),
+            name=name,
+            leg=[Leg(name=f"Leg {leg + 1}") for leg in range(self.legs)],
+            team_fee=self._fees(name, 60),
+            race_class=[RaceClass(punching_system=["SI"])],
+            sex=sex,
+            min_number_of_team_members=self.legs,
+            max_number_of_team_members=self.legs,
+        )
+
+    def _class_sizes(self, runners: int, classes: int) -> List[int]:
+        weights = [_AGES[(i // 2) % len(_AGES)][1] for i in range(classes)]
+        sizes = [runners * w // sum(weights) for w in weights]
+        for i in range(runners - sum(sizes)):
+            sizes[i % classes] += 1
+        return sizes
+
+    def _services(self) -> List[Service]:
+        def service(identifier: str, name: str, amount: int, max_number: Optional[float]):
+            return Service(
+                id=Id(id=identifier),
+                name=[LanguageString(text=name, language="en")],
+                fee=[
+                    Fee(
+                        id=Id(id=identifier),
+                        name=[LanguageString(text=name, language="en")],
+                        amount=Amount(amount=decimal.Decimal(amount), currency="EUR"),
+                    )
+                ],
+                max_number=max_number,
+                type=identifier,
+            )
+
+        capacity = float(max(10, self.runners // 4))
+        return [
+            service("accommodation", "School accommodation per night", 12, capacity),
+            service("lunch", "Lunch", 9, capacity * 2),
+            service("rental-card", "Rental SI card", 3, None),
+        ]
+
+    def event(self) -> Event:
+        """The event, with its race, organiser and services."""
+        return Event(
+            id=Id(id=f"E{self.seed}"),
+            name=f"Generated Event {self.seed}",
+            start_time=DateAndOptionalTime(date=self.date, time=self.first_start.timetz()),
+            end_time=DateAndOptionalTime(date=self.date),
+            event_status="Sanctioned",
+            classification="National",
+            forms=["Individual", "Relay"] if self.relay_classes else ["Individual"],
+            organisers=[self.clubs[0]],
+            races=[
+                Race(
+                    race_number=1,
+                    name="Long distance",
+                    start_time=DateAndOptionalTime(date=self.date),
+                    position=self._geo((0.0, 0.0)),
+                    discipline=["Long"],
+                )
+            ],
+            services=self.services,
+        )
+
+    # terrain and courses
+
+    def _geo(self, position: Tuple[float, float]) -> GeoPosition:
+        east, north = position
+        lat = 59.33 + north / _METERS_PER_DEGREE
+        lng = 18.06 + east / (_METERS_PER_DEGREE * math.cos(math.radians(59.33)))
+        return GeoPosition(lat=round(lat, 6), lng=round(lng, 6))
+
+    def _leg(self, a: Tuple[float, float], b: Tuple[float, float]) -> float:
+        return round(math.hypot(a[0] - b[0], a[1] - b[1]), -1)
+
+    def _legs(self, controls: Sequence[int]) -> List[float]:
+        """Leg lengths from the start to each control and to the finish."""
+        points = [(0.0, -200.0), *(self._positions[c] for c in controls), (0.0, 0.0)]
+        return [self._leg(a, b) for a, b in itertools.pairwise(points)]
+
+    def _pick_controls(self, rng: random.Random, count: int) -> List[int]:
+        """Controls of a course, with legs between 150 and 700 m where possible."""
+        chosen: List[int] = []
+        previous = (0.0, -200.0)
+        for _ in range(count):
+            candidates = [c for c in range(len(self._positions)) if c not in chosen]
+            good = [c for c in candidates if 150 <= self._leg(previous, self._positions[c]) <= 700]
+            control = rng.choice(good or candidates)
+            chosen.append(control)
+            previous = self._positions[control]
+        return chosen
+
+    def _individual_course(self, index: int) -> _Course:
+        age, _ = _AGES[(index // 2) % len(_AGES)]
+        count = max(6, 22 - abs(age - 21) // 3 - (2 if index % 2 else 0))
+        controls = self._pick_controls(self._random("course", index), count)
+        return _Course(self.classes[index].name, None, controls, self._legs(controls))
+
+    def _relay_courses(self, index: int) -> List[_Course]:
+        """The forked variants of a relay class: the controls at two points differ."""
+        rng = self._random("relay-course", index)
+        base = self._pick_controls(rng, 14)
+        forks = (3, 9)
+        alternatives = [
+            rng.sample([c for c in range(len(self._positions)) if c not in base], self.legs)
+            for _ in forks
+        ]
+        family = f"R{index + 1}"
+        courses = []
+        for variant in range(self.legs):
+            controls = list(base)
+            for fork, options in zip(forks, alternatives, strict=True):
+                controls[fork] = options[variant]
+            name = f"{family}{chr(ord('A') + variant)}"
+            courses.append(_Course(name, family, controls, self._legs(controls)))
+        return courses
+
+    def race_course_data(self) -> RaceCourseData:
+        """The controls, courses and course assignments."""
+        controls = [
+            Control(id=Id(id="S1"), position=self._geo((0.0, -200.0)), type="Start"),
+            *(
+                Control(
+                    id=Id(id=code),
+                    position=self._geo(position),
+                    map_position=MapPosition(
+                        x=round(position[0] * 1000 / _MAP_SCALE, 1),
+                        y=round(-position[1] * 1000 / _MAP_SCALE, 1),
+                    ),
+                )
+                for code, position in zip(self._codes, self._positions, strict=True)
+            ),
+            Control(id=Id(id="F1"), position=self._geo((0.0, 0.0)), type="Finish"),
+        ]
+        courses = [*self.courses, *itertools.chain.from_iterable(self.relay_courses)]
+        return RaceCourseData(
+            controls=controls,
+            courses=[self._course(course) for course in courses],
+            class_course_assignments=[
+                *(
+                    ClassCourseAssignment(class_name=c.name, course_name=course.name)
+                    for c, course in zip(self.classes, self.courses, strict=True)
+                ),
+                *(
+                    ClassCourseAssignment(class_name=c.name, course_family=variants[0].family)
+                    for c, variants in zip(self.relay_classes, self.relay_courses, strict=True)
+                ),
+            ],
+            team_course_assignments=[
+                self._team_course_assignment(c, team)
+                for i, c in enumerate(self.relay_classes)
+                for team in self._relay_teams(i)
+            ],
+            race_number=1,
+        )
+
+    def _course(self, course: _Course) -> Course:
+        course_controls = [CourseControl(control=["S1"], type="Start")]
+        course_controls += [
+            CourseControl(control=[self._codes[c]], leg_length=leg)
+            for c, leg in zip(course.controls, course.legs, strict=False)
+        ]
+        course_controls.append(
+            CourseControl(control=["F1"], type="Finish", leg_length=course.legs[-1])
+        )
+        simple = course.simple()
+        return Course(
+            name=course.name,
+            course_family=course.family,
+            length=simple.length,
+            climb=simple.climb,
+            course_controls=course_controls,
+        )
+
+    def _team_course_assignment(self, class_: Class_, team: _Team) -> TeamCourseAssignment:
+        return TeamCourseAssignment(
+            bib_number=team.bib,
+            team_name=team.name,
+            class_name=class_.name,
+            team_member_course_assignment=[
+                TeamMemberCourseAssignment(
+                    bib_number=member.bib,
+                    leg=leg + 1,
+                    course_name=course.name,
+                    course_family=course.family,
+                )
+                for leg, (member, course) in enumerate(zip(team.members, team.courses, strict=True))
+            ],
+        )
+
+    # persons and simulation
+
+    def _person(self, rng: random.Random, number: int, sex: str, age: int) -> Person:
+        given = _GIVEN_NAMES[sex][rng.randrange(len(_GIVEN_NAMES[sex]))]
+        family = _FAMILY_NAMES[rng.randrange(len(_FAMILY_NAMES))]
+        if age == 21:
+            years = rng.randint(21, 34)
+        elif age < 21:
+            years = age - rng.randint(0, 1)
+        else:
+            years = age + rng.randint(0, 4)
+        birth_date = datetime.date(self.date.year - years, 1, 1) + datetime.timedelta(
+            days=rng.randrange(365)
+        )
+        return Person(
+            ids=[Id(id=str(100_000 + number))],
+            name=PersonName(family_name=family, given_name=given),
+            birth_date=birth_date,
+            sex=sex,  # type: ignore
+        )
+
+    def _runner(
+        self, rng: random.Random, number: int, sex: str, age: int, start: datetime.datetime
+    ) -> _Runner:
+        person = self._person(rng, number, sex, age)
+        club = rng.choices(range(len(self.clubs)), cum_weights=self._club_weights)[0]
+        rental = rng.random() < 0.1
+        card = str((8_000_000 if rental else 2_000_000) + number)
+        return _Runner(person, club, card, rental, str(number + 1), str(number + 1), start)
+
+    def _simulate(self, rng: random.Random, runner: _Runner, course: _Course, pace: float) -> None:
+        """Draw the status, split times and time of a runner on a course."""
+        draw = rng.random()
+        if draw < 0.02:
+            runner.status = "DidNotStart"
+            return
+        retired_at = rng.randrange(len(course.controls)) if draw < 0.05 else None
+        missing = rng.randrange(len(course.controls)) if 0.05 <= draw < 0.08 else None
+        elapsed = 0.0
+        for i, (control, leg) in enumerate(zip(course.controls, course.legs, strict=False)):
+            leg_time = leg / 1000 * pace * rng.uniform(0.92, 1.12) + 5
+            if rng.random() < 0.1:
+                leg_time *= rng.uniform(1.2, 2.0)
+            elapsed += round(leg_time)
+            if (retired_at is not None and i >= retired_at) or i == missing:
+                runner.splits.append((self._codes[control], None))
+            else:
+                runner.splits.append((self._codes[control], elapsed))
+        if retired_at is not None:
+            runner.status = "DidNotFinish"
+            return
+        runner.time = elapsed + round(course.legs[-1] / 1000 * pace + 3)
+        runner.status = "MissingPunch" if missing is not None else "OK"
+
+    def _simulated(
+        self, kind: str, index: int, simulate: Callable[[int], List[Any]], runners: int
+    ) -> List[Any]:
+        """The memoized simulation of a class, kept up to `_MAX_SIMULATED_RUNNERS` runners."""
+        simulation = self._simulations.get((kind, index))
+        if simulation is None:
+            simulation = simulate(index)
+            if self._simulated_runners + runners <= _MAX_SIMULATED_RUNNERS:
+                self._simulations[kind, index] = simulation
+                self._simulated_runners += runners
+        return simulation
+
+    def _class_runners(self, index: int) -> List[_Runner]:
+        """The simulated runners of an individual class, in start order."""
+        return self._simulated("class", index, self._simulate_class, self._sizes[index])
+
+    def _relay_teams(self, index: int) -> List[_Team]:
+        """The simulated teams of a relay class, in bib order."""
+        return self._simulated("relay", index, self._simulate_relay, self._teams * self.legs)
+
+    def _simulate_class(self, index: int) -> List[_Runner]:
+        rng = self._random("class", index)
+        class_ = self.classes[index]
+        age = class_.max_age or class_.min_age or 21
+        size = self._sizes[index]
+        interval = 60 if size > 120 else 120
+        first = self.first_start + datetime.timedelta(seconds=30 * (index % 4))
+        # slower paces for youth, veterans and women
+        base = _ELITE_PACE * (1 + abs(age - 23) / 40) * (1.12 if class_.sex == "F" else 1.0)
+        runners = []
+        for i in range(size):
+            start = first + datetime.timedelta(seconds=interval * i)
+            runner = self._runner(rng, self._offsets[index] + i, class_.sex or "M", age, start)
+            self._simulate(rng, runner, self.courses[index], base * rng.lognormvariate(0.15, 0.2))
+            runners.append(runner)
+        return runners
+
+    def _simulate_relay(self, index: int) -> List[_Team]:
+        rng = self._random("relay", index)
+        class_ = self.relay_classes[index]
+        courses = self.relay_courses[index]
+        mass_start = self.first_start + datetime.timedelta(hours=3)
+        restart = mass_start + datetime.timedelta(hours=2)
+        teams: List[_Team] = []
+        club_teams = [0] * len(self.clubs)
+        for t in range(self._teams):
+            number = self.runners + (index * self._teams + t) * self.legs
+            club = rng.choices(range(len(self.clubs)), cum_weights=self._club_weights)[0]
+            club_teams[club] += 1
+            bib = str(self.runners + index * self._teams + t + 1)
+            team = _Team(
+                name=f"{self.clubs[club].name} {club_teams[club]}",
+                clubs=[club],
+                bib=bib,
+                entry_id=f"T{bib}",
+                members=[],
+                # the team runs each variant once, in a different order than its neighbours
+                courses=[courses[(t + leg) % self.legs] for leg in range(self.legs)],
+            )
+            start = mass_start
+            pace = (
+                _ELITE_PACE
+                * 1.1
+                * (1.12 if class_.sex == "F" else 1.0)
+                * rng.lognormvariate(0.1, 0.15)
+            )
+            for leg, course in enumerate(team.courses):
+                runner = self._runner(rng, number + leg, class_.sex or "M", 21, start)
+                runner.club = club
+                runner.bib = f"{bib}-{leg + 1}"
+                runner.entry_id = team.entry_id
+                self._simulate(rng, runner, course, pace * rng.uniform(0.9, 1.1))
+                team.members.append(runner)
+                start = runner.finish or restart
+            teams.append(team)
+        return teams
+
+    # message items
+
+    def _card(self, runner: _Runner) -> ControlCard:
+        return ControlCard(id=runner.card, punching_system="SI")
+
+    def _class_reference(self, class_: Class_) -> Class_:
+        return Class_(id=class_.id, name=class_.name)
+
+    def _assigned_fee(self, rng: random.Random, class_: Class_, team: bool = False) -> AssignedFee:
+        fees = class_.team_fee if team else class_.fee
+        fee = fees[1] if rng.random() < 0.05 else fees[0]
+        paid = fee.amount if rng.random() < 0.9 else None
+        return AssignedFee(fee=fee, paid_amount=paid)
+
+    def _rental_request(self) -> ServiceRequest:
+        service = self.services[2]
+        return ServiceRequest(
+            service=Service(id=service.id, name=service.name),
+            requested_quantity=1,
+            assigned_fee=[AssignedFee(fee=service.fee[0])],
+        )
+
+    def _person_entries(self, index: int) -> Iterator[PersonEntry]:
+        class_ = self.classes[index]
+        rng = self._random("entry", index)
+        for runner in self._class_runners(index):
+            entry_time = self.first_start - datetime.timedelta(days=rng.uniform(3, 40))
+            yield PersonEntry(
+                id=Id(id=runner.entry_id),
+                person=runner.person,
+                organisation=self.clubs[runner.club],
+                controlcards=[self._card(runner)],
+                classes=[self._class_reference(class_)],
+                race_number=[1],
+                assigned_fee=[self._assigned_fee(rng, class_)],
+                service_requests=[self._rental_request()] if runner.rental else [],
+                entry_time=entry_time,
+            )
+
+    def _team_entries(self, index: int) -> Iterator[TeamEntry]:
+        class_ = self.relay_classes[index]
+        rng = self._random("team-entry", index)
+        for team in self._relay_teams(index):
+            yield TeamEntry(
+                id=Id(id=team.entry_id),
+                name=team.name,
+                organisations=[self.clubs[c] for c in team.clubs],
+                team_entry_persons=[
+                    TeamEntryPerson(
+                        person=member.person,
+                        organisation=self.clubs[member.club],
+                        leg=leg + 1,
+                        control_card=[self._card(member)],
+                    )
+                    for leg, member in enumerate(team.members)
+                ],
+                class_=[self._class_reference(class_)],
+                race=[1],
+                assigned_fees=[self._assigned_fee(rng, class_, team=True)],
+            )
+
+    def _class_start(self, index: int) -> ClassStart:
+        class_, course = self.classes[index], self.courses[index]
+        return ClassStart(
+            class_=self._class_reference(class_),
+            courses=[SimpleRaceCourse(**course.simple().model_dump())],
+            person_starts=[
+                PersonStart(
+                    entry_id=Id(id=runner.entry_id),
+                    person=runner.person,
+                    organisation=self.clubs[runner.club],
+                    starts=[
+                        PersonRaceStart(
+                            bib_number=runner.bib,
+                            start_time=runner.start,
+                            control_card=[self._card(runner)],
+                        )
+                    ],
+                )
+                for runner in self._class_runners(index)
+            ],
+        )
+
+    def _relay_start(self, index: int) -> ClassStart:
+        class_ = self.relay_classes[index]
+        return ClassStart(
+            class_=self._class_reference(class_),
+            team_starts=[
+                TeamStart(
+                    entry_id=Id(id=team.entry_id),
+                    name=team.name,
+                    organisations=[self.clubs[c] for c in team.clubs],
+                    bib_number=team.bib,
+                    team_member_starts=[
+                        TeamMemberStart(
+                            person=member.person,
+                            organisation=self.clubs[member.club],
+                            starts=[
+                                TeamMemberRaceStart(
+                                    leg=leg + 1,
+                                    leg_order=1,
+                                    bib_number=member.bib,
+                                    # later legs start at the changeover
+                                    start_time=member.start if leg == 0 else None,
+                                    course=course.simple(),
+                                    control_card=[self._card(member)],
+                                )
+                            ],
+                        )
+                        for leg, (member, course) in enumerate(
+                            zip(team.members, team.courses, strict=True)
+                        )
+                    ],
+                )
+                for team in self._relay_teams(index)
+            ],
+        )
+
+    def _splits(self, runner: _Runner) -> List[SplitTime]:
+        return [
+            SplitTime(control_card=code, time=time, status="OK" if time is not None else "Missing")
+            for code, time in runner.splits
+        ]
+
+    def _class_result(self, index: int) -> ClassResult:
+        class_, course = self.classes[index], self.courses[index]
+        runners = self._class_runners(index)
+        positions, behind = _ranking([r.time if r.status == "OK" else None for r in runners])
+        order = sorted(
+            range(len(runners)), key=lambda i: (positions[i] is None, positions[i] or 0, i)
+        )
+        return ClassResult(
+            class_=self._class_reference(class_),
+            courses=[SimpleRaceCourse(**course.simple().model_dump())],
+            person_results=[
+                PersonResult(
+                    entry_id=Id(id=runners[i].entry_id),
+                    person=runners[i].person,
+                    organisation=self.clubs[runners[i].club],
+                    results=[
+                        PersonRaceResult(
+                            bib_number=runners[i].bib,
+                            start_time=runners[i].start,
+                            finish_time=runners[i].finish,
+                            time=runners[i].time,
+                            time_behind=behind[i],
+                            position=positions[i],
+                            status=runners[i].status,  # type: ignore
+                            split_time=self._splits(runners[i]),
+                            control_card=[self._card(runners[i])],
+                        )
+                    ],
+                )
+                for i in order
+            ],
+        )
+
+    def _relay_result(self, index: int) -> ClassResult:
+        class_ = self.relay_classes[index]
+        teams = self._relay_teams(index)
+        # leg times and team times after each leg, None if not OK so far
+        leg_times = [[m.time if m.status == "OK" else None for m in t.members] for t in teams]
+        totals = [list(itertools.accumulate(times, _add)) for times in leg_times]
+        leg_ranks = [_ranking([times[leg] for times in leg_times]) for leg in range(self.legs)]
+        team_ranks = [_ranking([total[leg] for total in totals]) for leg in range(self.legs)]
+        # the members running each forked variant, over all legs
+        runs: Dict[str, List[Tuple[int, int]]] = {}
+        for t, team in enumerate(teams):
+            for leg, course in enumerate(team.courses):
+                runs.setdefault(course.name, []).append((t, leg))
+        course_ranks: Dict[Tuple[int, int], Tuple[Optional[int], Optional[float]]] = {}
+        for members in runs.values():
+            positions, behind = _ranking([leg_times[t][leg] for t, leg in members])
+            course_ranks.update(zip(members, zip(positions, behind, strict=True), strict=True))
+        results = []
+        for t, team in enumerate(teams):
+            members = []
+            status = "OK"
+            for leg, (member, course) in enumerate(zip(team.members, team.courses, strict=True)):
+                ranks = (
+                    (leg_ranks[leg][0][t], leg_ranks[leg][1][t], "Leg"),
+                    (*course_ranks[t, leg], "Course"),
+                )
+                # the team is ranked from its first member which isn't OK
+                if status == "OK":
+                    status = member.status
+                members.append(
+                    TeamMemberResult(
+                        person=member.person,
+                        organisation=self.clubs[member.club],
+                        results=[
+                            TeamMemberRaceResult(
+                                leg=leg + 1,
+                                leg_order=1,
+                                bib_number=member.bib,
+                                start_time=member.start,
+                                finish_time=member.finish,
+                                time=member.time,
+                                time_behind=[
+                                    TeamTimeBehind(time_behind=behind, type=kind)  # type: ignore
+                                    for _, behind, kind in ranks
+                                    if behind is not None
+                                ],
+                                position=[
+                                    TeamPosition(position=position, type=kind)  # type: ignore
+                                    for position, _, kind in ranks
+                                    if position is not None
+                                ],
+                                status=member.status,  # type: ignore
+                                overall_result=OverallResult(
+                                    time=totals[t][leg],
+                                    time_behind=team_ranks[leg][1][t],
+                                    position=team_ranks[leg][0][t],
+                                    status=status,  # type: ignore
+                                ),
+                                course=course.simple(),
+                                split_time=self._splits(member),
+                                control_card=[self._card(member)],
+                            )
+                        ],
+                    )
+                )
+            results.append(
+                TeamResult(
+                    entry_id=Id(id=team.entry_id),
+                    name=team.name,
+                    organisations=[self.clubs[c] for c in team.clubs],
+                    bib_number=team.bib,
+                    team_member_results=members,
+                )
+            )
+        return ClassResult(class_=self._class_reference(class_), team_results=results)
+
+    # messages
+
+    def _message(self, name: str) -> Tuple[BaseMessageElement, List[Tuple[str, int]]]:
+        """The header of a message and its items in parts, as (method, class index)."""
+        individual = range(len(self.classes))
+        relays = range(len(self.relay_classes))
+        messages: Dict[str, Any] = {
+            "OrganisationList": lambda: (OrganisationList(), [("_organisations", 0)]),
+            "ClassList": lambda: (ClassList(), [("_all_classes", 0)]),
+            "CompetitorList": lambda: (
+                CompetitorList(),
+                [("_competitors", i) for i in individual],
+            ),
+            "ControlCardList": lambda: (
+                ControlCardList(owner=self.clubs[0].name),
+                [("_rental_cards", i) for i in individual],
+            ),
+            "CourseData": lambda: (
+                CourseData.model_construct(event=self.event(), race_course_data=[]),
+                [("_course_data", 0)],
+            ),
+            "EntryList": lambda: (
+                EntryList(
+                    event=self.event(),
+                    team_entries=[e for i in relays for e in self._team_entries(i)],
+                ),
+                [("_person_entries", i) for i in individual],
+            ),
+            "ServiceRequestList": lambda: (
+                ServiceRequestList(
+                    event=self.event(), organisation_service_requests=self._club_requests()
+                ),
+                [("_lunch_requests", i) for i in individual],
+            ),
+            "StartList": lambda: (
+                StartList(event=self.event()),
+                [("_class_start", i) for i in individual] + [("_relay_start", i) for i in relays],
+            ),
+            "ResultList": lambda: (
+                ResultList(event=self.event()),
+                [("_class_result", i) for i in individual] + [("_relay_result", i) for i in relays],
+            ),
+        }
+        if name not in messages:
+            raise ValueError(f"EventGenerator: unknown message {name!r}, one of {MESSAGES}")
+        header, parts = messages[name]()
+        header.create_time = self.first_start - datetime.timedelta(days=1)
+        header.creator = "pyiof.generator"
+        return header, parts
+
+    def _items(self, part: Tuple[str, int]) -> List[Any]:
+        method, index = part
+        items = getattr(self, method)(index)
+        return [items] if isinstance(items, BaseXmlModel) else list(items)
+
+    def _organisations(self, index: int) -> List[Organisation]:
+        return self.clubs
+
+    def _all_classes(self, index: int) -> List[Class_]:
+        return self.classes + self.relay_classes
+
+    def _course_data(self, index: int) -> RaceCourseData:
+        return self.race_course_data()
+
+    def _competitors(self, index: int) -> Iterator[Competitor]:
+        class_ = self._class_reference(self.classes[index])
+        for runner in self._class_runners(index):
+            yield Competitor(
+                person=runner.person,
+                organisation=[self.clubs[runner.club]],
+                controlcards=[] if runner.rental else [self._card(runner)],
+                class_=[class_],
+            )
+
+    def _rental_cards(self, index: int) -> Iterator[ControlCard]:
+        for runner in self._class_runners(index):
+            if runner.rental:
+                yield self._card(runner)
+
+    def _club_requests(self) -> List[OrganisationServiceRequest]:
+        """Accommodation requests of a third of the clubs, for the members of the club."""
+        rng = self._random("accommodation")
+        accommodation = self.services[0]
+        members = [0] * len(self.clubs)
+        for index in range(len(self.classes)):
+            for runner in self._class_runners(index):
+                members[runner.club] += 1
+        requests = []
+        for club, count in zip(self.clubs, members, strict=True):
+            if count == 0 or rng.random() > 1 / 3:
+                continue
+            nights = rng.randint(1, 2)
+            requested = float(max(1, round(count * rng.uniform(0.5, 1.0))) * nights)
+            requests.append(
+                OrganisationServiceRequest(
+                    organisation=club,
+                    service_requests=[
+                        ServiceRequest(
+                            service=Service(id=accommodation.id, name=accommodation.name),
+                            requested_quantity=requested,
+                            delivered_quantity=requested if rng.random() < 0.8 else None,
+                            assigned_fee=[AssignedFee(fee=accommodation.fee[0])],
+                        )
+                    ],
+                )
+            )
+        return requests
+
+    def _lunch_requests(self, index: int) -> Iterator[PersonServiceRequest]:
+        rng = self._random("lunch", index)
+        lunch = self.services[1]
+        for runner in self._class_runners(index):
+            if rng.random() < 0.3:
+                yield PersonServiceRequest(
+                    person=runner.person,
+                    service_requests=[
+                        ServiceRequest(
+                            service=Service(id=lunch.id, name=lunch.name),
+                            requested_quantity=float(rng.randint(1, 2)),
+                            assigned_fee=[AssignedFee(fee=lunch.fee[0])],
+                        )
+                    ],
+                )
+
+    def stream(self, name: str) -> StreamedMessage:
+        """A message generated class by class, e.g. "ResultList", see `MESSAGES`."""
+        header, parts = self._message(name)
+        items = itertools.chain.from_iterable(map(self._items, parts))
+        return StreamedMessage(header, streamed_field(type(header)).name, items)
+
+    def build(self, name: str) -> BaseMessageElement:
+        """A message generated in memory, e.g. "ResultList", see `MESSAGES`."""
+        message = self.stream(name)
+        return message.header.model_copy(update={message.field: list(message.items)})
+
+    def write(
+        self,
+        directory: str | os.PathLike,
+        names: Sequence[str] = MESSAGES,
+        backend: Backend = "compiled",
+        workers: int = 1,
+    ) -> Dict[str, Path]:
+        """Write messages to XML files named after the message, one class at a time.
+
+        Args:
+            directory: the directory of the files
+            names: the messages to write, see `MESSAGES`
+            backend: serializer backend, see `BaseXmlModel.to_xml_tree`
+            workers: the number of processes generating and serializing the classes in
+                parallel, the output is the same
+
+        Returns:
+            the paths of the written files by message name
+        """
+        paths = {name: Path(directory) / f"{name}.xml" for name in names}
+        if workers <= 1:
+            for name in names:
+                write_xml(self.stream(name), paths[name], backend=backend)
+            return paths
+
+        with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_start_worker, initargs=(self,)
+        ) as pool:
+            for name in names:
+                header, parts = self._message(name)
+                chunks = pool.map(
+                    _serialize_part,
+                    itertools.repeat(type(header)),
+                    parts,
+                    itertools.repeat(backend),
+                )
+                message = StreamedMessage(header, streamed_field(type(header)).name, chunks)
+                write_xml(message, paths[name], backend=backend)
+        return paths
+
+
+# the generator of a worker process of `EventGenerator.write`
+_worker_generator: Optional[EventGenerator] = None
+
+
+def _start_worker(generator: EventGenerator) -> None:
+    global _worker_generator  # noqa: PLW0603
+    _worker_generator = generator
+
+
+def _serialize_part(cls: type, part: Tuple[str, int], backend: Backend) -> bytes:
+    assert _worker_generator is not None
+    items = _worker_generator._items(part)
+    return b"".join(item_xml(item, cls, backend=backend) for item in items)
+
+
+def _add(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    return None if a is None or b is None else a + b
+
+
+def _ranking(times: Sequence[Optional[float]]) -> Tuple[List[Optional[int]], List[Optional[float]]]:
+    """Positions and times behind, equal times share a position, None without time."""
+    ranked = sorted((t, i) for i, t in enumerate(times) if t is not None)
+    positions: List[Optional[int]] = [None] * len(times)
+    behind: List[Optional[float]] = [None] * len(times)
+    for rank, (time, i) in enumerate(ranked):
+        previous = ranked[rank - 1]
+        positions[i] = positions[previous[1]] if rank and previous[0] == time else rank + 1
+        behind[i] = time - ranked[0][0]
+    return positions, behind
@@ -0,0 +1,207 @@
+"""Structural content hashes of model trees.
+
+`content_hash` is a stable fingerprint of the content of a model and its submodels: it
+is equal for models with equal field values, in any process and Python version, e.g.
+for change detection between systems, caching or deduplication. `modify_time` fields
+can be ignored, for content which is re-exported with new modification times.
+
+    before = result_list.content_hash()
+    person_result.results[0].time = 1234.0
+    assert result_list.content_hash() != before
+
+The hash of a model combines the hashes of its submodels, which are memoized per
+instance. Assigning a field of a model discards the memoized hashes of the model and of
+the models it was hashed within, so hashing again recomputes only the models on the
+path to the change, each from the memoized hashes of its children.
+
+Lists can also be changed in place, e.g. with `append`, which can't be observed. The
+memoized hash of a model with lists within it is therefore only reused after checking
+that the items of its lists are the same objects, which is much faster than hashing
+again but proportional to the number of such models, so a hash after a small change
+still takes time linear in the size of the tree. Submodels without lists, e.g. names
+and split times, are reused without checks.
+"""
+
+import hashlib
+import operator
+import weakref
+from typing import Any, List, Optional, Set, Tuple
+
+import pydantic
+
+from .compiled import _encode
+from .payload import ImagePayload
+from .utils import gc_paused
+
+DIGEST_SIZE = 16
+
+# memoized state in the __pyiof_hash__ slot of a model: the hashes with and without
+# modify_time fields, and weak references to the models it was hashed within. A hash is
+# memoized as (digest, snapshot), see `_snapshot`.
+_PLAIN, _IGNORING, _PARENTS = range(3)
+
+_NONE, _MODEL, _LIST, _VALUE, _IMAGE = (bytes([i]) for i in range(5))
+
+
+def _state(model: pydantic.BaseModel) -> Optional[List[Any]]:
+    try:
+        # the slot descriptor, without the attribute lookup of pydantic
+        return type(model).__pyiof_hash__.__get__(model)  # type: ignore
+    except AttributeError:
+        return None
+
+
+def invalidate(model: pydantic.BaseModel) -> None:
+    """Discard the memoized hashes of a model and of the models it was hashed within."""
+    pending = [model]
+    while pending:
+        state = _state(pending.pop())
+        # the models a model was hashed within are invalid already if the model is
+        if state is None or (state[_PLAIN] is None and state[_IGNORING] is None):
+            continue
+        state[_PLAIN] = state[_IGNORING] = None
+        for ref in state[_PARENTS]:
+            parent = ref()
+            if parent is not None:
+                pending.append(parent)
+
+
+def _add_parent(parents: List[Any], parent: pydantic.BaseModel) -> None:
+    # references without callback to the same model are the same object
+    ref = weakref.ref(parent)
+    if not parents:
+        parents.append(ref)
+    elif not any(r is ref for r in parents):
+        # drop parents which have been freed
+        parents[:] = [r for r in parents if r() is not None]
+        parents.append(ref)
+
+
+def _encode_value(
+    value: Any,
+    parts: List[bytes],
+    parent: pydantic.BaseModel,
+    ignore_modify_time: bool,
+    checked: Set[int],
+    dynamic: List[pydantic.BaseModel],
+) -> None:
+    """Append the canonical encoding of a field value, and its submodels with lists."""
+    kind = type(value)
+    if kind is str:
+        data = value.encode()
+        parts.append(_VALUE + len(data).to_bytes(8, "little") + data)
+    elif value is None:
+        parts.append(_NONE)
+    elif isinstance(value, pydantic.BaseModel):
+        digest, snapshot = _digest(value, ignore_modify_time, parent, checked)
+        parts.append(_MODEL + digest)
+        if snapshot is not None:
+            dynamic.append(value)
+    elif kind is list:
+        parts.append(_LIST + len(value).to_bytes(8, "little"))
+        for item in value:
+            _encode_value(item, parts, parent, ignore_modify_time, checked, dynamic)
+    elif kind is ImagePayload:
+        parts.append(_IMAGE)
+        parts.extend(value.iter_base64())
+        parts.append(_NONE)
+    else:
+        data = _encode(value).encode()
+        parts.append(_VALUE + len(data).to_bytes(8, "little") + data)
+
+
+def _snapshot(model: pydantic.BaseModel) -> Tuple[Any, ...]:
+    """The lists and submodels of a model, and the items of the lists.
+
+    Lists can be changed in place. They are compared by the identity of their items,
+    which are kept alive by the snapshot, so their ids can't be reused.
+    """
+    values: List[Any] = []
+    for value in model.__dict__.values():
+        if type(value) is list:
+            values.append(value)
+            values.extend(value)
+        elif isinstance(value, pydantic.BaseModel):
+            values.append(value)
+    return tuple(values)
+
+
+def _unchanged(model: pydantic.BaseModel, index: int, checked: Set[int]) -> bool:
+    """Whether the memoized hash of a model is up to date.
+
+    Models without lists within them are up to date while they are memoized, as
+    assigning a field discards the memoized hashes. The lists of other models are
+    compared with their snapshot, and their submodels with lists are checked as well.
+    """
+    state = _state(model)
+    memo = None if state is None else state[index]
+    if memo is None:
+        return False
+    if memo[1] is None or id(model) in checked:
+        return True
+    values, dynamic = memo[1]
+    current = _snapshot(model)
+    if len(current) != len(values) or not all(map(operator.is_, current, values)):
+        return False
+    if not all(_unchanged(child, index, checked) for child in dynamic):
+        return False
+    checked.add(id(model))
+    return True
+
+
+def _digest(
+    model: pydantic.BaseModel,
+    ignore_modify_time: bool,
+    parent: Optional[pydantic.BaseModel],
+    checked: Set[int],
+) -> Tuple[bytes, Any]:
+    """The memoized hash of a model, and the snapshot to check it is up to date.
+
+    The snapshot is None for models without lists within them, `checked` are the models
+    which are known to be up to date while hashing a model tree.
+    """
+    state = _state(model)
+    if state is None:
+        state = [None, None, []]
+        type(model).__pyiof_hash__.__set__(model, state)  # type: ignore
+    if parent is not None:
+        _add_parent(state[_PARENTS], parent)
+    index = _IGNORING if ignore_modify_time else _PLAIN
+    if _unchanged(model, index, checked):
+        return state[index]
+
+    # the fields of a class are in a fixed order, so their names aren't needed
+    parts = [type(model).__name__.encode()]
+    dynamic: List[pydantic.BaseModel] = []
+    has_lists = False
+    for name, value in model.__dict__.items():
+        if ignore_modify_time and name == "modify_time":
+            continue
+        has_lists |= type(value) is list
+        _encode_value(value, parts, model, ignore_modify_time, checked, dynamic)
+    digest = hashlib.blake2b(b"".join(parts), digest_size=DIGEST_SIZE).digest()
+    snapshot = (_snapshot(model), tuple(dynamic)) if has_lists or dynamic else None
+    memo = state[index] = (digest, snapshot)
+    checked.add(id(model))
+    return memo
+
+
+def content_digest(model: pydantic.BaseModel, ignore_modify_time: bool = False) -> bytes:
+    """The content hash of a model as bytes, see `content_hash`."""
+    with gc_paused():
+        return _digest(model, ignore_modify_time, None, set())[0]
+
+
+def content_hash(model: pydantic.BaseModel, ignore_modify_time: bool = False) -> str:
+    """A stable hash of the content of a model and its submodels, as hex string.
+
+    Hashing again after a change rehashes only the models on the path to the change, but
+    checking the lists for in-place changes is O(size): it visits every model with lists
+    within it, e.g. each `PersonResult` of a `ResultList`, even if nothing changed.
+
+    Args:
+        model: the model
+        ignore_modify_time: leave out the `modify_time` fields of the model and its
+            submodels
+    """
+    return content_digest(model, ignore_modify_time).hex()
@@ -0,0 +1,422 @@
+"""Random access to classes and entries of large message files.
+
+`MessageIndex.open` scans a result list, start list or entry list once and records the
+byte ranges of its classes and entries, keyed by class and by entry and person id. The
+index is stored in a sidecar file next to the message and reused as long as the
+message file is unchanged, so reading a single class or runner only parses its element:
+
+    index = MessageIndex.open("archive/resultlist.xml")
+    class_result = index.read_class("H21")
+    [person_result] = index.read_entries(("person", "12345"))
+
+Keys:
+    classes: ("id", class id) and ("name", class name), as `pyiof.watch.class_key`
+    entries: ("entry", entry id) and ("person", person id) of all persons of the entry,
+        and the class keys of the classes of an `EntryList` entry
+
+The scan uses `pyiof.scanner` and a tokenizer which only descends into the elements
+holding keys, e.g. not into the split times, so it doesn't build an XML tree.
+"""
+
+import dataclasses
+import functools
+import html
+import json
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import pydantic_xml
+from lxml import etree
+from pydantic_xml.typedefs import EntityLocation
+
+from .competitor import PersonEntry, TeamEntry
+from .compiled import Backend, _layout
+from .message_elements import EntryList, ResultList, StartList
+from .result import ClassResult, PersonResult, TeamResult
+from .scanner import _MARKUP, find_root
+from .start import ClassStart, PersonStart, TeamStart
+from .utils import atomic_write
+
+VERSION = 1
+
+SUFFIX = ".pyiof-index"
+
+Key = Tuple[str, ...]
+
+_Path = Tuple[bytes, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Layout:
+    """The indexed elements of a message.
+
+    Attributes:
+        classes: the element of the classes, None if the entries are root children
+        entries: the paths of the entry and person ids within each entry element
+    """
+
+    classes: Optional[Tuple[str, Any]]
+    entries: Dict[str, Tuple[Any, Sequence[_Path], Sequence[_Path]]]
+
+
+_CLASS_ID, _CLASS_NAME = (b"Class", b"Id"), (b"Class", b"Name")
+
+_LAYOUTS: Dict[str, _Layout] = {
+    "ResultList": _Layout(
+        ("ClassResult", ClassResult),
+        {
+            "PersonResult": (PersonResult, [(b"EntryId",)], [(b"Person", b"Id")]),
+            "TeamResult": (
+                TeamResult,
+                [(b"EntryId",), (b"TeamMemberResult", b"EntryId")],
+                [(b"TeamMemberResult", b"Person", b"Id")],
+            ),
+        },
+    ),
+    "StartList": _Layout(
+        ("ClassStart", ClassStart),
+        {
+            "PersonStart": (PersonStart, [(b"EntryId",)], [(b"Person", b"Id")]),
+            "TeamStart": (
+                TeamStart,
+                [(b"EntryId",), (b"TeamMemberStart", b"EntryId")],
+                [(b"TeamMemberStart", b"Person", b"Id")],
+            ),
+        },
+    ),
+    "EntryList": _Layout(
+        None,
+        {
+            "PersonEntry": (PersonEntry, [(b"Id",)], [(b"Person", b"Id")]),
+            "TeamEntry": (TeamEntry, [(b"Id",)], [(b"TeamEntryPerson", b"Person", b"Id")]),
+        },
+    ),
+}
+
+_MESSAGES = {"ResultList": ResultList, "StartList": StartList, "EntryList": EntryList}
+
+_ENCODING = re.compile(rb"""^\s*<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+
+
+@functools.cache
+def _later_elements(model: Any, names: Set[bytes]) -> FrozenSet[bytes]:
+    """The child elements of a model after all of the named ones, in schema order."""
+    children = [
+        f.xml_name.rpartition("}")[2].encode()
+        for f in _layout(model) or ()
+        if f.location is EntityLocation.ELEMENT
+    ]
+    last = max((i for i, name in enumerate(children) if name in names), default=len(children))
+    return frozenset(children[last + 1 :])
+
+
+def _texts(
+    data: Union[bytes, mmap.mmap], start: int, end: int, paths: Set[_Path], stop: FrozenSet[bytes]
+) -> Dict[_Path, List[bytes]]:
+    """The texts of the elements at paths within an element, relative to the element.
+
+    Elements which aren't on a path are skipped by searching for their end tag, as the
+    scanner they must not contain elements with the same name. The scan ends at the first
+    child in `stop`.
+    """
+    prefixes = {path[:i] for path in paths for i in range(1, len(path))}
+    texts: Dict[_Path, List[bytes]] = {}
+    stack: List[bytes] = []
+    # after the start tag of the element
+    position = _MARKUP.search(data, start, end).end()  # type: ignore
+    while match := _MARKUP.search(data, position, end):
+        position = match.end()
+        name = match.group("name")
+        if name is None or match.group("empty"):
+            continue
+        if match.group("end"):
+            if not stack:
+                break
+            stack.pop()
+            continue
+        path = (*stack, name.rpartition(b":")[2])
+        if not stack and path[0] in stop:
+            break
+        if path in prefixes:
+            stack.append(path[-1])
+            continue
+        if path in paths:
+            texts.setdefault(path, []).append(data[position : data.find(b"<", position, end)])
+        position = _skip(data, name, position, end)
+    return texts
+
+
+def _children(
+    data: Union[bytes, mmap.mmap], start: int, end: int, names: Set[bytes], stop: FrozenSet[bytes]
+) -> List[Tuple[bytes, int, int]]:
+    """The local names and byte ranges of the named child elements of an element."""
+    ranges: List[Tuple[bytes, int, int]] = []
+    position = _MARKUP.search(data, start, end).end()  # type: ignore
+    while match := _MARKUP.search(data, position, end):
+        position = match.end()
+        name = match.group("name")
+        if name is None:
+            continue
+        local_name = name.rpartition(b":")[2]
+        if match.group("end") or local_name in stop:
+            break
+        if not match.group("empty"):
+            position = _skip(data, name, position, end)
+        if local_name in names:
+            ranges.append((local_name, match.start(), position))
+    return ranges
+
+
+def _skip(data: Union[bytes, mmap.mmap], name: bytes, position: int, end: int) -> int:
+    """The offset after the end tag of an element, e.g. not of a longer name."""
+    tag = b"</" + name
+    while True:
+        close = data.find(tag, position, end)
+        if close < 0:
+            return end
+        position = close + len(tag)
+        if data[position : position + 1] in (b">", b" ", b"\t", b"\r", b"\n"):
+            return data.find(b">", position, end) + 1
+
+
+class Location(NamedTuple):
+    """The location of an element in a message file.
+
+    Attributes:
+        element (str): The local name of the element, e.g. "PersonResult".
+        start (int): The byte offset of the start tag.
+        end (int): The byte offset after the end tag.
+        class_index (int, optional): The index of the class containing the entry.
+    """
+
+    element: str
+    start: int
+    end: int
+    class_index: Optional[int] = None
+
+
+class MessageIndex:
+    """Byte ranges of the classes and entries of a message file.
+
+    Attributes:
+        path (Path): The message file.
+        message (str): The root element name, e.g. "ResultList".
+        classes (List[Location]): The class elements in document order, empty for an
+            entry list.
+        class_keys (Dict[Key, List[int]]): The indices into `classes` by class key.
+        entries (List[Location]): The entry elements in document order.
+        entry_keys (Dict[Key, List[int]]): The indices into `entries` by entry key.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        self.message = ""
+        self.classes: List[Location] = []
+        self.class_keys: Dict[Key, List[int]] = {}
+        self.entries: List[Location] = []
+        self.entry_keys: Dict[Key, List[int]] = {}
+        self._wrapper = (b"", b"")
+        self._encoding = "utf-8"
+        self._stat = (0, 0)
+
+    @staticmethod
+    def sidecar(path: Union[str, os.PathLike]) -> Path:
+        """The path of the index file of a message file."""
+        return Path(os.fspath(path) + SUFFIX)
+
+    @classmethod
+    def open(cls, path: Union[str, os.PathLike], save: bool = True) -> "MessageIndex":
+        """The index of a message file, from its sidecar file if up to date.
+
+        Args:
+            path: the message file
+            save: write the sidecar file if the index had to be built
+        """
+        index = cls.load(path)
+        if index is None:
+            index = cls.build(path)
+            if save:
+                index.save()
+        return index
+
+    @classmethod
+    def build(cls, path: Union[str, os.PathLike]) -> "MessageIndex":
+        """Scan a message file."""
+        index = cls(path)
+        with open(index.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            index._stat = (stat.st_size, stat.st_mtime_ns)
+            if stat.st_size == 0:
+                raise ValueError(f"MessageIndex: {index.path} is empty")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                index._scan(data)
+        return index
+
+    def _scan(self, data: mmap.mmap) -> None:
+        root = find_root(data)  # type: ignore
+        self.message = root.name.rpartition(b":")[2].decode()
+        layout = _LAYOUTS.get(self.message)
+        if layout is None:
+            raise ValueError(f"MessageIndex: can't index {self.message}")
+        encoding = _ENCODING.match(data, 0, root.start_tag[0])  # type: ignore
+        self._encoding = encoding.group(1).decode() if encoding else "utf-8"
+        # the prolog and root start tag declare the encoding and namespaces
+        self._wrapper = (data[: root.start_tag[1]], data[slice(*root.end_tag)])
+
+        message = _MESSAGES[self.message]
+        if layout.classes is None:
+            self._scan_entries(data, layout, message, root.start_tag[0], root.end_tag[1], None)
+            return
+        element, model = layout.classes
+        names = frozenset([element.encode()])
+        classes = _children(
+            data, root.start_tag[0], root.end_tag[1], names, _later_elements(message, names)
+        )
+        for _, start, end in classes:
+            self.classes.append(Location(element, start, end))
+            self._scan_entries(data, layout, model, start, end, len(self.classes) - 1)
+
+    def _scan_entries(
+        self,
+        data: mmap.mmap,
+        layout: _Layout,
+        parent: Any,
+        start: int,
+        end: int,
+        class_index: Optional[int],
+    ) -> None:
+        """Index the entries within a class, or within an entry list."""
+        names = frozenset(name.encode() for name in layout.entries)
+        entries = _children(data, start, end, names, _later_elements(parent, names))
+        if class_index is not None:
+            paths = {_CLASS_ID, _CLASS_NAME}
+            texts = _texts(data, start, end, paths, _later_elements(parent, frozenset([b"Class"])))
+            for key in self._class_keys(texts):
+                self.class_keys.setdefault(key, []).append(class_index)
+
+        for name, entry_start, entry_end in entries:
+            element = name.decode()
+            model, entry_paths, person_paths = layout.entries[element]
+            paths = {*entry_paths, *person_paths}
+            if class_index is None:
+                paths |= {_CLASS_ID, _CLASS_NAME}
+            tops = frozenset(path[0] for path in paths)
+            texts = _texts(data, entry_start, entry_end, paths, _later_elements(model, tops))
+            keys = [("entry", t) for p in entry_paths for t in self._decode(texts.get(p, ()))]
+            keys += [("person", t) for p in person_paths for t in self._decode(texts.get(p, ()))]
+            if class_index is None:
+                keys += self._class_keys(texts)
+            entry_index = len(self.entries)
+            self.entries.append(Location(element, entry_start, entry_end, class_index))
+            for key in dict.fromkeys(keys):
+                self.entry_keys.setdefault(key, []).append(entry_index)
+
+    def _decode(self, texts: Iterable[bytes]) -> List[str]:
+        decoded = (html.unescape(t.decode(self._encoding)).strip() for t in texts)
+        return [t for t in decoded if t]
+
+    def _class_keys(self, texts: Dict[_Path, List[bytes]]) -> List[Key]:
+        return [("id", t) for t in self._decode(texts.get(_CLASS_ID, ()))] + [
+            ("name", t) for t in self._decode(texts.get(_CLASS_NAME, ()))
+        ]
+
+    # sidecar file
+
+    def save(self) -> None:
+        """Write the sidecar file, atomically."""
+        state = {
+            "version": VERSION,
+            "stat": self._stat,
+            "message": self.message,
+            "encoding": self._encoding,
+            "wrapper": [w.decode("latin-1") for w in self._wrapper],
+            "classes": [list(location) for location in self.classes],
+            "class_keys": [[list(key), indices] for key, indices in self.class_keys.items()],
+            "entries": [list(location) for location in self.entries],
+            "entry_keys": [[list(key), indices] for key, indices in self.entry_keys.items()],
+        }
+        with atomic_write(self.sidecar(self.path)) as f:
+            f.write(json.dumps(state, separators=(",", ":")).encode())
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> Optional["MessageIndex"]:
+        """The index of a message file from its sidecar, None if missing or outdated."""
+        index = cls(path)
+        try:
+            stat = index.path.stat()
+            state = json.loads(cls.sidecar(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != VERSION or state["stat"] != [stat.st_size, stat.st_mtime_ns]:
+            return None
+        index._stat = (stat.st_size, stat.st_mtime_ns)
+        index.message = state["message"]
+        index._encoding = state["encoding"]
+        index._wrapper = tuple(w.encode("latin-1") for w in state["wrapper"])  # type: ignore
+        index.classes = [Location(*location) for location in state["classes"]]
+        index.class_keys = {tuple(key): indices for key, indices in state["class_keys"]}
+        index.entries = [Location(*location) for location in state["entries"]]
+        index.entry_keys = {tuple(key): indices for key, indices in state["entry_keys"]}
+        return index
+
+    # reading
+
+    def _class_key(self, key: Union[str, Key]) -> Key:
+        return ("name", key) if isinstance(key, str) else key
+
+    def find_classes(self, key: Union[str, Key]) -> List[Location]:
+        """The locations of the classes with a key, or with a name."""
+        return [self.classes[i] for i in self.class_keys.get(self._class_key(key), ())]
+
+    def find_entries(self, key: Key) -> List[Location]:
+        """The locations of the entries with a key, e.g. ("person", "12345")."""
+        return [self.entries[i] for i in self.entry_keys.get(key, ())]
+
+    def read(
+        self, locations: Sequence[Location], backend: Backend = "compiled"
+    ) -> List[pydantic_xml.BaseXmlModel]:
+        """Parse the elements at locations, reading only their bytes from the file."""
+        stat = self.path.stat()
+        if (stat.st_size, stat.st_mtime_ns) != self._stat:
+            raise ValueError(f"MessageIndex: {self.path} changed since it was indexed")
+        layout = _LAYOUTS[self.message]
+        models = []
+        with open(self.path, "rb") as f:
+            for location in locations:
+                if layout.classes is not None and location.element == layout.classes[0]:
+                    model = layout.classes[1]
+                else:
+                    model = layout.entries[location.element][0]
+                f.seek(location.start)
+                data = f.read(location.end - location.start)
+                root = etree.fromstring(self._wrapper[0] + data + self._wrapper[1])
+                models.append(model.from_xml_tree(root[0], backend=backend))
+        return models
+
+    def read_class(
+        self, key: Union[str, Key], backend: Backend = "compiled"
+    ) -> Optional[pydantic_xml.BaseXmlModel]:
+        """The first class with a key, or with a name, None if there is none."""
+        locations = self.find_classes(key)
+        return self.read(locations[:1], backend)[0] if locations else None
+
+    def read_entries(
+        self, key: Key, backend: Backend = "compiled"
+    ) -> List[pydantic_xml.BaseXmlModel]:
+        """The entries with a key, e.g. all results of a person."""
+        return self.read(self.find_entries(key), backend)
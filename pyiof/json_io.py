@@ -0,0 +1,214 @@
+"""JSON representation of IOF messages.
+
+Keys mirror the IOF XML tags in camelCase: elements use their tag with a lowercase first
+letter (`ClassResult` becomes `classResult`), attributes keep their name, and the text
+content of an element is stored as `value`. Repeated elements are JSON arrays, absent
+values and empty lists are omitted. Numbers and booleans are JSON values, dates, times
+and decimals strings.
+
+    {"iofVersion": "3.0", "status": "Complete", "event": {"name": "..."},
+     "classResult": [{"class": {"name": "H21"}, "personResult": [...]}]}
+
+`iter_json` writes large messages in chunks, one per class result or class start. Together
+with `pyiof.streaming.stream_message` a result list can be converted from XML to JSON with
+only one class in memory:
+
+    stream = stream_message("results.xml", pyiof.ResultList)
+    with open("results.json", "w") as f:
+        f.writelines(iter_json(stream))
+"""
+
+import json
+import os
+import re
+import typing
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, TypeVar, Union
+
+import pydantic_xml
+from pydantic_core import to_jsonable_python
+from pydantic_xml.typedefs import EntityLocation
+
+from .compiled import _Field, _layout
+from .payload import ImagePayload
+from .streaming import StreamedMessage, streamed_field
+from .utils import gc_paused
+
+M = TypeVar("M", bound=pydantic_xml.BaseXmlModel)
+
+_SEPARATORS = (",", ":")
+
+_LEADING_CAPITALS = re.compile(r"^[A-Z]+(?=[A-Z][a-z]|$)|^[A-Z]")
+
+
+def json_key(field: _Field) -> str:
+    """The JSON key of a field."""
+    if field.location is None:
+        return "value"
+    local_name = field.xml_name.rpartition("}")[2]
+    if field.location is EntityLocation.ATTRIBUTE:
+        return local_name
+    return _LEADING_CAPITALS.sub(lambda m: m.group(0).lower(), local_name)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, ImagePayload):
+        return value.to_base64()
+    return to_jsonable_python(value)
+
+
+class _JsonField(typing.NamedTuple):
+    name: str
+    key: str
+    is_list: bool
+    model: Optional[Type[pydantic_xml.BaseXmlModel]]
+
+
+_json_fields: Dict[type, List[_JsonField]] = {}
+
+
+def _fields(cls: Type[pydantic_xml.BaseXmlModel]) -> List[_JsonField]:
+    fields = _json_fields.get(cls)
+    if fields is None:
+        layout = _layout(cls)
+        if layout is None:
+            raise TypeError(f"{cls.__name__} has no JSON representation")
+        # attributes first, like in XML
+        layout = sorted(layout, key=lambda f: f.location is not EntityLocation.ATTRIBUTE)
+        fields = [_JsonField(f.name, json_key(f), f.is_list, f.model) for f in layout]
+        _json_fields[cls] = fields
+    return fields
+
+
+def to_dict(model: pydantic_xml.BaseXmlModel, exclude: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Convert a model to its JSON representation as dict.
+
+    Args:
+        model: the model to convert
+        exclude: names of fields to leave out
+    """
+    result: Dict[str, Any] = {}
+    for name, key, is_list, submodel in _fields(type(model)):
+        value = getattr(model, name)
+        if value is None or name in exclude:
+            continue
+        if is_list:
+            if not value:
+                continue
+            if submodel is not None:
+                result[key] = [to_dict(item) for item in value]
+            else:
+                result[key] = [_encode(item) for item in value]
+        elif submodel is not None:
+            result[key] = to_dict(value)
+        else:
+            result[key] = _encode(value)
+    return result
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=_SEPARATORS)
+
+
+def iter_json(message: Union[pydantic_xml.BaseXmlModel, StreamedMessage]) -> Iterator[str]:
+    """Serialize a message element to compact JSON in chunks.
+
+    Each class result or class start (or item of another streamed list, see
+    `pyiof.streaming.streamed_field`) is a separate chunk. The concatenated chunks are
+    identical to `to_json`.
+
+    Args:
+        message: a message element, or a message element read with
+            `pyiof.streaming.stream_message`
+    """
+    if isinstance(message, StreamedMessage):
+        header, field, items = message.header, message.field, message.items
+    else:
+        header = message
+        field = streamed_field(type(message)).name
+        items = iter(getattr(message, field))
+    key = next(f.key for f in _fields(type(header)) if f.name == field)
+
+    head = _dumps(to_dict(header, exclude=(field,)))
+    first = True
+    for item in items:
+        if first:
+            separator = "," if head != "{}" else ""
+            yield f"{head[:-1]}{separator}{_dumps(key)}:[{_dumps(to_dict(item))}"
+            first = False
+        else:
+            yield "," + _dumps(to_dict(item))
+    yield head if first else "]}"
+
+
+def to_json(model: pydantic_xml.BaseXmlModel) -> str:
+    """Serialize a model to compact JSON."""
+    return _dumps(to_dict(model))
+
+
+def write_json(message: Union[pydantic_xml.BaseXmlModel, StreamedMessage], path: str) -> None:
+    """Write a message element to a JSON file, one class at a time."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(iter_json(message))
+
+
+_key_maps: Dict[type, Dict[str, _JsonField]] = {}
+
+
+def _from_dict(cls: Type[pydantic_xml.BaseXmlModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map the keys of a JSON object to the field names of a model, recursively."""
+    key_map = _key_maps.get(cls)
+    if key_map is None:
+        key_map = _key_maps[cls] = {f.key: f for f in _fields(cls)}
+    result = {}
+    for key, value in data.items():
+        field = key_map.get(key)
+        if field is None:
+            # unknown keys are handled by the model validation
+            result[key] = value
+        elif field.model is None:
+            result[field.name] = value
+        elif field.is_list and isinstance(value, list):
+            result[field.name] = [
+                _from_dict(field.model, item) if isinstance(item, dict) else item for item in value
+            ]
+        elif isinstance(value, dict):
+            result[field.name] = _from_dict(field.model, value)
+        else:
+            result[field.name] = value
+    return result
+
+
+def from_dict(cls: Type[M], data: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> M:
+    """Create a model from its JSON representation as dict."""
+    with gc_paused():
+        return cls.model_validate(_from_dict(cls, data), context=context)
+
+
+def from_json(
+    cls: Type[M],
+    data: Union[str, bytes],
+    context: Optional[Dict[str, Any]] = None,
+    loads: Callable[[Union[str, bytes]], Any] = json.loads,
+) -> M:
+    """Create a model from JSON.
+
+    The keys are mapped to field names in a single pass, followed by a single validation
+    of the whole message.
+
+    Args:
+        cls: the model class
+        data: JSON document
+        context (dict, optional): pydantic validation context
+        loads: JSON decoder, e.g. `orjson.loads`
+    """
+    return from_dict(cls, loads(data), context=context)
+
+
+def read_json(
+    cls: Type[M], path: Union[str, os.PathLike], context: Optional[Dict[str, Any]] = None
+) -> M:
+    """Read a model from a JSON file."""
+    with open(path, "rb") as f:
+        return from_json(cls, f.read(), context=context)
@@ -0,0 +1,318 @@
+"""Fuzzy matching of persons against a competitor database.
+
+Entries without ids are matched by name, birth date, sex and organisation. Names are
+compared after normalization: accents are removed, letters without decomposition (e.g.
+"ß", "ø") and Cyrillic letters are transliterated, and the order of the names is ignored.
+Names with German umlauts are also compared in their spelling with "e", so "Müller"
+matches both "Muller" and "Mueller", while "Manuel" isn't folded to "Manul".
+
+To avoid comparing every entry with every competitor, competitors are indexed in blocks
+by birth year, sex and the first letters of each name. Only competitors in the blocks of
+an entry are scored, so a lookup takes constant time regardless of the database size.
+
+    index = PersonIndex(national_list.competitors)
+    for entry, match in zip(entries, index.match_entries(entries)):
+        if match is not None and match.score > 0.9:
+            ...
+"""
+
+import collections
+import dataclasses
+import difflib
+import functools
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .competitor import Competitor, PersonEntry
+from .contact import Organisation, Person
+from .merge import id_key, normalize_name
+
+# Latin letters without decomposition into base letter and accent
+_LATIN = {"ß": "ss", "æ": "ae", "ø": "o", "œ": "oe", "ł": "l", "đ": "d", "ð": "d", "þ": "th"}
+
+# transliteration of the Cyrillic letters U+0430 to U+044F, in alphabetical order
+_CYRILLIC = (
+    "a", "b", "v", "g", "d", "e", "zh", "z", "i", "i", "k", "l", "m", "n", "o", "p",
+    "r", "s", "t", "u", "f", "kh", "ts", "ch", "sh", "shch", "", "y", "", "e", "iu", "ia",
+)  # fmt: skip
+
+_TRANSLITERATION = str.maketrans(
+    {
+        **_LATIN,
+        "\u0131": "i",  # dotless i
+        **{chr(0x430 + i): latin for i, latin in enumerate(_CYRILLIC)},
+        "\u0451": "e",
+    }
+)
+
+# German umlauts spelled with "e", as a second spelling of names with umlauts
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue"})
+
+PREFIX_LENGTH = 3
+
+# score above which candidates sharing fewer name prefixes are not considered
+CERTAIN = 0.9
+
+# weights of the parts of the score, the name is always compared
+NAME_WEIGHT = 0.6
+BIRTH_DATE_WEIGHT = 0.25
+ORGANISATION_WEIGHT = 0.15
+
+
+@functools.lru_cache(maxsize=65536)
+def name_tokens(name: str) -> Tuple[str, ...]:
+    """The normalized tokens of a name, for comparison.
+
+    >>> name_tokens("Müller-Lüdenscheidt")
+    ('muller', 'ludenscheidt')
+    """
+    return tuple(normalize_name(name.casefold().translate(_TRANSLITERATION)).split())
+
+
+@functools.lru_cache(maxsize=65536)
+def name_spellings(name: str) -> Tuple[Tuple[str, ...], ...]:
+    """The tokens of a name, and of its spelling with German umlauts spelled with "e".
+
+    Only umlauts are spelled out, "ue" in a name without umlauts is kept.
+
+    >>> name_spellings("Müller")
+    (('muller',), ('mueller',))
+    >>> name_spellings("Manuel")
+    (('manuel',),)
+    """
+    tokens = name_tokens(name)
+    if name.isascii():
+        return (tokens,)
+    spelled = name_tokens(unicodedata.normalize("NFC", name.casefold()).translate(_UMLAUTS))
+    return (tokens,) if spelled == tokens else (tokens, spelled)
+
+
+def _spellings(person: Person) -> Tuple[Tuple[str, ...], ...]:
+    family = name_spellings(person.name.family_name)
+    given = name_spellings(person.name.given_name)
+    if len(family) == 1 and len(given) == 1:
+        return (family[0] + given[0],)
+    return tuple(f + g for f in family for g in given)
+
+
+@functools.lru_cache(maxsize=262144)
+def _token_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def name_similarity(a: Sequence[str], b: Sequence[str]) -> float:
+    """Similarity of two names given as tokens, between 0 and 1, independent of order.
+
+    Each token is paired with its most similar token of the other name, an initial
+    matches any token with the same first letter.
+    """
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+
+    def best(token: str) -> float:
+        if token in b:
+            return 1.0
+        if len(token) == 1:
+            return max(0.9 if other[0] == token else 0.0 for other in b)
+        return max(_token_similarity(token, other) for other in b)
+
+    # tokens of the longer name without counterpart (e.g. a second given name) count little
+    return sum(best(token) for token in a) / (len(a) + (len(b) - len(a)) / 4)
+
+
+def _spelling_similarity(a: Sequence[Tuple[str, ...]], b: Sequence[Tuple[str, ...]]) -> float:
+    """The similarity of the most similar spellings of two names."""
+    if len(a) == 1 and len(b) == 1:
+        return name_similarity(a[0], b[0])
+    return max(name_similarity(x, y) for x in a for y in b)
+
+
+@dataclasses.dataclass
+class Match:
+    """A candidate competitor for a person.
+
+    Attributes:
+        competitor (Competitor): The matched competitor.
+        score (float): Similarity between 0 and 1, 1 for a match by id.
+        name (float): Similarity of the names.
+        birth_date (float, optional): Similarity of the birth dates, None if unknown.
+        organisation (float, optional): Similarity of the organisations, None if unknown.
+    """
+
+    competitor: Competitor
+    score: float
+    name: float
+    birth_date: Optional[float] = None
+    organisation: Optional[float] = None
+
+
+class _Record:
+    __slots__ = ("competitor", "organisations", "spellings")
+
+    def __init__(self, competitor: Competitor):
+        self.competitor = competitor
+        self.spellings = _spellings(competitor.person)
+        self.organisations = competitor.organisation
+
+
+def _organisation_similarity(
+    organisation: Organisation, candidates: Sequence[Organisation]
+) -> Optional[float]:
+    best = None
+    for candidate in candidates:
+        if (
+            organisation.id is not None
+            and candidate.id is not None
+            and organisation.id.id
+            and id_key(organisation.id) == id_key(candidate.id)
+        ):
+            return 1.0
+        score = _spelling_similarity(
+            name_spellings(organisation.name), name_spellings(candidate.name)
+        )
+        best = score if best is None else max(best, score)
+    return best
+
+
+class PersonIndex:
+    """Index of competitors for fuzzy matching of persons.
+
+    Args:
+        competitors: the competitors to index, e.g. of a national `CompetitorList`
+        year_tolerance: maximal difference of birth years of a match, to allow for typos
+    """
+
+    def __init__(self, competitors: Iterable[Competitor] = (), year_tolerance: int = 0):
+        self.year_tolerance = year_tolerance
+        self._records: List[_Record] = []
+        self._ids: Dict[Tuple[str, str, str], int] = {}
+        # (birth year, sex, name prefix) -> records, year and sex None if unknown
+        self._blocks: Dict[Tuple[Optional[int], Optional[str], str], List[int]] = {}
+        # name prefix -> records, for persons without birth date
+        self._prefixes: Dict[str, List[int]] = {}
+        for competitor in competitors:
+            self.add(competitor)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, competitor: Competitor) -> None:
+        """Add a competitor to the index."""
+        number = len(self._records)
+        record = _Record(competitor)
+        self._records.append(record)
+        person = competitor.person
+        for identifier in person.ids:
+            if identifier.id:
+                self._ids.setdefault(id_key(identifier), number)
+        year = person.birth_date.year if person.birth_date is not None else None
+        prefixes = {token[:PREFIX_LENGTH] for tokens in record.spellings for token in tokens}
+        for prefix in prefixes:
+            self._blocks.setdefault((year, person.sex, prefix), []).append(number)
+            self._prefixes.setdefault(prefix, []).append(number)
+
+    def _candidates(
+        self, person: Person, spellings: Tuple[Tuple[str, ...], ...]
+    ) -> List[List[int]]:
+        """Candidates in the blocks of a person, grouped by descending number of blocks."""
+        prefixes = {
+            token[:PREFIX_LENGTH] for tokens in spellings for token in tokens if len(token) > 1
+        }
+        if person.birth_date is None:
+            blocks = [self._prefixes.get(prefix, ()) for prefix in prefixes]
+        else:
+            year = person.birth_date.year
+            years = [None, *range(year - self.year_tolerance, year + self.year_tolerance + 1)]
+            sexes = [None, person.sex] if person.sex is not None else [None, "M", "F"]
+            blocks = [
+                self._blocks.get((y, s, prefix), ())
+                for y in years
+                for s in sexes
+                for prefix in prefixes
+            ]
+        hits = collections.Counter(number for block in blocks for number in block)
+        groups: Dict[int, List[int]] = {}
+        for number, count in hits.items():
+            groups.setdefault(count, []).append(number)
+        return [sorted(groups[count]) for count in sorted(groups, reverse=True)]
+
+    def _score(
+        self,
+        person: Person,
+        spellings: Tuple[Tuple[str, ...], ...],
+        organisation: Optional[Organisation],
+        record: _Record,
+    ) -> Match:
+        candidate = record.competitor.person
+        name = _spelling_similarity(spellings, record.spellings)
+        match = Match(record.competitor, 0.0, name)
+        score, weight = NAME_WEIGHT * match.name, NAME_WEIGHT
+        if person.birth_date is not None and candidate.birth_date is not None:
+            if person.birth_date == candidate.birth_date:
+                match.birth_date = 1.0
+            elif person.birth_date.year == candidate.birth_date.year:
+                match.birth_date = 0.5
+            else:
+                # within the year tolerance of the index
+                match.birth_date = 0.25
+            score += BIRTH_DATE_WEIGHT * match.birth_date
+            weight += BIRTH_DATE_WEIGHT
+        if organisation is not None and record.organisations:
+            match.organisation = _organisation_similarity(organisation, record.organisations)
+            score += ORGANISATION_WEIGHT * (match.organisation or 0.0)
+            weight += ORGANISATION_WEIGHT
+        match.score = score / weight
+        return match
+
+    def match(
+        self,
+        person: Person,
+        organisation: Optional[Organisation] = None,
+        limit: int = 5,
+        threshold: float = 0.5,
+    ) -> List[Match]:
+        """Find the competitors most similar to a person.
+
+        A competitor with one of the ids of the person is returned as only match, with
+        score 1.
+
+        Args:
+            person: the person to match
+            organisation: the organisation of the person, e.g. of the entry
+            limit: maximal number of matches
+            threshold: minimal score of a match
+
+        Returns:
+            matches by descending score
+        """
+        for identifier in person.ids:
+            number = self._ids.get(id_key(identifier)) if identifier.id else None
+            if number is not None:
+                competitor = self._records[number].competitor
+                return [Match(competitor, 1.0, 1.0)]
+        spellings = _spellings(person)
+        matches: List[Match] = []
+        for group in self._candidates(person, spellings):
+            # candidates sharing fewer name prefixes are only scored if needed
+            if sum(m.score >= CERTAIN for m in matches) >= limit:
+                break
+            for number in group:
+                match = self._score(person, spellings, organisation, self._records[number])
+                if match.score >= threshold:
+                    matches.append(match)
+        matches.sort(key=lambda m: m.score, reverse=True)
+        return matches[:limit]
+
+    def match_entries(
+        self, entries: Iterable[PersonEntry], threshold: float = 0.5
+    ) -> List[Optional[Match]]:
+        """The best match of each entry, None for entries without match."""
+        results: List[Optional[Match]] = []
+        for entry in entries:
+            matches = self.match(entry.person, entry.organisation, 1, threshold)
+            results.append(matches[0] if matches else None)
+        return results
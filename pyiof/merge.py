@@ -0,0 +1,333 @@
+"""Merging of entry lists and competitor lists from many sources.
+
+Persons are identified by their ids (issuer type and id), falling back to their
+normalized name and birth date. Records of the same person are resolved by their
+modification time: the most recently modified record is kept, records without
+modification time count as oldest, and earlier sources win ties. Organisations are
+identified by their id and resolved in the same way, and references to them are replaced
+by the resolved organisation.
+
+All lookups are hash based, so merging takes linear time in the number of records.
+Every resolved duplicate is recorded in a `MergeReport`.
+
+    entries, report = merge_entry_lists(club_entry_lists, competitors=[national_list])
+    print(report.summary())
+"""
+
+import dataclasses
+import datetime
+import functools
+import re
+import unicodedata
+from typing import Any, Dict, Hashable, Iterable, List, Literal, Optional, Sequence, Tuple
+
+from .base import Id
+from .competitor import Competitor, PersonEntry, TeamEntry
+from .contact import Organisation, Person
+from .message_elements import CompetitorList, EntryList
+
+# whitespace, hyphens, dashes, apostrophes and punctuation
+_SEPARATORS = re.compile(r"[\s\-\u2010-\u2015'\u2019.,]+")
+
+_OLDEST = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+
+@functools.lru_cache(maxsize=65536)
+def normalize_name(name: str) -> str:
+    """Normalize a name for comparison: case, accents, whitespace and hyphens are ignored.
+
+    >>> normalize_name("  Müller-Lüdenscheidt ")
+    'muller ludenscheidt'
+    """
+    if not name.isascii():
+        decomposed = unicodedata.normalize("NFKD", name)
+        name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _SEPARATORS.sub(" ", name.casefold()).strip()
+
+
+def id_key(identifier: Id) -> Tuple[str, str, str]:
+    return ("id", identifier.type or "", identifier.id)
+
+
+def person_keys(person: Person) -> List[Hashable]:
+    """Lookup keys of a person, ordered by reliability: ids, then name and birth date."""
+    keys: List[Hashable] = [id_key(i) for i in person.ids if i.id]
+    if person.birth_date is not None:
+        name = person.name
+        keys.append(
+            (
+                "name",
+                normalize_name(name.family_name),
+                normalize_name(name.given_name),
+                person.birth_date,
+            )
+        )
+    return keys
+
+
+def _modified(*times: Optional[datetime.datetime]) -> datetime.datetime:
+    """The latest of several modification times, comparable across time zones."""
+    latest = _OLDEST
+    for time in times:
+        if time is not None:
+            aware = time if time.tzinfo is not None else time.replace(tzinfo=datetime.timezone.utc)
+            latest = max(latest, aware)
+    return latest
+
+
+@dataclasses.dataclass
+class MergeDecision:
+    """Resolution of duplicate records.
+
+    Attributes:
+        kind (str): The kind of record, "person", "organisation" or "team".
+        key (tuple): The key by which the duplicates were found.
+        kept (BaseXmlModel): The record kept in the merged list.
+        discarded (list): The duplicate records which were dropped.
+        conflict (bool): Whether any discarded record differs from the kept one.
+    """
+
+    kind: Literal["person", "organisation", "team"]
+    key: Hashable
+    kept: Any
+    discarded: List[Any]
+    conflict: bool
+
+
+@dataclasses.dataclass
+class MergeReport:
+    """Report of a merge.
+
+    Attributes:
+        sources (int): The number of merged lists.
+        records (int): The number of input records.
+        merged (int): The number of records in the merged list.
+        decisions (list[MergeDecision]): The resolved duplicates.
+        warnings (list[str]): Inconsistencies which were not resolved automatically,
+            e.g. records whose ids and names match different persons.
+    """
+
+    sources: int = 0
+    records: int = 0
+    merged: int = 0
+    decisions: List[MergeDecision] = dataclasses.field(default_factory=list)
+    warnings: List[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def conflicts(self) -> List[MergeDecision]:
+        """Decisions between records with different content."""
+        return [d for d in self.decisions if d.conflict]
+
+    def summary(self) -> str:
+        by_kind: Dict[str, int] = {}
+        for decision in self.decisions:
+            by_kind[decision.kind] = by_kind.get(decision.kind, 0) + len(decision.discarded)
+        duplicates = ", ".join(f"{n} {kind}" for kind, n in sorted(by_kind.items())) or "none"
+        return (
+            f"merged {self.records} records from {self.sources} sources into {self.merged}; "
+            f"duplicates removed: {duplicates}; conflicts: {len(self.conflicts)}; "
+            f"warnings: {len(self.warnings)}"
+        )
+
+
+class _Resolver:
+    """Groups records by key and keeps the most recently modified record per group."""
+
+    def __init__(self, kind: Literal["person", "organisation", "team"]):
+        self.kind = kind
+        self.slots: Dict[Hashable, int] = {}
+        self.groups: List[List[Tuple[datetime.datetime, Any]]] = []
+        self.group_keys: List[Hashable] = []
+
+    def find(self, keys: Sequence[Hashable], report: MergeReport) -> Optional[int]:
+        slot = None
+        for key in keys:
+            other = self.slots.get(key)
+            if other is None:
+                continue
+            if slot is None:
+                slot = other
+            elif other != slot:
+                report.warnings.append(
+                    f"{self.kind} {keys[0]} matches different records by {key}, kept apart"
+                )
+        return slot
+
+    def add(
+        self,
+        keys: Sequence[Hashable],
+        record: Any,
+        modified: datetime.datetime,
+        report: MergeReport,
+    ) -> int:
+        slot = self.find(keys, report) if keys else None
+        if slot is None:
+            slot = len(self.groups)
+            self.groups.append([])
+            self.group_keys.append(keys[0] if keys else None)
+        self.groups[slot].append((modified, record))
+        for key in keys:
+            self.slots.setdefault(key, slot)
+        return slot
+
+    def resolve(self, report: MergeReport) -> List[Any]:
+        """The kept record of each group, in order of first occurrence."""
+        kept = []
+        for key, group in zip(self.group_keys, self.groups, strict=True):
+            # max keeps the first of equally recent records
+            index = max(range(len(group)), key=lambda i: (group[i][0], -i))
+            record = group[index][1]
+            kept.append(record)
+            if len(group) > 1:
+                discarded = [r for i, (_, r) in enumerate(group) if i != index]
+                conflict = any(r is not record and r != record for r in discarded)
+                report.decisions.append(MergeDecision(self.kind, key, record, discarded, conflict))
+        return kept
+
+
+def _resolve_organisations(
+    organisations: Iterable[Optional[Organisation]], report: MergeReport
+) -> Dict[Hashable, Organisation]:
+    """The resolved organisation of each organisation id."""
+    resolver = _Resolver("organisation")
+    # organisations are usually shared by all entries of a source
+    unique = {id(org): org for org in organisations if org is not None}
+    for organisation in unique.values():
+        if organisation.id is not None and organisation.id.id:
+            resolver.add(
+                [id_key(organisation.id)], organisation, _modified(organisation.modify_time), report
+            )
+    return dict(zip(resolver.group_keys, resolver.resolve(report), strict=True))
+
+
+def _canonical(
+    organisation: Optional[Organisation], organisations: Dict[Hashable, Organisation]
+) -> Optional[Organisation]:
+    if organisation is None or organisation.id is None or not organisation.id.id:
+        return organisation
+    return organisations.get(id_key(organisation.id), organisation)
+
+
+def _merge_ids(person: Person, other: Person) -> Person:
+    """Add the ids of another record of the same person."""
+    known = {id_key(i) for i in person.ids}
+    missing = [i for i in other.ids if i.id and id_key(i) not in known]
+    updates: Dict[str, Any] = {}
+    if missing:
+        updates["ids"] = person.ids + missing
+    if person.birth_date is None and other.birth_date is not None:
+        updates["birth_date"] = other.birth_date
+    return person.model_copy(update=updates) if updates else person
+
+
+def _with_organisations(record: Any, field: str, organisations: Dict[Hashable, Organisation]):
+    """The record with its organisations in field replaced by the resolved ones."""
+    value = getattr(record, field)
+    if isinstance(value, list):
+        resolved: Any = [_canonical(org, organisations) for org in value]
+        changed = any(a is not b for a, b in zip(resolved, value, strict=True))
+    else:
+        resolved = _canonical(value, organisations)
+        changed = resolved is not value
+    return record.model_copy(update={field: resolved}) if changed else record
+
+
+def merge_competitor_lists(
+    competitor_lists: Iterable[CompetitorList],
+) -> Tuple[CompetitorList, MergeReport]:
+    """Merge competitor lists, removing duplicate competitors and organisations."""
+    report = MergeReport()
+    resolver = _Resolver("person")
+    competitors: List[Competitor] = []
+    for competitor_list in competitor_lists:
+        report.sources += 1
+        for competitor in competitor_list.competitors:
+            report.records += 1
+            competitors.append(competitor)
+            modified = _modified(competitor.modify_time, competitor.person.modify_time)
+            resolver.add(person_keys(competitor.person), competitor, modified, report)
+
+    organisations = _resolve_organisations(
+        (org for competitor in competitors for org in competitor.organisation), report
+    )
+    merged = [
+        _with_organisations(competitor, "organisation", organisations)
+        for competitor in resolver.resolve(report)
+    ]
+    report.merged = len(merged)
+    return CompetitorList(competitors=merged), report
+
+
+def _team_keys(team: TeamEntry) -> List[Hashable]:
+    keys: List[Hashable] = []
+    if team.id is not None and team.id.id:
+        keys.append(id_key(team.id))
+    classes = tuple(sorted(normalize_name(c.name) for c in team.class_))
+    keys.append(("team", normalize_name(team.name), classes))
+    return keys
+
+
+def _master_index(competitor_lists: Iterable[CompetitorList]) -> _Resolver:
+    master = _Resolver("person")
+    report = MergeReport()
+    for competitor_list in competitor_lists:
+        for competitor in competitor_list.competitors:
+            master.add(person_keys(competitor.person), competitor.person, _OLDEST, report)
+    return master
+
+
+def merge_entry_lists(
+    entry_lists: Iterable[EntryList], competitors: Iterable[CompetitorList] = ()
+) -> Tuple[EntryList, MergeReport]:
+    """Merge entry lists into one entry list of an event.
+
+    Args:
+        entry_lists: the entry lists to merge, e.g. one per club. The event is taken
+            from the first list.
+        competitors: competitor lists with master data of the persons, e.g. a national
+            competitor database. Entries of persons found in these lists get the ids and
+            birth date of the competitor, which helps matching entries from different
+            sources.
+
+    Returns:
+        the merged entry list and the merge report
+    """
+    report = MergeReport()
+    master = _master_index(competitors)
+    persons = _Resolver("person")
+    teams = _Resolver("team")
+    event = None
+    organisations: List[Optional[Organisation]] = []
+    for entry_list in entry_lists:
+        report.sources += 1
+        if event is None:
+            event = entry_list.event
+        elif entry_list.event != event:
+            report.warnings.append(f"different event in source {report.sources}, ignored")
+        for team in entry_list.team_entries:
+            report.records += 1
+            organisations.extend(team.organisations)
+            teams.add(_team_keys(team), team, _modified(team.modify_time), report)
+        for entry in entry_list.person_entries:
+            report.records += 1
+            organisations.append(entry.organisation)
+            record, keys = entry, person_keys(entry.person)
+            slot = master.find(keys, report) if master.groups else None
+            if slot is not None:
+                person = _merge_ids(entry.person, master.groups[slot][0][1])
+                record, keys = entry.model_copy(update={"person": person}), person_keys(person)
+            modified = _modified(entry.modify_time, entry.person.modify_time)
+            persons.add(keys, record, modified, report)
+    if event is None:
+        raise ValueError("merge_entry_lists: at least one entry list is required")
+
+    resolved = _resolve_organisations(organisations, report)
+    person_entries = [
+        _with_organisations(entry, "organisation", resolved) for entry in persons.resolve(report)
+    ]
+    team_entries = [
+        _with_organisations(team, "organisations", resolved) for team in teams.resolve(report)
+    ]
+    report.merged = len(person_entries) + len(team_entries)
+    merged = EntryList(event=event, person_entries=person_entries, team_entries=team_entries)
+    return merged, report
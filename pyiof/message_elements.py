@@ -1,8 +1,10 @@
 import datetime
-from typing import List, Literal, Optional
+import os
+from typing import Any, Dict, Iterator, List, Literal, Optional, Self
 
 from pydantic import conlist
 
+from . import json_io
 from .class_ import Class_
 from .competitor import Competitor, ControlCard, Organisation, PersonEntry, TeamEntry
 from .course import RaceCourseData
@@ -18,6 +20,28 @@ class BaseMessageElement(BaseXmlModel):
     create_time: Optional[datetime.datetime] = attr(name="createTime", default=None)
     creator: Optional[str] = attr(default=None)
 
+    def to_json(self) -> str:
+        """Serialize to compact JSON, see `pyiof.json_io` for the format."""
+        return json_io.to_json(self)
+
+    def iter_json(self) -> Iterator[str]:
+        """Serialize to compact JSON in chunks, one per class result or class start."""
+        return json_io.iter_json(self)
+
+    def write_json(self, path: str) -> None:
+        """Write to a JSON file without building the whole document in memory."""
+        json_io.write_json(self, path)
+
+    @classmethod
+    def from_json(cls, data: str | bytes, context: Optional[Dict[str, Any]] = None) -> Self:
+        """Deserialize from JSON, see `pyiof.json_io` for the format."""
+        return json_io.from_json(cls, data, context=context)
+
+    @classmethod
+    def read_json(cls, path: str | os.PathLike, context: Optional[Dict[str, Any]] = None) -> Self:
+        """Read a message from a JSON file."""
+        return json_io.read_json(cls, path, context=context)
+
 
 class CompetitorList(BaseMessageElement):
     """A list of competitors. This is used to exchange a "brutto" list of
@@ -79,6 +103,21 @@ class ResultList(BaseMessageElement):
     class_results: List[ClassResult] = element(tag="ClassResult", default_factory=list)
     status: Literal["Complete", "Delta", "Snapshot"] = attr(default="Complete")
 
+    def compute_overall(
+        self, rule: Optional[Any] = None, class_results: Optional[List[ClassResult]] = None
+    ) -> None:
+        """Compute the overall results of a multi-race event, see `pyiof.overall`.
+
+        Args:
+            rule: the rule for the overall time, e.g. `pyiof.overall.BestOf(3)`,
+                the sum of all race times by default
+            class_results: the classes to compute, e.g. after their results changed,
+                all classes by default
+        """
+        from .overall import compute_overall  # noqa: PLC0415 (optional numpy dependency)
+
+        compute_overall(self.class_results if class_results is None else class_results, rule)
+
 
 class ServiceRequestList(BaseMessageElement):
     """A list of service requests."""
@@ -0,0 +1,271 @@
+"""Overall results of multi-race events.
+
+The results of all persons of all classes are collected into (persons x races) arrays of
+times and statuses, and the overall time of each person is computed from them by a rule
+in vectorized form, followed by the positions and times behind within each class. The
+overall result after each race is stored as `OverallResult` of the person's result of
+that race, as defined by the IOF data standard.
+
+Rules:
+    SumOfTimes: the sum of the times of all races of the class
+    BestOf: the sum of the best times of a number of races
+    ChasingStart: the final race is a chasing start with a handicap from the previous
+        races, optionally limited
+
+When results of some classes change, only these classes need to be recomputed:
+
+    result_list.compute_overall(BestOf(3), class_results=[changed])
+
+Team results are not aggregated. Requires the ``numpy`` extra.
+"""
+
+import dataclasses
+import typing
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError("pyiof.overall requires numpy, install pyiof[numpy]") from e
+
+from .result import ClassResult, OverallResult, PersonRaceResult, ResultStatus
+from .ticks import MISSING, quantize, to_seconds, to_ticks
+from .utils import gc_paused
+
+STATUSES: Tuple[str, ...] = typing.get_args(ResultStatus)
+_OK = STATUSES.index("OK")
+_MISSING = STATUSES.index("DidNotEnter")
+
+
+@dataclasses.dataclass
+class RaceTable:
+    """The race results of the persons of several classes.
+
+    Attributes:
+        races (List[int]): The race numbers, in ascending order.
+        classes (np.ndarray): The class index of each person.
+        times (np.ndarray): The time of each person in each race, NaN if not OK. OK
+            results without time count as "Finished".
+        statuses (np.ndarray): The status of each person in each race, as index into
+            `STATUSES`.
+        present (np.ndarray): Whether each race is held in the class of each person.
+        results (List[List[Optional[PersonRaceResult]]]): The result of each person in
+            each race.
+        final (int, optional): The number of the last race of the event, also in the
+            tables of the first races.
+        resolutions (np.ndarray, optional): The time resolution of the class of each
+            person, 1 s by default.
+    """
+
+    races: List[int]
+    classes: np.ndarray
+    times: np.ndarray
+    statuses: np.ndarray
+    present: np.ndarray
+    results: List[List[Optional[PersonRaceResult]]]
+    final: Optional[int] = None
+    resolutions: Optional[np.ndarray] = None
+
+    @property
+    def ok(self) -> np.ndarray:
+        return self.statuses == _OK
+
+    def until(self, count: int) -> "RaceTable":
+        """The table of the first races."""
+        return RaceTable(
+            self.races[:count],
+            self.classes,
+            self.times[:, :count],
+            self.statuses[:, :count],
+            self.present[:, :count],
+            self.results,
+            self.final,
+            self.resolutions,
+        )
+
+
+def race_table(class_results: Iterable[ClassResult]) -> RaceTable:
+    """Collect the race results of classes, results without race number are race 1.
+
+    The times are rounded to the time resolution of their class.
+    """
+    rows: List[Dict[int, PersonRaceResult]] = []
+    classes: List[int] = []
+    resolutions: List[float] = []
+    for index, class_result in enumerate(class_results):
+        resolutions.append(class_result.time_resolution)
+        for person_result in class_result.person_results:
+            rows.append({r.race_number or 1: r for r in person_result.results})
+            classes.append(index)
+    races = sorted({race for row in rows for race in row})
+    results = [[row.get(race) for race in races] for row in rows]
+
+    times = np.full((len(rows), len(races)), np.nan)
+    statuses = np.full((len(rows), len(races)), _MISSING, dtype=np.int8)
+    for i, row in enumerate(results):
+        for j, result in enumerate(row):
+            if result is not None:
+                statuses[i, j] = STATUSES.index(result.status)
+                if result.time is not None:
+                    times[i, j] = result.time
+    class_indices = np.array(classes, dtype=np.intp)
+    person_resolutions = np.array(resolutions, dtype=float)[class_indices]
+    times = quantize(times, person_resolutions[:, None])
+    statuses[(statuses == _OK) & np.isnan(times)] = STATUSES.index("Finished")
+    times[statuses != _OK] = np.nan
+
+    # a race is held in a class if anybody of the class has a result for it
+    held = np.zeros((max(classes, default=-1) + 1, len(races)), dtype=bool)
+    has_result = np.array([[r is not None for r in row] for row in results], dtype=bool)
+    np.logical_or.at(held, class_indices, has_result.reshape(len(rows), len(races)))
+    final = races[-1] if races else None
+    present = held[class_indices]
+    return RaceTable(
+        races, class_indices, times, statuses, present, results, final, person_resolutions
+    )
+
+
+def _class_minimum(values: np.ndarray, classes: np.ndarray) -> np.ndarray:
+    """The minimum of the values of each person's class, ignoring NaN."""
+    minimum = np.full(classes.max() + 1 if len(classes) else 0, np.inf)
+    np.fmin.at(minimum, classes, values)
+    return minimum[classes]
+
+
+@dataclasses.dataclass
+class SumOfTimes:
+    """The overall time is the sum of the times of all races held in the class."""
+
+    def __call__(self, table: RaceTable) -> np.ndarray:
+        """The overall time of each person, NaN if there is none."""
+        complete = np.all(table.ok | ~table.present, axis=1)
+        totals = np.where(table.present, table.times, 0.0).sum(axis=1)
+        return np.where(complete, totals, np.nan)
+
+
+@dataclasses.dataclass
+class BestOf:
+    """The overall time is the sum of the best times of a number of races.
+
+    Before the number of races is held, the times of all races held so far count.
+
+    Attributes:
+        count (int): The number of counting races.
+    """
+
+    count: int
+
+    def __call__(self, table: RaceTable) -> np.ndarray:
+        times = np.where(table.ok & table.present, table.times, np.inf)
+        needed = np.minimum(self.count, table.present.sum(axis=1))
+        best = np.cumsum(np.sort(times, axis=1), axis=1)
+        if best.shape[1] == 0:
+            return np.full(len(times), np.nan)
+        totals = np.take_along_axis(best, np.maximum(needed - 1, 0)[:, None], axis=1)[:, 0]
+        return np.where(np.isfinite(totals) & (needed > 0), totals, np.nan)
+
+
+@dataclasses.dataclass
+class ChasingStart:
+    """The final race is a chasing start.
+
+    The final race is the last race of the event, or a given race. The handicap of a
+    runner in the final race is the time behind after the previous races, limited to
+    `max_handicap`. The overall time is the time of the leader after the previous races
+    plus the handicap and the time of the final race, so the finish order of the final
+    race is the overall order.
+
+    Attributes:
+        max_handicap (float, optional): The maximal handicap in seconds, e.g. for a mass
+            start of the runners far behind.
+        race (int, optional): The number of the final race, the last race by default.
+    """
+
+    max_handicap: Optional[float] = None
+    race: Optional[int] = None
+
+    def __call__(self, table: RaceTable) -> np.ndarray:
+        totals = SumOfTimes()(table)
+        final = self.race if self.race is not None else table.final
+        if len(table.races) < 2 or table.races[-1] != final:
+            return totals
+        previous = SumOfTimes()(table.until(len(table.races) - 1))
+        leader = _class_minimum(previous, table.classes)
+        handicap = previous - leader
+        if self.max_handicap is not None:
+            handicap = np.minimum(handicap, self.max_handicap)
+        chased = leader + handicap + table.times[:, -1]
+        return np.where(table.present[:, -1], chased, totals)
+
+
+Rule = typing.Callable[[RaceTable], np.ndarray]
+
+
+def _statuses(table: RaceTable, totals: np.ndarray) -> np.ndarray:
+    """The overall status: OK with an overall time, else the first status which isn't."""
+    relevant = np.where(table.present, table.statuses, _OK)
+    not_ok = relevant != _OK
+    first = np.argmax(not_ok, axis=1)
+    failed = np.where(not_ok.any(axis=1), relevant[np.arange(len(relevant)), first], _MISSING)
+    return np.where(np.isnan(totals), failed, _OK)
+
+
+def _positions(totals: np.ndarray, classes: np.ndarray) -> np.ndarray:
+    """The position of each person in their class by overall time, equal times share."""
+    positions = np.zeros(len(totals), dtype=np.int64)
+    ranked = np.flatnonzero(~np.isnan(totals))
+    if len(ranked) == 0:
+        return positions
+    order = ranked[np.lexsort((totals[ranked], classes[ranked]))]
+    sorted_classes, sorted_totals = classes[order], totals[order]
+    index = np.arange(len(order))
+    new_class = np.r_[True, sorted_classes[1:] != sorted_classes[:-1]]
+    new_time = new_class | np.r_[True, sorted_totals[1:] != sorted_totals[:-1]]
+    class_start = np.maximum.accumulate(np.where(new_class, index, 0))
+    tie_start = np.maximum.accumulate(np.where(new_time, index, 0))
+    positions[order] = tie_start - class_start[tie_start] + 1
+    return positions
+
+
+def _store(table: RaceTable, race: int, rule: Rule) -> None:
+    """Compute and store the overall results after a race."""
+    current = table.until(race + 1)
+    resolutions = table.resolutions if table.resolutions is not None else 1.0
+    # equal times in ticks are equal floats, and the times behind are exact
+    ticks = to_ticks(rule(current), resolutions)
+    totals = to_seconds(ticks, resolutions)
+    statuses = _statuses(current, totals)
+    positions = _positions(totals, table.classes)
+    leaders = to_ticks(_class_minimum(totals, table.classes), resolutions)
+    behind = to_seconds(np.where(ticks == MISSING, MISSING, ticks - leaders), resolutions)
+    columns = (totals.tolist(), behind.tolist(), positions.tolist(), statuses.tolist())
+    rows = zip(table.results, *columns, strict=True)
+    for row, time, time_behind, position, status in rows:
+        result = row[race]
+        if result is None:
+            continue
+        ok = status == _OK
+        scores = result.overall_result.scores if result.overall_result is not None else []
+        result.overall_result = OverallResult(
+            time=time if ok else None,
+            time_behind=time_behind if ok else None,
+            position=position if ok else None,
+            status=STATUSES[status],
+            scores=scores,
+        )
+
+
+def compute_overall(class_results: Iterable[ClassResult], rule: Optional[Rule] = None) -> None:
+    """Compute the overall results of classes after each race.
+
+    The `OverallResult` of every race result is replaced, keeping its scores.
+
+    Args:
+        class_results: the classes to compute
+        rule: the rule for the overall time, `SumOfTimes()` by default
+    """
+    rule = rule if rule is not None else SumOfTimes()
+    with gc_paused():
+        table = race_table(class_results)
+        for race in range(len(table.races)):
+            _store(table, race, rule)
@@ -0,0 +1,209 @@
+"""Out-of-band storage for large base64 payloads, e.g. embedded images.
+
+Large `Image.data` payloads can be kept as byte buffers or spilled to temporary files
+instead of Python strings. When writing a model with `write_xml`, the payloads are
+streamed to the file in base64 chunks, so peak memory does not scale with the size of
+embedded images.
+"""
+
+import base64
+import binascii
+import contextlib
+import contextvars
+import dataclasses
+import os
+import re
+import secrets
+import tempfile
+import weakref
+from typing import IO, Any, Dict, Iterator, Literal, Optional, Union
+
+from pydantic_core import core_schema
+
+# base64 decoding works on groups of 4 characters
+_CHUNK_SIZE = 4 * 16 * 1024
+
+_deferred: contextvars.ContextVar[Optional["DeferredPayloads"]] = contextvars.ContextVar(
+    "pyiof_deferred_payloads", default=None
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class ImageStorage:
+    """Storage mode for `Image.data` payloads when reading a message.
+
+    Attributes:
+        mode (str): "buffer" keeps the base64 data as bytes which are decoded on access,
+            "spill" decodes the data into temporary files.
+        threshold (int): Minimum payload size in base64 characters. Smaller payloads are
+            kept as strings.
+        directory (str, optional): Directory for temporary files, defaults to the system
+            temporary directory.
+    """
+
+    mode: Literal["buffer", "spill"] = "spill"
+    threshold: int = 64 * 1024
+    directory: Optional[str] = None
+
+
+class ImagePayload:
+    """Base64 payload stored as byte buffer or temporary file.
+
+    Use `ImagePayload.from_base64` to create a payload. Temporary files are removed
+    when the payload is garbage collected.
+    """
+
+    def __init__(self, buffer: Optional[bytes] = None, path: Optional[str] = None):
+        if (buffer is None) == (path is None):
+            raise ValueError("ImagePayload: exactly one of buffer or path must be given")
+        self._buffer = buffer
+        self.path = path
+        if path is not None:
+            weakref.finalize(self, _remove, path)
+
+    @classmethod
+    def from_base64(
+        cls,
+        data: Union[str, bytes],
+        mode: Literal["buffer", "spill"] = "spill",
+        directory: Optional[str] = None,
+    ) -> "ImagePayload":
+        """Store base64 encoded data as byte buffer or in a temporary file."""
+        if isinstance(data, str):
+            data = data.encode("ascii")
+        data = b"".join(data.split())
+        if mode == "buffer":
+            return cls(buffer=data)
+
+        fd, path = tempfile.mkstemp(prefix="pyiof-", suffix=".bin", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for start in range(0, len(data), _CHUNK_SIZE):
+                    f.write(binascii.a2b_base64(data[start : start + _CHUNK_SIZE]))
+        except BaseException:
+            _remove(path)
+            raise
+        return cls(path=path)
+
+    def read(self) -> bytes:
+        """The decoded binary data."""
+        if self._buffer is not None:
+            return binascii.a2b_base64(self._buffer)
+        assert self.path is not None
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def iter_base64(self, chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+        """Iterate over the base64 encoded data in chunks of about `chunk_size` bytes."""
+        if self._buffer is not None:
+            view = memoryview(self._buffer)
+            for start in range(0, len(view), chunk_size):
+                yield bytes(view[start : start + chunk_size])
+            return
+        assert self.path is not None
+        # 3 decoded bytes map to 4 base64 characters without padding
+        raw_chunk_size = max(3, chunk_size // 4 * 3)
+        with open(self.path, "rb") as f:
+            while chunk := f.read(raw_chunk_size):
+                yield base64.b64encode(chunk)
+
+    def to_base64(self) -> str:
+        """The full base64 encoded data as string."""
+        return b"".join(self.iter_base64()).decode("ascii")
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ImagePayload):
+            return self.read() == other.read()
+        if isinstance(other, str):
+            return self.to_base64() == "".join(other.split())
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __reduce__(self) -> Any:
+        # a temporary file belongs to a single payload, so pickles hold the data
+        if self.path is not None:
+            return (_spill, (self.read(), os.path.dirname(self.path)))
+        return (ImagePayload, (self._buffer,))
+
+    def __repr__(self) -> str:
+        if self.path is not None:
+            return f"ImagePayload(path={self.path!r})"
+        assert self._buffer is not None
+        return f"ImagePayload(<{len(self._buffer)} base64 bytes>)"
+
+    def serialize(self) -> str:
+        """Serialize for XML output, deferring the data when streaming to a file."""
+        deferred = _deferred.get()
+        if deferred is None:
+            return self.to_base64()
+        return deferred.add(self)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> core_schema.CoreSchema:
+        return core_schema.is_instance_schema(cls)
+
+
+def _spill(data: bytes, directory: Optional[str]) -> ImagePayload:
+    """Store binary data in a temporary file."""
+    fd, path = tempfile.mkstemp(prefix="pyiof-", suffix=".bin", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+    except BaseException:
+        _remove(path)
+        raise
+    return ImagePayload(path=path)
+
+
+def _remove(path: str) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class DeferredPayloads:
+    """Payloads replaced by placeholders in serialized XML.
+
+    The placeholders contain a random nonce, so they can't be confused with text of the
+    message, and ':' is not part of the base64 alphabet, so not with data either.
+    """
+
+    def __init__(self) -> None:
+        self.prefix = f"pyiof-payload-{secrets.token_hex(16)}:"
+        self.payloads: Dict[int, ImagePayload] = {}
+        self.pattern = re.compile(re.escape(self.prefix.encode("ascii")) + rb"(\d+)")
+
+    def add(self, payload: ImagePayload) -> str:
+        """Defer a payload, returns its placeholder."""
+        key = len(self.payloads)
+        self.payloads[key] = payload
+        return f"{self.prefix}{key}"
+
+
+@contextlib.contextmanager
+def deferred_payloads() -> Iterator[DeferredPayloads]:
+    """Replace payloads by placeholders while serializing within this context."""
+    deferred = DeferredPayloads()
+    token = _deferred.set(deferred)
+    try:
+        yield deferred
+    finally:
+        _deferred.reset(token)
+
+
+def write_with_payloads(f: IO[bytes], data: bytes, deferred: DeferredPayloads) -> None:
+    """Write serialized XML, streaming the payloads in place of their placeholders."""
+    if not deferred.payloads:
+        f.write(data)
+        return
+    view = memoryview(data)
+    pos = 0
+    for match in deferred.pattern.finditer(data):
+        payload = deferred.payloads.get(int(match.group(1)))
+        if payload is None:
+            continue
+        f.write(view[pos : match.start()])
+        for chunk in payload.iter_base64():
+            f.write(chunk)
+        pos = match.end()
+    f.write(view[pos:])
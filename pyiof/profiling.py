@@ -0,0 +1,255 @@
+"""Profiling hooks of reading and writing messages.
+
+Observers are called after each `from_xml`, `read_xml`, `to_xml` and `write_xml` of a
+message with a `Profile`: the time spent in each phase, the size of the XML document and
+optionally the number of elements by element name.
+
+Phases:
+    read: reading the file
+    cache: loading from and storing to the parse cache
+    parse: parsing the XML document into an lxml tree
+    validate: mapping the elements to models, including the pydantic validators
+    serialize: building the lxml tree from the models
+    encode: encoding the lxml tree to bytes
+    write: writing the file
+
+Nested calls, e.g. `from_xml` within `read_xml`, are reported as one profile of the
+outer call. Without observers the overhead is a check of an empty list. In production,
+observers can be called for a random sample of the calls only:
+
+    metrics = PrometheusMetrics()
+    profiling.add_observer(metrics, sample_rate=0.1)
+    ...
+    metrics.write("/var/lib/node_exporter/pyiof.prom")
+"""
+
+import collections
+import contextlib
+import contextvars
+import dataclasses
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lxml import etree
+
+from .utils import atomic_write
+
+
+@dataclasses.dataclass
+class Profile:
+    """Measurements of reading or writing a message.
+
+    Attributes:
+        operation (str): The profiled method, e.g. "read_xml".
+        model (str): The name of the message class.
+        backend (str): The parser or serializer backend.
+        path (str, optional): The path of the file read or written.
+        phases (Dict[str, float]): The time spent in each phase in seconds.
+        bytes (int): The size of the XML document.
+        elements (Dict[str, int]): The number of elements by element name, empty unless
+            requested by an observer.
+        total (float): The time of the whole operation in seconds.
+    """
+
+    operation: str
+    model: str
+    backend: str
+    path: Optional[str] = None
+    phases: Dict[str, float] = dataclasses.field(default_factory=dict)
+    bytes: int = 0
+    elements: Dict[str, int] = dataclasses.field(default_factory=dict)
+    total: float = 0.0
+    count_elements: bool = dataclasses.field(default=False, repr=False)
+
+
+Observer = Callable[[Profile], None]
+
+# observers with their sample rate and whether they need element counts
+_observers: List[Tuple[Observer, float, bool]] = []
+_current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar(
+    "pyiof_profile", default=None
+)
+
+
+def add_observer(
+    observer: Observer, sample_rate: float = 1.0, count_elements: bool = False
+) -> None:
+    """Call an observer with the profile of reading and writing messages.
+
+    Args:
+        observer: called with each `Profile`, in the thread of the operation
+        sample_rate: the fraction of the operations profiled for this observer
+        count_elements: count the elements by name, which takes about as long as
+            iterating over the lxml tree
+    """
+    if not 0 < sample_rate <= 1:
+        raise ValueError("add_observer: sample_rate must be in (0, 1]")
+    _observers.append((observer, sample_rate, count_elements))
+
+
+def remove_observer(observer: Observer) -> None:
+    """Stop calling an observer."""
+    _observers[:] = [entry for entry in _observers if entry[0] is not observer]
+
+
+@contextlib.contextmanager
+def observe(
+    observer: Observer, sample_rate: float = 1.0, count_elements: bool = False
+) -> Iterator[Observer]:
+    """Call an observer within a block, see `add_observer`."""
+    add_observer(observer, sample_rate, count_elements)
+    try:
+        yield observer
+    finally:
+        remove_observer(observer)
+
+
+@contextlib.contextmanager
+def profiled(
+    operation: str, model: str, backend: str, path: Optional[str] = None
+) -> Iterator[Optional[Profile]]:
+    """Profile an operation, yields None if it isn't profiled."""
+    if not _observers or _current.get() is not None:
+        yield _current.get()
+        return
+    selected = [entry for entry in _observers if random.random() < entry[1]]
+    if not selected:
+        yield None
+        return
+    count = any(count_elements for _, _, count_elements in selected)
+    profile = Profile(operation, model, backend, path, count_elements=count)
+    token = _current.set(profile)
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.total = time.perf_counter() - start
+        _current.reset(token)
+    for observer, _, _ in selected:
+        observer(profile)
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the time of a block to a phase of the current profile."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.phases[name] = profile.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_tree(root: etree._Element, size: Optional[int] = None) -> None:
+    """Record the size and the elements of a document in the current profile."""
+    profile = _current.get()
+    if profile is None:
+        return
+    if size is not None:
+        profile.bytes = size
+    if profile.count_elements:
+        counts = collections.Counter(
+            element.tag for element in root.iter() if isinstance(element.tag, str)
+        )
+        for tag, count in counts.items():
+            name = etree.QName(tag).localname
+            profile.elements[name] = profile.elements.get(name, 0) + count
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class PrometheusMetrics:
+    """Observer aggregating profiles as metrics in the Prometheus text format.
+
+    Metrics, labelled by operation and model:
+        pyiof_operation_seconds: histogram of the time of the operations
+        pyiof_phase_seconds_total: time spent in each phase, also labelled by phase
+        pyiof_bytes_total: size of the XML documents
+        pyiof_elements_total: number of elements, also labelled by element name
+
+    With sampling, the metrics cover the sampled operations only.
+
+    Args:
+        buckets: upper bounds of the histogram buckets in seconds
+    """
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], List[float]] = {}
+        self._phases: Dict[Tuple[str, str, str], float] = collections.defaultdict(float)
+        self._bytes: Dict[Tuple[str, str], int] = collections.defaultdict(int)
+        self._elements: Dict[Tuple[str, str, str], int] = collections.defaultdict(int)
+
+    def __call__(self, profile: Profile) -> None:
+        key = (profile.operation, profile.model)
+        with self._lock:
+            # bucket counts, then count and sum
+            histogram = self._histograms.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if profile.total <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += profile.total
+            for name, seconds in profile.phases.items():
+                self._phases[(*key, name)] += seconds
+            self._bytes[key] += profile.bytes
+            for name, count in profile.elements.items():
+                self._elements[(*key, name)] += count
+
+    def to_text(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP pyiof_operation_seconds Time of reading or writing a message.",
+            "# TYPE pyiof_operation_seconds histogram",
+        ]
+        with self._lock:
+            for (operation, model), histogram in sorted(self._histograms.items()):
+                for bound, count in zip(self.buckets, histogram, strict=False):
+                    labels = _labels(operation=operation, model=model, le=repr(bound))
+                    lines.append(f"pyiof_operation_seconds_bucket{labels} {count:.0f}")
+                labels = _labels(operation=operation, model=model, le="+Inf")
+                lines.append(f"pyiof_operation_seconds_bucket{labels} {histogram[-2]:.0f}")
+                labels = _labels(operation=operation, model=model)
+                lines.append(f"pyiof_operation_seconds_count{labels} {histogram[-2]:.0f}")
+                lines.append(f"pyiof_operation_seconds_sum{labels} {histogram[-1]!r}")
+            lines += [
+                "# HELP pyiof_phase_seconds_total Time spent in a phase of reading or writing.",
+                "# TYPE pyiof_phase_seconds_total counter",
+            ]
+            for (operation, model, name), seconds in sorted(self._phases.items()):
+                labels = _labels(operation=operation, model=model, phase=name)
+                lines.append(f"pyiof_phase_seconds_total{labels} {seconds!r}")
+            lines += [
+                "# HELP pyiof_bytes_total Size of the XML documents read or written.",
+                "# TYPE pyiof_bytes_total counter",
+            ]
+            for (operation, model), size in sorted(self._bytes.items()):
+                lines.append(f"pyiof_bytes_total{_labels(operation=operation, model=model)} {size}")
+            lines += [
+                "# HELP pyiof_elements_total Number of XML elements read or written.",
+                "# TYPE pyiof_elements_total counter",
+            ]
+            for (operation, model, name), count in sorted(self._elements.items()):
+                labels = _labels(operation=operation, model=model, element=name)
+                lines.append(f"pyiof_elements_total{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | os.PathLike) -> None:
+        """Write the metrics to a file, atomically, e.g. for the node exporter."""
+        with atomic_write(path) as f:
+            f.write(self.to_text().encode())
@@ -0,0 +1,279 @@
+"""Ranking list computation from a season of result lists.
+
+Each race of each class is scored by a formula, which computes the ranking points of the
+finishers from their times and the ranking scores they had before the race (the strength
+of the field). The ranking score of a person is the mean of their best race points.
+Races are processed in the order they are added, so the result lists of a season should
+be added chronologically.
+
+The state is kept in NumPy arrays indexed by person: the best race points of all persons
+are a single (persons x best_of) array, which is updated per race in vectorized form.
+Requires the ``numpy`` extra.
+
+    ranking = Ranking(WRSFormula(), best_of=5, score_type="WRS")
+    for result_list in season:
+        ranking.add_result_list(result_list)
+    competitor_list = ranking.to_competitor_list()
+"""
+
+import dataclasses
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError("pyiof.ranking requires numpy, install pyiof[numpy]") from e
+
+from .base import Score
+from .competitor import Competitor
+from .contact import Organisation, Person
+from .merge import id_key, normalize_name, person_keys
+from .message_elements import CompetitorList, ResultList
+from .result import ClassResult, PersonRaceResult
+from .ticks import quantize
+
+"""Signature of ranking formulas.
+
+Args:
+    times (np.ndarray): the times of the finishers of a race in seconds
+    ranking (np.ndarray): the ranking scores of the finishers before the race, NaN for
+        persons without ranking score
+
+Returns:
+    np.ndarray: the ranking points of the finishers
+"""
+Formula = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+@dataclasses.dataclass
+class WRSFormula:
+    """Ranking points relative to the strength of the field, as in the IOF World Ranking.
+
+    The points of a runner with time RT are MP + SP * (MT - RT) / ST, where MT and ST are
+    the mean and standard deviation of the times and MP and SP the mean and standard
+    deviation of the ranking scores of the ranked finishers.
+
+    Attributes:
+        min_ranked (int): Minimal number of ranked finishers to measure the field
+            strength. In smaller fields the times of all finishers and the default mean
+            and standard deviation are used.
+        default_mean (float): Mean points of a race without enough ranked finishers.
+        default_std (float): Standard deviation of the points of such a race.
+        minimum (float): Lower limit of the points.
+    """
+
+    min_ranked: int = 3
+    default_mean: float = 1000.0
+    default_std: float = 200.0
+    minimum: float = 0.0
+
+    def __call__(self, times: np.ndarray, ranking: np.ndarray) -> np.ndarray:
+        ranked = ~np.isnan(ranking)
+        if np.count_nonzero(ranked) >= self.min_ranked:
+            mean_points, std_points = ranking[ranked].mean(), ranking[ranked].std()
+            reference = times[ranked]
+        else:
+            mean_points, std_points = self.default_mean, self.default_std
+            reference = times
+        std_time = reference.std()
+        if std_time == 0:
+            return np.full(len(times), mean_points)
+        points = mean_points + std_points * (reference.mean() - times) / std_time
+        return np.maximum(points, self.minimum)
+
+
+@dataclasses.dataclass
+class WinnerTimeFormula:
+    """Ranking points relative to the time of the winner, independent of the field.
+
+    The winner gets `points`, a runner with twice the winning time none.
+
+    Attributes:
+        points (float): The points of the winner.
+    """
+
+    points: float = 100.0
+
+    def __call__(self, times: np.ndarray, ranking: np.ndarray) -> np.ndarray:
+        return np.maximum(self.points * (2 - times / times.min()), 0.0)
+
+
+@dataclasses.dataclass
+class RacePoints:
+    """The ranking points of a race of a class.
+
+    Attributes:
+        event (str): The name of the event.
+        class_name (str): The name of the class.
+        race_number (int, optional): The number of the race of a multi-race event.
+        persons (np.ndarray): The person indices of the finishers, see `Ranking.persons`.
+        points (np.ndarray): The ranking points of the finishers.
+        results (List[PersonRaceResult]): The results of the finishers.
+    """
+
+    event: str
+    class_name: str
+    race_number: Optional[int]
+    persons: np.ndarray
+    points: np.ndarray
+    results: List[PersonRaceResult]
+
+
+def _finishers(class_result: ClassResult) -> Dict[Optional[int], list]:
+    """The finishers of each race of a class, with their organisation and result."""
+    races: Dict[Optional[int], list] = {}
+    for person_result in class_result.person_results:
+        for result in person_result.results:
+            if result.status == "OK" and result.time is not None and result.time > 0:
+                races.setdefault(result.race_number, []).append(
+                    (person_result.person, person_result.organisation, result)
+                )
+    return races
+
+
+def person_key(person: Person) -> Hashable:
+    """The key of a person in a ranking: the first id, else name and birth date."""
+    if person.ids and person.ids[0].id:
+        return id_key(person.ids[0])
+    keys = person_keys(person)
+    if keys:
+        return keys[0]
+    return ("name", normalize_name(person.name.family_name), normalize_name(person.name.given_name))
+
+
+class Ranking:
+    """Ranking list computed from result lists.
+
+    Args:
+        formula: the formula for the points of a race, e.g. `WRSFormula()`
+        best_of: the number of best race points averaged to the ranking score
+        score_type: the type of the computed `Score` elements, e.g. "WRS"
+    """
+
+    def __init__(
+        self, formula: Optional[Formula] = None, best_of: int = 5, score_type: str = "Ranking"
+    ):
+        self.formula: Formula = formula if formula is not None else WRSFormula()
+        self.best_of = best_of
+        self.score_type = score_type
+        self.races: List[RacePoints] = []
+        self.persons: List[Person] = []
+        self.organisations: List[Optional[Organisation]] = []
+        self._index: Dict[Hashable, int] = {}
+        # best race points of each person in descending order, NaN if fewer races
+        self._best = np.full((0, best_of), np.nan)
+
+    def _person_indices(self, persons: List[Tuple[Person, Optional[Organisation]]]) -> np.ndarray:
+        indices = np.empty(len(persons), dtype=np.intp)
+        for i, (person, organisation) in enumerate(persons):
+            key = person_key(person)
+            index = self._index.get(key)
+            if index is None:
+                index = self._index[key] = len(self.persons)
+                self.persons.append(person)
+                self.organisations.append(organisation)
+            else:
+                # keep the latest data of the person
+                self.persons[index] = person
+                self.organisations[index] = organisation
+            indices[i] = index
+        if len(self.persons) > len(self._best):
+            grown = np.full((max(len(self.persons), 2 * len(self._best)), self.best_of), np.nan)
+            grown[: len(self._best)] = self._best
+            self._best = grown
+        return indices
+
+    def add_race(
+        self,
+        event: str,
+        class_name: str,
+        race_number: Optional[int],
+        finishers: List[Tuple[Person, Optional[Organisation], PersonRaceResult]],
+        resolution: Optional[float] = None,
+    ) -> Optional[RacePoints]:
+        """Score a race and update the ranking, None if nobody finished.
+
+        The times are rounded to the time resolution if given, so equal times get equal
+        points.
+        """
+        if not finishers:
+            return None
+        persons = self._person_indices([(p, o) for p, o, _ in finishers])
+        times = np.array([r.time for _, _, r in finishers], dtype=float)
+        if resolution is not None:
+            times = quantize(times, resolution)
+        points = np.asarray(self.formula(times, self.scores(persons)), dtype=float)
+
+        # merge the new points into the best points, a person may run a race only once
+        persons, first = np.unique(persons, return_index=True)
+        merged = np.concatenate([self._best[persons], points[first, None]], axis=1)
+        merged = -np.sort(-merged, axis=1)  # descending, NaN last
+        self._best[persons] = merged[:, : self.best_of]
+
+        race = RacePoints(
+            event, class_name, race_number, persons, points[first], [finishers[i][2] for i in first]
+        )
+        self.races.append(race)
+        return race
+
+    def add_result_list(self, result_list: ResultList) -> List[RacePoints]:
+        """Score all races of all classes of a result list."""
+        races = []
+        for class_result in result_list.class_results:
+            for race_number, finishers in _finishers(class_result).items():
+                race = self.add_race(
+                    result_list.event.name,
+                    class_result.class_.name,
+                    race_number,
+                    finishers,
+                    class_result.time_resolution,
+                )
+                if race is not None:
+                    races.append(race)
+        return races
+
+    def add_result_lists(self, result_lists: Iterable[ResultList]) -> None:
+        for result_list in result_lists:
+            self.add_result_list(result_list)
+
+    def scores(self, persons: Optional[np.ndarray] = None) -> np.ndarray:
+        """The ranking scores of persons, all persons by default, NaN if unranked."""
+        best = self._best[: len(self.persons)] if persons is None else self._best[persons]
+        counts = np.count_nonzero(~np.isnan(best), axis=1)
+        sums = np.nansum(best, axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def annotate_results(self) -> None:
+        """Set the race points as `Score` of the results of the added result lists.
+
+        A score of the results with the `score_type` is replaced, so the results can be
+        annotated again after more races were added.
+        """
+        for race in self.races:
+            for result, points in zip(race.results, race.points.tolist(), strict=True):
+                score = Score(score=points, type=self.score_type)
+                for i, existing in enumerate(result.scores):
+                    if existing.type == self.score_type:
+                        result.scores[i] = score
+                        break
+                else:
+                    result.scores.append(score)
+
+    def to_competitor_list(self) -> CompetitorList:
+        """The ranked persons with their ranking score, by descending score."""
+        scores = self.scores()
+        order = np.argsort(-scores, kind="stable")
+        competitors = []
+        for index, score in zip(order.tolist(), scores[order].tolist(), strict=True):
+            if np.isnan(score):
+                break
+            organisation = self.organisations[index]
+            competitors.append(
+                Competitor(
+                    person=self.persons[index],
+                    organisation=[organisation] if organisation is not None else [],
+                    score=[Score(score=score, type=self.score_type)],
+                )
+            )
+        return CompetitorList(competitors=competitors)
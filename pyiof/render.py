@@ -0,0 +1,517 @@
+"""Rendering of result lists and start lists as HTML or CSV.
+
+Messages are rendered class by class to an output stream. Together with
+`pyiof.streaming.stream_message` only a single class is in memory at a time:
+
+    with open("results.html", "w", encoding="utf-8") as out:
+        render_file("results.xml", pyiof.ResultList, out)
+
+The `resultlist_mode` of each class is honoured: "Default" classes are ordered by
+position, "Unordered" classes by name without positions, and "UnorderedNoTimes" classes
+show only whether a runner finished. Split times are rendered as separate tables per
+class and course (HTML) or as trailing columns (CSV).
+
+The HTML output is a self-contained document which paginates well when printed, its
+frame can be replaced with `HtmlTemplates`. Templates and row formats are compiled once
+and cached.
+"""
+
+import csv
+import dataclasses
+import functools
+import html
+import string
+from typing import IO, Dict, Iterator, List, Literal, Optional, Sequence, Tuple, Type, Union
+
+from .contact import Organisation, Person
+from .message_elements import ResultList, StartList
+from .result import ClassResult, PersonRaceResult, TeamResult
+from .start import ClassStart
+from .streaming import Source, StreamedMessage, stream_message
+
+Message = Union[ResultList, StartList, StreamedMessage]
+
+Format = Literal["html", "csv"]
+
+_STYLE = """\
+body { font-family: sans-serif; font-size: 10pt; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+th, td { padding: 0.1em 0.5em; text-align: left; }
+td.number { text-align: right; }
+thead { display: table-header-group; }
+tr { break-inside: avoid; }
+h2 { break-after: avoid; }
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class HtmlTemplates:
+    """The frame of rendered HTML documents, as `string.Template` strings.
+
+    Attributes:
+        document_start (str): Start of the document, with $title and $style.
+        class_start (str): Start of a class, with $id and $title.
+        class_end (str): End of a class.
+        document_end (str): End of the document.
+        style (str): CSS of the document.
+    """
+
+    document_start: str = (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>$title</title>\n'
+        "<style>\n$style</style>\n</head>\n<body>\n<h1>$title</h1>\n"
+    )
+    class_start: str = '<section id="$id">\n<h2>$title</h2>\n'
+    class_end: str = "</section>\n"
+    document_end: str = "</body>\n</html>\n"
+    style: str = _STYLE
+
+
+@functools.lru_cache(maxsize=64)
+def _template(text: str) -> string.Template:
+    return string.Template(text)
+
+
+@functools.lru_cache(maxsize=64)
+def _row_format(numeric: Tuple[bool, ...]) -> str:
+    """Format string of an HTML table row, numbers are aligned right."""
+    cells = "".join('<td class="number">{}</td>' if n else "<td>{}</td>" for n in numeric)
+    return f"<tr>{cells}</tr>\n"
+
+
+def format_time(seconds: Optional[float], resolution: float = 1) -> str:
+    """Format a time in seconds as H:MM:SS or M:SS, with decimals for finer resolutions.
+
+    >>> format_time(3725)
+    '1:02:05'
+    >>> format_time(65.3, resolution=0.1)
+    '1:05.3'
+    """
+    if seconds is None:
+        return ""
+    sign = "-" if seconds < 0 else ""
+    seconds = abs(seconds)
+    decimals = 0
+    while resolution < 1 and decimals < 3:
+        resolution *= 10
+        decimals += 1
+    scale = 10**decimals
+    units = round(seconds * scale)
+    whole, fraction = divmod(units, scale)
+    hours, rest = divmod(whole, 3600)
+    minutes, secs = divmod(rest, 60)
+    text = f"{hours}:{minutes:02}:{secs:02}" if hours else f"{minutes}:{secs:02}"
+    if decimals:
+        text += f".{fraction:0{decimals}}"
+    return sign + text
+
+
+def _name(person: Optional[Person]) -> str:
+    if person is None:
+        return ""
+    return f"{person.name.given_name} {person.name.family_name}".strip()
+
+
+def _organisation(organisation: Optional[Organisation]) -> str:
+    if organisation is None:
+        return ""
+    return organisation.short_name or organisation.name
+
+
+def _sort_name(person: Optional[Person]) -> Tuple[str, str]:
+    if person is None:
+        return ("", "")
+    return (person.name.family_name.casefold(), person.name.given_name.casefold())
+
+
+@dataclasses.dataclass
+class Table:
+    """A table of a class.
+
+    Attributes:
+        kind (str): "results", "splits" or "starts".
+        header (List[str]): The column titles.
+        numeric (Tuple[bool, ...]): Whether each column holds numbers or times.
+        rows (List[List[str]]): The formatted cells of the rows.
+        splits (List[List[str]]): The split times of each row, as pairs of control code
+            and cumulative time, for flat formats like CSV.
+    """
+
+    kind: str
+    header: List[str]
+    numeric: Tuple[bool, ...]
+    rows: List[List[str]]
+    splits: List[List[str]] = dataclasses.field(default_factory=list)
+
+
+def _race_result(results: Sequence, race_number: Optional[int]):
+    for result in results:
+        if race_number is None or result.race_number == race_number:
+            return result
+    return None
+
+
+def _result_order(mode: str, result: Optional[PersonRaceResult], person: Optional[Person]):
+    if mode != "Default":
+        return (0, 0, _sort_name(person))
+    if result is None:
+        return (3, 0, _sort_name(person))
+    if result.status == "OK" and result.position is not None:
+        return (0, result.position, _sort_name(person))
+    return (1 if result.status == "OK" else 2, 0, _sort_name(person))
+
+
+def _status_text(result: PersonRaceResult, mode: str) -> str:
+    if mode == "UnorderedNoTimes":
+        return "Finished" if result.status in ("OK", "Finished") else result.status
+    return "" if result.status == "OK" else result.status
+
+
+def _split_seconds(
+    results: List[PersonRaceResult], resolution: float
+) -> Tuple[List[List[Optional[float]]], List[List[Optional[float]]]]:
+    """The cumulative split times and leg times of results, None if missing.
+
+    The times are computed as integer ticks of the resolution (see `pyiof.ticks`), so
+    the leg times add up exactly to the split times. Legs next to a missing split are
+    missing.
+    """
+    try:
+        from .ticks import MISSING, leg_ticks, split_ticks, to_seconds  # noqa: PLC0415
+    except ImportError:  # pragma: no cover (optional numpy dependency)
+        return _split_seconds_python(results, resolution)
+    splits = split_ticks(results, resolution)
+    legs = leg_ticks(splits)
+
+    def seconds(ticks) -> List[List[Optional[float]]]:
+        values = to_seconds(ticks, resolution).tolist()
+        return [
+            [None if t == MISSING else v for t, v in zip(row, value_row, strict=True)]
+            for row, value_row in zip(ticks.tolist(), values, strict=True)
+        ]
+
+    return seconds(splits), seconds(legs)
+
+
+def _split_seconds_python(
+    results: List[PersonRaceResult], resolution: float
+) -> Tuple[List[List[Optional[float]]], List[List[Optional[float]]]]:
+    """`_split_seconds` without numpy."""
+    all_splits, all_legs = [], []
+    for result in results:
+        splits: List[Optional[float]] = []
+        legs: List[Optional[float]] = []
+        previous: Optional[int] = 0
+        for split in result.split_time:
+            if split.time is None or split.status == "Missing":
+                splits.append(None)
+                legs.append(None)
+                previous = None
+                continue
+            ticks = round(split.time / resolution)
+            splits.append(ticks * resolution)
+            legs.append(None if previous is None else (ticks - previous) * resolution)
+            previous = ticks
+        all_splits.append(splits)
+        all_legs.append(legs)
+    return all_splits, all_legs
+
+
+def _split_tables(
+    rows: List[Tuple[Optional[Person], PersonRaceResult]], resolution: float
+) -> List[Table]:
+    """Cumulative split times and leg times of the runners, by control.
+
+    Runners are grouped by the control codes of their split times, so runners on forked
+    courses get a table per course.
+    """
+    courses: Dict[Tuple[str, ...], List[Tuple[Optional[Person], PersonRaceResult]]] = {}
+    for person, result in rows:
+        controls = tuple(s.control_card for s in result.split_time)
+        if controls:
+            courses.setdefault(controls, []).append((person, result))
+    tables = []
+    for controls, course_rows in courses.items():
+        header = ["Name", *controls, "Finish"]
+        splits, legs = _split_seconds([result for _, result in course_rows], resolution)
+        table_rows = []
+        for (person, result), split_row, leg_row in zip(course_rows, splits, legs, strict=True):
+            cells = [_name(person)]
+            for time, leg in zip(split_row[: len(controls)], leg_row, strict=False):
+                if time is None:
+                    cells.append("-")
+                elif leg is None:
+                    cells.append(format_time(time, resolution))
+                else:
+                    cells.append(
+                        f"{format_time(time, resolution)} ({format_time(leg, resolution)})"
+                    )
+            cells.append(format_time(result.time, resolution))
+            table_rows.append(cells)
+        numeric = (False, *([True] * (len(controls) + 1)))
+        tables.append(Table("splits", header, numeric, table_rows))
+    return tables
+
+
+def result_tables(
+    class_result: ClassResult, splits: bool = True, race_number: Optional[int] = None
+) -> List[Table]:
+    """The result table of a class, and its split tables, one per course.
+
+    Args:
+        class_result: the class to render
+        splits: whether to include the split table
+        race_number: the race of a multi-race event, the first race by default
+    """
+    mode = class_result.class_.resultlist_mode
+    resolution = class_result.time_resolution
+    if class_result.team_results:
+        return [_team_table(class_result.team_results, mode, resolution, race_number)]
+
+    entries = []
+    for person_result in class_result.person_results:
+        result = _race_result(person_result.results, race_number)
+        entries.append((_result_order(mode, result, person_result.person), person_result, result))
+    entries.sort(key=lambda e: e[0])
+
+    rows = []
+    row_splits: List[List[str]] = []
+    finished: List[Tuple[Optional[Person], PersonRaceResult]] = []
+    for _, person_result, result in entries:
+        if result is None:
+            continue
+        name, club = _name(person_result.person), _organisation(person_result.organisation)
+        if mode == "UnorderedNoTimes":
+            rows.append([name, club, _status_text(result, mode)])
+            row_splits.append([])
+            continue
+        ok = result.status == "OK"
+        cells = [
+            str(result.position) if ok and result.position is not None and mode == "Default" else ""
+        ]
+        cells += [name, club, format_time(result.time, resolution) if ok else ""]
+        cells += [
+            f"+{format_time(result.time_behind, resolution)}"
+            if ok and result.time_behind is not None and mode == "Default"
+            else ""
+        ]
+        cells.append(_status_text(result, mode))
+        rows.append(cells)
+        row_splits.append(
+            [
+                value
+                for split in result.split_time
+                for value in (split.control_card, format_time(split.time, resolution))
+            ]
+            if splits
+            else []
+        )
+        if ok:
+            finished.append((person_result.person, result))
+
+    if mode == "UnorderedNoTimes":
+        tables = [Table("results", ["Name", "Club", "Status"], (False,) * 3, rows, row_splits)]
+    else:
+        header = ["Pos", "Name", "Club", "Time", "Behind", "Status"]
+        numeric = (True, False, False, True, True, False)
+        tables = [Table("results", header, numeric, rows, row_splits)]
+        if splits:
+            tables.extend(_split_tables(finished, resolution))
+    return tables
+
+
+def _team_table(
+    team_results: List[TeamResult], mode: str, resolution: float, race_number: Optional[int]
+) -> Table:
+    """Teams with the overall result after their last leg, and their members."""
+    entries = []
+    for team in team_results:
+        last = None
+        members = []
+        for member in team.team_member_results:
+            result = _race_result(member.results, race_number)
+            members.append(_name(member.person))
+            if result is not None and (last is None or (result.leg or 0) >= (last.leg or 0)):
+                last = result
+        overall = last.overall_result if last is not None else None
+        if mode != "Default" or overall is None:
+            order: Tuple = (1, 0, team.name.casefold())
+        else:
+            order = (0 if overall.position is not None else 1, overall.position or 0, "")
+        entries.append((order, team, overall, members))
+    entries.sort(key=lambda e: e[0])
+
+    rows = []
+    for _, team, overall, members in entries:
+        club = ", ".join(_organisation(o) for o in team.organisations)
+        ok = overall is not None and overall.status == "OK"
+        if mode == "UnorderedNoTimes":
+            status = "Finished" if ok else (overall.status if overall else "")
+            rows.append(["", team.name, club, ", ".join(members), "", "", status])
+            continue
+        rows.append(
+            [
+                str(overall.position) if ok and overall.position and mode == "Default" else "",
+                team.name,
+                club,
+                ", ".join(members),
+                format_time(overall.time, resolution) if ok else "",
+                f"+{format_time(overall.time_behind, resolution)}"
+                if ok and overall.time_behind is not None and mode == "Default"
+                else "",
+                "" if ok or overall is None else overall.status,
+            ]
+        )
+    header = ["Pos", "Team", "Club", "Members", "Time", "Behind", "Status"]
+    return Table("results", header, (True, False, False, False, True, True, False), rows)
+
+
+def start_tables(class_start: ClassStart, race_number: Optional[int] = None) -> List[Table]:
+    """The start table of a class, ordered by start time."""
+    entries = []
+    for person_start in class_start.person_starts:
+        start = _race_result(person_start.starts, race_number)
+        if start is None:
+            continue
+        time = start.start_time.strftime("%H:%M:%S") if start.start_time is not None else ""
+        card = start.control_card[0].id if start.control_card else ""
+        entries.append(
+            (
+                (time == "", time, _sort_name(person_start.person)),
+                [
+                    time,
+                    start.bib_number or "",
+                    _name(person_start.person),
+                    _organisation(person_start.organisation),
+                    card,
+                ],
+            )
+        )
+    entries.sort(key=lambda e: e[0])
+    header = ["Start", "Bib", "Name", "Club", "Card"]
+    return [Table("starts", header, (True, True, False, False, True), [r for _, r in entries])]
+
+
+def class_tables(
+    item: Union[ClassResult, ClassStart], splits: bool = True, race_number: Optional[int] = None
+) -> List[Table]:
+    if isinstance(item, ClassStart):
+        return start_tables(item, race_number)
+    return result_tables(item, splits, race_number)
+
+
+def _items(message: Message) -> Tuple[object, Iterator[Union[ClassResult, ClassStart]]]:
+    if isinstance(message, StreamedMessage):
+        return message.header, message.items
+    if isinstance(message, ResultList):
+        return message, iter(message.class_results)
+    return message, iter(message.class_starts)
+
+
+def render_html(
+    message: Message,
+    out: IO[str],
+    splits: bool = True,
+    race_number: Optional[int] = None,
+    templates: Optional[HtmlTemplates] = None,
+) -> None:
+    """Write a result list or start list as HTML document, class by class.
+
+    Args:
+        message: the message, or a message read with `pyiof.streaming.stream_message`
+        out: the text stream to write to
+        splits: whether to include split tables
+        race_number: the race of a multi-race event, the first race by default
+        templates: the frame of the document, `HtmlTemplates()` by default
+    """
+    templates = templates if templates is not None else HtmlTemplates()
+    header, items = _items(message)
+    title = header.event.name  # type: ignore[attr-defined]
+    out.write(
+        _template(templates.document_start).substitute(
+            title=html.escape(title), style=templates.style
+        )
+    )
+    class_start = _template(templates.class_start)
+    for number, item in enumerate(items):
+        out.write(class_start.substitute(id=f"class-{number}", title=html.escape(item.class_.name)))
+        for table in class_tables(item, splits, race_number):
+            out.write(f'<table class="{table.kind}">\n<thead><tr>')
+            out.write("".join(f"<th>{html.escape(title)}</th>" for title in table.header))
+            out.write("</tr></thead>\n<tbody>\n")
+            row_format = _row_format(table.numeric)
+            out.writelines(
+                row_format.format(*(html.escape(cell) for cell in row)) for row in table.rows
+            )
+            out.write("</tbody>\n</table>\n")
+        out.write(templates.class_end)
+    out.write(templates.document_end)
+
+
+# the columns of all result and start tables in CSV, see `render_csv`
+_CSV_RESULT_COLUMNS = ("Pos", "Name", "Club", "Members", "Time", "Behind", "Status")
+_CSV_START_COLUMNS = ("Start", "Bib", "Name", "Club", "Card")
+_CSV_ALIASES = {"Team": "Name"}
+
+
+def render_csv(
+    message: Message,
+    out: IO[str],
+    splits: bool = False,
+    race_number: Optional[int] = None,
+    dialect: Union[str, Type[csv.Dialect]] = "excel",
+) -> None:
+    """Write a result list or start list as CSV, class by class.
+
+    Each row starts with the class name and the columns of the result or start table.
+    The columns are the same for all classes, e.g. "Members" is empty for individual
+    classes, and the name of a team is in the "Name" column. With `splits`, the split
+    times of the runner follow as pairs of control code and cumulative time.
+
+    Args:
+        message: the message, or a message read with `pyiof.streaming.stream_message`
+        out: the text stream to write to, opened with ``newline=""``
+        splits: whether to append split times
+        race_number: the race of a multi-race event, the first race by default
+        dialect: the CSV dialect
+    """
+    header, items = _items(message)
+    columns = _CSV_START_COLUMNS if isinstance(header, StartList) else _CSV_RESULT_COLUMNS
+    writer = csv.writer(out, dialect=dialect)
+    writer.writerow(["Class", *columns])
+    for item in items:
+        table = class_tables(item, splits, race_number)[0]
+        positions = [columns.index(_CSV_ALIASES.get(title, title)) for title in table.header]
+        splits_of_rows = table.splits or [[]] * len(table.rows)
+        for row, row_splits in zip(table.rows, splits_of_rows, strict=True):
+            cells = [""] * len(columns)
+            for position, cell in zip(positions, row, strict=True):
+                cells[position] = cell
+            writer.writerow([item.class_.name, *cells, *row_splits])
+
+
+def render(
+    message: Message,
+    out: IO[str],
+    output_format: Format = "html",
+    splits: Optional[bool] = None,
+    race_number: Optional[int] = None,
+) -> None:
+    """Write a result list or start list as HTML or CSV, see `render_html` and `render_csv`."""
+    if output_format == "html":
+        render_html(message, out, True if splits is None else splits, race_number)
+    elif output_format == "csv":
+        render_csv(message, out, False if splits is None else splits, race_number)
+    else:
+        raise ValueError(f"unknown format {output_format!r}")
+
+
+def render_file(
+    source: Source,
+    cls: Type[Union[ResultList, StartList]],
+    out: IO[str],
+    output_format: Format = "html",
+    splits: Optional[bool] = None,
+    race_number: Optional[int] = None,
+) -> None:
+    """Render an XML file class by class, without reading the whole message."""
+    render(stream_message(source, cls), out, output_format, splits, race_number)
@@ -0,0 +1,265 @@
+"""Codec for the IOF binary route format.
+
+A route is stored as a base64 encoded sequence of waypoints, each consisting of a header
+byte, a time byte sequence and a position byte sequence. The format is described in the
+documentation of the ``Route`` type in IOF.xsd.
+
+Routes are decoded into structured NumPy arrays with the dtype :data:`WAYPOINT_DTYPE`,
+so speeds and distances can be computed in vectorized form. Requires the ``numpy`` extra.
+"""
+
+import base64
+import binascii
+from typing import Union
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError("pyiof.route requires numpy, install pyiof[numpy]") from e
+
+"""dtype of decoded waypoint arrays.
+
+Fields:
+    time (datetime64[ms]): The time of the waypoint (UTC).
+    lat (float64): The latitude in degrees.
+    lng (float64): The longitude in degrees.
+    alt (float64): The altitude in meters, NaN if not present.
+    interruption (bool): Whether the waypoint is the last one before an interruption
+        of the route, e.g. due to a satellite signal receiving failure.
+"""
+WAYPOINT_DTYPE = np.dtype(
+    [
+        ("time", "datetime64[ms]"),
+        ("lat", "f8"),
+        ("lng", "f8"),
+        ("alt", "f8"),
+        ("interruption", "?"),
+    ]
+)
+
+# milliseconds between the route epoch (1900-01-01) and the unix epoch
+_EPOCH_OFFSET_MS = 2208988800000
+
+_INTERRUPTION = 0x80
+_TIME_MILLISECONDS_DELTA = 0x40
+_TIME_SECONDS_DELTA = 0x20
+_POSITION_BIG_DELTA = 0x10
+_POSITION_SMALL_DELTA = 0x08
+_ALTITUDE_PRESENT = 0x04
+
+
+def _time_size(header: int) -> int:
+    if header & _TIME_MILLISECONDS_DELTA:
+        return 2
+    if header & _TIME_SECONDS_DELTA:
+        return 1
+    return 6
+
+
+def _position_size(header: int) -> int:
+    altitude = bool(header & _ALTITUDE_PRESENT)
+    if header & _POSITION_BIG_DELTA:
+        return 4 + altitude
+    if header & _POSITION_SMALL_DELTA:
+        return 2 + altitude
+    return 8 + 3 * altitude
+
+
+# total byte length of a waypoint, indexed by its header byte
+_WAYPOINT_SIZE = tuple(1 + _time_size(h) + _position_size(h) for h in range(256))
+
+
+def _read_int(buf: np.ndarray, offsets: np.ndarray, size: int, signed: bool) -> np.ndarray:
+    """Read big-endian integers of `size` bytes starting at each offset."""
+    value = np.zeros(len(offsets), dtype=np.int64)
+    for k in range(size):
+        value = (value << 8) | buf[offsets + k]
+    if signed:
+        sign_bit = 1 << (8 * size - 1)
+        value = np.where(value >= sign_bit, value - (sign_bit << 1), value)
+    return value
+
+
+def _accumulate(absolute: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Resolve a sequence of absolute values and deltas to absolute values.
+
+    `values` holds absolute values where `absolute` is set, deltas to the previous
+    element otherwise. The first element is always treated as absolute.
+    """
+    absolute = absolute.copy()
+    absolute[0] = True
+    deltas = np.where(absolute, 0, values)
+    cumulative = np.cumsum(deltas)
+    group = np.cumsum(absolute) - 1
+    starts = np.flatnonzero(absolute)
+    base = values[starts] - cumulative[starts]
+    return base[np.maximum(group, 0)] + cumulative
+
+
+def decode_route(data: Union[str, bytes]) -> np.ndarray:
+    """Decode a route in the IOF binary route format.
+
+    Args:
+        data: The base64 encoded route, as stored in ``Route.base64``.
+
+    Returns:
+        np.ndarray: structured array of waypoints with dtype :data:`WAYPOINT_DTYPE`.
+    """
+    raw = binascii.a2b_base64(data)
+    buf = np.frombuffer(raw, dtype=np.uint8)
+
+    # waypoints have variable length, so only the offsets are found sequentially
+    offsets_list = []
+    pos = 0
+    length = len(raw)
+    while pos < length:
+        offsets_list.append(pos)
+        pos += _WAYPOINT_SIZE[raw[pos]]
+    if pos != length:
+        raise ValueError("Route: truncated waypoint at end of route data")
+
+    offsets = np.array(offsets_list, dtype=np.int64)
+    headers = buf[offsets].astype(np.int64)
+    waypoints = np.empty(len(offsets), dtype=WAYPOINT_DTYPE)
+    if len(offsets) == 0:
+        return waypoints
+
+    # time byte sequence
+    time_ms_delta = (headers & _TIME_MILLISECONDS_DELTA) != 0
+    time_s_delta = ~time_ms_delta & ((headers & _TIME_SECONDS_DELTA) != 0)
+    time_full = ~time_ms_delta & ~time_s_delta
+    time_values = np.zeros(len(offsets), dtype=np.int64)
+    time_offsets = offsets + 1
+    for mask, size, factor in ((time_full, 6, 1), (time_ms_delta, 2, 1), (time_s_delta, 1, 1000)):
+        time_values[mask] = _read_int(buf, time_offsets[mask], size, signed=False) * factor
+    times = _accumulate(time_full, time_values) - _EPOCH_OFFSET_MS
+    waypoints["time"] = times.astype("datetime64[ms]")
+
+    # position byte sequence
+    position_offsets = time_offsets + np.where(time_full, 6, np.where(time_ms_delta, 2, 1))
+    big_delta = (headers & _POSITION_BIG_DELTA) != 0
+    small_delta = ~big_delta & ((headers & _POSITION_SMALL_DELTA) != 0)
+    position_full = ~big_delta & ~small_delta
+    has_altitude = (headers & _ALTITUDE_PRESENT) != 0
+
+    lat = np.zeros(len(offsets), dtype=np.int64)
+    lng = np.zeros(len(offsets), dtype=np.int64)
+    alt = np.zeros(len(offsets), dtype=np.int64)
+    for mask, size, alt_size in ((position_full, 4, 3), (big_delta, 2, 1), (small_delta, 1, 1)):
+        mask_offsets = position_offsets[mask]
+        lat[mask] = _read_int(buf, mask_offsets, size, signed=True)
+        lng[mask] = _read_int(buf, mask_offsets + size, size, signed=True)
+        alt_mask = has_altitude[mask]
+        alt_values = np.zeros(len(mask_offsets), dtype=np.int64)
+        alt_values[alt_mask] = _read_int(
+            buf, mask_offsets[alt_mask] + 2 * size, alt_size, signed=True
+        )
+        alt[mask] = alt_values
+
+    waypoints["lat"] = _accumulate(position_full, lat) / 1e6
+    waypoints["lng"] = _accumulate(position_full, lng) / 1e6
+    waypoints["alt"] = np.nan
+    if has_altitude.any():
+        # altitude deltas refer to the last waypoint which has an altitude
+        waypoints["alt"][has_altitude] = (
+            _accumulate(position_full[has_altitude], alt[has_altitude]) / 10
+        )
+    waypoints["interruption"] = (headers & _INTERRUPTION) != 0
+    return waypoints
+
+
+def _write_int(buf: np.ndarray, offsets: np.ndarray, values: np.ndarray, size: int) -> None:
+    """Write big-endian integers of `size` bytes starting at each offset."""
+    values = values & ((1 << (8 * size)) - 1)
+    for k in range(size):
+        buf[offsets + k] = (values >> (8 * (size - 1 - k))) & 0xFF
+
+
+def encode_route(waypoints: np.ndarray) -> str:
+    """Encode waypoints in the IOF binary route format.
+
+    The most compact storage mode is chosen for each waypoint, as required by the standard.
+
+    Args:
+        waypoints (np.ndarray): structured array with the fields of :data:`WAYPOINT_DTYPE`.
+            Missing altitudes are represented by NaN.
+
+    Returns:
+        str: The base64 encoded route, suitable for ``Route.base64``.
+    """
+    n = len(waypoints)
+    if n == 0:
+        return ""
+
+    times = waypoints["time"].astype("datetime64[ms]").astype(np.int64) + _EPOCH_OFFSET_MS
+    lat = np.round(waypoints["lat"] * 1e6).astype(np.int64)
+    lng = np.round(waypoints["lng"] * 1e6).astype(np.int64)
+    alt_float = np.asarray(waypoints["alt"], dtype=np.float64)
+    has_altitude = ~np.isnan(alt_float)
+    alt = np.round(np.where(has_altitude, alt_float, 0) * 10).astype(np.int64)
+
+    first = np.zeros(n, dtype=bool)
+    first[0] = True
+
+    dt = np.diff(times, prepend=times[0])
+    time_s_delta = ~first & (dt >= 0) & (dt < 256000) & (dt % 1000 == 0)
+    time_ms_delta = ~first & ~time_s_delta & (dt >= 0) & (dt < 65536)
+    time_size = np.where(time_s_delta, 1, np.where(time_ms_delta, 2, 6))
+
+    dlat = np.diff(lat, prepend=lat[0])
+    dlng = np.diff(lng, prepend=lng[0])
+    # altitude deltas refer to the previous waypoint, which must have an altitude as well
+    previous_altitude = np.concatenate(([False], has_altitude[:-1]))
+    dalt = np.diff(alt, prepend=alt[0])
+    altitude_delta_ok = ~has_altitude | (previous_altitude & (dalt >= -128) & (dalt <= 127))
+    small_delta = (
+        ~first & altitude_delta_ok & (dlat >= -128) & (dlat <= 127) & (dlng >= -128) & (dlng <= 127)
+    )
+    big_delta = (
+        ~first
+        & ~small_delta
+        & altitude_delta_ok
+        & (dlat >= -32768)
+        & (dlat <= 32767)
+        & (dlng >= -32768)
+        & (dlng <= 32767)
+    )
+    position_full = ~small_delta & ~big_delta
+    coordinate_size = np.where(small_delta, 1, np.where(big_delta, 2, 4))
+    altitude_size = np.where(has_altitude, np.where(position_full, 3, 1), 0)
+
+    sizes = 1 + time_size + 2 * coordinate_size + altitude_size
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    buf = np.zeros(int(sizes.sum()), dtype=np.uint8)
+
+    headers = (
+        np.where(waypoints["interruption"], _INTERRUPTION, 0)
+        | np.where(time_ms_delta, _TIME_MILLISECONDS_DELTA, 0)
+        | np.where(time_s_delta, _TIME_SECONDS_DELTA, 0)
+        | np.where(big_delta, _POSITION_BIG_DELTA, 0)
+        | np.where(small_delta, _POSITION_SMALL_DELTA, 0)
+        | np.where(has_altitude, _ALTITUDE_PRESENT, 0)
+    )
+    buf[offsets] = headers
+
+    time_offsets = offsets + 1
+    for mask, values, size in (
+        (~time_ms_delta & ~time_s_delta, times, 6),
+        (time_ms_delta, dt, 2),
+        (time_s_delta, dt // 1000, 1),
+    ):
+        _write_int(buf, time_offsets[mask], values[mask], size)
+
+    position_offsets = time_offsets + time_size
+    for mask, size, alt_size, lat_values, lng_values, alt_values in (
+        (position_full, 4, 3, lat, lng, alt),
+        (big_delta, 2, 1, dlat, dlng, dalt),
+        (small_delta, 1, 1, dlat, dlng, dalt),
+    ):
+        mask_offsets = position_offsets[mask]
+        _write_int(buf, mask_offsets, lat_values[mask], size)
+        _write_int(buf, mask_offsets + size, lng_values[mask], size)
+        alt_mask = mask & has_altitude
+        _write_int(buf, position_offsets[alt_mask] + 2 * size, alt_values[alt_mask], alt_size)
+
+    return base64.b64encode(buf.tobytes()).decode("ascii")
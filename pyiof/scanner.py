@@ -0,0 +1,91 @@
+"""Byte-level scanning of IOF XML documents.
+
+Finds the byte ranges of top-level elements, e.g. the `ClassResult` elements of a result
+list, without parsing the document. This allows hashing, indexing and parsing single
+classes of large documents.
+
+The scanner understands comments, CDATA sections and processing instructions, and
+assumes that the scanned elements don't contain elements with the same name, which
+holds for the message elements of the IOF data standard.
+"""
+
+import functools
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+_ATTRIBUTES = rb"""(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*"""
+
+_MARKUP = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<!DOCTYPE[^>]*>"
+    rb"|<(?P<end>/)?(?P<name>[^\s/>!?]+)" + _ATTRIBUTES + rb"(?P<empty>/)?>",
+    re.DOTALL,
+)
+
+
+class Root(NamedTuple):
+    """Location of the root element of a document.
+
+    Attributes:
+        name (bytes): The qualified name of the root element, e.g. b"ResultList"
+        start_tag (Tuple[int, int]): Byte range of the start tag
+        end_tag (Tuple[int, int]): Byte range of the end tag
+    """
+
+    name: bytes
+    start_tag: Tuple[int, int]
+    end_tag: Tuple[int, int]
+
+
+@functools.cache
+def _element_markup(local_name: str) -> re.Pattern:
+    """Comments, CDATA sections and start/end tags of elements with a local name."""
+    name = rb"(?:[^\s/>!?:]+:)?" + re.escape(local_name.encode())
+    return re.compile(
+        rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>"
+        rb"|<(?P<end>/)?(?P<name>" + name + rb")(?=[\s/>])" + _ATTRIBUTES + rb"(?P<empty>/)?>",
+        re.DOTALL,
+    )
+
+
+def find_root(data: bytes) -> Root:
+    """Locate the root element of a document, `data` can also be a memory map."""
+    for match in _MARKUP.finditer(data):
+        if match.group("name") is not None and not match.group("end"):
+            name = match.group("name")
+            end = data.rfind(b"</" + name)
+            if match.group("empty") or end < 0:
+                return Root(name, match.span(), (match.end(), match.end()))
+            return Root(name, match.span(), (end, data.find(b">", end) + 1))
+    raise ValueError("no root element found")
+
+
+def element_ranges(
+    data: bytes, local_name: str, start: int = 0, end: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """Byte ranges of all elements with a local name, e.g. "ClassResult".
+
+    Args:
+        data: XML document
+        local_name: local name of the elements, without namespace prefix
+        start: byte offset to start scanning at
+        end: byte offset to stop scanning at
+
+    Returns:
+        list of (start, end) byte ranges of the elements, including start and end tags
+    """
+    ranges = []
+    element_start: Optional[int] = None
+    markup = _element_markup(local_name)
+    for match in markup.finditer(data, start, len(data) if end is None else end):
+        if match.group("name") is None:
+            continue
+        if match.group("end"):
+            if element_start is not None:
+                ranges.append((element_start, match.end()))
+                element_start = None
+        elif match.group("empty"):
+            if element_start is None:
+                ranges.append(match.span())
+        elif element_start is None:
+            element_start = match.start()
+    return ranges
@@ -0,0 +1,486 @@
+"""Validation of model trees against the constraints of the IOF XSD.
+
+Validating a message with `lxml.etree.XMLSchema` requires serializing it first, which
+doubles the cost of an export. `Schema` instead checks the models directly against the
+constraints of the XSD which the pydantic types don't guarantee, e.g. for models built
+with `model_construct` or changed after validation:
+
+- the number of elements, minOccurs and maxOccurs, e.g. at least two course controls
+- required attributes
+- enumerations, e.g. the status of a result
+- the types of values, e.g. an integer position
+- the order of elements: models declaring their fields in another order than the XSD
+
+The content of `Extensions` elements isn't checked.
+
+    schema = Schema.load("IOF.xsd")
+    schema.validate(result_list)
+
+Models are validated on their own as well, e.g. class by class while streaming:
+
+    for class_result in stream.items:
+        schema.validate(class_result)
+
+The streaming writer validates the header and each item before serializing it:
+
+    write_xml(message, "results.xml", schema=schema)
+"""
+
+import dataclasses
+import datetime
+import decimal
+import functools
+import os
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+import pydantic_xml
+from lxml import etree
+from pydantic_xml.typedefs import EntityLocation
+
+from .compiled import _Field, _GeneratedNames, _layout
+
+ModelType = Type[pydantic_xml.BaseXmlModel]
+
+_XSD = "{http://www.w3.org/2001/XMLSchema}"
+
+# python types of the values of the XSD builtin types
+_BUILTINS: Dict[str, Tuple[type, ...]] = {
+    "string": (str,),
+    "NMTOKEN": (str,),
+    "double": (int, float),
+    "decimal": (int, float, decimal.Decimal),
+    "integer": (int,),
+    "boolean": (bool,),
+    "date": (datetime.date,),
+    "dateTime": (datetime.datetime,),
+    "time": (datetime.time,),
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class _SimpleType:
+    builtin: str
+    enumeration: Optional[FrozenSet[str]] = None
+
+
+@dataclasses.dataclass
+class _Particle:
+    """Declaration of an element or attribute."""
+
+    name: str
+    type: Union[_SimpleType, "_ComplexType"]
+    min: int
+    max: Optional[int]  # None if unbounded
+    position: int = 0
+
+
+@dataclasses.dataclass
+class _ComplexType:
+    name: str
+    elements: Dict[str, _Particle] = dataclasses.field(default_factory=dict)
+    attributes: Dict[str, _Particle] = dataclasses.field(default_factory=dict)
+    text: Optional[_SimpleType] = None
+    # open content, e.g. Extensions
+    any: bool = False
+
+
+def _local(name: str) -> str:
+    return name.rsplit("}", 1)[-1].rsplit(":", 1)[-1]
+
+
+class _Reader:
+    """Reads the types of an XSD document."""
+
+    def __init__(self, root: etree._Element):
+        self.simple_nodes = {n.get("name"): n for n in root.iterfind(f"{_XSD}simpleType")}
+        self.complex_nodes = {n.get("name"): n for n in root.iterfind(f"{_XSD}complexType")}
+        self.complex: Dict[str, _ComplexType] = {}
+        self.roots = {
+            node.get("name"): self.element_type(node) for node in root.iterfind(f"{_XSD}element")
+        }
+
+    def simple(self, name: Optional[str], node: Optional[etree._Element]) -> _SimpleType:
+        """A named simple type or an inline simple type node."""
+        if name is not None and (name.startswith("xsd:") or name not in self.simple_nodes):
+            return _SimpleType(_local(name))
+        if node is None:
+            node = self.simple_nodes[name]
+        restriction = node.find(f"{_XSD}restriction")
+        if restriction is None:
+            return _SimpleType("string")
+        base = self.simple(restriction.get("base"), None)
+        values = [e.get("value") for e in restriction.iterfind(f"{_XSD}enumeration")]
+        return _SimpleType(base.builtin, frozenset(values) if values else base.enumeration)
+
+    def element_type(self, node: etree._Element) -> Union[_SimpleType, _ComplexType]:
+        """The type of an element or attribute declaration."""
+        name = node.get("type")
+        if name is not None:
+            if name in self.complex_nodes:
+                return self.complex_type(name, self.complex_nodes[name])
+            return self.simple(name, None)
+        inline = node.find(f"{_XSD}complexType")
+        if inline is not None:
+            return self.complex_type(f"{node.get('name')} element", inline)
+        return self.simple(None, node.find(f"{_XSD}simpleType"))
+
+    def complex_type(self, name: str, node: etree._Element) -> _ComplexType:
+        if name in self.complex:
+            return self.complex[name]
+        # registered before its content is read for recursive types
+        type_ = self.complex[name] = _ComplexType(name)
+        self.content(type_, node)
+        return type_
+
+    def content(self, type_: _ComplexType, node: etree._Element) -> None:
+        """Add the elements and attributes of a type node, including its base types."""
+        for extension in node.iterfind(f"{_XSD}*/{_XSD}extension"):
+            base = extension.get("base")
+            if base in self.complex_nodes:
+                self.content(type_, self.complex_nodes[base])
+            else:
+                type_.text = self.simple(base, None)
+            self.content(type_, extension)
+        for particle in node.iterfind(f"{_XSD}sequence/{_XSD}*"):
+            if particle.tag == f"{_XSD}any":
+                type_.any = True
+                continue
+            maximum = particle.get("maxOccurs", "1")
+            type_.elements[particle.get("name")] = _Particle(
+                particle.get("name"),
+                self.element_type(particle),
+                int(particle.get("minOccurs", "1")),
+                None if maximum == "unbounded" else int(maximum),
+                len(type_.elements),
+            )
+        for attribute in node.iterfind(f"{_XSD}attribute"):
+            name = attribute.get("name") or _local(attribute.get("ref", ""))
+            required = attribute.get("use") == "required"
+            type_.attributes[name] = _Particle(name, self.element_type(attribute), int(required), 1)
+
+
+# expressions testing whether a value v is not of a builtin type
+_TYPE_TESTS = {
+    "string": "not isinstance(v, str)",
+    "NMTOKEN": "not isinstance(v, str)",
+    "double": "type(v) is bool or not isinstance(v, (int, float))",
+    "decimal": "type(v) is bool or not isinstance(v, (int, float, _Decimal))",
+    "integer": "type(v) is bool or not isinstance(v, int)",
+    "boolean": "type(v) is not bool",
+    "date": "type(v) is _datetime or not isinstance(v, _date)",
+    "dateTime": "not isinstance(v, _datetime)",
+    "time": "not isinstance(v, _time)",
+}
+
+Errors = List[Tuple[str, str]]
+Checker = Callable[[Any, FrozenSet[str]], Errors]
+
+_NOTHING: FrozenSet[str] = frozenset()
+
+
+def _type_error(value: Any, type_: _SimpleType) -> str:
+    return f"{value!r} is not of type {type_.builtin}"
+
+
+def _enum_error(value: Any, type_: _SimpleType) -> str:
+    return f"{value!r} is not one of {', '.join(sorted(type_.enumeration or ()))}"
+
+
+def _count_error(count: int, particle: _Particle) -> str:
+    if count == 0 and particle.max == 1:
+        return "required element missing"
+    maximum = "unbounded" if particle.max is None else particle.max
+    return f"{count} elements, expected {particle.min} to {maximum}"
+
+
+def _present(value: Any) -> bool:
+    """Whether an element field is serialized, empty strings are skipped."""
+    values = value if isinstance(value, list) else [value]
+    return any(v is not None and not (type(v) is str and not v) for v in values)
+
+
+def _prefixed(label: str, errors: Errors) -> Errors:
+    return [(f"{label}/{path}" if path else label, message) for path, message in errors]
+
+
+_CONSTANTS: Dict[str, Any] = {
+    "_Decimal": decimal.Decimal,
+    "_date": datetime.date,
+    "_datetime": datetime.datetime,
+    "_time": datetime.time,
+}
+
+
+class Schema:
+    """The constraints of an XSD document, see the module documentation.
+
+    A checker function is generated per model class and XSD type on first use, like the
+    serializers of `pyiof.compiled`.
+
+    Args:
+        root: the root element of the XSD document
+    """
+
+    def __init__(self, root: etree._Element):
+        self._roots = _Reader(root).roots
+        self._classes: Optional[Dict[type, List[_ComplexType]]] = None
+        self._namespace: Dict[str, Any] = {
+            **_CONSTANTS,
+            "_NOTHING": _NOTHING,
+            "_prefixed": _prefixed,
+            "_present": _present,
+            "_check": self._check,
+            "_type_error": _type_error,
+            "_enum_error": _enum_error,
+            "_count_error": _count_error,
+        }
+        self._names = _GeneratedNames()
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "Schema":
+        """Read an XSD file, e.g. the IOF.xsd of the data standard, cached by path."""
+        return _load(os.path.realpath(path))
+
+    def errors(self, model: pydantic_xml.BaseXmlModel, exclude: Iterable[str] = ()) -> List[str]:
+        """The violations of the schema by a model and its submodels.
+
+        Args:
+            model: a message element, or any model within a message, e.g. a `ClassResult`
+            exclude: names of list fields of the model which aren't checked, e.g. the
+                streamed items of a message
+
+        Returns:
+            the violations as "path: message", e.g.
+            "ClassResult/PersonResult[1]/Result[0]/Status: 'Fast' is not one of ..."
+        """
+        cls = type(model)
+        errors = self._checker(cls, self._type(cls))(model, frozenset(exclude))
+        label = cls.__xml_tag__ or cls.__name__
+        return [f"{path}: {message}" for path, message in _prefixed(label, errors)]
+
+    def validate(self, model: pydantic_xml.BaseXmlModel, exclude: Iterable[str] = ()) -> None:
+        """Raise a ValueError if a model violates the schema, see `errors`."""
+        errors = self.errors(model, exclude)
+        if errors:
+            shown = "\n  ".join(errors[:20])
+            more = f"\n  and {len(errors) - 20} more" if len(errors) > 20 else ""
+            raise ValueError(
+                f"{type(model).__name__}: {len(errors)} schema violations:\n  {shown}{more}"
+            )
+
+    def validate_items(self, cls: ModelType, field: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Validate the items of a list field of a message while iterating over them.
+
+        Each item is validated before it is yielded, the number of items when the
+        iteration ends. Items already serialized to bytes are counted only.
+
+        Args:
+            cls: the message element class, e.g. `pyiof.ResultList`
+            field: the name of the list field, e.g. "class_results"
+            items: the items of the field
+        """
+        particle = self._particle(cls, field)
+        count = 0
+        for item in items:
+            if not isinstance(item, bytes):
+                errors = self._check(item, particle.type)  # type: ignore
+                if errors:
+                    label = f"{particle.name}[{count}]"
+                    shown = "\n  ".join(f"{p}: {m}" for p, m in _prefixed(label, errors)[:20])
+                    raise ValueError(f"{cls.__name__}: schema violations:\n  {shown}")
+            count += 1
+            yield item
+        if count < particle.min or (particle.max is not None and count > particle.max):
+            raise ValueError(f"{cls.__name__}: {particle.name}: {_count_error(count, particle)}")
+
+    def _type(self, cls: type) -> _ComplexType:
+        """The complex type of a model class."""
+        root = self._roots.get(cls.__xml_tag__ or cls.__name__)  # type: ignore
+        if isinstance(root, _ComplexType):
+            return root
+        if self._classes is None:
+            self._classes = self._collect()
+        types = self._classes.get(cls, [])
+        if len(types) != 1:
+            kind = "no" if not types else "ambiguous"
+            raise TypeError(f"Schema: {kind} type of {cls.__name__} in the schema")
+        return types[0]
+
+    def _collect(self) -> Dict[type, List[_ComplexType]]:
+        """The complex types of the model classes reachable from the message elements."""
+        import pyiof  # noqa: PLC0415 (circular import)
+
+        classes: Dict[type, List[_ComplexType]] = {}
+        pending = [
+            (getattr(pyiof, name), type_)
+            for name, type_ in self._roots.items()
+            if isinstance(type_, _ComplexType) and hasattr(pyiof, name)
+        ]
+        while pending:
+            cls, type_ = pending.pop()
+            if any(t is type_ for t in classes.get(cls, [])):
+                continue
+            classes.setdefault(cls, []).append(type_)
+            for field in _layout(cls) or []:
+                particle = type_.elements.get(_local(field.xml_name))
+                if (
+                    field.location is EntityLocation.ELEMENT
+                    and field.model
+                    and particle
+                    and isinstance(particle.type, _ComplexType)
+                ):
+                    pending.append((field.model, particle.type))
+        return classes
+
+    def _particle(self, cls: ModelType, field: str) -> _Particle:
+        for f in _layout(cls) or []:
+            particle = self._type(cls).elements.get(_local(f.xml_name))
+            if f.name == field and f.location is EntityLocation.ELEMENT and particle:
+                return particle
+        raise ValueError(f"{cls.__name__}: no element field {field}")
+
+    def _check(self, model: Any, type_: _ComplexType) -> Errors:
+        """The violations of a model of any class, relative to its element."""
+        if not isinstance(model, pydantic_xml.BaseXmlModel):
+            return [("", f"{model!r} is not a model of type {type_.name}")]
+        return self._checker(type(model), type_)(model, _NOTHING)
+
+    def _checker(self, cls: type, type_: _ComplexType) -> Checker:
+        return self._namespace[self._name(cls, type_)]
+
+    def _name(self, cls: type, type_: _ComplexType) -> str:
+        define = functools.partial(self._define, cls, type_)
+        return self._names.get((cls, id(type_)), f"_check_{cls.__name__}", define)
+
+    def _define(self, cls: type, type_: _ComplexType, name: str) -> None:
+        self._namespace[f"{name}_type"] = type_
+        source = self._generate(name, cls, type_)
+        exec(compile(source, f"<pyiof.schema {cls.__qualname__}>", "exec"), self._namespace)
+
+    def _constant(self, value: Any) -> str:
+        """The name of a constant in the namespace of the generated code."""
+        name = f"_c{len(self._namespace)}"
+        self._namespace[name] = value
+        return name
+
+    def _generate(self, name: str, cls: type, type_: _ComplexType) -> str:
+        lines = [f"def {name}(value, skip):", "    errors = []"]
+        fields: List[_Field] = _layout(cls) or []  # type: ignore
+        for field in fields:
+            label = _local(field.xml_name)
+            lines.append(f"    v = value.{field.name}")
+            if field.location is EntityLocation.ELEMENT:
+                lines.extend(self._element(field, label, type_))
+            elif field.location is EntityLocation.ATTRIBUTE:
+                lines.extend(self._attribute(label, type_))
+            elif type_.text is not None:
+                lines.append("    if v is not None:")
+                lines.extend(self._value(repr("text()"), type_.text, "        "))
+        lines.extend(self._order(fields, type_))
+        lines.append("    return errors")
+        return "\n".join(lines) + "\n"
+
+    def _attribute(self, label: str, type_: _ComplexType) -> List[str]:
+        particle = type_.attributes.get(label)
+        if particle is None:
+            message = f"attribute not allowed in {type_.name}"
+            return ["    if v is not None:", f"        errors.append(({label!r}, {message!r}))"]
+        lines = ["    if v is not None:"]
+        lines.extend(self._value(repr(label), particle.type, "        "))  # type: ignore
+        if particle.min:
+            lines.append("    else:")
+            lines.append(f"        errors.append(({label!r}, 'required attribute missing'))")
+        return lines
+
+    def _value(self, label: str, type_: _SimpleType, indent: str) -> List[str]:
+        """Check a simple value v which isn't None."""
+        constant = self._constant(type_)
+        lines = [
+            f"{indent}if {_TYPE_TESTS.get(type_.builtin, 'False')}:",
+            f"{indent}    errors.append(({label}, _type_error(v, {constant})))",
+        ]
+        if type_.enumeration is not None:
+            lines.append(f"{indent}elif v not in {constant}.enumeration:")
+            lines.append(f"{indent}    errors.append(({label}, _enum_error(v, {constant})))")
+        return lines
+
+    def _element(self, field: _Field, label: str, type_: _ComplexType) -> List[str]:
+        particle = type_.elements.get(label)
+        if particle is None:
+            message = f"element not allowed in {type_.name}"
+            return ["    if _present(v):", f"        errors.append(({label!r}, {message!r}))"]
+        constant = self._constant(particle)
+        if field.is_list:
+            lines = [
+                f"    if v and {field.name!r} not in skip:",
+                "        n = 0",
+                "        for v in v:",
+            ]
+            lines.extend(self._item(field, particle, f'f"{label}[{{n}}]"', "            "))
+            lines.append("            n += 1")
+            lines.append("    else:")
+            lines.append("        n = 0")
+            lines.append(f"    if {field.name!r} not in skip and not (")
+            lines.append(f"        {constant}.min <= n <= ({constant}.max or n)")
+            lines.append("    ):")
+        else:
+            empty = " or v == ''" if isinstance(particle.type, _SimpleType) else ""
+            lines = [f"    n = 0 if v is None{empty} else 1"]
+            lines.append("    if n:")
+            lines.extend(self._item(field, particle, repr(label), "        "))
+            lines.append(f"    if n < {constant}.min:")
+        lines.append(f"        errors.append(({label!r}, _count_error(n, {constant})))")
+        return lines
+
+    def _item(self, field: _Field, particle: _Particle, label: str, indent: str) -> List[str]:
+        """Check an element value v, counted in n for lists."""
+        if isinstance(particle.type, _SimpleType):
+            lines = [f"{indent}if v is None or v == '':", f"{indent}    continue"]
+            return (lines if field.is_list else []) + self._value(label, particle.type, indent)
+        if particle.type.any:
+            return [f"{indent}pass"]
+        lines = [f"{indent}if v is None:", f"{indent}    continue"] if field.is_list else []
+        type_name = self._constant(particle.type)
+        if field.model is not None:
+            model = self._constant(field.model)
+            checker = self._name(field.model, particle.type)
+            lines.append(f"{indent}sub = {checker}(v, _NOTHING) if type(v) is {model} else ")
+            lines[-1] += f"_check(v, {type_name})"
+        else:
+            lines.append(f"{indent}sub = _check(v, {type_name})")
+        lines.append(f"{indent}if sub:")
+        lines.append(f"{indent}    errors += _prefixed({label}, sub)")
+        return lines
+
+    def _order(self, fields: List[_Field], type_: _ComplexType) -> List[str]:
+        """Check pairs of element fields serialized in another order than the XSD."""
+        positions = [
+            (f.name, type_.elements[_local(f.xml_name)].position)
+            for f in fields
+            if f.location is EntityLocation.ELEMENT and _local(f.xml_name) in type_.elements
+        ]
+        lines = []
+        for i, (a, position) in enumerate(positions):
+            for b, other in positions[i + 1 :]:
+                if position > other:
+                    message = f"{b} must be before {a} in {type_.name}"
+                    lines.append(f"    if _present(value.{a}) and _present(value.{b}):")
+                    lines.append(f"        errors.append(('', {message!r}))")
+        return lines
+
+
+@functools.cache
+def _load(path: str) -> Schema:
+    return Schema(etree.parse(path).getroot())
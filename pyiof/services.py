@@ -0,0 +1,230 @@
+"""Totals of service requests, e.g. accommodation and meals.
+
+`summarize_services` reads a `ServiceRequestList` in one streaming pass, parsing one
+organisation or person service request at a time, and sums the requested and delivered
+quantities per service and the fees per organisation. Only the totals are kept in memory,
+so the summary of a large multi-day event can be recomputed whenever the file changes:
+
+    summary = summarize_services("services.xml")
+    for totals in summary.services.values():
+        print(totals.service.name[0].text, totals.requested, totals.remaining)
+    for totals in summary.organisations.values():
+        print(totals.organisation.name, totals.fees, totals.paid)
+
+A `ServiceSummary` can also be filled from messages in memory, see `ServiceSummary.add`.
+
+Services are identified by their id, or by their normalized name if they have none. The
+capacity (`Service.max_number`) is taken from the services of the event and its races,
+or from the first request of a service which isn't defined by the event. Fees are summed
+as assigned to the requests, per currency, fees given as a percentage are not included.
+"""
+
+import dataclasses
+import decimal
+import os
+from typing import IO, Any, Dict, Hashable, Iterable, Iterator, List, Optional, Union
+
+from lxml import etree
+
+from .compiled import Backend, _layout
+from .contact import Organisation
+from .event import Event
+from .merge import id_key, normalize_name
+from .message_elements import ServiceRequestList
+from .misc import OrganisationServiceRequest, PersonServiceRequest, Service, ServiceRequest
+
+Source = Union[str, os.PathLike, IO[bytes]]
+
+Request = Union[OrganisationServiceRequest, PersonServiceRequest]
+
+
+@dataclasses.dataclass
+class ServiceTotals:
+    """The requests of a service.
+
+    Attributes:
+        service (Service): The service, as defined by the event if it is.
+        requests (int): The number of service requests.
+        requested (float): The total requested quantity.
+        delivered (float): The total delivered quantity.
+    """
+
+    service: Service
+    requests: int = 0
+    requested: float = 0.0
+    delivered: float = 0.0
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """The remaining capacity, negative if overbooked, None for unlimited services."""
+        if self.service.max_number is None:
+            return None
+        return self.service.max_number - self.requested
+
+
+@dataclasses.dataclass
+class OrganisationTotals:
+    """The service requests of an organisation.
+
+    Attributes:
+        organisation (Organisation, optional): The organisation, None for the requests of
+            persons which aren't made by an organisation.
+        requests (int): The number of service requests, including those of its persons.
+        requested (dict): The requested quantity per service key.
+        fees (dict[str, Decimal]): The sum of the assigned fees per currency, None for
+            amounts without currency.
+        paid (dict[str, Decimal]): The sum of the paid amounts per currency.
+    """
+
+    organisation: Optional[Organisation]
+    requests: int = 0
+    requested: Dict[Hashable, float] = dataclasses.field(default_factory=dict)
+    fees: Dict[Optional[str], decimal.Decimal] = dataclasses.field(default_factory=dict)
+    paid: Dict[Optional[str], decimal.Decimal] = dataclasses.field(default_factory=dict)
+
+
+def _add_amount(sums: Dict[Optional[str], decimal.Decimal], amount: Any) -> None:
+    if amount is not None:
+        sums[amount.currency] = sums.get(amount.currency, decimal.Decimal(0)) + amount.amount
+
+
+class ServiceSummary:
+    """Totals of service requests per service and per organisation.
+
+    Attributes:
+        services (dict[Hashable, ServiceTotals]): The totals per service key, in the order
+            the services were defined or first requested.
+        organisations (dict[Hashable, OrganisationTotals]): The totals per organisation,
+            keyed by the organisation id or normalized name, None for persons without
+            organisation.
+    """
+
+    def __init__(self) -> None:
+        self.services: Dict[Hashable, ServiceTotals] = {}
+        self.organisations: Dict[Hashable, OrganisationTotals] = {}
+        # the key of each service by name, for references without id
+        self._names: Dict[str, Hashable] = {}
+
+    def service_key(self, service: Service) -> Hashable:
+        """The key of a service in `services`."""
+        if service.id is not None and service.id.id:
+            return id_key(service.id)
+        name = normalize_name(service.name[0].text)
+        return self._names.get(name, ("name", name))
+
+    def add_service(self, service: Service) -> ServiceTotals:
+        """Define a service and its capacity, keeping the totals of earlier requests."""
+        key = self.service_key(service)
+        self._names.setdefault(normalize_name(service.name[0].text), key)
+        totals = self.services.get(key)
+        if totals is None:
+            totals = self.services[key] = ServiceTotals(service)
+        else:
+            totals.service = service
+        return totals
+
+    def add_event(self, event: Event) -> None:
+        """Define the services of an event and of its races."""
+        for service in event.services:
+            self.add_service(service)
+        for race in event.races:
+            for service in race.services:
+                self.add_service(service)
+
+    def add(self, message: Union[ServiceRequestList, Request, Iterable[Request]]) -> None:
+        """Add the services of a message and its requests, or single requests."""
+        if isinstance(message, ServiceRequestList):
+            self.add_event(message.event)
+            self.add(message.organisation_service_requests)
+            self.add(message.person_service_requests)
+        elif isinstance(message, OrganisationServiceRequest):
+            totals = self._organisation(message.organisation)
+            self._add_requests(totals, message.service_requests)
+            for person_request in message.person_service_requests:
+                self._add_requests(totals, person_request.service_requests)
+        elif isinstance(message, PersonServiceRequest):
+            self._add_requests(self._organisation(None), message.service_requests)
+        else:
+            for request in message:
+                self.add(request)
+
+    def _organisation(self, organisation: Optional[Organisation]) -> OrganisationTotals:
+        key: Hashable = None
+        if organisation is not None:
+            if organisation.id is not None and organisation.id.id:
+                key = id_key(organisation.id)
+            else:
+                key = ("name", normalize_name(organisation.name))
+        totals = self.organisations.get(key)
+        if totals is None:
+            totals = self.organisations[key] = OrganisationTotals(organisation)
+        return totals
+
+    def _add_requests(self, totals: OrganisationTotals, requests: List[ServiceRequest]) -> None:
+        for request in requests:
+            key = self.service_key(request.service)
+            service = self.services.get(key)
+            if service is None:
+                service = self.add_service(request.service)
+            service.requests += 1
+            service.requested += request.requested_quantity
+            service.delivered += request.delivered_quantity or 0.0
+            totals.requests += 1
+            totals.requested[key] = totals.requested.get(key, 0.0) + request.requested_quantity
+            for assigned_fee in request.assigned_fee:
+                _add_amount(totals.fees, assigned_fee.fee.amount)
+                _add_amount(totals.paid, assigned_fee.paid_amount)
+
+    def overbooked(self) -> List[ServiceTotals]:
+        """The services with more requested than their capacity."""
+        return [
+            totals
+            for totals in self.services.values()
+            if totals.remaining is not None and totals.remaining < 0
+        ]
+
+
+def iter_service_requests(
+    source: Source, context: Optional[Dict[str, Any]] = None, backend: Backend = "compiled"
+) -> Iterator[Union[Event, Request]]:
+    """Parse the event and the service requests of a `ServiceRequestList` one at a time.
+
+    Args:
+        source: path or binary file object of the XML document
+        context (dict, optional): pydantic validation context
+        backend (str): parser backend, see `BaseXmlModel.from_xml_tree`
+    """
+    models = {
+        field.xml_name: field.model
+        for field in _layout(ServiceRequestList) or []
+        if field.name in ("event", "organisation_service_requests", "person_service_requests")
+    }
+    for _, element in etree.iterparse(source, events=("end",), tag=list(models)):
+        parent = element.getparent()
+        # person requests are also nested in organisation requests
+        if parent is None or parent.getparent() is not None:
+            continue
+        model = models[element.tag]
+        assert model is not None
+        yield model.from_xml_tree(element, context=context, backend=backend)  # type: ignore
+        # release the parsed element
+        parent.remove(element)
+
+
+def summarize_services(
+    source: Source, context: Optional[Dict[str, Any]] = None, backend: Backend = "compiled"
+) -> ServiceSummary:
+    """Sum the service requests of a `ServiceRequestList` file in one streaming pass.
+
+    Args:
+        source: path or binary file object of the XML document
+        context (dict, optional): pydantic validation context
+        backend (str): parser backend, see `BaseXmlModel.from_xml_tree`
+    """
+    summary = ServiceSummary()
+    for item in iter_service_requests(source, context, backend):
+        if isinstance(item, Event):
+            summary.add_event(item)
+        else:
+            summary.add(item)
+    return summary
@@ -0,0 +1,277 @@
+"""Incremental reading and writing of large message elements.
+
+`stream_message` reads a message element like a `ResultList` class by class: the
+message itself is parsed without its `ClassResult` elements, which are then parsed and
+yielded one at a time. Only a single class is kept in memory.
+
+    stream = stream_message("results.xml", pyiof.ResultList)
+    print(stream.header.event.name)
+    for class_result in stream.items:
+        ...
+
+`write_xml` writes a message element the same way, serializing one item at a time, so
+the items can be produced by a generator:
+
+    write_xml(StreamedMessage(header, "class_results", iter_class_results()), "out.xml")
+
+The items can be validated against the IOF XSD while writing, see `pyiof.schema`.
+"""
+
+import copy
+import dataclasses
+import os
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generic,
+    Iterator,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+import pydantic_xml
+from lxml import etree
+from pydantic_xml.typedefs import EntityLocation
+
+from .compiled import Backend, _Field, _layout
+from .payload import deferred_payloads, write_with_payloads
+from .utils import Fsync, atomic_write
+
+if TYPE_CHECKING:
+    from .schema import Schema
+
+M = TypeVar("M", bound=pydantic_xml.BaseXmlModel)
+
+Source = Union[str, os.PathLike, IO[bytes]]
+
+"""Default streamed field of message elements, the last list of elements otherwise."""
+STREAMED_FIELDS = {
+    "ResultList": "class_results",
+    "StartList": "class_starts",
+}
+
+
+@dataclasses.dataclass
+class StreamedMessage(Generic[M]):
+    """A message element which is read incrementally.
+
+    Attributes:
+        header (BaseXmlModel): The message element without the streamed items. Elements
+            after the first item are not included.
+        field (str): Name of the streamed field of the message element, e.g. class_results
+        items (Iterator): The parsed items of the streamed field, read on iteration.
+    """
+
+    header: M
+    field: str
+    items: Iterator[Any]
+
+
+def streamed_field(cls: Type[pydantic_xml.BaseXmlModel], field: Optional[str] = None) -> _Field:
+    """The layout of the field which is streamed for a message element class."""
+    fields = _layout(cls)
+    if fields is None:
+        raise TypeError(f"{cls.__name__} can't be streamed")
+    candidates = [
+        f
+        for f in fields
+        if f.location is EntityLocation.ELEMENT and f.is_list and f.model is not None
+    ]
+    name = field or STREAMED_FIELDS.get(cls.__name__)
+    if name is not None:
+        candidates = [f for f in candidates if f.name == name]
+    if not candidates:
+        raise ValueError(f"{cls.__name__}: no list of elements {field or ''} to stream")
+    return candidates[-1]
+
+
+def stream_message(
+    source: Source,
+    cls: Type[M],
+    field: Optional[str] = None,
+    context: Optional[Dict[str, Any]] = None,
+    backend: Backend = "compiled",
+) -> StreamedMessage[M]:
+    """Read a message element incrementally.
+
+    The XML is read up to the first streamed item to parse the header, the items are
+    parsed while iterating over `StreamedMessage.items`.
+
+    Args:
+        source: path or binary file object of the XML document
+        cls: message element class, e.g. `pyiof.ResultList`
+        field (str, optional): name of the streamed list field, defaults to the class
+            results or class starts, or the last list of elements of other messages
+        context (dict, optional): pydantic validation context
+        backend (str): parser backend, see `BaseXmlModel.from_xml_tree`
+    """
+    stream = streamed_field(cls, field)
+    assert stream.model is not None
+    events = etree.iterparse(source, events=("start", "end"))
+    _, root = next(events)
+
+    first_item = None
+    for event, element in events:
+        if event == "start" and element.tag == stream.xml_name and element.getparent() is root:
+            first_item = element
+            break
+    header = _parse_header(cls, root, first_item, context, backend)
+
+    return StreamedMessage(
+        header=header,
+        field=stream.name,
+        items=_iter_items(events, root, stream, context, backend),
+    )
+
+
+def _parse_header(
+    cls: Type[M],
+    root: etree._Element,
+    stop: Optional[etree._Element],
+    context: Optional[Dict[str, Any]],
+    backend: Backend,
+) -> M:
+    """Parse the message from the children of the root before `stop`."""
+    header = etree.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+    for child in root:
+        if child is stop:
+            break
+        header.append(copy.deepcopy(child))
+    return cls.from_xml_tree(header, context=context, backend=backend)  # type: ignore
+
+
+def _iter_items(
+    events: Any,
+    root: etree._Element,
+    stream: _Field,
+    context: Optional[Dict[str, Any]],
+    backend: Backend,
+) -> Iterator[Any]:
+    model = stream.model
+    assert model is not None
+    for event, element in events:
+        if event != "end" or element.getparent() is not root:
+            continue
+        if element.tag == stream.xml_name:
+            yield model.from_xml_tree(element, context=context, backend=backend)
+        # release parsed elements, the header has been parsed already
+        root.remove(element)
+
+
+# marks the position of the streamed items in the serialized header
+_ITEMS = b"<!--pyiof-streamed-items-->"
+
+
+def _split_header(
+    header: pydantic_xml.BaseXmlModel, stream: _Field, pretty_print: bool, backend: Backend
+) -> Tuple[bytes, bytes]:
+    """The XML before and after the streamed items."""
+    empty = header.model_copy(update={stream.name: []})
+    root = empty.to_xml_tree(skip_empty=True, exclude_none=False, backend=backend)  # type: ignore
+    fields = _layout(type(header)) or []
+    following = {f.xml_name for f in fields[fields.index(stream) + 1 :]}
+    position = next((i for i, child in enumerate(root) if child.tag in following), len(root))
+    root.insert(position, etree.Comment(_ITEMS[4:-3].decode()))
+    data = etree.tostring(root, pretty_print=pretty_print, xml_declaration=True, encoding="UTF-8")
+    head, tail = data.split(_ITEMS)
+    if pretty_print:
+        # the items are indented and end with a newline themselves
+        head, tail = head.rstrip(b" "), tail[1:]
+    return head, tail
+
+
+def item_xml(
+    item: pydantic_xml.BaseXmlModel,
+    cls: Type[pydantic_xml.BaseXmlModel],
+    field: Optional[str] = None,
+    pretty_print: bool = True,
+    backend: Backend = "pydantic_xml",
+) -> bytes:
+    """Serialize an item of a streamed list as chunk of `iter_xml`.
+
+    Items can be serialized in advance, e.g. in parallel, and passed to `iter_xml` as
+    bytes.
+
+    Args:
+        item: the item, e.g. a `ClassResult`
+        cls: the message element class, e.g. `pyiof.ResultList`
+        field (str, optional): the streamed field, see `streamed_field`
+        pretty_print (bool): indent the XML as within the message element
+        backend (str): serializer backend, see `BaseXmlModel.to_xml_tree`
+    """
+    return _item_xml(item, streamed_field(cls, field), pretty_print, backend)
+
+
+def _item_xml(
+    item: pydantic_xml.BaseXmlModel, stream: _Field, pretty_print: bool, backend: Backend
+) -> bytes:
+    element = item.to_xml_tree(skip_empty=True, exclude_none=False, backend=backend)  # type: ignore
+    element.tag = stream.xml_name
+    # serialized within an element of the message namespaces, which it shares, and indented
+    # as its child
+    wrapper = etree.Element(element.tag, nsmap=element.nsmap)
+    wrapper.append(element)
+    data = etree.tostring(wrapper, pretty_print=pretty_print, encoding="UTF-8")
+    return data[data.index(b">") + (2 if pretty_print else 1) : data.rindex(b"</")]
+
+
+def iter_xml(
+    message: Union[pydantic_xml.BaseXmlModel, StreamedMessage],
+    pretty_print: bool = True,
+    backend: Backend = "pydantic_xml",
+    schema: Optional["Schema"] = None,
+) -> Iterator[bytes]:
+    """Serialize a message element to XML in chunks.
+
+    Each class result or class start (or item of another streamed list, see
+    `streamed_field`) is a separate chunk. The concatenated chunks are identical to
+    `to_xml`.
+
+    Args:
+        message: a message element, or a `StreamedMessage` e.g. with a generator of items.
+            Items may also be chunks serialized with `item_xml`.
+        pretty_print (bool): indent the XML
+        backend (str): serializer backend, see `BaseXmlModel.to_xml_tree`
+        schema (Schema, optional): validate the header and each item before it is
+            serialized, raises a ValueError on the first invalid item, see `pyiof.schema`
+    """
+    if isinstance(message, StreamedMessage):
+        header, items = message.header, message.items
+        stream = streamed_field(type(header), message.field)
+    else:
+        header = message
+        stream = streamed_field(type(message))
+        items = iter(getattr(message, stream.name))
+    if schema is not None:
+        schema.validate(header, exclude=[stream.name])
+        items = schema.validate_items(type(header), stream.name, items)
+    head, tail = _split_header(header, stream, pretty_print, backend)
+    yield head
+    for item in items:
+        yield item if isinstance(item, bytes) else _item_xml(item, stream, pretty_print, backend)
+    yield tail
+
+
+def write_xml(
+    message: Union[pydantic_xml.BaseXmlModel, StreamedMessage],
+    path: Union[str, os.PathLike],
+    pretty_print: bool = True,
+    backend: Backend = "pydantic_xml",
+    schema: Optional["Schema"] = None,
+    fsync: Fsync = "none",
+) -> None:
+    """Write a message element to an XML file, one item at a time, see `iter_xml`.
+
+    The file is written atomically, see `pyiof.utils.atomic_write`: if writing fails,
+    e.g. at an invalid item with a schema, an existing file is left unchanged and no
+    partial file is left behind. `fsync` selects when it is synced to disk, see
+    `pyiof.utils.Fsync`.
+    """
+    with atomic_write(path, fsync) as f, deferred_payloads() as payloads:
+        for chunk in iter_xml(message, pretty_print, backend, schema):
+            write_with_payloads(f, chunk, payloads)
@@ -0,0 +1,108 @@
+"""Times as integer ticks of the time resolution.
+
+Times are stored as float seconds in the models, e.g. `PersonRaceResult.time`, while
+`ClassResult.time_resolution` and `ClassStart.time_resolution` declare their resolution.
+Sums and differences of float times aren't exact, e.g. 0.1 + 0.2 != 0.3, so equal times
+can compare unequal. Times converted to int64 ticks, units of the resolution, are exact:
+
+    ticks = to_ticks([r.time for r in results], class_result.time_resolution)
+    order = np.argsort(ticks, kind="stable")
+    seconds = to_seconds(ticks, class_result.time_resolution)
+
+`to_seconds` returns the float nearest to the decimal value of the ticks, e.g. 0.3 for 3
+ticks of 0.1 s, so the XML has exactly the digits of the resolution. Missing times are
+`MISSING` as ticks and NaN as seconds. All conversions are vectorized, resolutions can be
+arrays, e.g. the resolution of each person's class. Requires the ``numpy`` extra.
+
+Serialization rounds the times of the results and splits of a `ClassResult` to its
+resolution in the same way, without numpy, see `BaseXmlModel.to_xml_tree`.
+"""
+
+from typing import Sequence, Union
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError("pyiof.ticks requires numpy, install pyiof[numpy]") from e
+
+from .result import PersonRaceResult
+
+MISSING = np.iinfo(np.int64).min
+"""The ticks of a missing time."""
+
+Resolution = Union[float, np.ndarray]
+
+
+def _per_second(resolution: Resolution) -> np.ndarray:
+    """The ticks per second of resolutions which divide a second, else NaN."""
+    per_second = np.rint(1 / np.asarray(resolution, dtype=float))
+    return np.where(np.isclose(per_second * resolution, 1), per_second, np.nan)
+
+
+def to_ticks(seconds, resolution: Resolution = 1) -> np.ndarray:
+    """Times in seconds as int64 ticks of the resolution, rounded to the nearest tick.
+
+    Args:
+        seconds: the times, None, NaN or infinite if missing
+        resolution: the time resolution in seconds, e.g. 0.1
+    """
+    seconds = np.asarray(seconds, dtype=float)
+    missing = ~np.isfinite(seconds)
+    per_second = _per_second(resolution)
+    with np.errstate(invalid="ignore"):
+        ticks = np.where(
+            np.isnan(per_second), seconds / resolution, seconds * np.nan_to_num(per_second)
+        )
+        return np.where(missing, MISSING, np.rint(ticks)).astype(np.int64)
+
+
+def to_seconds(ticks, resolution: Resolution = 1) -> np.ndarray:
+    """Ticks of the resolution as float seconds, NaN if missing, see `to_ticks`."""
+    ticks = np.asarray(ticks, dtype=np.int64)
+    per_second = _per_second(resolution)
+    with np.errstate(invalid="ignore"):
+        # a division by the ticks per second is the nearest float to the decimal value
+        seconds = np.where(
+            np.isnan(per_second), ticks * resolution, ticks / np.nan_to_num(per_second, nan=1)
+        )
+    return np.where(ticks == MISSING, np.nan, seconds)
+
+
+def quantize(seconds, resolution: Resolution = 1) -> np.ndarray:
+    """Times rounded to the resolution, as written to XML."""
+    return to_seconds(to_ticks(seconds, resolution), resolution)
+
+
+def split_ticks(results: Sequence[PersonRaceResult], resolution: Resolution = 1) -> np.ndarray:
+    """The cumulative split times of results as ticks, one row per result.
+
+    The columns are the split times in the order of the results' `split_time` followed
+    by the time of the result, missing splits and columns of shorter results are
+    `MISSING`.
+    """
+    counts = np.array([len(r.split_time) for r in results], dtype=np.intp)
+    width = int(counts.max(initial=0)) + 1
+    # all split times in one array, scattered into the rows
+    times = np.array(
+        [s.time if s.status != "Missing" else None for r in results for s in r.split_time],
+        dtype=float,
+    )
+    rows = np.repeat(np.arange(len(results)), counts)
+    columns = np.arange(len(times)) - np.repeat(np.cumsum(counts) - counts, counts)
+    seconds = np.full((len(results), width), np.nan)
+    seconds[rows, columns] = times
+    seconds[:, -1] = np.array([r.time for r in results], dtype=float)
+    if np.ndim(resolution):
+        resolution = np.asarray(resolution)[:, None]
+    return to_ticks(seconds, resolution)
+
+
+def leg_ticks(splits: np.ndarray) -> np.ndarray:
+    """The leg times between consecutive splits of `split_ticks`.
+
+    The first leg is from the start, legs next to a missing split are `MISSING`.
+    """
+    splits = np.asarray(splits, dtype=np.int64)
+    previous = np.concatenate([np.zeros((len(splits), 1), dtype=np.int64), splits[:, :-1]], 1)
+    missing = (splits == MISSING) | (previous == MISSING)
+    return np.where(missing, MISSING, splits - np.where(missing, 0, previous))
@@ -0,0 +1,74 @@
+import contextlib
+import functools
+import gc
+import os
+import tempfile
+from typing import IO, Iterator, Literal, Union
+
+"""When written files are synced to disk.
+
+none: not synced, a rename is atomic for other processes, but not after a power loss
+file: the file is synced before it is renamed, so it is complete after a power loss
+all: also the directory is synced after the rename, so the rename is durable
+"""
+Fsync = Literal["none", "file", "all"]
+
+
+@contextlib.contextmanager
+def gc_paused() -> Iterator[None]:
+    """Pause the cyclic garbage collector while creating many objects.
+
+    Creating a large model allocates many container objects, which triggers repeated full
+    collections of the growing model. The models don't contain reference cycles, so
+    collection can safely wait until they are completed.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@functools.cache
+def _umask() -> int:
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+@contextlib.contextmanager
+def atomic_write(path: Union[str, os.PathLike], fsync: Fsync = "none") -> Iterator[IO[bytes]]:
+    """Open a temporary file, which replaces `path` when the block completes.
+
+    Readers of `path` see the old or the new content, never a partially written file. The
+    temporary file is in the same directory and removed if the block raises. A new file
+    gets the permissions of `open`, an existing file keeps its permissions.
+    """
+    path = os.fspath(path)
+    directory, name = os.path.split(path)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask()
+    fd, temporary = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory or ".")
+    try:
+        os.chmod(temporary, mode)
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            if fsync != "none":
+                os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temporary)
+        raise
+    # directories can't be opened on Windows, where renames are journaled
+    if fsync == "all" and os.name == "posix":
+        directory_fd = os.open(directory or ".", os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
@@ -0,0 +1,401 @@
+"""Incremental ingestion of repeatedly rewritten message files.
+
+Event software rewrites its result and start list exports every few seconds, while only a
+few classes change in between. `IncrementalReader` locates the `ClassResult` or
+`ClassStart` elements of a file by their byte ranges (see `pyiof.scanner`) and hashes
+them, so only classes with changed content are parsed again. The changes are reported as
+typed events per entry.
+
+`Watcher` watches a directory with inotify on Linux, and by polling modification times
+elsewhere, and passes the change events to callbacks:
+
+    def on_change(event):
+        if isinstance(event, EntryChanged):
+            print(event.entry_key, event.new)
+
+    watcher = Watcher("exports", callbacks=[on_change])
+    watcher.run()
+"""
+
+import ctypes
+import ctypes.util
+import dataclasses
+import fnmatch
+import hashlib
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, Type
+
+import pydantic_xml
+from lxml import etree
+
+from .compiled import Backend
+from .message_elements import ResultList, StartList
+from .scanner import element_ranges, find_root
+from .streaming import streamed_field
+
+logger = logging.getLogger(__name__)
+
+"""Message element classes by root element name, for messages read by the watcher."""
+MESSAGES: Dict[str, Type[pydantic_xml.BaseXmlModel]] = {
+    "ResultList": ResultList,
+    "StartList": StartList,
+}
+
+# fields of the streamed items holding entries
+_ENTRY_FIELDS = ("person_results", "team_results", "person_starts", "team_starts")
+
+
+@dataclasses.dataclass(frozen=True)
+class ChangeEvent:
+    """Base class of change events.
+
+    Attributes:
+        path (str): Path of the changed file.
+    """
+
+    path: str
+
+
+@dataclasses.dataclass(frozen=True)
+class MessageRead(ChangeEvent):
+    """A file has been read, emitted before the entry events of the file.
+
+    Attributes:
+        message (BaseXmlModel): The new content of the file.
+    """
+
+    message: Any
+
+
+@dataclasses.dataclass(frozen=True)
+class EntryAdded(ChangeEvent):
+    """An entry (e.g. a PersonResult) has been added to a class.
+
+    Attributes:
+        class_key (tuple): Key of the class, see `class_key`.
+        entry_key (tuple): Key of the entry, see `entry_key`.
+        entry (BaseXmlModel): The new entry.
+    """
+
+    class_key: Hashable
+    entry_key: Hashable
+    entry: Any
+
+
+@dataclasses.dataclass(frozen=True)
+class EntryRemoved(ChangeEvent):
+    """An entry has been removed from a class.
+
+    Attributes:
+        class_key (tuple): Key of the class, see `class_key`.
+        entry_key (tuple): Key of the entry, see `entry_key`.
+        entry (BaseXmlModel): The removed entry.
+    """
+
+    class_key: Hashable
+    entry_key: Hashable
+    entry: Any
+
+
+@dataclasses.dataclass(frozen=True)
+class EntryChanged(ChangeEvent):
+    """The result (or start) of an entry has changed.
+
+    Attributes:
+        class_key (tuple): Key of the class, see `class_key`.
+        entry_key (tuple): Key of the entry, see `entry_key`.
+        old (BaseXmlModel): The previous entry.
+        new (BaseXmlModel): The new entry.
+    """
+
+    class_key: Hashable
+    entry_key: Hashable
+    old: Any
+    new: Any
+
+
+Callback = Callable[[ChangeEvent], None]
+
+
+def class_key(item: Any) -> Tuple[str, str]:
+    """Key of a class result or class start: the class id, or the class name."""
+    class_ = item.class_
+    if class_.id is not None and class_.id.id:
+        return ("id", class_.id.id)
+    return ("name", class_.name)
+
+
+def entry_key(entry: Any) -> Tuple[str, ...]:
+    """Key of an entry: the entry id, the first person id, or the name."""
+    if entry.entry_id is not None and entry.entry_id.id:
+        return ("entry", entry.entry_id.id)
+    person = getattr(entry, "person", None)
+    if person is not None:
+        if person.ids:
+            return ("person", person.ids[0].id)
+        organisation = entry.organisation.name if entry.organisation is not None else ""
+        return ("name", person.name.family_name, person.name.given_name, organisation)
+    return ("team", entry.name or "")
+
+
+def _entries(item: Any) -> Iterator[Tuple[Hashable, Any]]:
+    seen: Dict[Hashable, int] = {}
+    for name in _ENTRY_FIELDS:
+        for entry in getattr(item, name, ()):
+            key = entry_key(entry)
+            count = seen[key] = seen.get(key, 0) + 1
+            # entries with the same key are told apart by their order
+            yield (key if count == 1 else (*key, count)), entry
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class IncrementalReader:
+    """Reads successive versions of a message file, parsing only changed classes.
+
+    Attributes:
+        cls (type): The message element class, e.g. `pyiof.ResultList`.
+        message (BaseXmlModel, optional): The message of the last read.
+    """
+
+    def __init__(self, cls: Type[pydantic_xml.BaseXmlModel], backend: Backend = "compiled"):
+        self.cls = cls
+        self.backend = backend
+        self.message: Optional[Any] = None
+        self._field = streamed_field(cls)
+        self._tag = self._field.xml_name.rpartition("}")[2]
+        self._header_digest: Optional[bytes] = None
+        self._header: Optional[Any] = None
+        self._items: Dict[bytes, Any] = {}
+
+    def read(self, data: bytes, path: str = "") -> List[ChangeEvent]:
+        """Read a new version of the file.
+
+        Returns:
+            the change events since the previous version, starting with `MessageRead`
+        """
+        root = find_root(data)
+        ranges = element_ranges(data, self._tag, root.start_tag[1], root.end_tag[0])
+
+        # the message without the items
+        segments = []
+        position = 0
+        for start, end in ranges:
+            segments.append(data[position:start])
+            position = end
+        segments.append(data[position:])
+        header = b"".join(segments)
+        header_digest = _digest(header)
+        if header_digest != self._header_digest:
+            self._header = self.cls.from_xml(header, backend=self.backend)
+            self._header_digest = header_digest
+
+        wrapper = (data[slice(*root.start_tag)], data[slice(*root.end_tag)])
+        items: Dict[bytes, Any] = {}
+        added = []
+        order = []
+        for start, end in ranges:
+            digest = _digest(data[start:end])
+            if digest in self._items:
+                items[digest] = self._items[digest]
+            elif digest not in items:
+                items[digest] = self._parse_item(data[start:end], wrapper)
+                added.append(items[digest])
+            order.append(items[digest])
+        removed = [item for digest, item in self._items.items() if digest not in items]
+        self._items = items
+
+        assert self._header is not None
+        self.message = self._header.model_copy(update={self._field.name: order})
+        events: List[ChangeEvent] = [MessageRead(path, self.message)]
+        events.extend(_diff(path, removed, added))
+        return events
+
+    def _parse_item(self, data: bytes, wrapper: Tuple[bytes, bytes]) -> Any:
+        # the start tag of the root declares the namespaces
+        root = etree.fromstring(wrapper[0] + data + wrapper[1])
+        model = self._field.model
+        assert model is not None
+        return model.from_xml_tree(root[0], backend=self.backend)
+
+
+def _diff(path: str, removed: List[Any], added: List[Any]) -> Iterator[ChangeEvent]:
+    """Change events of the entries of changed classes."""
+    old = {(class_key(item), key): entry for item in removed for key, entry in _entries(item)}
+    new = {(class_key(item), key): entry for item in added for key, entry in _entries(item)}
+    for key, entry in new.items():
+        if key not in old:
+            yield EntryAdded(path, key[0], key[1], entry)
+        elif old[key] != entry:
+            yield EntryChanged(path, key[0], key[1], old[key], entry)
+    for key, entry in old.items():
+        if key not in new:
+            yield EntryRemoved(path, key[0], key[1], entry)
+
+
+class _Inotify:
+    """Minimal inotify binding, watching a directory for completely written files."""
+
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_NONBLOCK = 0o4000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def wait(self, timeout: float) -> List[str]:
+        """Names of files written within the timeout."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(buffer):
+            _, _, _, length = self._EVENT.unpack_from(buffer, offset)
+            offset += self._EVENT.size
+            names.append(os.fsdecode(buffer[offset : offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher:
+    """Watches a directory for changed result and start list files.
+
+    Files are read with an `IncrementalReader` per file, the message class is determined
+    from the root element (see `MESSAGES`). Files which can't be read, e.g. because they
+    are still being written, are retried on the next change or poll.
+
+    Attributes:
+        directory (str): The watched directory.
+        pattern (str): Glob pattern of the watched file names.
+        interval (float): Polling interval in seconds, also the maximum delay of `stop`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        callbacks: Optional[List[Callback]] = None,
+        pattern: str = "*.xml",
+        interval: float = 1.0,
+        use_inotify: Optional[bool] = None,
+        backend: Backend = "compiled",
+    ):
+        """
+        Args:
+            directory (str): directory to watch
+            callbacks (list, optional): functions called with each change event
+            pattern (str): glob pattern of watched file names
+            interval (float): polling interval in seconds
+            use_inotify (bool, optional): use inotify, by default if it is available
+            backend (str): parser backend, see `BaseXmlModel.from_xml_tree`
+        """
+        self.directory = directory
+        self.callbacks: List[Callback] = list(callbacks or [])
+        self.pattern = pattern
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.backend = backend
+        self._readers: Dict[str, IncrementalReader] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._stop = threading.Event()
+
+    def add_callback(self, callback: Callback) -> None:
+        self.callbacks.append(callback)
+
+    def _emit(self, events: List[ChangeEvent]) -> None:
+        for event in events:
+            for callback in self.callbacks:
+                callback(event)
+
+    def check(self, path: str) -> List[ChangeEvent]:
+        """Read a file if it has changed since the last check, and emit the change events."""
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._stats.pop(path, None)
+            return []
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._stats.get(path) == signature:
+            return []
+
+        reader = self._readers.get(path)
+        try:
+            if reader is None:
+                cls = MESSAGES.get(find_root(data).name.rpartition(b":")[2].decode())
+                if cls is None:
+                    self._stats[path] = signature
+                    return []
+                reader = IncrementalReader(cls, backend=self.backend)
+            events = reader.read(data, path)
+        except (ValueError, etree.XMLSyntaxError) as e:
+            # incomplete file or invalid content, retried on the next change
+            logger.warning("could not read %s: %s", path, e)
+            return []
+        self._readers[path] = reader
+        self._stats[path] = signature
+        self._emit(events)
+        return events
+
+    def poll(self) -> List[ChangeEvent]:
+        """Check all files of the directory once."""
+        events = []
+        for name in sorted(os.listdir(self.directory)):
+            if fnmatch.fnmatch(name, self.pattern):
+                events.extend(self.check(os.path.join(self.directory, name)))
+        return events
+
+    def run(self) -> None:
+        """Watch the directory until `stop` is called."""
+        self._stop.clear()
+        inotify = None
+        if self.use_inotify is not False:
+            try:
+                inotify = _Inotify(self.directory)
+            except (OSError, AttributeError):
+                if self.use_inotify:
+                    raise
+        try:
+            self.poll()
+            while not self._stop.is_set():
+                if inotify is None:
+                    self._stop.wait(self.interval)
+                    self.poll()
+                    continue
+                for name in sorted(set(inotify.wait(self.interval))):
+                    if fnmatch.fnmatch(name, self.pattern):
+                        self.check(os.path.join(self.directory, name))
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def start(self) -> threading.Thread:
+        """Watch the directory in a background thread."""
+        thread = threading.Thread(target=self.run, name="pyiof-watcher", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,171 @@
+"""Non-blocking atomic writes of messages.
+
+`BackgroundWriter` writes messages on a background thread, each to a temporary file which
+atomically replaces the target, so a crash never leaves a truncated file for readers such
+as web servers. A results loop can submit a new snapshot every few seconds without
+waiting for I/O:
+
+    with BackgroundWriter(backend="compiled", fsync="file") as writer:
+        while running:
+            result_list = export_results()
+            writer.submit(result_list, "public/results.xml")
+            time.sleep(5)
+
+Writes to the same target are coalesced: a snapshot submitted while an earlier one is
+still waiting replaces it, so only the latest snapshot is written. The futures of both
+submissions complete when it has been written. Serialization can run in a process pool
+to avoid contention on the GIL with the submitting thread, the messages are then pickled
+between the processes.
+
+Writers which aren't closed are closed at interpreter exit, after their submitted
+messages have been written. By then a process pool executor has been shut down, the
+remaining messages are serialized on the background thread.
+"""
+
+import atexit
+import collections
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Optional, Tuple, Union
+
+import pydantic_xml
+
+from .compiled import Backend
+from .utils import Fsync
+
+logger = logging.getLogger(__name__)
+
+
+def _write(message: pydantic_xml.BaseXmlModel, path: str, backend: Backend, fsync: Fsync) -> None:
+    message.write_xml(path, backend=backend, atomic=True, fsync=fsync)  # type: ignore
+
+
+class BackgroundWriter:
+    """Writes messages atomically on a background thread, coalescing writes per target.
+
+    A message must not be modified after it has been submitted, until its future has
+    completed: submit a copy of a message which is updated in place, e.g.
+    `result_list.model_copy(deep=True)`.
+
+    Args:
+        backend: the serializer backend, see `BaseXmlModel.to_xml_tree`
+        fsync: when the files are synced to disk: "none", "file" or "all", see
+            `pyiof.utils.Fsync`
+        executor: executor for serialization, e.g. a `ProcessPoolExecutor`, by default
+            the messages are serialized on the background thread, and when the executor
+            has been shut down
+    """
+
+    def __init__(
+        self,
+        backend: Backend = "compiled",
+        fsync: Fsync = "file",
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        self.backend = backend
+        self.fsync = fsync
+        self.executor = executor
+        self._condition = threading.Condition()
+        # the latest snapshot waiting for each target, in submission order
+        self._pending: collections.OrderedDict[str, Tuple[Any, concurrent.futures.Future]] = (
+            collections.OrderedDict()
+        )
+        self._writing: Optional[str] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="pyiof-writer", daemon=True)
+        self._thread.start()
+        # a daemon thread doesn't keep the interpreter from exiting, the submitted
+        # messages are written at exit instead
+        atexit.register(self.close)
+
+    def submit(
+        self, message: pydantic_xml.BaseXmlModel, path: Union[str, os.PathLike]
+    ) -> concurrent.futures.Future:
+        """Write a message to a file in the background.
+
+        Returns:
+            a future completing when the message, or a later one submitted for the same
+            file, has been written, or with the exception of the write
+        """
+        path = os.path.abspath(os.fspath(path))
+        with self._condition:
+            if self._closed:
+                raise ValueError("BackgroundWriter: submit after close")
+            if path in self._pending and not self._pending[path][1].cancelled():
+                # coalesce with the waiting snapshot, which isn't written anymore
+                _, future = self._pending[path]
+            else:
+                future = concurrent.futures.Future()
+            self._pending[path] = (message, future)
+            self._condition.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                path, (message, future) = self._pending.popitem(last=False)
+                self._writing = path
+            if future.set_running_or_notify_cancel():
+                try:
+                    self._write(message, path)
+                except BaseException as e:
+                    logger.exception("writing %s failed", path)
+                    future.set_exception(e)
+                else:
+                    future.set_result(None)
+            with self._condition:
+                self._writing = None
+                self._condition.notify_all()
+
+    def _write(self, message: pydantic_xml.BaseXmlModel, path: str) -> None:
+        args = (message, path, self.backend, self.fsync)
+        if self.executor is not None:
+            try:
+                written = self.executor.submit(_write, *args)
+            except RuntimeError:
+                # the executor has been shut down, e.g. at interpreter exit
+                pass
+            else:
+                written.result()
+                return
+        _write(*args)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all submitted messages have been written.
+
+        Returns:
+            False if the timeout expired before
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and self._writing is None, timeout
+            )
+
+    def close(self, wait: bool = True) -> None:
+        """Stop accepting messages, and write the submitted ones if `wait`.
+
+        Without waiting, the messages not being written yet are cancelled. Writers are
+        closed with waiting at interpreter exit.
+        """
+        atexit.unregister(self.close)
+        with self._condition:
+            self._closed = True
+            if not wait:
+                for _, future in self._pending.values():
+                    future.cancel()
+                self._pending.clear()
+            self._condition.notify_all()
+        if wait:
+            self._thread.join()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
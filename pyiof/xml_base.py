@@ -1,8 +1,64 @@
-from typing import Self, cast
+import concurrent.futures
+import os
+import typing
+from typing import Any, Dict, Iterator, Optional, Self, Set, cast
 
+import pydantic
 import pydantic_xml
+from lxml import etree
 from pydantic_xml import attr, element  # noqa: F401
 
+from . import aio, compiled, hashing, profiling
+from .cache import DEFAULT_MAX_SIZE, ParseCache
+from .compiled import Backend
+from .payload import ImageStorage, deferred_payloads, write_with_payloads
+from .utils import Fsync, atomic_write
+
+
+def _submodels(annotation: Any) -> Iterator[type]:
+    """The XML model classes referenced by a field annotation."""
+    if isinstance(annotation, type) and issubclass(annotation, pydantic_xml.BaseXmlModel):
+        yield annotation
+    for arg in typing.get_args(annotation):
+        yield from _submodels(arg)
+
+
+_NAMESPACE = "{http://www.orienteering.org/datastandard/3.0}"
+# the result times rounded to the time resolution of their class, by parent element
+_TIME_TAGS = (f"{_NAMESPACE}Time", f"{_NAMESPACE}TimeBehind")
+_TIME_PARENTS = {f"{_NAMESPACE}{tag}" for tag in ("Result", "OverallResult", "SplitTime")}
+
+
+def _quantize_times(root: etree._Element) -> None:
+    """Round the result times of the class results in a tree to their time resolution.
+
+    Sums of float times aren't exact, e.g. 0.1 + 0.2 is written as 0.30000000000000004,
+    rounded to the ticks of the resolution it's 0.3 as with `pyiof.ticks.quantize`.
+    """
+    for class_result in root.iter(f"{_NAMESPACE}ClassResult"):
+        resolution = float(class_result.get("timeResolution") or 1)
+        if not resolution > 0:
+            continue
+        # a division by the ticks per second gives the nearest float to the decimal value
+        per_second = round(1 / resolution)
+        divides = per_second > 0 and abs(per_second * resolution - 1) < 1e-9
+        for time in class_result.iter(*_TIME_TAGS):
+            text = time.text
+            parent = time.getparent()
+            if not text or parent is None or parent.tag not in _TIME_PARENTS:
+                continue
+            seconds = float(text)
+            if divides:
+                quantized = round(seconds * per_second) / per_second
+            else:
+                quantized = round(seconds / resolution) * resolution
+            if quantized != seconds:
+                time.text = str(quantized)
+
+
+# model classes with pydantic schema and XML serializers built for all submodels
+_built: Set[type] = set()
+
 
 class BaseXmlModel(  # type: ignore
     pydantic_xml.BaseXmlModel,
@@ -11,26 +67,249 @@ class BaseXmlModel(  # type: ignore
         "xsi": "http://www.w3.org/2001/XMLSchema-instance",
     },
 ):
-    def to_xml_tree(self, exclude_none: bool = True, **kwargs):
-        return super().to_xml_tree(exclude_none=exclude_none, **kwargs)
-
-    def to_xml(self, pretty_print: bool = True, **kwargs) -> bytes:
-        return cast(
-            bytes,
-            super().to_xml(
-                pretty_print=pretty_print,
-                xml_declaration=True,
-                encoding="UTF-8",
-                skip_empty=True,
-                **kwargs,
-            ),
-        )
+    # Schemas and XML serializers are built on first use instead of at import time,
+    # see `_build_xml_serializers`
+    model_config = pydantic.ConfigDict(defer_build=True)
+
+    # memoized content hashes, see `pyiof.hashing`, not copied or pickled
+    __slots__ = ("__pyiof_hash__",)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        hashing.invalidate(self)
+
+    def content_hash(self, ignore_modify_time: bool = False) -> str:
+        """A stable hash of the content of this model and its submodels.
+
+        Hashes are memoized and updated incrementally after fields are assigned or
+        lists are changed in place, checking the lists takes time linear in the size of
+        the model, see `pyiof.hashing.content_hash`.
+
+        Args:
+            ignore_modify_time (bool): leave out the `modify_time` fields
+        """
+        return hashing.content_hash(self, ignore_modify_time)
+
+    @classmethod
+    def _build_xml_serializers(cls) -> None:
+        """Build the deferred schema and XML serializer of this model and its submodels."""
+        if cls in _built:
+            return
+        pending = [cls]
+        seen = {cls}
+        while pending:
+            model = pending.pop()
+            if model.__xml_serializer__ is None:
+                model.model_rebuild()
+            for field_info in model.model_fields.values():
+                for submodel in _submodels(field_info.annotation):
+                    if submodel not in seen:
+                        seen.add(submodel)
+                        pending.append(submodel)
+        _built.update(seen)
+
+    def to_xml_tree(
+        self, exclude_none: bool = True, backend: Backend = "pydantic_xml", **kwargs
+    ) -> etree._Element:
+        """Serialize to an lxml tree.
+
+        Args:
+            exclude_none (bool): don't create elements and attributes for None values
+            backend (str): "pydantic_xml" for the generic serializer, "compiled" for
+                serializers generated per model class (see `pyiof.compiled`).
+                Both produce the same output.
+
+        The times of results and splits in a `ClassResult` are rounded to its
+        `time_resolution`, the model keeps the unrounded times.
+        """
+        self._build_xml_serializers()
+        if backend == "compiled":
+            tree = compiled.to_xml_tree(self, exclude_none=exclude_none, **kwargs)
+        else:
+            tree = super().to_xml_tree(exclude_none=exclude_none, **kwargs)
+        _quantize_times(tree)
+        return tree
+
+    def to_xml(
+        self,
+        pretty_print: bool = True,
+        backend: Backend = "pydantic_xml",
+        skip_empty: bool = True,
+        exclude_none: bool = False,
+        exclude_unset: bool = False,
+        **kwargs,
+    ) -> bytes:
+        """Serialize to XML.
+
+        Args:
+            pretty_print (bool): indent the XML
+            backend (str): serializer backend, see `to_xml_tree`
+            skip_empty (bool): don't create elements for empty values
+            exclude_none (bool): don't create elements and attributes for None values
+            exclude_unset (bool): don't create elements and attributes for unset fields
+            kwargs: further options of `lxml.etree.tostring`, e.g. `standalone`
+        """
+        with profiling.profiled("to_xml", type(self).__name__, backend):
+            with profiling.phase("serialize"):
+                tree = self.to_xml_tree(
+                    skip_empty=skip_empty,
+                    exclude_none=exclude_none,
+                    exclude_unset=exclude_unset,
+                    backend=backend,
+                )
+            with profiling.phase("encode"):
+                data = etree.tostring(
+                    tree,
+                    pretty_print=pretty_print,
+                    xml_declaration=True,
+                    encoding="UTF-8",
+                    **kwargs,
+                )
+            profiling.record_tree(tree, len(data))
+        return data
+
+    @classmethod
+    def from_xml_tree(
+        cls,
+        root: etree._Element,
+        context: Optional[Dict[str, Any]] = None,
+        empty_as_string: bool = False,
+        backend: Backend = "pydantic_xml",
+    ) -> Self:
+        """Deserialize from an lxml tree.
+
+        Args:
+            root: the root element
+            context (dict, optional): pydantic validation context
+            empty_as_string (bool): read empty elements as empty strings instead of None
+            backend (str): "pydantic_xml" for the generic parser, "compiled" for parsers
+                generated per model class (see `pyiof.compiled`). Both produce the same
+                models, the compiled backend falls back to pydantic_xml on invalid input.
+        """
+        cls._build_xml_serializers()
+        if backend == "compiled" and not empty_as_string:
+            model = compiled.from_xml_tree(cls, root, context=context)
+            if model is not None:
+                return cast(Self, model)
+        return super().from_xml_tree(root, context=context, empty_as_string=empty_as_string)
+
+    @classmethod
+    def from_xml(
+        cls,
+        source: str | bytes,
+        context: Optional[Dict[str, Any]] = None,
+        empty_as_string: bool = False,
+        backend: Backend = "pydantic_xml",
+        **kwargs,
+    ) -> Self:
+        with profiling.profiled("from_xml", cls.__name__, backend):
+            with profiling.phase("parse"):
+                root = etree.fromstring(source, **kwargs)
+            profiling.record_tree(root, len(source))
+            with profiling.phase("validate"):
+                return cls.from_xml_tree(
+                    root, context=context, empty_as_string=empty_as_string, backend=backend
+                )
 
     @classmethod
-    def read_xml(cls, path: str) -> Self:
-        with open(path, "rb") as f:
-            return cls.from_xml(f.read())
+    def read_xml(
+        cls,
+        path: str,
+        image_storage: Optional[ImageStorage] = None,
+        backend: Backend = "pydantic_xml",
+        cache_dir: Optional[str | os.PathLike] = None,
+        cache_max_size: int = DEFAULT_MAX_SIZE,
+    ) -> Self:
+        """Read a message from an XML file.
+
+        Args:
+            path (str): path of the XML file
+            image_storage (ImageStorage, optional): keep large embedded images as byte
+                buffers or temporary files instead of strings
+            backend (str): parser backend, see `from_xml_tree`
+            cache_dir (str, optional): directory of a persistent cache of parsed messages,
+                keyed by file content (see `pyiof.cache`). Cache hits skip parsing and
+                validation.
+            cache_max_size (int): size limit of the cache directory in bytes
+        """
+        with profiling.profiled("read_xml", cls.__name__, backend, os.fspath(path)) as profile:
+            context: Optional[Dict[str, Any]] = None
+            if image_storage is not None:
+                context = {"image_storage": image_storage}
+            with profiling.phase("read"), open(path, "rb") as f:
+                data = f.read()
+            if cache_dir is None:
+                return cls.from_xml(data, context=context, backend=backend)
+
+            with profiling.phase("cache"):
+                cache = ParseCache(cache_dir, max_size=cache_max_size)
+                key = cache.key(cls, data, image_storage)
+                model = cache.load(key)
+            if not isinstance(model, cls):
+                model = cls.from_xml(data, context=context, backend=backend)
+                with profiling.phase("cache"):
+                    cache.store(key, model)
+            elif profile is not None:
+                profile.bytes = len(data)
+            return model
+
+    @classmethod
+    async def aread_xml(
+        cls, path: str, executor: Optional[concurrent.futures.Executor] = None, **kwargs
+    ) -> Self:
+        """Read a message from an XML file without blocking the event loop.
+
+        Args:
+            path (str): path of the XML file
+            executor (Executor, optional): thread or process pool executor for parsing,
+                defaults to the thread pool of the event loop
+            **kwargs: options of `read_xml`
+        """
+        return await aio.run(executor, cls.read_xml, path, **kwargs)
+
+    def write_xml(
+        self,
+        path: str,
+        backend: Backend = "pydantic_xml",
+        atomic: bool = False,
+        fsync: Fsync = "none",
+    ) -> None:
+        """Write a message to an XML file.
+
+        Args:
+            path (str): path of the XML file
+            backend (str): serializer backend, see `to_xml_tree`
+            atomic (bool): write a temporary file and rename it, so readers never see a
+                partially written file, see `pyiof.utils.atomic_write`
+            fsync (str): when an atomic write is synced to disk: "none", "file" or "all"
+        """
+        with (
+            profiling.profiled("write_xml", type(self).__name__, backend, os.fspath(path)),
+            atomic_write(path, fsync) if atomic else open(path, "wb") as f,
+            deferred_payloads() as payloads,
+        ):
+            data = self.to_xml(backend=backend)
+            with profiling.phase("write"):
+                write_with_payloads(f, data, payloads)
+
+    async def awrite_xml(
+        self,
+        path: str,
+        backend: Backend = "pydantic_xml",
+        executor: Optional[concurrent.futures.Executor] = None,
+        atomic: bool = False,
+        fsync: Fsync = "none",
+    ) -> None:
+        """Write a message to an XML file without blocking the event loop.
+
+        The model must not be modified until the write has completed.
 
-    def write_xml(self, path: str) -> None:
-        with open(path, "wb") as f:
-            f.write(self.to_xml())
+        Args:
+            path (str): path of the XML file
+            backend (str): serializer backend, see `to_xml_tree`
+            executor (Executor, optional): thread or process pool executor for
+                serialization, defaults to the thread pool of the event loop
+            atomic (bool): write a temporary file and rename it, see `write_xml`
+            fsync (str): when an atomic write is synced to disk, see `write_xml`
+        """
+        await aio.run(executor, self.write_xml, path, backend=backend, atomic=atomic, fsync=fsync)
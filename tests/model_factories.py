@@ -1,10 +1,12 @@
-from typing import Generic, TypeVar
+import base64
+from typing import Any, Callable, Generic, TypeVar
 
 from polyfactory import Ignore
 from polyfactory.factories.base import T
 from polyfactory.factories.pydantic_factory import ModelFactory
 
 import pyiof
+from pyiof.payload import ImagePayload
 
 
 class CustomModelFactory(ModelFactory[T]):  # type: ignore
@@ -18,6 +20,15 @@ class CustomModelFactory(ModelFactory[T]):  # type: ignore
     too_few_entries_substitute_class = Ignore()
     too_many_entries_substitute_class = Ignore()
 
+    @classmethod
+    def get_provider_map(cls) -> dict[Any, Callable[[], Any]]:
+        return {
+            ImagePayload: lambda: ImagePayload.from_base64(
+                base64.b64encode(cls.__faker__.binary(12)), "buffer"
+            ),
+            **super().get_provider_map(),
+        }
+
 
 class ClassListFactory(CustomModelFactory[pyiof.ClassList]):
     __model__ = pyiof.ClassList
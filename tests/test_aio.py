@@ -0,0 +1,91 @@
+import asyncio
+import concurrent.futures
+import contextlib
+from pathlib import Path
+
+import pytest
+
+import pyiof
+from pyiof.aio import aiter_json, aiterate, astream_message
+
+RESULTLIST = Path(__file__).parent / "testdata" / "resultlist" / "generated.xml"
+
+
+def test_aread_awrite_xml(tmp_path):
+    async def main():
+        resultlist = await pyiof.ResultList.aread_xml(str(RESULTLIST), backend="compiled")
+        await resultlist.awrite_xml(str(tmp_path / "results.xml"))
+        return resultlist
+
+    resultlist = asyncio.run(main())
+    assert resultlist == pyiof.ResultList.read_xml(str(RESULTLIST))
+    assert (tmp_path / "results.xml").read_bytes() == resultlist.to_xml()
+
+
+def test_aread_xml_process_pool():
+    async def main():
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+            return await pyiof.ResultList.aread_xml(str(RESULTLIST), executor=executor)
+
+    assert asyncio.run(main()) == pyiof.ResultList.read_xml(str(RESULTLIST))
+
+
+def test_astream_message():
+    async def main():
+        stream = await astream_message(str(RESULTLIST), pyiof.ResultList)
+        return stream.header, [item async for item in stream.items]
+
+    header, class_results = asyncio.run(main())
+    expected = pyiof.ResultList.read_xml(str(RESULTLIST))
+    assert header.event == expected.event
+    assert class_results == expected.class_results
+
+
+def test_aiter_json():
+    resultlist = pyiof.ResultList.read_xml(str(RESULTLIST))
+
+    async def main():
+        return [chunk async for chunk in aiter_json(resultlist)]
+
+    assert "".join(asyncio.run(main())) == resultlist.to_json()
+
+
+def test_aiterate_backpressure_and_close():
+    produced = []
+
+    def numbers():
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield i
+        finally:
+            produced.append("closed")
+
+    async def main():
+        items = aiterate(numbers())
+        async for i in items:
+            if i == 2:
+                break
+        await items.aclose()
+        # the generator has been closed in the executor
+        assert produced[-1] == "closed"
+
+    asyncio.run(main())
+    assert produced == [0, 1, 2, "closed"]
+
+
+def test_aiterate_close_error():
+    def numbers():
+        try:
+            yield 1
+            yield 2
+        finally:
+            raise OSError("close failed")
+
+    async def main():
+        async with contextlib.aclosing(aiterate(numbers())) as items:
+            async for _ in items:
+                break
+
+    with pytest.raises(OSError, match="close failed"):
+        asyncio.run(main())
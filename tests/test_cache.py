@@ -0,0 +1,68 @@
+import os
+import pickle
+from pathlib import Path
+
+import pytest
+
+import pyiof
+from pyiof.cache import ParseCache
+from pyiof.payload import ImagePayload
+
+EXAMPLE = Path(__file__).parent / "testdata" / "resultlist" / "generated.xml"
+
+
+def test_read_xml_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    expected = pyiof.ResultList.read_xml(str(EXAMPLE))
+
+    assert pyiof.ResultList.read_xml(str(EXAMPLE), cache_dir=cache_dir) == expected
+    assert len(list(cache_dir.iterdir())) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cache hit expected")
+
+    monkeypatch.setattr(pyiof.ResultList, "from_xml", fail)
+    cached = pyiof.ResultList.read_xml(str(EXAMPLE), cache_dir=cache_dir)
+    assert cached == expected
+    assert cached.to_xml() == expected.to_xml()
+
+
+def test_cache_key_depends_on_content_and_class(tmp_path):
+    cache = ParseCache(tmp_path)
+    data = EXAMPLE.read_bytes()
+    key = cache.key(pyiof.ResultList, data)
+    assert key == cache.key(pyiof.ResultList, data)
+    assert key != cache.key(pyiof.ResultList, data + b"\n")
+    assert key != cache.key(pyiof.StartList, data)
+    assert key != cache.key(pyiof.ResultList, data, options="spill")
+
+
+def test_cache_corrupt_entry(tmp_path):
+    cache = ParseCache(tmp_path)
+    key = cache.key(pyiof.ResultList, b"")
+    (tmp_path / (key + ".pyiof-cache")).write_bytes(b"not a pickle")
+    assert cache.load(key) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_eviction(tmp_path):
+    cache = ParseCache(tmp_path, max_size=2500)
+    for i in range(3):
+        cache.store(str(i), b"x" * 1000)
+        os.utime(tmp_path / f"{i}.pyiof-cache", (i, i))
+    assert cache.load("0") is None
+    assert cache.load("1") is not None
+    cache.store("3", b"x" * 1000)
+    # "1" was used more recently than "2"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["1.pyiof-cache", "3.pyiof-cache"]
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_pickle_image_payload(tmp_path, spill):
+    payload = ImagePayload.from_base64(
+        "AAECAw==", mode="spill" if spill else "buffer", directory=str(tmp_path)
+    )
+    restored = pickle.loads(pickle.dumps(payload))
+    assert restored == payload
+    if spill:
+        assert restored.path not in (None, payload.path)
@@ -0,0 +1,107 @@
+import pytest
+
+import pyiof
+from pyiof.cards import CardRegistry
+from pyiof.generator import EventGenerator
+
+
+@pytest.fixture(scope="module")
+def messages():
+    generator = EventGenerator(seed=3, runners=80, classes=4, clubs=6, teams=3)
+    return {name: generator.build(name) for name in ("ControlCardList", "EntryList", "StartList")}
+
+
+def registry(messages):
+    cards = CardRegistry(default_system="SI")
+    for message in messages.values():
+        cards.add(message)
+    return cards
+
+
+def test_rental_cards(messages):
+    cards = registry(messages)
+    rental = messages["ControlCardList"].control_cards[0]
+    assert cards.is_rental(rental)
+    assert cards.is_rental(rental.id)
+    assert cards.owner(rental) == messages["ControlCardList"].owner
+    assert not cards.is_rental("no such card")
+    assert cards.owner("no such card") is None
+
+    missing = cards.missing_returns()
+    assert missing
+    assert all(cards.is_rental(key) and cards.uses(key) for key in missing)
+    cards.mark_returned(missing[0])
+    assert missing[0] not in cards.missing_returns()
+    cards.mark_returned(missing[0], returned=False)
+    assert missing[0] in cards.missing_returns()
+
+
+def test_uses_and_duplicates(messages):
+    cards = registry(messages)
+    assert not cards.duplicates()
+    start = messages["StartList"].class_starts[0].person_starts[0]
+    card = start.starts[0].control_card[0]
+    # in the entry list and the start list
+    assert len(cards.uses(card)) == 2
+    assert cards.holders(card) == [start.person]
+
+    other = messages["StartList"].class_starts[1].person_starts[0].person
+    conflicts = cards.assign(card, other)
+    assert [use.record for use in conflicts] == [u.record for u in cards.uses(card)[:2]]
+    assert cards.is_duplicate(card)
+    assert list(cards.duplicates()) == [cards.key(card)]
+    assert len(cards.duplicates()[cards.key(card)]) == 3
+    cards.unassign(card, other)
+    assert not cards.is_duplicate(card)
+    assert cards.assign(card, start.person) == []
+
+    # the entry is for race 1 only
+    assert cards.assign(card, other, race=2) == []
+    assert not cards.is_duplicate(card)
+
+
+def test_holders_by_id():
+    def person(family_name, person_id=None):
+        return pyiof.Person(
+            ids=[pyiof.Id(id=person_id)] if person_id else [],
+            name=pyiof.PersonName(family_name=family_name, given_name="Anna"),
+        )
+
+    cards = CardRegistry(default_system="SI")
+    cards.assign("123", person("Berg", "1"))
+    # the same person with another spelling of the name replaces the assignment
+    assert cards.assign("123", person("Bergh", "1")) == []
+    assert len(cards.uses("123")) == 1
+    # a namesake
+    assert len(cards.assign("123", person("Berg", "2"))) == 1
+    assert cards.is_duplicate("123")
+    # persons without id by name
+    assert cards.assign("456", person("Lind")) == []
+    assert cards.assign("456", person("LIND")) == []
+    assert len(cards.assign("456", person("Lund"))) == 1
+
+
+def test_replace_and_remove_sources(messages):
+    cards = registry(messages)
+    count = len(cards)
+    card = messages["StartList"].class_starts[0].person_starts[0].starts[0].control_card[0]
+    cards.add(messages["StartList"])
+    assert len(cards) == count
+    assert len(cards.uses(card)) == 2
+
+    cards.remove("EntryList")
+    cards.remove("StartList")
+    assert card not in cards
+    cards.remove("ControlCardList")
+    assert len(cards) == 0
+    assert not cards.missing_returns()
+
+
+def test_add_classes_separately(messages):
+    cards = CardRegistry(default_system="SI")
+    for class_start in messages["StartList"].class_starts:
+        cards.add(class_start, source=("StartList", class_start.class_.name))
+    whole = registry({"StartList": messages["StartList"]})
+    assert len(cards) == len(whole)
+    with pytest.raises(TypeError, match="can't index"):
+        cards.add(pyiof.PersonName())
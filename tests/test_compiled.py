@@ -0,0 +1,174 @@
+import concurrent.futures
+import threading
+from pathlib import Path
+
+import pydantic
+import pydantic_xml
+import pytest
+from lxml import etree
+
+import pyiof
+from pyiof import compiled
+from pyiof.generator import EventGenerator
+from pyiof.schema import Schema
+
+from .xml_validator import iof_xml_schema
+
+MESSAGES = {
+    "competitorlist": pyiof.CompetitorList,
+    "organisationlist": pyiof.OrganisationList,
+    "eventlist": pyiof.EventList,
+    "classlist": pyiof.ClassList,
+    "entrylist": pyiof.EntryList,
+    "coursedata": pyiof.CourseData,
+    "startlist": pyiof.StartList,
+    "resultlist": pyiof.ResultList,
+    "servicerequestlist": pyiof.ServiceRequestList,
+    "controlcardlist": pyiof.ControlCardList,
+}
+
+EXAMPLE_FILES = sorted((Path(__file__).parent / "testdata").glob("*/*.xml"))
+
+
+def read_example(path: Path):
+    try:
+        return MESSAGES[path.parent.name].read_xml(str(path))
+    except pydantic.ValidationError:
+        pytest.skip("example file is rejected by the model validators")
+
+
+@pytest.mark.parametrize("path", EXAMPLE_FILES, ids=lambda p: f"{p.parent.name}/{p.name}")
+def test_compiled_serializer(path: Path):
+    message = read_example(path)
+
+    assert message.to_xml(backend="compiled") == message.to_xml()
+    iof_xml_schema.assertValid(message.to_xml_tree(backend="compiled"))
+
+
+@pytest.mark.parametrize(
+    "path",
+    [p for p in EXAMPLE_FILES if p.parent.name in ("resultlist", "startlist")],
+    ids=lambda p: f"{p.parent.name}/{p.name}",
+)
+@pytest.mark.parametrize("skip_empty", [False, True])
+@pytest.mark.parametrize("exclude_none", [False, True])
+def test_compiled_serializer_options(path: Path, skip_empty: bool, exclude_none: bool):
+    message = read_example(path)
+    kwargs = {"skip_empty": skip_empty, "exclude_none": exclude_none}
+
+    compiled = message.to_xml_tree(backend="compiled", **kwargs)
+    generic = message.to_xml_tree(**kwargs)
+    assert etree.tostring(compiled) == etree.tostring(generic)
+
+
+@pytest.mark.parametrize("backend", ["pydantic_xml", "compiled"])
+def test_to_xml_options(backend):
+    message = pyiof.EventList(events=[pyiof.Event(name="Test")])
+    for kwargs in ({"exclude_none": True}, {"exclude_unset": True}):
+        tree = message.to_xml_tree(skip_empty=True, **kwargs)
+        expected = etree.tostring(tree, pretty_print=True, xml_declaration=True, encoding="UTF-8")
+        assert message.to_xml(backend=backend, **kwargs) == expected
+    assert b"standalone='yes'" in message.to_xml(backend=backend, standalone=True)
+
+
+@pytest.mark.parametrize("backend", ["pydantic_xml", "compiled"])
+def test_times_rounded_to_resolution(backend):
+    def race_result(time, **kwargs):
+        return pyiof.PersonRaceResult(
+            time=time,
+            time_behind=time - 0.1,
+            status="OK",
+            split_time=[pyiof.SplitTime(control_card="31", time=time / 3)],
+            **kwargs,
+        )
+
+    class_result = pyiof.ClassResult(
+        class_=pyiof.Class_(name="H21"),
+        time_resolution=0.1,
+        person_results=[
+            pyiof.PersonResult(
+                person=pyiof.Person(name=pyiof.PersonName(family_name="A", given_name="B")),
+                results=[
+                    race_result(
+                        0.1 + 0.2,
+                        overall_result=pyiof.OverallResult(time=1.1 + 2.2, status="OK"),
+                    )
+                ],
+            )
+        ],
+    )
+    message = pyiof.ResultList(event=pyiof.Event(name="Test"), class_results=[class_result])
+    data = message.to_xml(backend=backend)
+    for text in (b"<Time>0.3</Time>", b"<TimeBehind>0.2</TimeBehind>", b"<Time>3.3</Time>"):
+        assert text in data
+    assert b"<Time>0.1</Time>" in data  # the split time 0.1 / 3
+    parsed = pyiof.ResultList.from_xml(data, backend=backend)
+    result = parsed.class_results[0].person_results[0].results[0]
+    assert (result.time, result.time_behind, result.split_time[0].time) == (0.3, 0.2, 0.1)
+    assert parsed.to_xml(backend=backend) == data
+    # whole seconds by default
+    class_result.time_resolution = 1
+    assert b"<Time>0.0</Time>" in message.to_xml(backend=backend)
+
+
+def assert_same_model(a: pydantic.BaseModel, b: pydantic.BaseModel):
+    assert a == b
+    assert a.model_fields_set == b.model_fields_set
+    for name in a.model_fields_set:
+        value_a, value_b = getattr(a, name), getattr(b, name)
+        if isinstance(value_a, pydantic.BaseModel):
+            assert_same_model(value_a, value_b)
+        elif isinstance(value_a, list):
+            for item_a, item_b in zip(value_a, value_b, strict=True):
+                if isinstance(item_a, pydantic.BaseModel):
+                    assert_same_model(item_a, item_b)
+
+
+@pytest.mark.parametrize("path", EXAMPLE_FILES, ids=lambda p: f"{p.parent.name}/{p.name}")
+def test_compiled_parser(path: Path):
+    cls = MESSAGES[path.parent.name]
+    try:
+        expected = cls.read_xml(str(path))
+    except pydantic.ValidationError as e:
+        error = str(e)
+    else:
+        assert_same_model(cls.read_xml(str(path), backend="compiled"), expected)
+        return
+
+    # invalid documents fall back to pydantic_xml for its error messages
+    with pytest.raises(pydantic.ValidationError) as compiled_error:
+        cls.read_xml(str(path), backend="compiled")
+    assert str(compiled_error.value) == error
+
+
+def test_compiled_parser_wrong_root():
+    path = next(p for p in EXAMPLE_FILES if p.parent.name == "startlist")
+    with pytest.raises(pydantic_xml.ParsingError):
+        pyiof.ResultList.read_xml(str(path), backend="compiled")
+
+
+def test_concurrent_first_use(monkeypatch):
+    # fresh caches, so the functions are generated by the threads
+    monkeypatch.setattr(compiled, "_generators", {})
+    monkeypatch.setattr(compiled, "_parser_generator", compiled._ParserGenerator())
+    schema = Schema(etree.parse(str(Path(__file__).parent.parent / "IOF.xsd")).getroot())
+    generator = EventGenerator(seed=6, runners=40, classes=3, clubs=4, teams=2)
+    names = ["ResultList", "StartList", "EntryList", "ClassList", "CourseData", "CompetitorList"]
+    messages = [generator.build(name) for name in names]
+    threads = 12
+    barrier = threading.Barrier(threads)
+
+    def work(i):
+        message = messages[i % len(messages)]
+        barrier.wait()
+        data = message.to_xml(backend="compiled")
+        parsed = compiled.from_xml_tree(type(message), etree.fromstring(data))
+        return data, parsed, schema.errors(message)
+
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(work, range(threads)))
+    for i, (data, parsed, errors) in enumerate(results):
+        message = messages[i % len(messages)]
+        assert data == message.to_xml()
+        assert parsed == message
+        assert errors == []
@@ -0,0 +1,71 @@
+import pytest
+
+import pyiof
+from pyiof.diagnostics import memory_report
+
+
+def result_list(clubs, runners=10, shared=False):
+    organisations = [pyiof.Organisation(name=f"Club {i}") for i in range(clubs)]
+    return pyiof.ResultList(
+        event=pyiof.Event(name="Test Event"),
+        class_results=[
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="H21"),
+                person_results=[
+                    pyiof.PersonResult(
+                        person=pyiof.Person(
+                            name=pyiof.PersonName(family_name=f"Runner {i}", given_name="A")
+                        ),
+                        organisation=(
+                            organisations[i % clubs]
+                            if shared
+                            else pyiof.Organisation(name=f"Club {i % clubs}")
+                        ),
+                        results=[pyiof.PersonRaceResult(status="OK", time=1000 + i)],
+                    )
+                    for i in range(runners)
+                ],
+            )
+        ],
+    )
+
+
+def test_memory_report_counts():
+    report = memory_report(result_list(2))
+    assert report.classes["PersonResult"].instances == 10
+    assert report.classes["Organisation"].instances == 10
+    assert report.classes["ResultList"].deep_bytes == report.total_bytes
+    assert report.fields[("PersonResult", "person")].values == 10
+    own = sum(stats.own_bytes for stats in report.classes.values())
+    assert own == report.total_bytes
+
+
+def test_memory_report_duplicates():
+    report = memory_report(result_list(2))
+    organisations = report.classes["Organisation"]
+    assert organisations.duplicates == 8
+    assert organisations.duplicate_bytes == pytest.approx(organisations.deep_bytes * 0.8)
+    assert report.duplicate_bytes == organisations.duplicate_bytes
+    # the persons differ by name
+    assert report.classes["Person"].duplicates == 0
+
+
+def test_memory_report_shared():
+    duplicated = memory_report(result_list(2))
+    shared = memory_report(result_list(2, shared=True))
+    assert shared.shared == 8
+    assert shared.classes["Organisation"].instances == 2
+    assert shared.duplicate_bytes == 0
+    assert shared.total_bytes == duplicated.total_bytes - duplicated.duplicate_bytes
+
+
+def test_memory_report_sample():
+    full = memory_report(result_list(2, runners=1000))
+    sampled = memory_report(result_list(2, runners=1000), sample=0.1)
+    assert sampled.sample == 0.1
+    assert sampled.classes["PersonResult"].instances == 1000
+    assert sampled.total_bytes == pytest.approx(full.total_bytes, rel=0.05)
+    assert "PersonResult" in str(sampled)
+    assert sampled.to_dict()["classes"]["PersonResult"]["instances"] == 1000
+    with pytest.raises(ValueError, match="sample"):
+        memory_report(full, sample=0)
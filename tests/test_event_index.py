@@ -0,0 +1,101 @@
+import datetime
+
+import pytest
+
+import pyiof
+
+np = pytest.importorskip("numpy")
+
+from pyiof.event_index import EventIndex  # noqa: E402
+
+
+def day(d):
+    return pyiof.DateAndOptionalTime(date=datetime.date(2024, 6, d))
+
+
+def race(number, d, lat=None, lng=None, disciplines=()):
+    return pyiof.Race(
+        race_number=number,
+        name=f"Race {number}",
+        start_time=day(d),
+        position=pyiof.GeoPosition(lat=lat, lng=lng) if lat is not None else None,
+        discipline=list(disciplines),
+    )
+
+
+def events():
+    club = pyiof.Organisation(id=pyiof.Id(id="42"), name="OK Linné", short_name="OKL")
+    return [
+        pyiof.Event(
+            name="Stockholm 3 days",
+            start_time=day(1),
+            end_time=day(3),
+            classification="National",
+            organisers=[club],
+            races=[
+                race(1, 1, 59.33, 18.07, ["Sprint"]),
+                race(2, 2, 59.40, 17.90, ["Middle"]),
+                race(3, 3, 59.60, 18.50, ["Long"]),
+            ],
+        ),
+        pyiof.Event(
+            name="Uppsala sprint",
+            start_time=day(8),
+            classification="Regional",
+            races=[race(1, 8, 59.86, 17.64, ["Sprint"])],
+        ),
+        pyiof.Event(name="Fiji night-O", races=[race(1, 5, -17.7, 179.9)]),
+        pyiof.Event(name="Club training", start_time=day(2), classification="Club"),
+        pyiof.Event(name="Undated"),
+    ]
+
+
+def names(matches):
+    return [(m.event.name, m.race.race_number if m.race else None) for m in matches]
+
+
+def test_within_radius():
+    index = EventIndex(events())
+    assert len(index) == 7
+    matches = index.within(59.33, 18.07, 20)
+    assert names(matches) == [("Stockholm 3 days", 1), ("Stockholm 3 days", 2)]
+    assert matches[0].distance == pytest.approx(0)
+    assert matches[1].distance == pytest.approx(12.4, abs=0.1)
+    assert len(index.within(59.33, 18.07, 100)) == 4
+    # across the antimeridian and with all cells
+    assert names(index.within(-17.7, -179.9, 50)) == [("Fiji night-O", 1)]
+    assert len(index.within(0, 0, 20000)) == 5
+
+
+def test_between_dates():
+    index = EventIndex(events())
+    assert names(index.between(datetime.date(2024, 6, 2), datetime.date(2024, 6, 5))) == [
+        ("Stockholm 3 days", 2),
+        ("Club training", None),
+        ("Stockholm 3 days", 3),
+        ("Fiji night-O", 1),
+    ]
+    assert names(index.between(datetime.datetime(2024, 6, 6, 12), None)) == [("Uppsala sprint", 1)]
+    assert index.between(None, datetime.date(2024, 5, 31)) == []
+    # everything, undated last
+    assert names(index.query())[-1] == ("Undated", None)
+
+
+def test_values_and_combined_queries():
+    index = EventIndex(events())
+    assert names(index.query(classification="Regional")) == [("Uppsala sprint", 1)]
+    assert len(index.query(classification=["National", "Club"])) == 4
+    assert names(index.query(discipline="Sprint")) == [
+        ("Stockholm 3 days", 1),
+        ("Uppsala sprint", 1),
+    ]
+    for organiser in ("ok linne", "OKL", "42", pyiof.Organisation(name="OK Linné")):
+        assert len(index.query(organiser=organiser)) == 3
+    assert index.query(organiser="nobody") == []
+    assert names(
+        index.query(
+            near=(59.8, 17.7), radius=60, discipline="Sprint", end=datetime.date(2024, 6, 8)
+        )
+    ) == [("Uppsala sprint", 1), ("Stockholm 3 days", 1)]
+    with pytest.raises(ValueError, match="together"):
+        index.query(near=(59.8, 17.7))
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+import pyiof
+from pyiof.generator import MESSAGES, EventGenerator
+from pyiof.streaming import iter_xml, write_xml
+
+from .xml_validator import iof_xml_schema
+
+TESTDATA = Path(__file__).parent / "testdata"
+MESSAGE_CLASSES = {
+    cls.__name__.lower(): cls
+    for cls in (
+        pyiof.CompetitorList,
+        pyiof.OrganisationList,
+        pyiof.EventList,
+        pyiof.ClassList,
+        pyiof.EntryList,
+        pyiof.CourseData,
+        pyiof.StartList,
+        pyiof.ResultList,
+        pyiof.ServiceRequestList,
+        pyiof.ControlCardList,
+    )
+}
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return EventGenerator(seed=7, runners=200, classes=6, clubs=12, teams=6)
+
+
+@pytest.mark.parametrize("name", MESSAGES)
+def test_generated_messages_valid(generator, name):
+    data = generator.build(name).to_xml(backend="compiled")
+    iof_xml_schema.assertValid(etree.fromstring(data))
+
+
+def test_generator_deterministic(generator):
+    other = EventGenerator(seed=7, runners=200, classes=6, clubs=12, teams=6)
+    assert other.build("ResultList") == generator.build("ResultList")
+    assert EventGenerator(seed=8, runners=200).build("ResultList") != generator.build("ResultList")
+
+
+def test_splits_follow_courses(generator):
+    courses = {c.name: c for c in generator.build("CourseData").race_course_data[0].courses}
+    result_list = generator.build("ResultList")
+    individual = [c for c in result_list.class_results if c.person_results]
+    assert sum(len(c.person_results) for c in individual) == 200
+    for class_result in individual:
+        course = courses[class_result.courses[0].name]
+        assert class_result.courses[0].length == course.length
+        codes = [c.control[0] for c in course.course_controls if c.type in (None, "Control")]
+        for person_result in class_result.person_results:
+            result = person_result.results[0]
+            if result.status == "DidNotStart":
+                assert result.split_time == []
+                continue
+            assert [s.control_card for s in result.split_time] == codes
+            if result.status == "OK":
+                times = [s.time for s in result.split_time]
+                assert times == sorted(times)
+                assert result.time > times[-1]
+
+
+def test_relay_standings(generator):
+    result_list = generator.build("ResultList")
+    relays = [c for c in result_list.class_results if c.team_results]
+    assert relays
+    for class_result in relays:
+        legs = [
+            [member.results[0] for member in team.team_member_results]
+            for team in class_result.team_results
+        ]
+        for results in legs:
+            total = 0.0
+            for result in results:
+                assert [p.type for p in result.position] in ([], ["Leg", "Course"])
+                overall = result.overall_result
+                if overall.time is None:
+                    assert overall.status != "OK"
+                    assert overall.position is None
+                    total = None
+                    continue
+                total += result.time
+                assert overall.status == "OK"
+                assert overall.time == pytest.approx(total)
+        # the leader after each leg is first
+        for leg in range(len(legs[0])):
+            overall = [results[leg].overall_result for results in legs]
+            leader = min((o for o in overall if o.time is not None), key=lambda o: o.time)
+            assert leader.position == 1
+            assert leader.time_behind == 0
+
+
+def test_simulations_memoized(generator):
+    assert generator._class_runners(0) is generator._class_runners(0)
+    assert generator._relay_teams(0) is generator._relay_teams(0)
+    other = EventGenerator(seed=7, runners=200, classes=6, clubs=12, teams=6)
+    assert other._class_runners(0) == generator._class_runners(0)
+
+
+def test_write_streamed(generator, tmp_path):
+    paths = generator.write(tmp_path, names=["StartList", "ResultList"])
+    for name, path in paths.items():
+        assert path.read_bytes() == generator.build(name).to_xml(backend="compiled")
+    (tmp_path / "parallel").mkdir()
+    parallel = generator.write(tmp_path / "parallel", names=["ResultList"], workers=2)
+    assert parallel["ResultList"].read_bytes() == paths["ResultList"].read_bytes()
+
+
+@pytest.mark.parametrize("pretty_print", [True, False])
+def test_iter_xml(pretty_print, tmp_path):
+    for path in TESTDATA.glob("*/*.xml"):
+        if path.parent.name == "classlist":
+            continue  # the example fees don't pass the Fee validator
+        message = MESSAGE_CLASSES[path.parent.name].read_xml(str(path))
+        expected = message.to_xml(pretty_print=pretty_print)
+        assert b"".join(iter_xml(message, pretty_print=pretty_print)) == expected
+        write_xml(message, tmp_path / path.name, pretty_print=pretty_print)
+        assert (tmp_path / path.name).read_bytes() == expected
@@ -0,0 +1,66 @@
+import copy
+import datetime
+import pickle
+
+import pyiof
+from pyiof.generator import EventGenerator
+from pyiof.hashing import invalidate
+
+
+def result_list():
+    return EventGenerator(seed=2, runners=60, classes=3, clubs=6, teams=3).build("ResultList")
+
+
+def test_content_hash_stable():
+    a, b = result_list(), result_list()
+    assert a is not b
+    assert a.content_hash() == b.content_hash()
+    assert len(a.content_hash()) == 32
+    assert pickle.loads(pickle.dumps(a)).content_hash() == a.content_hash()
+    assert copy.deepcopy(a).content_hash() == a.content_hash()
+    assert pyiof.PersonName(family_name="A", given_name="B").content_hash() != (
+        pyiof.PersonName(family_name="AB", given_name="").content_hash()
+    )
+
+
+def test_content_hash_after_change():
+    model = result_list()
+    before = model.content_hash()
+    result = model.class_results[1].person_results[2].results[0]
+    time = result.time
+    result.time = 1.0
+    changed = model.content_hash()
+    assert changed != before
+    assert changed == copy.deepcopy(model).content_hash()
+    result.time = time
+    assert model.content_hash() == before
+
+    # a split time is hashed within the result, which is hashed within the class result
+    result.split_time[0].time = 2.0
+    assert model.class_results[1].content_hash() != result_list().class_results[1].content_hash()
+    assert model.class_results[0].content_hash() == result_list().class_results[0].content_hash()
+
+    # lists changed in place
+    model = result_list()
+    before = model.content_hash()
+    person_result = model.class_results[0].person_results.pop()
+    removed = model.content_hash()
+    assert removed != before
+    assert removed == copy.deepcopy(model).content_hash()
+    model.class_results[0].person_results.append(person_result)
+    assert model.content_hash() == before
+    model = result_list()
+    model.content_hash()
+    model.class_results[2].person_results[0].person.ids.clear()
+    assert model.content_hash() == copy.deepcopy(model).content_hash()
+    assert model.content_hash() != result_list().content_hash()
+    invalidate(model)
+    assert model.content_hash() == copy.deepcopy(model).content_hash()
+
+
+def test_content_hash_ignore_modify_time():
+    model = result_list()
+    before = model.content_hash(), model.content_hash(ignore_modify_time=True)
+    model.event.modify_time = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+    assert model.content_hash() != before[0]
+    assert model.content_hash(ignore_modify_time=True) == before[1]
@@ -0,0 +1,55 @@
+import base64
+import os
+
+import pyiof
+from pyiof.payload import ImagePayload, ImageStorage
+
+LOGO = base64.b64encode(bytes(range(256)) * 100).decode()
+
+
+def make_organisation_list():
+    return pyiof.OrganisationList(
+        organisations=[
+            pyiof.Organisation(
+                name="OK Orient",
+                logotype=[pyiof.Image(data=LOGO, mediatype="image/png")],
+            )
+        ]
+    )
+
+
+def test_read_xml_image_storage(tmp_path):
+    path = tmp_path / "organisations.xml"
+    make_organisation_list().write_xml(str(path))
+
+    for mode in ("buffer", "spill"):
+        storage = ImageStorage(mode=mode, threshold=1024, directory=str(tmp_path))
+        organisations = pyiof.OrganisationList.read_xml(str(path), image_storage=storage)
+        image = organisations.organisations[0].logotype[0]
+        assert isinstance(image.data, ImagePayload)
+        assert image.content() == bytes(range(256)) * 100
+        assert organisations.to_xml() == make_organisation_list().to_xml()
+
+
+def test_write_xml_streams_spilled_image(tmp_path):
+    organisations = make_organisation_list()
+    image = organisations.organisations[0].logotype[0]
+    image.spill(str(tmp_path))
+    assert isinstance(image.data, ImagePayload)
+    assert image.data.path is not None
+    assert os.path.exists(image.data.path)
+
+    path = tmp_path / "organisations.xml"
+    organisations.write_xml(str(path))
+    assert path.read_bytes() == make_organisation_list().to_xml()
+
+
+def test_write_xml_placeholder_text(tmp_path):
+    organisations = make_organisation_list()
+    organisations.organisations[0].name = "pyiof-payload:0"
+    organisations.organisations[0].logotype[0].spill(str(tmp_path))
+    path = tmp_path / "organisations.xml"
+    organisations.write_xml(str(path))
+    expected = make_organisation_list()
+    expected.organisations[0].name = "pyiof-payload:0"
+    assert path.read_bytes() == expected.to_xml()
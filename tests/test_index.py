@@ -0,0 +1,101 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import pyiof
+from pyiof.generator import EventGenerator
+from pyiof.index import MessageIndex
+
+TESTDATA = Path(__file__).parent / "testdata"
+
+
+@pytest.fixture(scope="module")
+def event(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("event")
+    generator = EventGenerator(seed=4, runners=120, classes=4, clubs=8, teams=4)
+    return generator.write(directory, ["ResultList", "StartList", "EntryList"])
+
+
+@pytest.mark.parametrize(
+    ("name", "items", "entries"),
+    [
+        ("ResultList", "class_results", ("person_results", "team_results")),
+        ("StartList", "class_starts", ("person_starts", "team_starts")),
+    ],
+)
+def test_read_classes_and_entries(event, name, items, entries):
+    message = getattr(pyiof, name).read_xml(str(event[name]))
+    index = MessageIndex.open(event[name])
+    assert len(index.classes) == len(getattr(message, items))
+    for item in getattr(message, items):
+        assert index.read_class(item.class_.name) == item
+        assert index.read_class(("id", item.class_.id.id)) == item
+        for field in entries:
+            for entry in getattr(item, field):
+                assert entry in index.read_entries(("entry", entry.entry_id.id))
+
+    entry = getattr(getattr(message, items)[0], entries[0])[0]
+    assert index.read_entries(("person", entry.person.ids[0].id)) == [entry]
+    assert index.read_class("no such class") is None
+    assert index.read_entries(("person", "no such person")) == []
+
+
+def test_entry_list_classes(event):
+    entry_list = pyiof.EntryList.read_xml(str(event["EntryList"]))
+    index = MessageIndex.open(event["EntryList"])
+    assert not index.classes
+    assert len(index.entries) == len(entry_list.person_entries) + len(entry_list.team_entries)
+    class_name = entry_list.person_entries[0].classes[0].name
+    expected = [e for e in entry_list.person_entries if e.classes[0].name == class_name]
+    assert index.read_entries(("name", class_name)) == expected
+
+
+def test_sidecar(tmp_path):
+    path = tmp_path / "results.xml"
+    path.write_bytes((TESTDATA / "resultlist" / "generated.xml").read_bytes())
+    index = MessageIndex.open(path)
+    assert MessageIndex.sidecar(path).exists()
+
+    loaded = MessageIndex.load(path)
+    assert loaded is not None
+    assert loaded.classes == index.classes
+    assert loaded.entry_keys == index.entry_keys
+    assert loaded.read(loaded.classes) == index.read(index.classes)
+
+    path.write_bytes(path.read_bytes() + b"\n")
+    assert MessageIndex.load(path) is None
+    with pytest.raises(ValueError, match="changed since it was indexed"):
+        index.read(index.classes)
+    os.utime(path)
+    assert len(MessageIndex.open(path).classes) == len(index.classes)
+
+
+def test_prefixes_and_encoding(tmp_path):
+    path = tmp_path / "starts.xml"
+    path.write_bytes(
+        """<?xml version="1.0" encoding="ISO-8859-1"?>
+<iof:StartList xmlns:iof="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0">
+  <iof:Event><iof:Name>Test</iof:Name></iof:Event>
+  <!-- <iof:ClassStart> -->
+  <iof:ClassStart>
+    <iof:Class><iof:Name>Hérren</iof:Name></iof:Class>
+    <iof:PersonStart>
+      <iof:EntryId>1</iof:EntryId>
+      <iof:Person><iof:Id>a&amp;b</iof:Id><iof:Name><iof:Family>Müller</iof:Family></iof:Name></iof:Person>
+      <iof:Start/>
+    </iof:PersonStart>
+  </iof:ClassStart>
+</iof:StartList>
+""".encode("latin-1")
+    )
+    index = MessageIndex.open(path, save=False)
+    assert not MessageIndex.sidecar(path).exists()
+    class_start = index.read_class("Hérren")
+    assert class_start.person_starts[0].person.name.family_name == "Müller"
+    [person_start] = index.read_entries(("person", "a&b"))
+    assert person_start == class_start.person_starts[0]
+
+    path.write_bytes(b"<CourseData/>")
+    with pytest.raises(ValueError, match="can't index CourseData"):
+        MessageIndex.build(path)
@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+
+import pydantic
+import pytest
+
+import pyiof
+from pyiof.json_io import iter_json, to_dict, write_json
+from pyiof.streaming import stream_message
+
+from .test_compiled import EXAMPLE_FILES, MESSAGES, read_example
+
+RESULTLIST = Path(__file__).parent / "testdata" / "resultlist" / "generated.xml"
+
+
+@pytest.mark.parametrize("path", EXAMPLE_FILES, ids=lambda p: f"{p.parent.name}/{p.name}")
+def test_json_roundtrip(path: Path):
+    message = read_example(path)
+    data = message.to_json()
+
+    assert "".join(message.iter_json()) == data
+    assert type(message).from_json(data) == message
+
+
+def test_json_keys():
+    resultlist = pyiof.ResultList.read_xml(str(RESULTLIST))
+    data = json.loads(resultlist.to_json())
+
+    assert data["iofVersion"] == "3.0"
+    assert data["status"] == "Complete"
+    class_result = data["classResult"][0]
+    assert class_result["class"]["name"] == resultlist.class_results[0].class_.name
+    person_result = class_result["personResult"][0]
+    assert set(person_result) >= {"person", "result"}
+    assert "personResults" not in class_result
+
+
+def test_id_value_key():
+    person = pyiof.Person(
+        ids=[pyiof.Id(id="123", type="WRE")],
+        name=pyiof.PersonName(family="Doe", given="Jane"),
+    )
+    assert to_dict(person)["id"] == [{"type": "WRE", "value": "123"}]
+
+
+def test_stream_xml_to_json(tmp_path):
+    expected = pyiof.ResultList.read_xml(str(RESULTLIST))
+    stream = stream_message(str(RESULTLIST), pyiof.ResultList)
+    assert stream.header.class_results == []
+
+    path = tmp_path / "results.json"
+    write_json(stream, str(path))
+    assert path.read_text() == expected.to_json()
+    assert pyiof.ResultList.read_json(path) == expected
+
+
+def test_stream_message_items():
+    expected = pyiof.ResultList.read_xml(str(RESULTLIST))
+    stream = stream_message(str(RESULTLIST), pyiof.ResultList)
+    assert stream.header.event == expected.event
+    assert list(stream.items) == expected.class_results
+
+
+def test_from_json_validates():
+    with pytest.raises(pydantic.ValidationError):
+        pyiof.ResultList.from_json('{"status": "Unknown", "event": {"name": "Test"}}')
+
+
+def test_empty_stream():
+    resultlist = MESSAGES["resultlist"](event=pyiof.Event(name="Test"))
+    assert list(iter_json(resultlist)) == [resultlist.to_json()]
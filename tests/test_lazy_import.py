@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+import pytest
+
+import pyiof
+
+
+def test_import_is_lazy():
+    code = "import sys, pyiof; print(sorted(m for m in sys.modules if m.startswith('pyiof.')))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+@pytest.mark.parametrize("name", pyiof.__all__)
+def test_lazy_attributes(name: str):
+    module = getattr(pyiof, pyiof._LAZY_ATTRIBUTES[name])
+    assert getattr(pyiof, name) is getattr(module, name)
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        pyiof.NotAModel  # noqa: B018
@@ -0,0 +1,117 @@
+import datetime
+
+import pyiof
+from pyiof.matching import PersonIndex, name_similarity, name_spellings, name_tokens
+
+
+def competitor(family, given, birth_date=None, sex=None, ids=(), organisation=None):
+    return pyiof.Competitor(
+        person=pyiof.Person(
+            ids=[pyiof.Id(id=value, type=issuer) for issuer, value in ids],
+            name=pyiof.PersonName(family_name=family, given_name=given),
+            birth_date=birth_date,
+            sex=sex,
+        ),
+        organisation=[organisation] if organisation is not None else [],
+    )
+
+
+def person(family, given, birth_date=None, sex=None, ids=()):
+    return competitor(family, given, birth_date, sex, ids).person
+
+
+BIRTH_DATE = datetime.date(1990, 4, 12)
+
+DATABASE = [
+    competitor("Müller", "Jörg", BIRTH_DATE, "M", [("NAT", "1")]),
+    competitor("Müller", "Anna", BIRTH_DATE, "F", [("NAT", "2")]),
+    competitor("Strauß", "Jörg", datetime.date(1991, 4, 12), "M", [("NAT", "3")]),
+    competitor("Петров", "Иван", datetime.date(1985, 1, 1), "M", [("NAT", "4")]),
+    competitor(
+        "Hansen",
+        "Ole",
+        datetime.date(1975, 6, 1),
+        "M",
+        organisation=pyiof.Organisation(name="OK Ø"),
+    ),
+    competitor(
+        "Hansen",
+        "Ole",
+        datetime.date(1975, 6, 1),
+        "M",
+        organisation=pyiof.Organisation(name="IL X"),
+    ),
+]
+
+
+def test_name_tokens():
+    assert name_tokens("Müller-Lüdenscheidt") == ("muller", "ludenscheidt")
+    assert name_tokens("Mueller") in name_spellings("MÜLLER")
+    assert name_tokens("Muller") in name_spellings("Mu\u0308ller")
+    assert name_tokens("Manuel") != name_tokens("Manul")
+    assert name_spellings("Manuel") == (("manuel",),)
+    assert name_tokens("Strauß") == ("strauss",)
+    assert name_tokens("Петров") == ("petrov",)
+
+
+def test_name_similarity():
+    assert name_similarity(("muller", "jorg"), ("jorg", "muller")) == 1.0
+    assert name_similarity(("muller", "j"), ("muller", "jorg")) > 0.9
+    assert name_similarity(("muller", "jorg"), ("meier", "anna")) < 0.5
+    assert name_similarity((), ("muller",)) == 0.0
+
+
+def test_match_by_id():
+    index = PersonIndex(DATABASE)
+    matches = index.match(person("Anyone", "Else", ids=[("NAT", "3")]))
+    assert [(m.competitor, m.score) for m in matches] == [(DATABASE[2], 1.0)]
+
+
+def test_match_normalized_name():
+    index = PersonIndex(DATABASE)
+    assert len(index) == len(DATABASE)
+    best = index.match(person("MUELLER", "Joerg", BIRTH_DATE, "M"))[0]
+    assert best.competitor is DATABASE[0]
+    assert best.score == 1.0
+    # "ue" is only folded in names with umlauts
+    manuel = competitor("Manul", "Jörg", BIRTH_DATE, "M")
+    best = PersonIndex([manuel]).match(person("Manuel", "Jörg", BIRTH_DATE, "M"))[0]
+    assert best.name < 1.0
+    # swapped name order
+    best = index.match(person("Ivan", "Petrov", datetime.date(1985, 1, 1)))[0]
+    assert best.competitor is DATABASE[3]
+
+
+def test_match_blocking():
+    index = PersonIndex(DATABASE)
+    # blocked by sex
+    matches = index.match(person("Müller", "Jörg", BIRTH_DATE, "F"))
+    assert [m.competitor for m in matches] == [DATABASE[1]]
+    # blocked by birth year, unless tolerated
+    assert index.match(person("Strauss", "Jorg", BIRTH_DATE, "M"), threshold=0.9) == []
+    index = PersonIndex(DATABASE, year_tolerance=1)
+    best = index.match(person("Strauss", "Jorg", BIRTH_DATE, "M"))[0]
+    assert best.competitor is DATABASE[2]
+    assert best.birth_date == 0.25
+
+
+def test_match_without_birth_date():
+    index = PersonIndex(DATABASE)
+    best = index.match(person("Muller", "Jorg"))[0]
+    assert best.competitor is DATABASE[0]
+    assert best.birth_date is None
+
+
+def test_match_entries_organisation():
+    index = PersonIndex(DATABASE)
+    entries = [
+        pyiof.PersonEntry(
+            person=person("Hansen", "Ole", datetime.date(1975, 6, 1), "M"),
+            organisation=pyiof.Organisation(name="IL X"),
+        ),
+        pyiof.PersonEntry(person=person("Nobody", "Known")),
+    ]
+    best, none = index.match_entries(entries)
+    assert best.competitor is DATABASE[5]
+    assert best.organisation == 1.0
+    assert none is None
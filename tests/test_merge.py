@@ -0,0 +1,155 @@
+import datetime
+
+import pyiof
+from pyiof.merge import merge_competitor_lists, merge_entry_lists, normalize_name
+
+EVENT = pyiof.Event(name="Test Event")
+
+
+def person(family, given, ids=(), birth_date=None, modify_time=None):
+    return pyiof.Person(
+        ids=[pyiof.Id(id=value, type=issuer) for issuer, value in ids],
+        name=pyiof.PersonName(family_name=family, given_name=given),
+        birth_date=birth_date,
+        modify_time=modify_time,
+    )
+
+
+def organisation(identifier, name, modify_time=None):
+    return pyiof.Organisation(id=pyiof.Id(id=identifier), name=name, modify_time=modify_time)
+
+
+def entry(person, organisation=None, class_name="H21", modify_time=None):
+    return pyiof.PersonEntry(
+        person=person,
+        organisation=organisation,
+        classes=[pyiof.Class_(name=class_name)],
+        modify_time=modify_time,
+    )
+
+
+def test_normalize_name():
+    assert normalize_name("  Müller-Lüdenscheidt ") == "muller ludenscheidt"
+    assert normalize_name("ÅSTRÖM") == normalize_name("astrom")
+    assert normalize_name("O'Neill") == normalize_name("o neill")
+
+
+def test_merge_entry_lists_by_id():
+    old = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    new = datetime.datetime(2024, 2, 1, tzinfo=datetime.timezone.utc)
+    club_a = pyiof.EntryList(
+        event=EVENT,
+        person_entries=[
+            entry(person("Smith", "Anna", [("IOF", "1")]), class_name="D21", modify_time=old),
+            entry(person("Jones", "Ben", [("IOF", "2")])),
+        ],
+    )
+    club_b = pyiof.EntryList(
+        event=EVENT,
+        person_entries=[
+            entry(person("Smith", "Anna", [("IOF", "1")]), class_name="D21E", modify_time=new),
+            entry(person("Jones", "Ben", [("NAT", "2")])),
+        ],
+    )
+    merged, report = merge_entry_lists([club_a, club_b])
+
+    assert merged.event == EVENT
+    assert [e.person.name.family_name for e in merged.person_entries] == ["Smith", "Jones", "Jones"]
+    assert merged.person_entries[0].classes[0].name == "D21E"
+    assert (report.sources, report.records, report.merged) == (2, 4, 3)
+    assert len(report.decisions) == 1
+    assert report.decisions[0].key == ("id", "IOF", "1")
+    assert report.conflicts == report.decisions
+    assert "1 person" in report.summary()
+
+
+def test_merge_entry_lists_by_name_and_birth_date():
+    birth_date = datetime.date(1990, 5, 17)
+    lists = [
+        pyiof.EntryList(
+            event=EVENT, person_entries=[entry(person("Müller", "Jörg", birth_date=birth_date))]
+        ),
+        pyiof.EntryList(
+            event=EVENT,
+            person_entries=[
+                entry(person("MULLER", "Jorg", birth_date=birth_date)),
+                entry(person("Müller", "Jörg")),
+            ],
+        ),
+    ]
+    merged, report = merge_entry_lists(lists)
+    # without birth date the person can't be identified
+    assert len(merged.person_entries) == 2
+    assert merged.person_entries[0].person.name.family_name == "Müller"
+    assert len(report.decisions) == 1
+    assert report.conflicts == report.decisions
+
+
+def test_merge_entry_lists_identical_duplicates():
+    anna = entry(person("Smith", "Anna", [("IOF", "1")]))
+    lists = [pyiof.EntryList(event=EVENT, person_entries=[anna]) for _ in range(3)]
+    merged, report = merge_entry_lists(lists)
+    assert merged.person_entries == [anna]
+    assert len(report.decisions[0].discarded) == 2
+    assert report.conflicts == []
+
+
+def test_merge_entry_lists_with_competitors():
+    birth_date = datetime.date(1985, 3, 2)
+    national = pyiof.CompetitorList(
+        competitors=[
+            pyiof.Competitor(person=person("Smith", "Anna", [("NAT", "42")], birth_date=birth_date))
+        ]
+    )
+    lists = [
+        pyiof.EntryList(
+            event=EVENT, person_entries=[entry(person("Smith", "Anna", [("NAT", "42")]))]
+        ),
+        pyiof.EntryList(
+            event=EVENT, person_entries=[entry(person("Smith", "Anna", birth_date=birth_date))]
+        ),
+    ]
+    merged, report = merge_entry_lists(lists, competitors=[national])
+    assert len(merged.person_entries) == 1
+    assert merged.person_entries[0].person.birth_date == birth_date
+    assert report.merged == 1
+
+
+def test_merge_organisations():
+    old = datetime.datetime(2024, 1, 1)
+    new = datetime.datetime(2024, 2, 1)
+    lists = [
+        pyiof.EntryList(
+            event=EVENT,
+            person_entries=[entry(person("A", "A", [("", "1")]), organisation("7", "OK Old", old))],
+        ),
+        pyiof.EntryList(
+            event=EVENT,
+            person_entries=[entry(person("B", "B", [("", "2")]), organisation("7", "OK New", new))],
+            team_entries=[pyiof.TeamEntry(name="OK 1", organisations=[organisation("7", "OK")])],
+        ),
+    ]
+    merged, report = merge_entry_lists(lists)
+    names = {e.organisation.name for e in merged.person_entries}
+    assert names == {"OK New"}
+    assert merged.team_entries[0].organisations[0].name == "OK New"
+    assert [d.kind for d in report.decisions] == ["organisation"]
+    assert len(report.decisions[0].discarded) == 2
+
+
+def test_merge_competitor_lists():
+    lists = [
+        pyiof.CompetitorList(
+            competitors=[
+                pyiof.Competitor(person=person("Smith", "Anna", [("IOF", "1"), ("NAT", "9")])),
+                pyiof.Competitor(person=person("Jones", "Ben", [("IOF", "2")])),
+            ]
+        ),
+        pyiof.CompetitorList(
+            competitors=[pyiof.Competitor(person=person("Smith", "Anna", [("NAT", "9")]))]
+        ),
+    ]
+    merged, report = merge_competitor_lists(lists)
+    assert len(merged.competitors) == 2
+    assert report.merged == 2
+    assert report.decisions[0].key == ("id", "IOF", "1")
@@ -0,0 +1,131 @@
+import pytest
+
+import pyiof
+
+pytest.importorskip("numpy")
+
+from pyiof.overall import BestOf, ChasingStart, SumOfTimes  # noqa: E402
+
+
+def person_result(name, races):
+    return pyiof.PersonResult(
+        person=pyiof.Person(name=pyiof.PersonName(family_name=name)),
+        results=[
+            pyiof.PersonRaceResult(
+                race_number=number,
+                time=time if isinstance(time, (int, float)) else None,
+                status="OK" if isinstance(time, (int, float)) else time,
+            )
+            for number, time in races.items()
+        ],
+    )
+
+
+def result_list():
+    return pyiof.ResultList(
+        event=pyiof.Event(name="3 Days"),
+        class_results=[
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="H21"),
+                person_results=[
+                    person_result("a", {1: 3000, 2: 3100, 3: 2900}),
+                    person_result("b", {1: 2900, 2: 3300, 3: 2800}),
+                    person_result("c", {1: 3100, 2: "MissingPunch", 3: 2700}),
+                    person_result("d", {1: 3000, 3: 3200}),
+                ],
+            ),
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="D21"),
+                person_results=[
+                    person_result("e", {1: 3500, 2: 3500}),
+                    person_result("f", {1: 3400, 2: 3600}),
+                ],
+            ),
+        ],
+    )
+
+
+def overall(result_list, race, attribute):
+    """An attribute of the overall results after a race, None for persons without result."""
+    values = []
+    for class_result in result_list.class_results:
+        for person_result in class_result.person_results:
+            results = {r.race_number: r for r in person_result.results}
+            result = results.get(race)
+            values.append(getattr(result.overall_result, attribute) if result else None)
+    return values
+
+
+def test_sum_of_times():
+    results = result_list()
+    results.compute_overall()
+    assert overall(results, 1, "time") == [3000, 2900, 3100, 3000, 3500, 3400]
+    assert overall(results, 1, "position") == [2, 1, 4, 2, 2, 1]
+    assert overall(results, 1, "time_behind") == [100, 0, 200, 100, 100, 0]
+    assert overall(results, 2, "time") == [6100, 6200, None, None, 7000, 7000]
+    assert overall(results, 2, "position") == [1, 2, None, None, 1, 1]
+    assert overall(results, 2, "status") == ["OK", "OK", "MissingPunch", None, "OK", "OK"]
+    assert overall(results, 3, "status")[:4] == ["OK", "OK", "MissingPunch", "DidNotEnter"]
+    assert overall(results, 3, "time")[:3] == [9000, 9000, None]
+    assert overall(results, 3, "position")[:3] == [1, 1, None]
+
+
+def test_best_of():
+    results = result_list()
+    results.compute_overall(BestOf(2))
+    assert overall(results, 3, "time")[:3] == [5900, 5700, 5800]
+    assert overall(results, 3, "position")[:3] == [3, 1, 2]
+    assert overall(results, 3, "time")[3] == 6200
+    assert overall(results, 3, "position")[3] == 4
+
+
+def test_chasing_start():
+    results = result_list()
+    results.compute_overall(ChasingStart(max_handicap=50))
+    # after two races: a 6100, b 6200 (handicap 50); c and d did not complete
+    assert overall(results, 3, "time")[:3] == [6100 + 2900, 6100 + 50 + 2800, None]
+    assert overall(results, 3, "position")[:2] == [2, 1]
+    # before the final race and in classes without final race the times are summed
+    assert overall(results, 2, "time") == [6100, 6200, None, None, 7000, 7000]
+
+
+def test_incremental_update():
+    results = result_list()
+    results.compute_overall(SumOfTimes())
+    ladies = results.class_results[1]
+    ladies.person_results[0].results[1].time = 3400
+    before = results.class_results[0].person_results[0].results[2].overall_result
+    results.compute_overall(class_results=[ladies])
+    assert overall(results, 2, "position")[4:] == [1, 2]
+    assert results.class_results[0].person_results[0].results[2].overall_result is before
+
+
+def test_keep_scores():
+    results = result_list()
+    result = results.class_results[1].person_results[0].results[0]
+    result.overall_result = pyiof.OverallResult(status="OK", scores=[pyiof.Score(score=1.0)])
+    results.compute_overall()
+    assert result.overall_result.scores == [pyiof.Score(score=1.0)]
+    assert result.overall_result.time == 3500
+
+
+def test_time_resolution():
+    results = pyiof.ResultList(
+        event=pyiof.Event(name="Sprint"),
+        class_results=[
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="H21"),
+                time_resolution=0.1,
+                person_results=[
+                    person_result("a", {1: 0.1, 2: 0.2}),
+                    person_result("b", {1: 0.2, 2: 0.1 + 1e-9}),
+                    person_result("c", {1: 0.3, 2: 0.1}),
+                ],
+            )
+        ],
+    )
+    results.compute_overall()
+    # 0.1 + 0.2 != 0.3 in floats, but equal in ticks of the resolution
+    assert overall(results, 2, "time") == [0.3, 0.3, 0.4]
+    assert overall(results, 2, "position") == [1, 1, 3]
+    assert overall(results, 2, "time_behind") == [0.0, 0.0, 0.1]
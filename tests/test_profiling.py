@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+import pyiof
+from pyiof import profiling
+from pyiof.profiling import PrometheusMetrics
+
+EXAMPLE = Path(__file__).parent / "testdata" / "resultlist" / "generated.xml"
+
+
+def test_read_and_write_profiles(tmp_path):
+    profiles = []
+    with profiling.observe(profiles.append, count_elements=True):
+        result_list = pyiof.ResultList.read_xml(str(EXAMPLE))
+        result_list.write_xml(str(tmp_path / "out.xml"))
+    read, write = profiles
+    assert read.operation == "read_xml"
+    assert read.model == "ResultList"
+    assert read.path == str(EXAMPLE)
+    assert set(read.phases) == {"read", "parse", "validate"}
+    assert read.bytes == EXAMPLE.stat().st_size
+    assert read.elements["ResultList"] == 1
+    assert read.elements["PersonResult"] == sum(
+        len(c.person_results) for c in result_list.class_results
+    )
+    assert read.total >= sum(read.phases.values())
+    assert write.operation == "write_xml"
+    assert set(write.phases) == {"serialize", "encode", "write"}
+    assert write.bytes == (tmp_path / "out.xml").stat().st_size
+    assert write.elements["PersonResult"] == read.elements["PersonResult"]
+
+    # not observed anymore
+    pyiof.ResultList.read_xml(str(EXAMPLE))
+    assert len(profiles) == 2
+
+
+def test_sampling_and_cache_phase(tmp_path, monkeypatch):
+    profiles = []
+    with profiling.observe(profiles.append, sample_rate=0.5):
+        monkeypatch.setattr(profiling.random, "random", lambda: 0.7)
+        pyiof.ResultList.read_xml(str(EXAMPLE))
+        assert profiles == []
+        monkeypatch.setattr(profiling.random, "random", lambda: 0.2)
+        pyiof.ResultList.read_xml(str(EXAMPLE), cache_dir=tmp_path)
+        pyiof.ResultList.read_xml(str(EXAMPLE), cache_dir=tmp_path)
+    miss, hit = profiles
+    assert "validate" in miss.phases
+    assert "cache" in miss.phases
+    assert set(hit.phases) == {"read", "cache"}
+    assert hit.bytes == miss.bytes
+    assert hit.elements == {}
+    with pytest.raises(ValueError, match="sample_rate"):
+        profiling.add_observer(profiles.append, sample_rate=0)
+
+
+def test_prometheus_metrics(tmp_path):
+    metrics = PrometheusMetrics(buckets=(0.0, 3600.0))
+    with profiling.observe(metrics, count_elements=True):
+        data = pyiof.ResultList.read_xml(str(EXAMPLE)).to_xml()
+        pyiof.ResultList.from_xml(data)
+    text = metrics.to_text()
+    assert (
+        'pyiof_operation_seconds_bucket{operation="read_xml",model="ResultList",le="0.0"} 0' in text
+    )
+    assert (
+        'pyiof_operation_seconds_bucket{operation="from_xml",model="ResultList",le="3600.0"} 1'
+        in text
+    )
+    assert 'pyiof_operation_seconds_count{operation="to_xml",model="ResultList"} 1' in text
+    assert 'pyiof_phase_seconds_total{operation="to_xml",model="ResultList",phase="encode"}' in text
+    assert f'pyiof_bytes_total{{operation="from_xml",model="ResultList"}} {len(data)}' in text
+    assert 'pyiof_elements_total{operation="read_xml",model="ResultList",element="Event"} 1' in text
+
+    path = tmp_path / "pyiof.prom"
+    metrics.write(path)
+    assert path.read_text() == text
+    assert [p.name for p in tmp_path.iterdir()] == ["pyiof.prom"]
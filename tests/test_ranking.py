@@ -0,0 +1,108 @@
+import pytest
+
+import pyiof
+
+np = pytest.importorskip("numpy")
+
+from pyiof.ranking import Ranking, WinnerTimeFormula, WRSFormula  # noqa: E402
+
+
+def person_result(name, time, status="OK", race_number=None):
+    return pyiof.PersonResult(
+        person=pyiof.Person(
+            ids=[pyiof.Id(id=name, type="NAT")],
+            name=pyiof.PersonName(family_name=name, given_name="X"),
+        ),
+        organisation=pyiof.Organisation(name=f"OK {name}"),
+        results=[pyiof.PersonRaceResult(time=time, status=status, race_number=race_number)],
+    )
+
+
+def result_list(event, times, status=None):
+    status = status or {}
+    return pyiof.ResultList(
+        event=pyiof.Event(name=event),
+        class_results=[
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="H21"),
+                person_results=[
+                    person_result(name, time, status.get(name, "OK"))
+                    for name, time in times.items()
+                ],
+            )
+        ],
+    )
+
+
+def test_wrs_formula():
+    formula = WRSFormula()
+    times = np.array([3000.0, 3300.0, 3600.0])
+    # unranked field: default mean and standard deviation
+    points = formula(times, np.full(3, np.nan))
+    assert points.mean() == pytest.approx(1000.0)
+    assert points.std() == pytest.approx(200.0)
+    assert points[0] > points[1] > points[2]
+    # ranked field
+    points = formula(times, np.array([1500.0, 1200.0, 1200.0]))
+    assert points == pytest.approx([1300 + 173.205, 1300.0, 1300 - 173.205], abs=1e-3)
+    assert formula(np.array([3000.0, 3000.0]), np.full(2, np.nan)).tolist() == [1000.0, 1000.0]
+
+
+def test_winner_time_formula():
+    points = WinnerTimeFormula(100)(np.array([3000.0, 4500.0, 7000.0]), np.full(3, np.nan))
+    assert points.tolist() == [100.0, 50.0, 0.0]
+
+
+def test_ranking():
+    ranking = Ranking(WinnerTimeFormula(100), best_of=2, score_type="Test")
+    ranking.add_result_lists(
+        [
+            result_list("Race 1", {"a": 3000, "b": 3300, "c": 6000}),
+            result_list("Race 2", {"a": 3600, "b": 3000, "c": 3000}, {"a": "MissingPunch"}),
+            result_list("Race 3", {"a": 3000, "b": 4500, "d": 3300}),
+        ]
+    )
+    assert len(ranking.races) == 3
+    assert [p.name.family_name for p in ranking.persons] == ["a", "b", "c", "d"]
+    # best two of: a 100, 100; b 90, 100, 50; c 0, 100; d 90
+    assert ranking.scores().tolist() == pytest.approx([100.0, 95.0, 50.0, 90.0])
+
+    competitors = ranking.to_competitor_list().competitors
+    assert [c.person.name.family_name for c in competitors] == ["a", "b", "d", "c"]
+    assert competitors[1].score[0].score == pytest.approx(95.0)
+    assert competitors[1].score[0].type == "Test"
+    assert competitors[1].organisation[0].name == "OK b"
+
+
+def test_ranking_field_strength():
+    ranking = Ranking(WRSFormula(min_ranked=2))
+    strong = {"a": 3000, "b": 3300, "c": 3600}
+    ranking.add_result_list(result_list("Race 1", strong))
+    first = ranking.races[0].points
+    # the same times against the now ranked runners give the same points
+    race = ranking.add_result_list(result_list("Race 2", strong))[0]
+    assert race.points == pytest.approx(first)
+    # a newcomer beating the ranked runners gets more points than any of them
+    race = ranking.add_result_list(result_list("Race 3", {"x": 2700, **strong}))[0]
+    assert race.points[race.persons.tolist().index(3)] > first.max()
+
+
+def test_annotate_results():
+    results = result_list("Race 1", {"a": 3000, "b": 4500})
+    ranking = Ranking(WinnerTimeFormula(100), score_type="Test")
+    ranking.add_result_list(results)
+    ranking.annotate_results()
+    scores = [r.results[0].scores for r in results.class_results[0].person_results]
+    assert scores == [
+        [pyiof.Score(score=100.0, type="Test")],
+        [pyiof.Score(score=50.0, type="Test")],
+    ]
+
+    # annotating again replaces the scores of the ranking, and keeps other scores
+    scores[0].insert(0, pyiof.Score(score=1.0, type="Other"))
+    ranking.annotate_results()
+    ranking.annotate_results()
+    assert [r.results[0].scores for r in results.class_results[0].person_results] == [
+        [pyiof.Score(score=1.0, type="Other"), pyiof.Score(score=100.0, type="Test")],
+        [pyiof.Score(score=50.0, type="Test")],
+    ]
@@ -0,0 +1,191 @@
+import csv
+import datetime
+import io
+
+import pyiof
+from pyiof.generator import EventGenerator
+from pyiof.render import (
+    HtmlTemplates,
+    format_time,
+    render,
+    render_csv,
+    render_file,
+    render_html,
+    result_tables,
+)
+
+
+def person_result(family, time=None, position=None, status="OK", splits=()):
+    return pyiof.PersonResult(
+        person=pyiof.Person(name=pyiof.PersonName(family_name=family, given_name="X")),
+        organisation=pyiof.Organisation(name=f"Club {family}", short_name=f"C{family}"),
+        results=[
+            pyiof.PersonRaceResult(
+                time=time,
+                time_behind=time - 3000 if time is not None else None,
+                position=position,
+                status=status,
+                split_time=[pyiof.SplitTime(control_card=c, time=t) for c, t in splits],
+            )
+        ],
+    )
+
+
+def result_list():
+    return pyiof.ResultList(
+        event=pyiof.Event(name="Test <Event>"),
+        class_results=[
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="H21"),
+                person_results=[
+                    person_result("B", 3100, 2, splits=[("31", 600), ("32", 1500)]),
+                    person_result("C", status="MissingPunch", splits=[("31", 700)]),
+                    person_result("A", 3000, 1, splits=[("31", 650), ("32", 1400)]),
+                ],
+            ),
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="Open", resultlist_mode="Unordered"),
+                person_results=[person_result("Z", 3000, 1), person_result("Y", 3300, 2)],
+            ),
+            pyiof.ClassResult(
+                class_=pyiof.Class_(name="Beginners", resultlist_mode="UnorderedNoTimes"),
+                person_results=[
+                    person_result("N", 3000, 1),
+                    person_result("M", status="DidNotFinish"),
+                ],
+            ),
+        ],
+    )
+
+
+def test_format_time():
+    assert format_time(3725) == "1:02:05"
+    assert format_time(65) == "1:05"
+    assert format_time(65.34, resolution=0.1) == "1:05.3"
+    assert format_time(-5) == "-0:05"
+    assert format_time(None) == ""
+
+
+def test_split_table_ticks():
+    result = person_result("A", 1800.5, 1, splits=[("31", 600.5), ("32", 1201.5), ("33", None)])
+    result.results[0].split_time.append(pyiof.SplitTime(control_card="34", time=1500))
+    class_result = pyiof.ClassResult(class_=pyiof.Class_(name="H21"), person_results=[result])
+    _, splits = result_tables(class_result)
+    # legs in whole seconds add up to the split times, which are rounded half to even
+    assert splits.rows[0][1:] == ["10:00 (10:00)", "20:02 (10:02)", "-", "25:00", "30:00"]
+
+
+def test_render_html():
+    out = io.StringIO()
+    render_html(result_list(), out)
+    document = out.getvalue()
+    assert document.startswith("<!DOCTYPE html>")
+    assert "<title>Test &lt;Event&gt;</title>" in document
+    assert document.count("<section") == 3
+    h21, open_class, beginners = document.split("<section")[1:]
+    # ordered by position, runners without position last
+    assert h21.index("X A") < h21.index("X B") < h21.index("X C")
+    assert '<td class="number">+1:40</td>' in h21
+    assert '<table class="splits">' in h21
+    assert "10:50 (10:50)" in h21
+    assert "23:20 (12:30)" in h21
+    # ordered by name without positions
+    assert open_class.index("X Y") < open_class.index("X Z")
+    assert '<td class="number">1</td>' not in open_class
+    # no times
+    assert "50:00" not in beginners
+    assert "<td>Finished</td>" in beginners
+    assert "<td>DidNotFinish</td>" in beginners
+
+
+def test_render_html_templates():
+    out = io.StringIO()
+    templates = HtmlTemplates(document_start="<div>$title", document_end="</div>", style="")
+    render_html(result_list(), out, splits=False, templates=templates)
+    assert out.getvalue().startswith("<div>Test &lt;Event&gt;<section")
+    assert "splits" not in out.getvalue()
+
+
+def test_render_csv():
+    out = io.StringIO(newline="")
+    render_csv(result_list(), out, splits=True)
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == ["Class", "Pos", "Name", "Club", "Members", "Time", "Behind", "Status"]
+    assert rows[1] == [
+        *("H21", "1", "X A", "CA", "", "50:00", "+0:00", ""),
+        *("31", "10:50", "32", "23:20"),
+    ]
+    assert rows[3][1:4] == ["", "X C", "CC"]
+    assert rows[3][-3:] == ["MissingPunch", "31", "11:40"]
+    assert rows[-1] == ["Beginners", "", "X N", "CN", "", "", "", "Finished"]
+
+
+def test_render_csv_relays():
+    result_list = EventGenerator(seed=3, runners=60, classes=2, clubs=4, teams=3).build(
+        "ResultList"
+    )
+    out = io.StringIO(newline="")
+    render_csv(result_list, out)
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    header = rows[0]
+    assert {len(row) for row in rows} == {len(header)}
+    relay = result_list.class_results[-1]
+    team = relay.team_results[0]
+    row = next(r for r in rows if r[0] == relay.class_.name and r[2] == team.name)
+    members = row[header.index("Members")]
+    assert members.startswith(team.team_member_results[0].person.name.given_name)
+    individual = next(r for r in rows if r[0] == result_list.class_results[0].class_.name)
+    assert individual[header.index("Members")] == ""
+    assert individual[header.index("Time")]
+
+
+def test_split_tables_forked_courses():
+    class_result = pyiof.ClassResult(
+        class_=pyiof.Class_(name="H21"),
+        person_results=[
+            person_result("A", 3000, 1, splits=[("31", 600), ("32", 1500)]),
+            person_result("B", 3100, 2, splits=[("32", 700), ("31", 1600)]),
+            person_result("C", 3200, 3, splits=[("31", 650), ("32", 1400)]),
+        ],
+    )
+    _, first, second = result_tables(class_result)
+    assert first.header == ["Name", "31", "32", "Finish"]
+    assert [row[:2] for row in first.rows] == [["X A", "10:00 (10:00)"], ["X C", "10:50 (10:50)"]]
+    assert second.header == ["Name", "32", "31", "Finish"]
+    assert second.rows == [["X B", "11:40 (11:40)", "26:40 (15:00)", "51:40"]]
+
+
+def test_render_start_list():
+    start_list = pyiof.StartList(
+        event=pyiof.Event(name="Test"),
+        class_starts=[
+            pyiof.ClassStart(
+                class_=pyiof.Class_(name="H21"),
+                person_starts=[
+                    pyiof.PersonStart(
+                        person=pyiof.Person(name=pyiof.PersonName(family_name=name)),
+                        starts=[
+                            pyiof.PersonRaceStart(start_time=datetime.datetime(2024, 5, 1, 10, m))
+                        ],
+                    )
+                    for name, m in (("late", 30), ("early", 0))
+                ],
+            )
+        ],
+    )
+    out = io.StringIO()
+    render(start_list, out, "csv")
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[1:] == [
+        ["H21", "10:00:00", "", "early", "", ""],
+        ["H21", "10:30:00", "", "late", "", ""],
+    ]
+
+
+def test_render_file(tmp_path):
+    path = tmp_path / "results.xml"
+    result_list().write_xml(str(path))
+    streamed, loaded = io.StringIO(), io.StringIO()
+    render_file(str(path), pyiof.ResultList, streamed)
+    render_html(pyiof.ResultList.read_xml(str(path)), loaded)
+    assert streamed.getvalue() == loaded.getvalue()
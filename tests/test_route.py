@@ -0,0 +1,51 @@
+import base64
+import struct
+
+import pytest
+
+import pyiof
+
+np = pytest.importorskip("numpy")
+route = pytest.importorskip("pyiof.route")
+
+# 2020-06-01T10:00:00Z in milliseconds since 1900-01-01
+START_MS = 3799994400000
+
+
+def waypoint_bytes():
+    # full time and position, with altitude
+    data = bytes([0x04]) + START_MS.to_bytes(6, "big")
+    data += struct.pack(">ii", 59_123_456, 18_000_000) + (1234).to_bytes(3, "big", signed=True)
+    # seconds delta time, small delta position, with altitude
+    data += bytes([0x20 | 0x08 | 0x04, 1]) + struct.pack(">bbb", 5, -7, -3)
+    # milliseconds delta time, big delta position, interruption, no altitude
+    data += bytes([0x80 | 0x40 | 0x10]) + struct.pack(">Hhh", 1500, 1000, -2000)
+    return data
+
+
+def test_decode_route():
+    waypoints = route.decode_route(base64.b64encode(waypoint_bytes()))
+
+    assert waypoints["time"].tolist() == [
+        np.datetime64("2020-06-01T10:00:00.000"),
+        np.datetime64("2020-06-01T10:00:01.000"),
+        np.datetime64("2020-06-01T10:00:02.500"),
+    ]
+    assert np.allclose(waypoints["lat"], [59.123456, 59.123461, 59.124461])
+    assert np.allclose(waypoints["lng"], [18.0, 17.999993, 17.997993])
+    assert np.allclose(waypoints["alt"], [123.4, 123.1, np.nan], equal_nan=True)
+    assert waypoints["interruption"].tolist() == [False, False, True]
+
+
+def test_encode_route_roundtrip():
+    data = waypoint_bytes()
+    assert base64.b64decode(route.encode_route(route.decode_route(base64.b64encode(data)))) == data
+
+
+def test_route_waypoints_cached():
+    r = pyiof.Route(base64=base64.b64encode(waypoint_bytes()).decode())
+    assert r.waypoints is r.waypoints
+    assert not r.waypoints.flags.writeable
+
+    r2 = pyiof.Route.from_waypoints(r.waypoints[:2])
+    assert len(r2.waypoints) == 2
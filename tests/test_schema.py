@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+
+import pyiof
+from pyiof.generator import MESSAGES, EventGenerator
+from pyiof.schema import Schema
+from pyiof.streaming import StreamedMessage, iter_xml, write_xml
+
+from .xml_validator import iof_xml_schema
+
+XSD = Path(__file__).parent.parent / "IOF.xsd"
+
+
+@pytest.fixture(scope="module")
+def schema():
+    return Schema.load(XSD)
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return EventGenerator(seed=5, runners=100, classes=4, clubs=8, teams=4)
+
+
+@pytest.mark.parametrize("name", MESSAGES)
+def test_valid_messages(schema, generator, name):
+    assert schema.errors(generator.build(name)) == []
+
+
+def test_violations(schema, generator):
+    result_list = generator.build("ResultList")
+    class_result = result_list.class_results[0]
+    result = class_result.person_results[0].results[0]
+    result.status = "Fast"
+    result.position = "1"
+    class_result.person_results[1].person = None
+    class_result.class_.name = ""
+    errors = schema.errors(result_list)
+    assert errors == [
+        "ResultList/ClassResult[0]/Class/Name: required element missing",
+        "ResultList/ClassResult[0]/PersonResult[0]/Result[0]/Position: '1' is not of type integer",
+        "ResultList/ClassResult[0]/PersonResult[0]/Result[0]/Status: 'Fast' is not one of "
+        + ", ".join(sorted(pyiof.result.ResultStatus.__args__)),
+        "ResultList/ClassResult[0]/PersonResult[1]/Person: required element missing",
+    ]
+    # the same violations are found by the XSD validation
+    tree = result_list.to_xml_tree(skip_empty=True, exclude_none=False)
+    assert not iof_xml_schema.validate(tree)
+
+    # incrementally, class by class
+    prefix = "ResultList/ClassResult[0]/"
+    assert schema.errors(class_result) == [e.replace(prefix, "ClassResult/") for e in errors]
+    assert schema.errors(result_list.class_results[1]) == []
+    with pytest.raises(ValueError, match="4 schema violations"):
+        schema.validate(result_list)
+
+
+def test_min_occurs(schema, generator):
+    course_data = generator.build("CourseData")
+    course = course_data.race_course_data[0].courses[0]
+    course.course_controls = course.course_controls[:1]
+    course.course_controls[0].type = "Bogus"
+    assert schema.errors(course) == [
+        "Course/CourseControl[0]/type: 'Bogus' is not one of "
+        "Control, CrossingPoint, EndOfMarkedRoute, Finish, Start",
+        "Course/CourseControl: 1 elements, expected 2 to unbounded",
+    ]
+    course_data.race_course_data = []
+    assert schema.errors(course_data) == [
+        "CourseData/RaceCourseData: 0 elements, expected 1 to unbounded"
+    ]
+    assert schema.errors(course_data, exclude=["race_course_data"]) == []
+
+
+def test_streaming_validation(schema, generator, tmp_path):
+    result_list = generator.build("ResultList")
+    assert b"".join(iter_xml(result_list, schema=schema)) == result_list.to_xml()
+
+    result_list.class_results[2].person_results[0].results[0].status = "Fast"
+    chunks = iter_xml(result_list, schema=schema)
+    with pytest.raises(ValueError, match=r"ClassResult\[2\]/PersonResult\[0\]"):
+        list(chunks)
+
+    # the file isn't replaced by a partial one
+    write_xml(generator.build("ResultList"), tmp_path / "results.xml", schema=schema)
+    before = (tmp_path / "results.xml").read_bytes()
+    with pytest.raises(ValueError, match=r"ClassResult\[2\]"):
+        write_xml(result_list, tmp_path / "results.xml", schema=schema)
+    assert (tmp_path / "results.xml").read_bytes() == before
+    assert [p.name for p in tmp_path.iterdir()] == ["results.xml"]
+
+    course_data = generator.build("CourseData")
+    message = StreamedMessage(course_data.model_copy(), "race_course_data", iter([]))
+    with pytest.raises(ValueError, match="RaceCourseData: 0 elements"):
+        list(iter_xml(message, schema=schema))
+
+
+def test_schema_cached(schema):
+    assert Schema.load(str(XSD)) is schema
@@ -0,0 +1,107 @@
+import decimal
+import io
+
+import pyiof
+from pyiof.base import LanguageString
+from pyiof.fee import Amount, Fee
+from pyiof.generator import EventGenerator
+from pyiof.misc import OrganisationServiceRequest, PersonServiceRequest
+from pyiof.services import ServiceSummary, iter_service_requests, summarize_services
+
+
+def service(name, identifier=None, max_number=None):
+    return pyiof.Service(
+        id=pyiof.Id(id=identifier) if identifier else None,
+        name=[LanguageString(text=name)],
+        max_number=max_number,
+    )
+
+
+def request(service, quantity, delivered=None, amount=None, paid=None, currency="EUR"):
+    fee = Fee(
+        name=[LanguageString(text="fee")],
+        amount=Amount(amount=decimal.Decimal(amount), currency=currency) if amount else None,
+        percentage=None if amount else 10.0,
+    )
+    return pyiof.ServiceRequest(
+        service=service,
+        requested_quantity=quantity,
+        delivered_quantity=delivered,
+        assigned_fee=[
+            pyiof.AssignedFee(
+                fee=fee,
+                paid_amount=Amount(amount=decimal.Decimal(paid), currency=currency)
+                if paid
+                else None,
+            )
+        ],
+    )
+
+
+def test_summary():
+    person = pyiof.Person(name=pyiof.PersonName(family_name="Doe", given_name="Jane"))
+    bed, lunch = service("Bed", "bed", max_number=10), service("Lunch")
+    message = pyiof.ServiceRequestList(
+        event=pyiof.Event(name="Five days", services=[bed]),
+        organisation_service_requests=[
+            OrganisationServiceRequest(
+                organisation=pyiof.Organisation(name="OK Ärla"),
+                service_requests=[request(service("Bed", "bed"), 8, 8, "96.50", "96.50")],
+                person_service_requests=[
+                    PersonServiceRequest(
+                        person=person,
+                        service_requests=[request(service("lunch "), 2, amount="9.25")],
+                    )
+                ],
+            ),
+            OrganisationServiceRequest(
+                organisation=pyiof.Organisation(name="ok arla"),
+                service_requests=[request(bed, 4, amount="100", currency="SEK")],
+            ),
+        ],
+        person_service_requests=[
+            PersonServiceRequest(person=person, service_requests=[request(lunch, 1)])
+        ],
+    )
+
+    summary = ServiceSummary()
+    summary.add(message)
+    beds, lunches = summary.services.values()
+    assert beds.service is bed
+    assert (beds.requests, beds.requested, beds.delivered, beds.remaining) == (2, 12, 8, -2)
+    assert (lunches.requests, lunches.requested, lunches.remaining) == (2, 3, None)
+    assert summary.overbooked() == [beds]
+
+    club, persons = summary.organisations.values()
+    assert club.organisation.name == "OK Ärla"
+    assert club.requests == 3
+    assert club.requested == {("id", "", "bed"): 12, ("name", "lunch"): 2}
+    assert club.fees == {"EUR": decimal.Decimal("105.75"), "SEK": decimal.Decimal(100)}
+    assert club.paid == {"EUR": decimal.Decimal("96.50")}
+    assert persons.organisation is None
+    assert (persons.requests, persons.fees, persons.paid) == (1, {}, {})
+
+    streamed = summarize_services(io.BytesIO(message.to_xml()))
+    assert streamed.services == summary.services
+    assert streamed.organisations == summary.organisations
+
+
+def test_streaming(tmp_path):
+    generator = EventGenerator(seed=3, runners=200, classes=4, clubs=12)
+    path = generator.write(tmp_path, ["ServiceRequestList"])["ServiceRequestList"]
+    message = pyiof.ServiceRequestList.read_xml(str(path))
+    items = list(iter_service_requests(path))
+    assert items == [
+        message.event,
+        *message.organisation_service_requests,
+        *message.person_service_requests,
+    ]
+
+    summary = ServiceSummary()
+    summary.add(message)
+    streamed = summarize_services(path)
+    assert streamed.services == summary.services
+    assert streamed.organisations == summary.organisations
+    accommodation = streamed.services[("id", "", "accommodation")]
+    assert accommodation.service.max_number is not None
+    assert accommodation.requests == len(message.organisation_service_requests)
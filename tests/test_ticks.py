@@ -0,0 +1,51 @@
+import pytest
+
+import pyiof
+
+np = pytest.importorskip("numpy")
+
+from pyiof.ticks import MISSING, leg_ticks, quantize, split_ticks, to_seconds, to_ticks  # noqa: E402
+
+
+def test_ticks_round_trip():
+    ticks = to_ticks([0.1 + 0.2, 0.3, None, float("nan"), 3725.04], 0.1)
+    assert ticks.tolist() == [3, 3, MISSING, MISSING, 37250]
+    assert repr(to_seconds(ticks, 0.1).tolist()[:2]) == "[0.3, 0.3]"
+    assert np.isnan(to_seconds(ticks, 0.1)[2])
+
+    # the shortest repr of the seconds has the digits of the resolution
+    ticks = np.arange(100_000)
+    assert to_seconds(ticks, 0.01).tolist() == [round(t / 100, 2) for t in ticks.tolist()]
+    assert to_seconds(to_ticks([150.1, 89], 60), 60).tolist() == [180.0, 60.0]
+    assert quantize([1.234, 1.234], np.array([0.1, 0.01])).tolist() == [1.2, 1.23]
+    assert quantize(1.6).tolist() == 2.0
+
+
+def test_split_and_leg_ticks():
+    def result(time, splits):
+        return pyiof.PersonRaceResult(
+            time=time,
+            status="OK",
+            split_time=[
+                pyiof.SplitTime(control_card=str(31 + i), time=split, status=status)
+                for i, (split, status) in enumerate(splits)
+            ],
+        )
+
+    results = [
+        result(40.3, [(10.1, "OK"), (20.2, "OK"), (30.3, "OK")]),
+        result(45.0, [(10.1, "OK"), (None, "Missing"), (30.4, "OK")]),
+        result(None, [(12.0, "OK")]),
+    ]
+    splits = split_ticks(results, 0.1)
+    assert splits.tolist() == [
+        [101, 202, 303, 403],
+        [101, MISSING, 304, 450],
+        [120, MISSING, MISSING, MISSING],
+    ]
+    assert leg_ticks(splits).tolist() == [
+        [101, 101, 101, 100],
+        [101, MISSING, MISSING, 146],
+        [120, MISSING, MISSING, MISSING],
+    ]
+    assert split_ticks([], 0.1).shape == (0, 1)
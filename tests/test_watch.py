@@ -0,0 +1,123 @@
+import threading
+from pathlib import Path
+
+import pyiof
+from pyiof.scanner import element_ranges, find_root
+from pyiof.watch import (
+    EntryAdded,
+    EntryChanged,
+    EntryRemoved,
+    IncrementalReader,
+    MessageRead,
+    Watcher,
+)
+
+RESULTLIST = Path(__file__).parent / "testdata" / "resultlist" / "generated.xml"
+
+
+def test_element_ranges():
+    data = RESULTLIST.read_bytes()
+    root = find_root(data)
+    assert data[slice(*root.start_tag)].startswith(b"<ResultList ")
+    assert data[slice(*root.end_tag)] == b"</ResultList>"
+
+    ranges = element_ranges(data, "ClassResult")
+    assert len(ranges) == len(pyiof.ResultList.read_xml(str(RESULTLIST)).class_results)
+    for start, end in ranges:
+        assert data[start:end].startswith(b"<ClassResult")
+        assert data[start:end].endswith(b"</ClassResult>")
+
+
+def test_element_ranges_skip_comments():
+    data = b"<a><!-- <b>x</b> --><p:b/><b x='>'>y</b><![CDATA[<b>]]></a>"
+    assert [data[s:e] for s, e in element_ranges(data, "b")] == [b"<p:b/>", b"<b x='>'>y</b>"]
+
+
+def original_resultlist():
+    resultlist = pyiof.ResultList.read_xml(str(RESULTLIST))
+    # the generated example has duplicate class names and entry ids
+    for i, class_result in enumerate(resultlist.class_results):
+        class_result.class_.name = f"Class {i}"
+        for j, entry in enumerate(class_result.person_results + class_result.team_results):
+            entry.entry_id = pyiof.Id(id=f"{i}-{j}")
+    return resultlist
+
+
+def modified_resultlist():
+    resultlist = original_resultlist()
+    class_result = resultlist.class_results[-1]
+    changed = class_result.person_results[0]
+    changed.results[0].time = 4711
+    removed = class_result.person_results.pop()
+    return resultlist, changed, removed
+
+
+def test_incremental_reader(monkeypatch):
+    reader = IncrementalReader(pyiof.ResultList)
+    data = original_resultlist().to_xml()
+    events = reader.read(data)
+    expected = pyiof.ResultList.from_xml(data)
+    assert reader.message == expected
+    assert isinstance(events[0], MessageRead)
+    assert all(isinstance(e, EntryAdded) for e in events[1:])
+    assert len(events) - 1 == sum(
+        len(c.person_results) + len(c.team_results) for c in expected.class_results
+    )
+
+    parsed = []
+    parse_item = reader._parse_item
+    monkeypatch.setattr(reader, "_parse_item", lambda *a: parsed.append(a) or parse_item(*a))
+
+    resultlist, changed, removed = modified_resultlist()
+    events = reader.read(resultlist.to_xml())
+    assert reader.message == pyiof.ResultList.from_xml(resultlist.to_xml())
+    assert len(parsed) == 1
+    assert [type(e) for e in events] == [MessageRead, EntryChanged, EntryRemoved]
+    assert events[1].new == changed
+    assert events[2].entry == removed
+
+
+def test_watcher_poll(tmp_path):
+    path = tmp_path / "results.xml"
+    original_resultlist().write_xml(str(path))
+    (tmp_path / "notes.txt").write_text("ignored")
+    received = []
+    watcher = Watcher(str(tmp_path), callbacks=[received.append], use_inotify=False)
+
+    assert watcher.poll() == received
+    assert isinstance(received[0], MessageRead)
+    assert watcher.poll() == []
+
+    resultlist, _, _ = modified_resultlist()
+    resultlist.write_xml(str(path))
+    events = watcher.poll()
+    assert [type(e) for e in events] == [MessageRead, EntryChanged, EntryRemoved]
+
+
+def test_watcher_incomplete_file(tmp_path):
+    (tmp_path / "results.xml").write_bytes(RESULTLIST.read_bytes()[:5000])
+    assert Watcher(str(tmp_path), use_inotify=False).poll() == []
+
+
+def test_watcher_run(tmp_path):
+    path = tmp_path / "results.xml"
+    original_resultlist().write_xml(str(path))
+    changes = threading.Event()
+    received = []
+
+    def callback(event):
+        received.append(event)
+        if isinstance(event, EntryChanged):
+            changes.set()
+
+    watcher = Watcher(str(tmp_path), callbacks=[callback], interval=0.05)
+    thread = watcher.start()
+    try:
+        while not received:
+            threading.Event().wait(0.01)
+        resultlist, _, _ = modified_resultlist()
+        resultlist.write_xml(str(path))
+        assert changes.wait(5)
+    finally:
+        watcher.stop()
+        thread.join(5)
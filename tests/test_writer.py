@@ -0,0 +1,103 @@
+import concurrent.futures
+import os
+import stat
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import pyiof
+from pyiof import writer as writer_module
+from pyiof.utils import atomic_write
+from pyiof.writer import BackgroundWriter
+
+
+def event_list(name):
+    return pyiof.EventList(events=[pyiof.Event(name=name)])
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path / "events.xml"
+    event_list("first").write_xml(str(path), atomic=True, fsync="all")
+    assert pyiof.EventList.read_xml(str(path)) == event_list("first")
+    os.chmod(path, 0o640)
+
+    def fail():
+        with atomic_write(path) as f:
+            f.write(b"<EventList")
+            raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError, match="failed"):
+        fail()
+    assert pyiof.EventList.read_xml(str(path)) == event_list("first")
+    assert os.listdir(tmp_path) == ["events.xml"]
+
+    event_list("second").write_xml(str(path), atomic=True)
+    assert pyiof.EventList.read_xml(str(path)) == event_list("second")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_background_writes_coalesce(tmp_path, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def write(message, path, backend, fsync):
+        written.append(message.events[0].name)
+        started.set()
+        release.wait(5)
+        message.write_xml(path, backend=backend, atomic=True, fsync=fsync)
+
+    monkeypatch.setattr(writer_module, "_write", write)
+    with BackgroundWriter(fsync="none") as writer:
+        first = writer.submit(event_list("0"), tmp_path / "events.xml")
+        assert started.wait(5)
+        # the first write is in progress, the following snapshots are coalesced
+        futures = [writer.submit(event_list(str(i)), tmp_path / "events.xml") for i in range(1, 4)]
+        other = writer.submit(event_list("other"), tmp_path / "other.xml")
+        assert futures[0] is futures[1] is futures[2]
+        assert not writer.flush(timeout=0.01)
+        release.set()
+        assert writer.flush(timeout=5)
+    assert first.result() is None
+    assert futures[0].result() is None
+    assert other.done()
+    assert written == ["0", "3", "other"]
+    assert pyiof.EventList.read_xml(str(tmp_path / "events.xml")) == event_list("3")
+    with pytest.raises(ValueError, match="after close"):
+        writer.submit(event_list("4"), tmp_path / "events.xml")
+
+
+def test_background_write_errors(tmp_path):
+    writer = BackgroundWriter()
+    future = writer.submit(event_list("x"), tmp_path / "missing" / "events.xml")
+    with pytest.raises(FileNotFoundError):
+        future.result(timeout=5)
+    writer.close()
+
+
+def test_background_writes_in_process_pool(tmp_path):
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        writer = BackgroundWriter(fsync="none", executor=executor)
+        future = writer.submit(event_list("pool"), tmp_path / "events.xml")
+        assert future.result(timeout=30) is None
+        assert pyiof.EventList.read_xml(str(tmp_path / "events.xml")) == event_list("pool")
+    # the executor has been shut down, the writer serializes on its thread
+    assert writer.submit(event_list("thread"), tmp_path / "events.xml").result(5) is None
+    writer.close()
+    assert pyiof.EventList.read_xml(str(tmp_path / "events.xml")) == event_list("thread")
+
+
+def test_background_writes_at_exit(tmp_path):
+    path = tmp_path / "events.xml"
+    script = f"""
+import concurrent.futures
+import pyiof
+from pyiof.writer import BackgroundWriter
+
+events = pyiof.EventList(events=[pyiof.Event(name="exit")])
+executor = concurrent.futures.ProcessPoolExecutor(1)
+BackgroundWriter(fsync="none", executor=executor).submit(events, {str(path)!r})
+"""
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=60)
+    assert pyiof.EventList.read_xml(str(path)) == event_list("exit")